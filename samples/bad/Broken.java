@@ -0,0 +1,5 @@
+class Broken {
+    public static void main(String[] a){
+        System.out.println(1 +);
+    }
+}
@@ -0,0 +1,43 @@
+class ArraySum {
+    public static void main(String[] a){
+        System.out.println(new Summer().Run(100));
+    }
+}
+
+class Base {
+    int total ;
+    public int Reset(){
+        total = 0 ;
+        return total ;
+    }
+}
+
+class Summer {
+    int[] data ;
+    boolean ready ;
+
+    public int Run(int n){
+        int i ;
+        int s ;
+        int x ;
+        data = new int[n] ;
+        i = 0 ;
+        while (i < data.length) {
+            data[i] = i * 2 + 1 % 3 ;
+            i = i + 1 ;
+        }
+        s = 0 ;
+        i = 0 ;
+        ready = true ;
+        while ((i < n) && ready) {
+            s = s + data[i] ;
+            if (!(s < 1000) || false) ready = false ; else { x = s * 1 + 0 ; }
+            i = i + 1 ;
+        }
+        return s ;
+    }
+
+    private int Twice(int v, int w){
+        return v * 2 - w ;
+    }
+}
@@ -1,3 +1,4 @@
+from framework.compilation_context import CompilationContext
 from ir_tree.name_conventions import *
 from symbol_table.class_info import ClassInfo
 from symbol_table.method_info import MethodInfo
@@ -16,10 +17,11 @@ class FrameFiller:
     # TODO Хорошо ли, что FrameFiller содержит метод create_frame?
     """
 
-    def __init__(self, table: Table, verbose=False):
+    def __init__(self, table: Table, verbose=False, context: CompilationContext = None):
         self.table = table
         self.filled: bool = False
         self.verbose: bool = verbose
+        self.context = context
 
     def fill(self):
         """
@@ -36,7 +38,7 @@ class FrameFiller:
             methods_names = class_info.methods_names
             for method in methods_names:
                 method_info = self.table.get_method(method, position)
-                frame = X86MiniJavaFrame()
+                frame = X86MiniJavaFrame(self.context.temps if self.context is not None else None)
                 this_variable = VariableInfo(THIS_NAME, position, class_info.type_info)
                 frame.add_formal(this_variable)
                 for arg_info in method_info.args_block:
@@ -67,14 +69,15 @@ class FrameFiller:
             print(message)
 
     @staticmethod
-    def create_frame(class_info: ClassInfo, method_info: MethodInfo):
+    def create_frame(class_info: ClassInfo, method_info: MethodInfo, context: CompilationContext = None):
         """
         Отвечает за создание и заполнении фрейма на основании данных о классе и методе
         :param class_info:
         :param method_info:
+        :param context: контекст компиляции, из которого нумеруются регистры фрейма
         :return:
         """
-        frame = X86MiniJavaFrame()
+        frame = X86MiniJavaFrame(context.temps if context is not None else None)
         this_variable = VariableInfo(THIS_NAME, Position(0, 0), class_info.type_info)
         frame.add_formal(this_variable)
         for arg_info in method_info.args_block:
@@ -26,7 +26,7 @@ class InFrameAccess(IAccess):
             Binop(
                 BinopEnum.PLUS,
                 fp,
-                Const(self.address.address, position),
+                Const(self.address.get_address(), position),
                 position
             ),
             position
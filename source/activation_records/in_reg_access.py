@@ -1,6 +1,6 @@
 from ir_tree.expressions.i_exp import IExp
 from ir_tree.expressions.mem import Mem
-from ir_tree.expressions.temp import Temp
+from ir_tree.expressions.temp import Temp, TempAllocator
 from syntax_tree import Position
 from .i_access import IAccess
 from .temp_address import TempAddress
@@ -9,7 +9,7 @@ from .temp_address import TempAddress
 class InRegAccess(IAccess):
     AR_Prefix = 'AR::'
 
-    def __init__(self, record_type, size, name: str = None, id: int = None):
+    def __init__(self, record_type, size, name: str = None, id: int = None, temps: TempAllocator = None):
         IAccess.__init__(self)
         self.record_type = record_type
         self.size = size
@@ -20,7 +20,7 @@ class InRegAccess(IAccess):
             self.id = -1
             self.name = name
 
-        self.temp = Temp(self.AR_Prefix + self.name)
+        self.temp = Temp(self.AR_Prefix + self.name, allocator=temps)
 
     @classmethod
     def from_other(cls, other: 'InRegAccess'):
@@ -0,0 +1,976 @@
+import gc
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from enum import Enum
+from pathlib import Path
+
+import click
+import ply.lex as ply_lex
+
+from activation_records.frame_filler import FrameFiller
+from code_generation.instruction import InstructionList
+from driver import build_ir, compile_methods
+from flow_graph.control_flow_graph import ControlFlowGraph
+from framework.ast_cache import AstCache
+from framework.compilation_context import CompilationContext
+from framework.program_generator import ProgramGenerator
+from ir_tree.array_struct import bounds_checks
+from ir_tree.expressions.all import Binop, BinopEnum, Const, Mem
+from ir_tree.label import LabelAllocator
+from ir_tree.statements.all import Jump, JumpC, JumpTypeEnum, LabelStm, Move
+from ir_tree.translate.eseq_canonizer import EseqCanonizer
+from ir_tree.translate.ir_builder import IRBuilder
+from ir_tree.translate.linearizer import Linearizer
+from ir_tree.translate.no_jump_block import InLabelVisitor, NoJumpTree, OutLabelVisitor
+from optimization.bounds_checks import BoundsCheckElimination, failure_labels
+from optimization.pass_manager import OPTIMIZATION_LEVELS, MethodUnit, PassManager, count_ir_nodes
+import lex
+from symbol_table.table_filler import TableFiller
+from syntax_tree import Position, node_fields
+from type_checker.type_checker import TypeChecker
+from x86.strength_reduction import X86_COST_MODEL, CostModel
+from x86.x86_code_generation import Muncher
+from yacc import GRAMMAR_HASH, PARSER_BACKENDS, Parser, parse_source
+
+
+def measure(action, *args):
+    """
+    Отвечает за замер времени выполнения действия
+    :param action: замеряемая функция
+    :param args: аргументы функции
+    :return: время выполнения в секундах
+    """
+    # Как и timeit, отключаем сборщик мусора - он добавляет к большим входам нелинейную составляющую #
+    gc.collect()
+    gc.disable()
+    try:
+        start = time.perf_counter()
+        action(*args)
+        return time.perf_counter() - start
+    finally:
+        gc.enable()
+
+
+def print_scaling(title, rows):
+    """
+    Печатает таблицу масштабирования: размер, время и время на элемент
+    :param title: заголовок столбца размера
+    :param rows: список пар (размер, время в секундах)
+    :return:
+    """
+    print(f'{title:>12} {"time, s":>12} {"us / item":>12} {"ratio":>8}')
+    base = None
+    for size, elapsed in rows:
+        per_item = elapsed / size * 1e6
+        if base is None:
+            base = per_item
+        print(f'{size:>12} {elapsed:>12.4f} {per_item:>12.4f} {per_item / base:>8.2f}')
+
+
+def run_label_bench(sizes):
+    """
+    Замеряет выдачу нумерованных меток: время на метку
+    не должно расти с ростом числа меток
+    :param sizes: количества меток
+    :return:
+    """
+    print('### Бенчмарк выдачи меток ###')
+    print()
+
+    def allocate(count):
+        labels = LabelAllocator()
+        for _ in range(count):
+            labels.next_label()
+
+    print_scaling('labels', [(size, measure(allocate, size)) for size in sizes])
+    print()
+
+
+def generate_lines(lines):
+    """
+    Генерирует программу примерно из заданного числа строк
+    :param lines: желаемое число строк
+    :return: текст программы
+    """
+    # Метод из 60 операторов занимает около 240 строк #
+    return ProgramGenerator(seed=lines).generate(classes=1, methods=max(1, lines // 240), statements=60)
+
+
+def run_parse_bench(sizes):
+    """
+    Замеряет разбор программ разной длины: время на строку не должно расти
+    ни для обычного текста, ни для текста, записанного в одну строку
+    :param sizes: количества строк
+    :return:
+    """
+    print('### Бенчмарк парсера ###')
+    print()
+
+    texts = [generate_lines(size) for size in sizes if size <= 100000]
+    parse_source(texts[0])
+
+    print('Обычный текст')
+    print_scaling('lines', [(text.count('\n'), measure(parse_source, text)) for text in texts])
+    print()
+
+    print('Текст в одну строку')
+    print_scaling('chars', [(len(text), measure(parse_source, text.replace('\n', ' '))) for text in texts])
+    print()
+
+
+def run_backend_bench(sizes):
+    """
+    Сравнивает пропускную способность парсеров (строк в секунду)
+    :param sizes: количества строк
+    :return:
+    """
+    print('### Бенчмарк реализаций парсера ###')
+    print()
+
+    texts = [generate_lines(size) for size in sizes if size <= 100000]
+    print(f'{"lines":>12}' + ''.join(f'{backend + ", lines/s":>18}' for backend in PARSER_BACKENDS) + f'{"speedup":>10}')
+    for text in texts:
+        lines = text.count('\n')
+        speeds = [lines / measure(parse_source, text, backend) for backend in PARSER_BACKENDS]
+        print(f'{lines:>12}' + ''.join(f'{speed:>18.0f}' for speed in speeds) + f'{speeds[-1] / speeds[0]:>10.2f}')
+    print()
+
+
+def count_nodes(root):
+    """
+    Считает узлы AST и различные объекты Position в дереве
+    :param root: корень дерева
+    :return: пара (количество узлов, количество расположений)
+    """
+    nodes = 0
+    positions = set()
+    stack = [root]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, list):
+            stack.extend(node)
+        elif isinstance(node, Position):
+            positions.add(id(node))
+        elif type(node).__module__.startswith('syntax_tree') and not isinstance(node, Enum):
+            nodes += 1
+            stack.extend(value for _, value in node_fields(node))
+    return nodes, len(positions)
+
+
+def print_visitor_speed(name, nodes, elapsed):
+    print(f'{name:>16} {nodes:>10} {elapsed:>10.4f} {nodes / elapsed:>14.0f}')
+
+
+def run_visitor_bench(lines=2000):
+    """
+    Замеряет обходчики AST и IR: количество узлов дерева, обработанных в секунду,
+    для каждого обходчика отдельно
+    :param lines: количество строк программы
+    :return:
+    """
+    print('### Бенчмарк обходчиков ###')
+    print()
+
+    program = parse_source(generate_lines(lines))
+    nodes = count_nodes(program)[0]
+    print(f'{"visitor":>16} {"nodes":>10} {"time, s":>10} {"nodes / s":>14}')
+
+    # Printer и IRPrinter не замеряются - их время уходит на склейку строк, а не на обход #
+    context = CompilationContext()
+    filler = TableFiller(context.table, context=context)
+    filler.fill_table(program)
+    print_visitor_speed('TypeChecker', nodes, measure(program.accept, TypeChecker(context.table)))
+    filler.fill_class_struct()
+    FrameFiller(context.table, context=context).fill()
+    builder = IRBuilder(context.table, context)
+    print_visitor_speed('IRBuilder', nodes, measure(builder.parse, program))
+
+    trees = builder.trees
+    nodes = count_ir_nodes(trees.values())
+    canonizer = EseqCanonizer(context)
+    canonized = dict()
+    print_visitor_speed('EseqCanonizer', nodes, measure(
+        lambda: canonized.update((key, canonizer.canonize(tree)) for key, tree in trees.items())))
+
+    nodes = count_ir_nodes(canonized.values())
+    linearizer = Linearizer()
+    linearized = dict()
+    print_visitor_speed('Linearizer', nodes, measure(
+        lambda: linearized.update((key, linearizer.linearize(tree, [])) for key, tree in canonized.items())))
+
+    statements = [statement for tree in linearized.values() for statement in tree]
+    for visitor_class in (InLabelVisitor, OutLabelVisitor):
+        def visit_all():
+            for statement in statements:
+                statement.accept(visitor_class())
+        print_visitor_speed(visitor_class.__name__, len(statements), measure(visit_all))
+
+    reblocked = [NoJumpTree(tree, context).build_tree() for tree in linearized.values()]
+    nodes = count_ir_nodes(reblocked)
+
+    def munch_all():
+        for tree in reblocked:
+            Muncher(tree, context).create_instructions_list()
+    print_visitor_speed('Muncher', nodes, measure(munch_all))
+    print()
+
+
+def run_memory_bench(lines=20000):
+    """
+    Замеряет через tracemalloc память, которую занимает AST большой программы
+    :param lines: количество строк программы
+    :return:
+    """
+    print('### Бенчмарк памяти AST ###')
+    print()
+
+    text = generate_lines(lines)
+    print(f'{"backend":>8} {"nodes":>10} {"positions":>10} {"bytes":>12} {"bytes / node":>14}')
+    for backend in PARSER_BACKENDS:
+        gc.collect()
+        tracemalloc.start()
+        program = parse_source(text, backend)
+        gc.collect()
+        size = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        nodes, positions = count_nodes(program)
+        print(f'{backend:>8} {nodes:>10} {positions:>10} {size:>12} {size / nodes:>14.1f}')
+    print()
+
+
+def import_time(module, cache_dir):
+    """
+    Замеряет время импорта модуля в отдельном процессе через -X importtime
+    :param module: имя модуля
+    :param cache_dir: каталог кэша таблиц разбора для процесса
+    :return: суммарное время импорта модуля в секундах
+    """
+    source_dir = os.path.dirname(os.path.abspath(__file__))
+    env = dict(os.environ, MINIJAVA_CACHE_DIR=cache_dir, PYTHONPATH=os.pathsep.join(
+        [source_dir, os.path.dirname(source_dir), os.environ.get('PYTHONPATH', '')]))
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+                            cwd=source_dir, env=env, stderr=subprocess.PIPE, universal_newlines=True)
+    for line in result.stderr.splitlines():
+        if line.startswith('import time:') and line.split('|')[-1].strip() == module:
+            return int(line.split('|')[1]) / 1e6
+    raise RuntimeError(f'Не удалось замерить импорт {module}:\n{result.stderr}')
+
+
+def run_startup_bench(repeats=5):
+    """
+    Замеряет запуск: импорт yacc без кэша таблиц разбора и с кэшем,
+    а также создание Parser (копия лексера) против сборки лексера через ply_lex.lex()
+    :param repeats: количество повторов (берется минимум)
+    :return:
+    """
+    print('### Бенчмарк запуска ###')
+    print()
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        cold = import_time('yacc', cache_dir)
+        warm = min(import_time('yacc', cache_dir) for _ in range(repeats))
+    print(f'{"import yacc":>24} {"time, s":>12}')
+    print(f'{"без кэша таблиц":>24} {cold:>12.4f}')
+    print(f'{"с кэшем таблиц":>24} {warm:>12.4f}')
+    print()
+
+    def build_lexers(count):
+        for _ in range(count):
+            ply_lex.lex(module=lex)
+
+    def build_parsers(count):
+        for _ in range(count):
+            Parser()
+
+    print(f'{"1000 лексеров":>24} {"time, s":>12}')
+    print(f'{"ply_lex.lex()":>24} {measure(build_lexers, 1000):>12.4f}')
+    print(f'{"Parser() (clone)":>24} {measure(build_parsers, 1000):>12.4f}')
+    print()
+
+
+def run_cache_bench(count=200):
+    """
+    Сравнивает пропускную способность разбора корпуса программ
+    без кэша AST, с пустым (холодным) и с заполненным (теплым) кэшем
+    :param count: количество программ в корпусе
+    :return:
+    """
+    print('### Бенчмарк кэша AST ###')
+    print()
+
+    texts = [ProgramGenerator(seed=index).generate(classes=1 + index % 3, methods=1 + index % 4,
+                                                   statements=5 + index % 20) for index in range(count)]
+    lines = sum(text.count('\n') for text in texts)
+
+    def parse_corpus(backend, cache):
+        for text in texts:
+            parse_source(text, backend, cache)
+
+    print(f'{count} программ, {lines} строк')
+    print(f'{"backend":>8} {"no cache":>14} {"cold":>14} {"warm":>14} {"warm / no cache":>16}')
+    for backend in PARSER_BACKENDS:
+        with tempfile.TemporaryDirectory() as directory:
+            cache = AstCache(directory, GRAMMAR_HASH)
+            speeds = [lines / measure(parse_corpus, backend, None),
+                      lines / measure(parse_corpus, backend, cache),
+                      lines / measure(parse_corpus, backend, cache)]
+        print(f'{backend:>8}' + ''.join(f'{speed:>14.0f}' for speed in speeds) + f'{speeds[2] / speeds[0]:>16.2f}')
+    print('(строк в секунду)')
+    print()
+
+
+def run_method_pipeline_bench(methods=5000, jobs=None):
+    """
+    Замеряет бэкенд методов (canonize -> linearize -> reblock -> Muncher)
+    большой программы последовательно и в пуле процессов разного размера
+    :param methods: количество методов программы
+    :param jobs: размеры пула (по умолчанию 2, 4, ... до числа ядер)
+    :return:
+    """
+    print('### Бенчмарк параллельного бэкенда методов ###')
+    print()
+
+    cores = os.cpu_count() or 1
+    if jobs is None:
+        jobs = [1] + [2 ** power for power in range(1, cores.bit_length() + 1) if 2 ** power <= max(cores, 2)]
+    text = ProgramGenerator(seed=methods).generate(classes=max(1, methods // 100), methods=min(methods, 100),
+                                                   statements=3)
+
+    print(f'{methods} методов, ядер: {cores}')
+    print(f'{"jobs":>8} {"time, s":>12} {"methods / s":>14} {"speedup":>10}')
+    base = None
+    for count in jobs:
+        # Бэкенд меняет деревья, поэтому IR строится заново для каждого замера #
+        trees, context = build_ir(text)
+        elapsed = measure(compile_methods, trees, context, count)
+        if base is None:
+            base = elapsed
+        print(f'{count:>8} {elapsed:>12.3f} {len(trees) / elapsed:>14.1f} {base / elapsed:>10.2f}')
+    print()
+
+
+def run_ir_size_bench(repeats=3):
+    """
+    Замеряет размер IR деревьев (количество узлов после IRBuilder и после канонизации)
+    и время canonize и linearize для сгенерированной программы и для длинного метода
+    :param repeats: количество замеров (берется лучший)
+    :return:
+    """
+    print('### Бенчмарк размера IR ###')
+    print()
+
+    body = '\n'.join(f'        a = this.f(a, {index % 7}, a + 1) + {index % 5};' for index in range(20000))
+    programs = [
+        ('generated', ProgramGenerator(seed=13).generate(classes=20, methods=20, statements=20)),
+        ('long method', 'class Main {\n    public static void main(String[] args) {\n'
+                        '        System.out.println(new A().m());\n    }\n}\n'
+                        'class A {\n    int a;\n    public int f(int x, int y, int z) {\n        return x;\n    }\n'
+                        '    public int m() {\n' + body + '\n        return a;\n    }\n}\n'),
+    ]
+    print(f'{"program":>12} {"IR nodes":>10} {"CIR nodes":>10} {"canonize, s":>12} {"linearize, s":>13}')
+    for name, text in programs:
+        canonize_times, linearize_times = [], []
+        for _ in range(repeats):
+            # Канонизация и линеаризация меняют деревья, поэтому IR строится заново для каждого замера #
+            trees, context = build_ir(text)
+            nodes = count_ir_nodes(trees.values())
+            canonized = dict()
+            canonize_times.append(measure(lambda: canonized.update(
+                (key, EseqCanonizer(context.fork(index)).canonize(tree))
+                for index, (key, tree) in enumerate(trees.items()))))
+            canonized_nodes = count_ir_nodes(canonized.values())
+            linearize_times.append(measure(lambda: [Linearizer().linearize(tree, []) for tree in canonized.values()]))
+        print(f'{name:>12} {nodes:>10} {canonized_nodes:>10} {min(canonize_times):>12.3f} {min(linearize_times):>13.3f}')
+    print()
+
+
+def generate_linear_tree(count, context):
+    """
+    Генерирует линеаризованный метод примерно из count операторов: группы
+    метка - присваивание - условный переход - присваивание - метка, как после канонизации if
+    :param count: количество операторов
+    :param context: контекст компиляции (метки и временные переменные)
+    :return:
+    """
+    temp = context.new_temp('x')
+    tree = []
+    for index in range(count // 5):
+        start, end = context.labels.next_label(), context.labels.next_label()
+        tree += [
+            LabelStm(start),
+            Move(temp, Const(index)),
+            JumpC(JumpTypeEnum.LT, temp, Const(0), end),
+            Move(temp, Const(0)),
+            LabelStm(end),
+        ]
+    return tree
+
+
+def run_reblock_bench(sizes):
+    """
+    Замеряет разбиение линеаризованного метода на блоки (NoJumpTree) и удаление
+    неиспользуемых меток: время на оператор не должно расти с длиной метода
+    :param sizes: количества операторов
+    :return:
+    """
+    print('### Бенчмарк разбиения на блоки ###')
+    print()
+
+    rows = []
+    for size in sizes:
+        context = CompilationContext()
+        tree = generate_linear_tree(size, context)
+        rows.append((len(tree), measure(lambda: NoJumpTree(tree, context).build_tree())))
+    print_scaling('statements', rows)
+    print()
+
+
+def count_jumps(tree):
+    """
+    Считает переходы в линеаризованном методе
+    :param tree: операторы метода
+    :return: пара (безусловные переходы, условные переходы)
+    """
+    return sum(isinstance(statement, Jump) for statement in tree), sum(isinstance(statement, JumpC) for statement in tree)
+
+
+def run_trace_bench():
+    """
+    Сравнивает количество переходов после разбиения на блоки для раскладки
+    в исходном порядке и раскладки трассами (TraceScheduler) для примеров из samples/good
+    :return:
+    """
+    print('### Бенчмарк раскладки блоков трассами ###')
+    print()
+
+    print(f'{"sample":>28} {"Jump before":>12} {"Jump after":>11} {"removed":>8} {"JumpC":>6} {"inverted":>9}')
+    totals = [0, 0]
+    for sample in sorted(os.listdir('../samples/good')):
+        trees, context = build_ir((Path('../samples/good') / Path(sample)).read_text())
+        before = after = conditions = inverted = 0
+        for key, tree in trees.items():
+            linearized = Linearizer().linearize(EseqCanonizer(context).canonize(tree), [])
+            source_order = NoJumpTree(list(linearized), context).build_tree(traces=False)
+            traces = NoJumpTree(linearized, context).build_tree(traces=True)
+            before += count_jumps(source_order)[0]
+            after += count_jumps(traces)[0]
+            conditions += count_jumps(traces)[1]
+            original = {id(statement) for statement in source_order if isinstance(statement, JumpC)}
+            inverted += sum(isinstance(statement, JumpC) and id(statement) not in original for statement in traces)
+        totals[0] += before
+        totals[1] += after
+        print(f'{sample:>28} {before:>12} {after:>11} {before - after:>8} {conditions:>6} {inverted:>9}')
+    print(f'{"total":>28} {totals[0]:>12} {totals[1]:>11} {totals[0] - totals[1]:>8}')
+    print()
+
+
+def build_flow_graph(tree):
+    """
+    Строит граф потока управления и считает по нему доминаторы и циклы
+    :param tree: линеаризованный метод
+    :return:
+    """
+    graph = ControlFlowGraph.from_linear_tree(tree)
+    graph.immediate_dominators()
+    graph.loops()
+    return graph
+
+
+def run_cfg_bench(sizes):
+    """
+    Замеряет построение графа потока управления, дерева доминаторов и циклов:
+    метод из цепочки if внутри одного цикла (обратный переход в начало)
+    :param sizes: количества операторов
+    :return:
+    """
+    print('### Бенчмарк графа потока управления ###')
+    print()
+
+    rows = []
+    for size in sizes:
+        context = CompilationContext()
+        tree = generate_linear_tree(size, context)
+        tree.append(Jump(tree[0].label_name))
+        rows.append((len(tree), measure(build_flow_graph, tree)))
+    print_scaling('statements', rows)
+    print()
+
+
+def count_instructions(text, passes):
+    """
+    Компилирует программу заданными проходами и считает инструкции
+    :param text: исходный код программы
+    :param passes: имена проходов (последний - munch)
+    :return:
+    """
+    trees, context = build_ir(text)
+    instructions = 0
+    for index, (key, tree) in enumerate(trees.items()):
+        unit = MethodUnit(key, tree, context.fork(index))
+        PassManager(passes).run(unit)
+        instructions += len(unit.instructions.instructions)
+    return instructions
+
+
+def run_fold_bench():
+    """
+    Сравнивает количество инструкций примеров из samples/good без свертки констант
+    и со сверткой (остальные проходы - как на -O1)
+    :return:
+    """
+    print('### Бенчмарк свертки констант ###')
+    print()
+
+    with_fold = OPTIMIZATION_LEVELS[1]
+    without_fold = [name for name in with_fold if name not in ('fold', 'dead-branches')]
+    print(f'{"sample":>28} {"before":>8} {"after":>8} {"removed":>8} {"%":>6}')
+    totals = [0, 0]
+    for sample in sorted(os.listdir('../samples/good')):
+        text = (Path('../samples/good') / Path(sample)).read_text()
+        before, after = count_instructions(text, without_fold), count_instructions(text, with_fold)
+        totals[0] += before
+        totals[1] += after
+        print(f'{sample:>28} {before:>8} {after:>8} {before - after:>8} {(before - after) / before:>6.1%}')
+    print(f'{"total":>28} {totals[0]:>8} {totals[1]:>8} {totals[0] - totals[1]:>8} '
+          f'{(totals[0] - totals[1]) / totals[0]:>6.1%}')
+    print()
+
+
+def count_moves(instructions) -> int:
+    return sum(1 for instruction in instructions if instruction.asm_code == 'MOV %0 %1')
+
+
+def run_copy_bench():
+    """
+    Для каждого метода примеров из samples/good - пересылки между временными переменными
+    и все инструкции без распространения копий и с ним (остальные проходы - как на -O2),
+    а также сколько пересылок удалили проходы copies и machine-copies
+    :return:
+    """
+    print('### Бенчмарк распространения копий ###')
+    print()
+
+    passes = OPTIMIZATION_LEVELS[2]
+    plain_passes = [name for name in passes if name not in ('copies', 'machine-copies')]
+    print(f'{"method":>28} {"moves":>8} {"after":>8} {"instr":>8} {"after":>8} {"ir":>6} {"machine":>8} {"time, s":>8}')
+    totals = [0, 0, 0, 0]
+    for sample in sorted(os.listdir('../samples/good')):
+        text = (Path('../samples/good') / Path(sample)).read_text()
+        trees, context = build_ir(text)
+        plain = dict()
+        for index, (key, tree) in enumerate(trees.items()):
+            unit = MethodUnit(key, tree, context.fork(index))
+            PassManager(plain_passes).run(unit)
+            plain[key] = unit.instructions.instructions
+        trees, context = build_ir(text)
+        for index, (key, tree) in enumerate(trees.items()):
+            unit = MethodUnit(key, tree, context.fork(index))
+            records = {record.name: record for record in PassManager(passes).run(unit)}
+            row = [count_moves(plain[key]), count_moves(unit.instructions.instructions),
+                   len(plain[key]), len(unit.instructions.instructions)]
+            totals = [total + value for total, value in zip(totals, row)]
+            elapsed = records['copies'].elapsed + records['machine-copies'].elapsed
+            print(f'{key:>28} {row[0]:>8} {row[1]:>8} {row[2]:>8} {row[3]:>8} {records["copies"].changes:>6} '
+                  f'{records["machine-copies"].changes:>8} {elapsed:>8.4f}')
+    print(f'{"total":>28} {totals[0]:>8} {totals[1]:>8} {totals[2]:>8} {totals[3]:>8}')
+    print()
+
+
+def count_loads(instructions) -> int:
+    return sum(1 for instruction in instructions if (instruction.asm_code or '').startswith('MOV %0 ['))
+
+
+def run_cse_bench():
+    """
+    Для каждого метода примеров из samples/good - чтения памяти и все инструкции без удаления
+    общих подвыражений и с ним (остальные проходы - как на -O2), сколько выражений заменено
+    и время прохода cse
+    :return:
+    """
+    print('### Бенчмарк удаления общих подвыражений ###')
+    print()
+
+    passes = OPTIMIZATION_LEVELS[2]
+    plain_passes = [name for name in passes if name != 'cse']
+    print(f'{"method":>28} {"loads":>8} {"after":>8} {"instr":>8} {"after":>8} {"reused":>8} {"time, s":>8}')
+    totals = [0, 0, 0, 0, 0]
+    for sample in sorted(os.listdir('../samples/good')):
+        text = (Path('../samples/good') / Path(sample)).read_text()
+        trees, context = build_ir(text)
+        plain = dict()
+        for index, (key, tree) in enumerate(trees.items()):
+            unit = MethodUnit(key, tree, context.fork(index))
+            PassManager(plain_passes).run(unit)
+            plain[key] = unit.instructions.instructions
+        trees, context = build_ir(text)
+        for index, (key, tree) in enumerate(trees.items()):
+            unit = MethodUnit(key, tree, context.fork(index))
+            records = {record.name: record for record in PassManager(passes).run(unit)}
+            row = [count_loads(plain[key]), count_loads(unit.instructions.instructions),
+                   len(plain[key]), len(unit.instructions.instructions), records['cse'].changes]
+            totals = [total + value for total, value in zip(totals, row)]
+            print(f'{key:>28} {row[0]:>8} {row[1]:>8} {row[2]:>8} {row[3]:>8} {row[4]:>8} '
+                  f'{records["cse"].elapsed:>8.4f}')
+    print(f'{"total":>28} {totals[0]:>8} {totals[1]:>8} {totals[2]:>8} {totals[3]:>8} {totals[4]:>8}')
+    print()
+
+
+def run_dead_code_bench(statements=(50, 200, 800)):
+    """
+    Для каждого метода примеров из samples/good, а затем для сгенерированных методов
+    растущего размера - удаленные проходом dead-code операторы, узлы IR до и после прохода,
+    инструкции без удаления мертвого кода и с ним (остальные проходы - как на -O2) и время прохода
+    :param statements: количества операторов в сгенерированных методах
+    :return:
+    """
+    print('### Бенчмарк удаления мертвого кода ###')
+    print()
+
+    passes = OPTIMIZATION_LEVELS[2]
+    plain_passes = [name for name in passes if name != 'dead-code']
+    programs = [('', (Path('../samples/good') / Path(sample)).read_text())
+                for sample in sorted(os.listdir('../samples/good'))]
+    programs += [(f'{count}: ', ProgramGenerator(seed=count).generate(classes=1, methods=1, statements=count))
+                 for count in statements]
+    print(f'{"method":>28} {"removed":>8} {"ir":>8} {"after":>8} {"instr":>8} {"after":>8} {"time, s":>8}')
+    for prefix, text in programs:
+        trees, context = build_ir(text)
+        plain = dict()
+        for index, (key, tree) in enumerate(trees.items()):
+            unit = MethodUnit(key, tree, context.fork(index))
+            PassManager(plain_passes).run(unit)
+            plain[key] = len(unit.instructions.instructions)
+        trees, context = build_ir(text)
+        for index, (key, tree) in enumerate(trees.items()):
+            unit = MethodUnit(key, tree, context.fork(index))
+            record = next(record for record in PassManager(passes, count_sizes=True).run(unit)
+                          if record.name == 'dead-code')
+            print(f'{prefix + key:>28} {record.changes:>8} {record.size_before:>8} {record.size_after:>8} '
+                  f'{plain[key]:>8} {len(unit.instructions.instructions):>8} {record.elapsed:>8.4f}')
+    print()
+
+
+def estimate_cycles(instructions, model: CostModel) -> int:
+    """
+    Оценка стоимости инструкций по модели стоимости цели (мнемоники вне модели стоят 1)
+    :param instructions: инструкции метода
+    :param model: модель стоимости
+    :return:
+    """
+    return sum(model.costs.get(instruction.asm_code.split()[0], 1) for instruction in instructions
+               if instruction.asm_code)
+
+
+def run_strength_bench():
+    """
+    Для каждого метода примеров из samples/good - умножения и деления (IMUL и IDIV) и оценка
+    стоимости по X86_COST_MODEL без понижения стоимости и с ним (остальные проходы - как на -O2)
+    :return:
+    """
+    print('### Бенчмарк понижения стоимости операций ###')
+    print()
+
+    passes = OPTIMIZATION_LEVELS[2]
+    plain_passes = ['munch' if name == 'strength-munch' else name for name in passes]
+    print(f'{"method":>28} {"mul/div":>8} {"after":>8} {"cycles":>8} {"after":>8}')
+    totals = [0, 0, 0, 0]
+    for sample in sorted(os.listdir('../samples/good')):
+        text = (Path('../samples/good') / Path(sample)).read_text()
+        results = []
+        for names in (plain_passes, passes):
+            trees, context = build_ir(text)
+            methods = dict()
+            for index, (key, tree) in enumerate(trees.items()):
+                unit = MethodUnit(key, tree, context.fork(index))
+                PassManager(names).run(unit)
+                methods[key] = unit.instructions.instructions
+            results.append(methods)
+        for key in results[0]:
+            row = [sum((instruction.asm_code or '').startswith(('IMUL', 'IDIV')) for instruction in methods[key])
+                   for methods in results]
+            row += [estimate_cycles(methods[key], X86_COST_MODEL) for methods in results]
+            totals = [total + value for total, value in zip(totals, row)]
+            print(f'{key:>28} {row[0]:>8} {row[1]:>8} {row[2]:>8} {row[3]:>8}')
+    print(f'{"total":>28} {totals[0]:>8} {totals[1]:>8} {totals[2]:>8} {totals[3]:>8}')
+    print()
+
+
+def weighted_instructions(instructions) -> int:
+    """
+    Оценка числа исполняемых инструкций: инструкция в цикле глубины d считается 10 ** d раз
+    :param instructions: инструкции метода
+    :return:
+    """
+    instruction_list = InstructionList()
+    instruction_list.instructions = instructions
+    graph = ControlFlowGraph.from_instructions(instruction_list)
+    return sum(10 ** graph.loop_depth(block.index) * sum(1 for item in block.items if item.asm_code)
+               for block in graph.blocks)
+
+
+def run_licm_bench():
+    """
+    Для каждого метода примеров из samples/good (ArraySum, BubbleSort) - инструкции и их число
+    с учетом вложенности циклов (weighted_instructions) без выноса инвариантов и с ним
+    (остальные проходы - как на -O2)
+    :return:
+    """
+    print('### Бенчмарк выноса инвариантов циклов ###')
+    print()
+
+    passes = OPTIMIZATION_LEVELS[2]
+    plain_passes = [name for name in passes if name != 'licm']
+    print(f'{"method":>28} {"instr":>8} {"after":>8} {"weighted":>9} {"after":>8}')
+    totals = [0, 0, 0, 0]
+    for sample in sorted(os.listdir('../samples/good')):
+        text = (Path('../samples/good') / Path(sample)).read_text()
+        results = []
+        for names in (plain_passes, passes):
+            trees, context = build_ir(text)
+            methods = dict()
+            for index, (key, tree) in enumerate(trees.items()):
+                unit = MethodUnit(key, tree, context.fork(index))
+                PassManager(names).run(unit)
+                methods[key] = unit.instructions.instructions
+            results.append(methods)
+        for key in results[0]:
+            row = [sum(1 for instruction in methods[key] if instruction.asm_code) for methods in results]
+            row += [weighted_instructions(methods[key]) for methods in results]
+            totals = [total + value for total, value in zip(totals, row)]
+            print(f'{key:>28} {row[0]:>8} {row[1]:>8} {row[2]:>9} {row[3]:>8}')
+    print(f'{"total":>28} {totals[0]:>8} {totals[1]:>8} {totals[2]:>9} {totals[3]:>8}')
+    print()
+
+
+def array_kernel(name):
+    """
+    Цикл по массиву на линеаризованном IR со счетчиком во временной переменной:
+    'sum' - сумма элементов с копированием в другой массив, 'bubble' - проходы сортировки пузырьком
+    :param name: 'sum' или 'bubble'
+    :return: (операторы, контекст)
+    """
+    context = CompilationContext()
+    i, j, x, y, array, copy, result = (context.new_temp(temp)
+                                       for temp in ('i', 'j', 'x', 'y', 'array', 'copy', 'result'))
+    labels = [context.labels.next_label() for _ in range(8)]
+
+    def element(base, index, shift=1):
+        return Mem(Binop(BinopEnum.PLUS, Binop(BinopEnum.PLUS, base, Const(shift)),
+                         Binop(BinopEnum.MUL, Const(4), index)))
+
+    if name == 'sum':
+        return [LabelStm(labels[0]), Move(i, Const(0)), Move(x, Const(0)), Jump(labels[1]),
+                LabelStm(labels[1]), JumpC(JumpTypeEnum.GE, i, Const(100), labels[3]),
+                LabelStm(labels[2]), Move(y, element(array, i)), Move(element(copy, i), y),
+                Move(x, Binop(BinopEnum.PLUS, x, y)), Move(i, Binop(BinopEnum.PLUS, i, Const(1))), Jump(labels[1]),
+                LabelStm(labels[3]), Move(Mem(result), x)], context
+    return [LabelStm(labels[0]), Move(j, Const(0)), Jump(labels[1]),
+            LabelStm(labels[1]), JumpC(JumpTypeEnum.GE, j, Const(100), labels[7]),
+            LabelStm(labels[2]), Move(i, Const(0)), Jump(labels[3]),
+            LabelStm(labels[3]), JumpC(JumpTypeEnum.GE, i, Const(99), labels[6]),
+            LabelStm(labels[4]), Move(x, element(array, i)), Move(y, element(array, i, 5)),
+            JumpC(JumpTypeEnum.LT, x, y, labels[5]),
+            Move(element(array, i), y), Move(element(array, i, 5), x), Jump(labels[5]),
+            LabelStm(labels[5]), Move(i, Binop(BinopEnum.PLUS, i, Const(1))), Jump(labels[3]),
+            LabelStm(labels[6]), Move(j, Binop(BinopEnum.PLUS, j, Const(1))), Jump(labels[1]),
+            LabelStm(labels[7]), Move(Mem(result), j)], context
+
+
+def run_induction_bench():
+    """
+    Для циклов суммы массива и сортировки пузырьком (array_kernel) - инструкции и их число
+    с учетом вложенности циклов (weighted_instructions) без понижения стоимости индукционных
+    переменных и с ним (остальные проходы после линеаризации - как на -O2)
+    :return:
+    """
+    print('### Бенчмарк понижения стоимости индукционных переменных ###')
+    print()
+
+    passes = OPTIMIZATION_LEVELS[2]
+    passes = passes[passes.index('linearize') + 1:]
+    plain_passes = [name for name in passes if name != 'induction']
+    print(f'{"kernel":>10} {"instr":>8} {"after":>8} {"weighted":>9} {"after":>8} {"reduced":>8}')
+    for name in ('sum', 'bubble'):
+        row = []
+        for names in (plain_passes, passes):
+            tree, context = array_kernel(name)
+            unit = MethodUnit(name, None, context)
+            unit.linear = tree
+            records = PassManager(names).run(unit)
+            instructions = unit.instructions.instructions
+            row.append((sum(1 for instruction in instructions if instruction.asm_code),
+                        weighted_instructions(instructions),
+                        sum(record.changes or 0 for record in records if record.name == 'induction')))
+        (plain_count, plain_weighted, _), (count, weighted, reduced) = row
+        print(f'{name:>10} {plain_count:>8} {count:>8} {plain_weighted:>9} {weighted:>8} {reduced:>8}')
+    print()
+
+
+def checked_kernel(name):
+    """
+    Цикл по массиву с проверками границ (array_struct.bounds_checks) на линеаризованном IR:
+    'sum' - сумма a[i] при i < a.length, 'pairs' - a[i] + a[i + 1] при i < a.length - 1,
+    'invariant' - 100 проходов с чтением a[k], k не меняется в цикле
+    :param name: 'sum', 'pairs' или 'invariant'
+    :return: (операторы, контекст)
+    """
+    context = CompilationContext()
+    i, j, k, x, y, n, m, array, out, result = (
+        context.new_temp(temp) for temp in ('i', 'j', 'k', 'x', 'y', 'n', 'm', 'array', 'out', 'result'))
+    labels = [context.labels.next_label() for _ in range(4)]
+    checks = lambda index: bounds_checks(array, index, context, Position(0, 0))
+    element = lambda index: Mem(Binop(BinopEnum.PLUS, Binop(BinopEnum.PLUS, array, Const(1)), index))
+    length = Mem(Binop(BinopEnum.PLUS, array, Const(0)))
+
+    if name == 'sum':
+        return [LabelStm(labels[0]), Move(i, Const(0)), Move(x, Const(0)), Move(n, length), Jump(labels[1]),
+                LabelStm(labels[1]), JumpC(JumpTypeEnum.GE, i, n, labels[3]),
+                LabelStm(labels[2]), *checks(i), Move(y, element(i)), Move(x, Binop(BinopEnum.PLUS, x, y)),
+                Move(i, Binop(BinopEnum.PLUS, i, Const(1))), Jump(labels[1]),
+                LabelStm(labels[3]), Move(Mem(result), x)], context
+    if name == 'pairs':
+        return [LabelStm(labels[0]), Move(i, Const(0)), Move(n, length), Move(m, Binop(BinopEnum.MINUS, n, Const(1))),
+                Jump(labels[1]),
+                LabelStm(labels[1]), JumpC(JumpTypeEnum.GE, i, m, labels[3]),
+                LabelStm(labels[2]), *checks(i), Move(x, element(i)), Move(j, Binop(BinopEnum.PLUS, i, Const(1))),
+                *checks(j), Move(y, element(j)), Move(Mem(Binop(BinopEnum.PLUS, out, i)), Binop(BinopEnum.PLUS, x, y)),
+                Move(i, j), Jump(labels[1]),
+                LabelStm(labels[3]), Move(Mem(result), i)], context
+    return [LabelStm(labels[0]), Move(k, Mem(Binop(BinopEnum.PLUS, out, Const(4)))), Move(i, Const(0)),
+            Move(x, Const(0)), Jump(labels[1]),
+            LabelStm(labels[1]), *checks(k), Move(y, element(k)), Move(x, Binop(BinopEnum.PLUS, x, y)),
+            Move(i, Binop(BinopEnum.PLUS, i, Const(1))), JumpC(JumpTypeEnum.LT, i, Const(100), labels[1]),
+            LabelStm(labels[3]), Move(Mem(result), x)], context
+
+
+def count_bounds_checks(tree) -> int:
+    """
+    :param tree: линеаризованный метод
+    :return: количество проверок границ (условных переходов на вызов обработчика)
+    """
+    failures = failure_labels(ControlFlowGraph.from_linear_tree(tree))
+    return sum(1 for statement in tree if isinstance(statement, JumpC) and statement.true_label in failures)
+
+
+def run_bounds_bench():
+    """
+    Для циклов с проверками границ (checked_kernel) - проверки до удаления, удаленные и вынесенные
+    из цикла, число инструкций с учетом вложенности циклов (weighted_instructions) без удаления
+    проверок и с ним; затем то же для примеров из samples/good, собранных с проверками границ
+    (остальные проходы - как на -O2)
+    :return:
+    """
+    print('### Бенчмарк удаления проверок границ массивов ###')
+    print()
+
+    passes = OPTIMIZATION_LEVELS[2]
+    before_bounds = passes[:passes.index('bounds')]
+    after_bounds = passes[passes.index('bounds') + 1:]
+    print(f'{"kernel":>10} {"checks":>8} {"removed":>8} {"hoisted":>8} {"weighted":>9} {"after":>8}')
+    for name in ('sum', 'pairs', 'invariant'):
+        row = []
+        for eliminate in (False, True):
+            tree, context = checked_kernel(name)
+            unit = MethodUnit(name, None, context)
+            unit.linear = tree
+            PassManager(before_bounds[before_bounds.index('linearize') + 1:]).run(unit)
+            checks = count_bounds_checks(unit.linear)
+            elimination = BoundsCheckElimination(unit.linear, unit.context)
+            if eliminate:
+                elimination.eliminate()
+            PassManager(after_bounds).run(unit)
+            row.append((checks, elimination.removed, elimination.hoisted,
+                        weighted_instructions(unit.instructions.instructions)))
+        (checks, _, _, plain_weighted), (_, removed, hoisted, weighted) = row
+        print(f'{name:>10} {checks:>8} {removed:>8} {hoisted:>8} {plain_weighted:>9} {weighted:>8}')
+    print()
+
+    totals = [0, 0, 0]
+    for sample in sorted(os.listdir('../samples/good')):
+        trees, context = build_ir((Path('../samples/good') / Path(sample)).read_text(), bounds_checks=True)
+        for index, (key, tree) in enumerate(trees.items()):
+            unit = MethodUnit(key, tree, context.fork(index))
+            PassManager(before_bounds).run(unit)
+            elimination = BoundsCheckElimination(unit.linear, unit.context)
+            checks = count_bounds_checks(unit.linear)
+            elimination.eliminate()
+            totals = [total + value for total, value in zip(totals, (checks, elimination.removed, elimination.hoisted))]
+    print(f'samples/good: проверок {totals[0]}, удалено {totals[1]}, вынесено из циклов {totals[2]}')
+    print()
+
+
+@click.command()
+@click.option('--bench', '-b', default='all',
+              help='What to measure? (labels, parse, startup, backends, memory, cache, methods, visitors, ir, reblock, traces, cfg, fold, copies, cse, dead, strength, licm, induction, bounds, all).')
+@click.option('--scale', '-s', default=1000000,
+              help='Largest size for scaling benchmarks.')
+def run_benchmarks(bench, scale):
+    sizes = [size for size in (1000, 10000, 100000, 1000000) if size <= scale]
+
+    if bench == 'labels' or bench == 'all':
+        run_label_bench(sizes)
+
+    if bench == 'parse' or bench == 'all':
+        run_parse_bench(sizes)
+
+    if bench == 'startup' or bench == 'all':
+        run_startup_bench()
+
+    if bench == 'backends' or bench == 'all':
+        run_backend_bench(sizes)
+
+    if bench == 'memory' or bench == 'all':
+        run_memory_bench(min(scale, 20000))
+
+    if bench == 'cache' or bench == 'all':
+        run_cache_bench()
+
+    if bench == 'methods' or bench == 'all':
+        run_method_pipeline_bench(min(scale // 200, 5000))
+
+    if bench == 'visitors' or bench == 'all':
+        run_visitor_bench(min(scale, 2000))
+
+    if bench == 'ir' or bench == 'all':
+        run_ir_size_bench()
+
+    if bench == 'reblock' or bench == 'all':
+        run_reblock_bench(sizes)
+
+    if bench == 'traces' or bench == 'all':
+        run_trace_bench()
+
+    if bench == 'cfg' or bench == 'all':
+        run_cfg_bench(sizes)
+
+    if bench == 'fold' or bench == 'all':
+        run_fold_bench()
+
+    if bench == 'copies' or bench == 'all':
+        run_copy_bench()
+
+    if bench == 'cse' or bench == 'all':
+        run_cse_bench()
+
+    if bench == 'dead' or bench == 'all':
+        run_dead_code_bench()
+
+    if bench == 'strength' or bench == 'all':
+        run_strength_bench()
+
+    if bench == 'licm' or bench == 'all':
+        run_licm_bench()
+
+    if bench == 'induction' or bench == 'all':
+        run_induction_bench()
+
+    if bench == 'bounds' or bench == 'all':
+        run_bounds_bench()
+
+
+if __name__ == '__main__':
+    run_benchmarks()
@@ -0,0 +1,310 @@
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+import click
+
+from activation_records.frame_filler import FrameFiller
+from framework.compilation_context import CompilationContext
+from ir_tree.translate.i_subtree_wrapper import ISubtreeWrapper
+from ir_tree.translate.ir_builder import IRBuilder
+from optimization.pass_manager import DEFAULT_LEVEL, OPTIMIZATION_LEVELS, MethodUnit, PassManager, PassRecord, \
+    PassReport
+from symbol_table.table_filler import TableFiller
+from type_checker.type_checker import TypeChecker
+from yacc import parse_source
+
+# Стадии IR обходят деревья явным стеком (см. Visitor.visit), но pickle, которым деревья #
+# передаются в процессы пула, обходит рекурсивно глубоко вложенные выражения #
+RECURSION_LIMIT = 10000
+
+
+class CompilationResult:
+    """
+    Результат компиляции одного файла: ассемблерный код или текст ошибки
+
+    Объект передается из процесса-исполнителя в основной процесс,
+    поэтому хранит только строки и числа
+    """
+
+    def __init__(self, path: str, code: str = None, error: str = None, elapsed: float = 0.0,
+                 records: List[PassRecord] = None):
+        """
+        Конструктор
+        :param path: путь к исходному файлу
+        :param code: ассемблерный код (None, если компиляция не удалась)
+        :param error: текст ошибки (None, если компиляция удалась)
+        :param elapsed: время компиляции в секундах
+        :param records: замеры фронтенда и проходов бэкенда по всем методам
+        """
+        self.path = path
+        self.code = code
+        self.error = error
+        self.elapsed = elapsed
+        self.records = records if records is not None else list()
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+class MethodResult:
+    """
+    Результат бэкенда для одного метода: инструкции и граф конфликтов временных переменных
+    """
+
+    def __init__(self, key: str, instructions: List[str], interference: Dict[int, List[int]] = None,
+                 records: List[PassRecord] = None):
+        """
+        Конструктор
+        :param key: имя метода (ключ в IRBuilder.trees)
+        :param instructions: инструкции в формате format_long
+        :param interference: номер временной переменной -> номера переменных, живых одновременно с ней
+        (None, если анализ живости не проводился)
+        :param records: замеры проходов бэкенда
+        """
+        self.key = key
+        self.instructions = instructions
+        self.interference = interference
+        self.records = records if records is not None else list()
+
+
+def compile_method(key: str, tree: ISubtreeWrapper, context: CompilationContext,
+                   liveness: bool = False, level: int = DEFAULT_LEVEL, count_sizes: bool = False) -> MethodResult:
+    """
+    Проводит метод через проходы бэкенда уровня level (см. OPTIMIZATION_LEVELS):
+    canonize -> linearize -> reblock -> Muncher и, если нужно, LifecycleGraph -> VariableGraph
+    :param key: имя метода
+    :param tree: IR дерево метода
+    :param context: контекст метода (CompilationContext.fork)
+    :param liveness: строить ли граф живости и граф конфликтов
+    :param level: уровень оптимизации
+    :param count_sizes: считать ли размер метода до и после каждого прохода
+    :return:
+    """
+    unit = MethodUnit(key, tree, context)
+    records = PassManager(level=level, liveness=liveness, count_sizes=count_sizes).run(unit)
+    code = [instruction.format_long() for instruction in unit.instructions.instructions]
+    return MethodResult(key, code, unit.interference, records)
+
+
+def compile_method_job(job) -> MethodResult:
+    return compile_method(*job)
+
+
+def compile_methods(trees: Dict[str, ISubtreeWrapper], context: CompilationContext, jobs: int = 1,
+                    liveness: bool = False, chunk_size: int = 64, level: int = DEFAULT_LEVEL,
+                    count_sizes: bool = False) -> List[MethodResult]:
+    """
+    Проводит все методы через бэкенд, при jobs > 1 - в пуле процессов
+    Каждый метод получает свой CompilationContext.fork, поэтому результат
+    не зависит от числа процессов, а порядок методов совпадает с порядком в trees
+    :param trees: IR деревья методов (IRBuilder.trees)
+    :param context: контекст компиляции после IRBuilder
+    :param jobs: количество процессов (1 - в текущем процессе)
+    :param liveness: строить ли граф живости и граф конфликтов
+    :param chunk_size: количество методов в одной задаче пула
+    :param level: уровень оптимизации
+    :param count_sizes: считать ли размер метода до и после каждого прохода
+    :return:
+    """
+    jobs_list = [(key, tree, context.fork(index), liveness, level, count_sizes)
+                 for index, (key, tree) in enumerate(trees.items())]
+    if jobs <= 1:
+        return [compile_method_job(job) for job in jobs_list]
+
+    sys.setrecursionlimit(max(sys.getrecursionlimit(), RECURSION_LIMIT))
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        return list(executor.map(compile_method_job, jobs_list, chunksize=chunk_size))
+
+
+def build_ir(text: str, bounds_checks: bool = False):
+    """
+    Проводит программу через фронтенд: parse -> TableFiller -> TypeChecker ->
+    FrameFiller -> IRBuilder
+    :param text: исходный код программы
+    :param bounds_checks: проверять ли индексы при обращении к массивам
+    :return: пара (IR деревья методов, контекст компиляции)
+    """
+    program = parse_source(text)
+
+    context = CompilationContext()
+    filler = TableFiller(context.table, context=context)
+    filler.fill_table(program)
+    # check_ast_st печатает ошибки типов, здесь они должны дойти до вызывающего #
+    program.accept(TypeChecker(context.table))
+    filler.fill_class_struct()
+    FrameFiller(context.table, context=context).fill()
+
+    builder = IRBuilder(context.table, context, bounds_checks)
+    builder.parse(program)
+    return builder.trees, context
+
+
+def compile_source(text: str, method_jobs: int = 1, liveness: bool = False, level: int = DEFAULT_LEVEL,
+                   records: List[PassRecord] = None, bounds_checks: bool = False) -> str:
+    """
+    Компилирует программу от разбора до выбора инструкций
+    (фронтенд, см. build_ir, затем бэкенд каждого метода, см. compile_method)
+    :param text: исходный код программы
+    :param method_jobs: количество процессов для бэкенда методов
+    :param liveness: строить ли для методов граф живости и граф конфликтов
+    :param level: уровень оптимизации
+    :param records: сюда добавляются замеры фронтенда и проходов (None - размеры методов не считаются)
+    :param bounds_checks: проверять ли индексы при обращении к массивам
+    :return: ассемблерный код в формате tests/output.asm
+    """
+    start = time.perf_counter()
+    trees, context = build_ir(text, bounds_checks)
+    if records is not None:
+        records.append(PassRecord('frontend', 'ast', time.perf_counter() - start))
+    lines = []
+    for result in compile_methods(trees, context, method_jobs, liveness, level=level, count_sizes=records is not None):
+        if records is not None:
+            records.extend(result.records)
+        lines.append(result.key)
+        lines.append('-' * 10)
+        lines.extend(result.instructions)
+        lines.append('')
+    return '\n'.join(lines) + '\n'
+
+
+def compile_file(path, method_jobs: int = 1, liveness: bool = False, level: int = DEFAULT_LEVEL,
+                 statistics: bool = False, bounds_checks: bool = False) -> CompilationResult:
+    """
+    Компилирует файл, перехватывая ошибки компиляции
+    :param path: путь к исходному файлу
+    :param method_jobs: количество процессов для бэкенда методов
+    :param liveness: строить ли для методов граф живости и граф конфликтов
+    :param level: уровень оптимизации
+    :param statistics: собирать ли замеры проходов (CompilationResult.records)
+    :param bounds_checks: проверять ли индексы при обращении к массивам
+    :return: результат компиляции
+    """
+    start = time.perf_counter()
+    records = list() if statistics else None
+    try:
+        with open(path) as file:
+            code = compile_source(file.read(), method_jobs, liveness, level, records, bounds_checks)
+    except Exception as error:
+        return CompilationResult(str(path), error=f'{type(error).__name__}: {error}',
+                                 elapsed=time.perf_counter() - start)
+    return CompilationResult(str(path), code=code, elapsed=time.perf_counter() - start, records=records)
+
+
+def collect_files(paths, suffix: str = '.java') -> List[Tuple[Path, Path]]:
+    """
+    Раскрывает список файлов и папок в отсортированный список исходных файлов
+    :param paths: файлы и папки (папки обходятся рекурсивно)
+    :param suffix: расширение исходных файлов
+    :return: пары (корень, файл): корень - папка из paths, в которой найден файл, или папка отдельного файла
+    """
+    files = []
+    for path in map(Path, paths):
+        if path.is_dir():
+            files.extend((path, file) for file in sorted(file for file in path.rglob(f'*{suffix}') if file.is_file()))
+        else:
+            files.append((path.parent, path))
+    return files
+
+
+def output_paths(files: List[Tuple[Path, Path]], output) -> Dict[str, Path]:
+    """
+    Пути ассемблерных файлов: путь исходного файла относительно его корня повторяется в папке output
+    :param files: пары (корень, файл), см. collect_files
+    :param output: папка результатов
+    :return: путь исходного файла (как в CompilationResult.path) -> путь результата
+    """
+    targets = dict()
+    sources = dict()
+    for root, file in files:
+        target = Path(output) / file.relative_to(root).with_suffix('.asm')
+        if target in sources:
+            raise click.UsageError(f'Файлы {sources[target]} и {file} записываются в один и тот же {target}')
+        sources[target] = file
+        targets[str(file)] = target
+    return targets
+
+
+def compile_files(paths, jobs: int = 1, method_jobs: int = 1, liveness: bool = False, level: int = DEFAULT_LEVEL,
+                  statistics: bool = False, bounds_checks: bool = False):
+    """
+    Компилирует файлы в пуле процессов и отдает результаты по мере готовности
+    :param paths: исходные файлы
+    :param jobs: количество процессов (1 - компиляция в текущем процессе)
+    :param method_jobs: количество процессов для бэкенда методов каждого файла
+    :param liveness: строить ли для методов граф живости и граф конфликтов
+    :param level: уровень оптимизации
+    :param statistics: собирать ли замеры проходов
+    :param bounds_checks: проверять ли индексы при обращении к массивам
+    :return: генератор результатов компиляции
+    """
+    if jobs <= 1:
+        for path in paths:
+            yield compile_file(path, method_jobs, liveness, level, statistics, bounds_checks)
+        return
+
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        futures = [executor.submit(compile_file, path, method_jobs, liveness, level, statistics, bounds_checks)
+                   for path in paths]
+        for future in as_completed(futures):
+            yield future.result()
+
+
+@click.command()
+@click.argument('paths', nargs=-1, required=True)
+@click.option('--jobs', '-j', default=os.cpu_count() or 1,
+              help='Number of worker processes.')
+@click.option('--method-jobs', '-m', default=1,
+              help='Number of worker processes for the backend of each file (per method).')
+@click.option('--liveness', is_flag=True,
+              help='Also build liveness and interference graphs of every method.')
+@click.option('--output', '-o', default=None,
+              help='Directory for .asm files, mirroring paths inside the given folders (not written if omitted).')
+@click.option('--opt-level', '-O', 'level', default=DEFAULT_LEVEL,
+              type=click.IntRange(min(OPTIMIZATION_LEVELS), max(OPTIMIZATION_LEVELS)),
+              help='Optimization level (0 - no optimizations, 1 - constant folding, trace layout and strength reduction, '
+                   '2 - data-flow and loop optimizations).')
+@click.option('--report', type=click.Choice(['none', 'table', 'json']), default='none',
+              help='Print time and size of every pass summed over all methods.')
+@click.option('--bounds-checks', is_flag=True,
+              help='Check array indices at run time (redundant checks are removed at -O2).')
+def run_driver(paths, jobs, method_jobs, liveness, output, level, report, bounds_checks):
+    sources = collect_files(paths)
+    files = [file for _, file in sources]
+    targets = output_paths(sources, output) if output is not None else dict()
+
+    failed = 0
+    statistics = PassReport()
+    start = time.perf_counter()
+    for result in compile_files(files, jobs, method_jobs, liveness, level, report != 'none', bounds_checks):
+        statistics.add(result.records)
+        if result.ok:
+            print(f'OK    {result.path} ({result.elapsed:.3f} s)')
+            if output is not None:
+                target = targets[result.path]
+                os.makedirs(target.parent, exist_ok=True)
+                with open(target, 'w', encoding='utf-8') as file:
+                    file.write(result.code)
+        else:
+            failed += 1
+            print(f'ERROR {result.path}: {result.error}')
+    elapsed = time.perf_counter() - start
+
+    print()
+    print(f'Файлов: {len(files)}, с ошибками: {failed}, процессов: {jobs}')
+    print(f'Время: {elapsed:.3f} s, {len(files) / elapsed if elapsed else 0.0:.1f} файлов в секунду')
+    if report == 'table':
+        print()
+        print(statistics.format_table())
+    elif report == 'json':
+        print(statistics.to_json())
+    if failed:
+        raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    run_driver()
@@ -2,20 +2,17 @@
 import os
 
 from activation_records.frame_filler import FrameFiller
-from ir_tree.translate.eseq_canonizer import EseqCanonizer
+from framework.compilation_context import CompilationContext
 from ir_tree.translate.ir_builder import IRBuilder
 from ir_tree.translate.ir_printer import IRPrinter
-from ir_tree.translate.linearizer import Linearizer
-from ir_tree.translate.no_jump_block import NoJumpBlocksForest, NoJumpTree
+from optimization.pass_manager import OPTIMIZATION_LEVELS, MethodUnit, PassManager
 from reg_lifecycle.lifecycle_graph import LifecycleGraph
 from reg_lifecycle.lifecycle_printer import LifecyclePrinter
 from reg_lifecycle.variable_graph import VariableGraph
 from reg_lifecycle.variable_graph_printer import VariableGraphPrinter
-from symbol_table.table import Table
 from symbol_table.table_filler import TableFiller
 from syntax_tree import Printer
 from type_checker.type_checker import TypeChecker
-from x86.x86_code_generation import Muncher
 from yacc import parse_program
 
 if __name__ == '__main__':
@@ -36,8 +33,9 @@ if __name__ == '__main__':
 
     # отображаем символьную таблицу
     print('### Символьная таблица ###')
-    table = Table()
-    filler = TableFiller(table, verbose=True)
+    context = CompilationContext()
+    table = context.table
+    filler = TableFiller(table, verbose=True, context=context)
     filler.fill_table(program)
     table = filler.table
     print()
@@ -54,13 +52,13 @@ if __name__ == '__main__':
 
     # записи активаций
     print('### Записи активаций ###')
-    frame_filler = FrameFiller(table, verbose=True)
+    frame_filler = FrameFiller(table, verbose=True, context=context)
     frame_filler.fill()
     print()
 
     # строим IR дерево
     print('### Построение IR дерева ###')
-    builder = IRBuilder(table)
+    builder = IRBuilder(table, context)
     builder.parse(program)
     trees = builder.trees
     print()
@@ -72,53 +70,33 @@ if __name__ == '__main__':
     printer.print_to_file()
     print()
 
-    # канонизируем IR дерево
-    print('### Канонизация IR дерева ###')
-    canonizer = EseqCanonizer()
-    canonized_trees = dict()
-    for key, tree in trees.items():
-        canonized_tree = canonizer.canonize(tree)
-        canonized_trees[key] = canonized_tree
-    print()
-
-    print('### Печать IR дерева ###')
-    printer = IRPrinter('../tests/cir_tree.gv')
-    printer.create_graph(canonized_trees)
-    printer.print_to_file()
-    print()
-
-    # линеаризируем IR дерево
-    print('### Линеаризация дерева ###')
-    linearizer = Linearizer()
-    linearized = dict()
-    for tree_key, tree_value in canonized_trees.items():
-        linearized[tree_key] = []
-        linearized[tree_key] = linearizer.linearize(tree_value, linearized[tree_key])
-    print()
-
-    # распечатываем линеаризированное IR дерево
-    print('### Печать линеаризированного IR дерева ###')
-    printer = IRPrinter('../tests/linear_tree.gv')
-    printer.create_linearized_graph(linearized)
-    printer.print_to_file()
-    print()
-
-    # генерируем reblocked IR дерево
-    print('### Генерация Reblocked IR дерева ###')
-    no_jump_forest: NoJumpBlocksForest = dict()
-    for tree_key, tree_value in linearized.items():
-        no_jump_forest[tree_key] = NoJumpTree(tree_value)
-    reblocked = dict()
-    for tree_key, tree_value in no_jump_forest.items():
-        reblocked[tree_key] = tree_value.build_tree()
-    print()
-
-    # распечатываем reblocked IR дерево
-    print('### Печать Reblocked IR дерева ###')
-    printer = IRPrinter('../tests/reblocked_tree.gv')
-    printer.create_linearized_graph(reblocked)
-    printer.print_to_file()
-    print()
+    # бэкенд - проходы -O0 (OPTIMIZATION_LEVELS[0]) по одному над всеми методами,
+    # после прохода распечатываем промежуточное представление
+    # проход -> (заголовок, заголовок печати, файл графа)
+    stages = {
+        'canonize': ('Канонизация IR дерева', 'Печать IR дерева', '../tests/cir_tree.gv'),
+        'linearize': ('Линеаризация дерева', 'Печать линеаризированного IR дерева', '../tests/linear_tree.gv'),
+        'reblock': ('Генерация Reblocked IR дерева', 'Печать Reblocked IR дерева', '../tests/reblocked_tree.gv'),
+        'munch': ('Выбор инструкций', None, None),
+    }
+    units = [MethodUnit(key, tree, context) for key, tree in trees.items()]
+    for name in OPTIMIZATION_LEVELS[0]:
+        title, print_title, graph_path = stages[name]
+        print(f'### {title} ###')
+        manager = PassManager([name])
+        for unit in units:
+            manager.run(unit)
+        print()
+
+        if graph_path is not None:
+            print(f'### {print_title} ###')
+            printer = IRPrinter(graph_path)
+            if name == 'canonize':
+                printer.create_graph({unit.key: unit.tree for unit in units})
+            else:
+                printer.create_linearized_graph({unit.key: unit.linear for unit in units})
+            printer.print_to_file()
+            print()
 
     # распечатываем инструкции
 
@@ -128,11 +106,10 @@ if __name__ == '__main__':
         lifecycle_printer.print_prefix()
         variable_printer = VariableGraphPrinter('../tests/variables.gv')
         variable_printer.print_prefix()
-        for tree_key, tree in reblocked.items():
-            file.write(tree_key + '\n')
+        for unit in units:
+            file.write(unit.key + '\n')
             file.write('-' * 10 + '\n')
-            muncher = Muncher(tree)
-            list = muncher.create_instructions_list()
+            list = unit.instructions
             lifecycle_graph = LifecycleGraph(list)
             lifecycle_graph.build_Lifecycle()
             lifecycle_printer.print(lifecycle_graph.nodes_list)
@@ -0,0 +1,349 @@
+from typing import Dict, List, Optional, Set
+
+from code_generation.instruction import IInstruction, InstructionList, LabelInstruction
+from ir_tree.label import Label
+from ir_tree.statements.all import *
+from ir_tree.translate.i_subtree_wrapper import LinearTree
+
+
+class BasicBlock:
+    """
+    Базовый блок графа потока управления: операторы IR или инструкции,
+    которые выполняются подряд, и номера соседних блоков
+    """
+
+    def __init__(self, index: int, label: Label = None, items: list = None):
+        """
+        Конструктор
+        :param index: номер блока в графе (порядок блоков в методе)
+        :param label: метка в начале блока (None - блок входа или блок после перехода без метки)
+        :param items: операторы или инструкции блока, включая метку и переходы
+        """
+        self.index = index
+        self.label = label
+        self.items: list = items if items is not None else list()
+        self.successors: List[int] = list()
+        self.predecessors: List[int] = list()
+
+
+class Loop:
+    """
+    Естественный цикл: заголовок, блоки, из которых в него ведут обратные ребра,
+    и все блоки тела (вместе с заголовком и вложенными циклами)
+    """
+
+    def __init__(self, header: int, latches: List[int], blocks: Set[int]):
+        """
+        Конструктор
+        :param header: номер блока-заголовка (доминирует над всеми блоками цикла)
+        :param latches: номера блоков, из которых обратные ребра ведут в заголовок
+        :param blocks: номера блоков цикла
+        """
+        self.header = header
+        self.latches = latches
+        self.blocks = blocks
+        self.parent: Optional[Loop] = None
+        self.children: List[Loop] = list()
+        self.depth = 1
+
+    def exits(self, graph: 'ControlFlowGraph') -> List[int]:
+        """
+        Блоки вне цикла, в которые из него есть переходы
+        :param graph: граф, в котором найден цикл
+        :return:
+        """
+        return sorted({successor for block in self.blocks for successor in graph.blocks[block].successors
+                       if successor not in self.blocks})
+
+
+class ControlFlowGraph:
+    """
+    Граф потока управления метода - общий для оптимизаций IR и распределения регистров:
+    строится по линеаризованному методу (from_linear_tree) или по инструкциям (from_instructions)
+
+    Блок 0 - вход в метод. Обратный постпорядок, дерево доминаторов
+    (Cooper, Harvey, Kennedy, A Simple, Fast Dominance Algorithm) и естественные циклы
+    считаются при первом обращении и сбрасываются при изменении ребер
+    Недостижимые из входа блоки в обратный постпорядок не входят, доминатора у них нет
+    """
+
+    def __init__(self, blocks: List[BasicBlock]):
+        """
+        Конструктор
+        :param blocks: блоки метода с заполненными ребрами
+        """
+        self.blocks = blocks
+        self.labels: Dict[Label, int] = {block.label: block.index for block in blocks if block.label is not None}
+        self.invalidate()
+
+    @classmethod
+    def from_linear_tree(cls, tree: LinearTree) -> 'ControlFlowGraph':
+        """
+        Строит граф по линеаризованному методу (после Linearizer или NoJumpTree.build_tree)
+        Блок начинается меткой и заканчивается переходом; JumpC проваливается в следующий блок
+        :param tree: операторы метода
+        :return:
+        """
+        blocks = cls.split(tree, lambda statement: statement.label_name if isinstance(statement, LabelStm) else None,
+                           lambda statement: isinstance(statement, (Jump, JumpC)))
+        graph = cls(blocks)
+        for block in blocks:
+            last = block.items[-1] if block.items else None
+            if isinstance(last, Jump):
+                graph.add_edge(block.index, graph.labels[last.label_to_jump])
+                continue
+            if isinstance(last, JumpC):
+                graph.add_edge(block.index, graph.labels[last.true_label])
+            if block.index + 1 < len(blocks):
+                graph.add_edge(block.index, block.index + 1)
+        return graph
+
+    @classmethod
+    def from_instructions(cls, instruction_list: InstructionList) -> 'ControlFlowGraph':
+        """
+        Строит граф по инструкциям после Muncher
+        Блок начинается LabelInstruction и заканчивается инструкцией с метками перехода;
+        из блока, который кончается не JMP, управление проваливается в следующий блок
+        :param instruction_list: инструкции метода
+        :return:
+        """
+        blocks = cls.split(instruction_list.instructions,
+                           lambda instruction: instruction.label if isinstance(instruction, LabelInstruction) else None,
+                           lambda instruction: bool(instruction.label_list))
+        graph = cls(blocks)
+        for block in blocks:
+            last = block.items[-1] if block.items else None
+            if last is not None:
+                for label in last.label_list:
+                    graph.add_edge(block.index, graph.labels[label])
+            if (last is None or not cls.is_unconditional_jump(last)) and block.index + 1 < len(blocks):
+                graph.add_edge(block.index, block.index + 1)
+        return graph
+
+    @staticmethod
+    def split(items: list, label_of, ends_block) -> List[BasicBlock]:
+        """
+        Делит последовательность на базовые блоки
+        :param items: операторы или инструкции
+        :param label_of: элемент -> метка, если элемент - метка, иначе None
+        :param ends_block: заканчивает ли элемент блок (переход)
+        :return:
+        """
+        blocks = [BasicBlock(0)]
+        for item in items:
+            label = label_of(item)
+            if label is not None and (blocks[-1].items or blocks[-1].label is not None):
+                blocks.append(BasicBlock(len(blocks), label))
+            elif label is not None:
+                blocks[-1].label = label
+            blocks[-1].items.append(item)
+            if ends_block(item):
+                blocks.append(BasicBlock(len(blocks)))
+        if len(blocks) > 1 and not blocks[-1].items:
+            blocks.pop()
+        return blocks
+
+    @staticmethod
+    def is_unconditional_jump(instruction: IInstruction) -> bool:
+        return instruction.asm_code is not None and instruction.asm_code.startswith('JMP')
+
+    def add_edge(self, source: int, target: int):
+        if target not in self.blocks[source].successors:
+            self.blocks[source].successors.append(target)
+            self.blocks[target].predecessors.append(source)
+            self.invalidate()
+
+    def remove_edge(self, source: int, target: int):
+        if target in self.blocks[source].successors:
+            self.blocks[source].successors.remove(target)
+            self.blocks[target].predecessors.remove(source)
+            self.invalidate()
+
+    def invalidate(self):
+        """
+        Сбрасывает посчитанные обход, доминаторы и циклы (после изменения ребер)
+        :return:
+        """
+        self._order: Optional[List[int]] = None
+        self._idom: Optional[List[Optional[int]]] = None
+        self._dominator_children: Optional[List[List[int]]] = None
+        self._dominator_interval: Optional[List[tuple]] = None
+        self._loops: Optional[List[Loop]] = None
+        self._innermost: Optional[List[Optional[Loop]]] = None
+
+    def __len__(self):
+        return len(self.blocks)
+
+    def statements(self) -> list:
+        """
+        Операторы (инструкции) всех блоков в порядке блоков
+        :return:
+        """
+        return [item for block in self.blocks for item in block.items]
+
+    def reverse_postorder(self) -> List[int]:
+        """
+        Достижимые из входа блоки в обратном постпорядке (обход в глубину явным стеком)
+        :return:
+        """
+        if self._order is None:
+            order = []
+            if self.blocks:
+                visited = [False] * len(self.blocks)
+                visited[0] = True
+                stack = [(0, iter(self.blocks[0].successors))]
+                while stack:
+                    block, successors = stack[-1]
+                    for successor in successors:
+                        if not visited[successor]:
+                            visited[successor] = True
+                            stack.append((successor, iter(self.blocks[successor].successors)))
+                            break
+                    else:
+                        order.append(block)
+                        stack.pop()
+            order.reverse()
+            self._order = order
+        return self._order
+
+    def is_reachable(self, block: int) -> bool:
+        return block == 0 or self.immediate_dominators()[block] is not None
+
+    def immediate_dominators(self) -> List[Optional[int]]:
+        """
+        Непосредственные доминаторы: итерации по обратному постпорядку,
+        пересечение доминаторов предшественников - подъем по уже найденному дереву
+        :return: для каждого блока - номер непосредственного доминатора (у входа - 0, у недостижимых - None)
+        """
+        if self._idom is None:
+            order = self.reverse_postorder()
+            position = [-1] * len(self.blocks)
+            for index, block in enumerate(order):
+                position[block] = index
+            idom: List[Optional[int]] = [None] * len(self.blocks)
+            if order:
+                idom[0] = 0
+
+            def intersect(first: int, second: int) -> int:
+                while first != second:
+                    while position[first] > position[second]:
+                        first = idom[first]
+                    while position[second] > position[first]:
+                        second = idom[second]
+                return first
+
+            changed = True
+            while changed:
+                changed = False
+                for block in order[1:]:
+                    new_idom = None
+                    for predecessor in self.blocks[block].predecessors:
+                        if idom[predecessor] is None:
+                            continue
+                        new_idom = predecessor if new_idom is None else intersect(predecessor, new_idom)
+                    if idom[block] != new_idom:
+                        idom[block] = new_idom
+                        changed = True
+            self._idom = idom
+        return self._idom
+
+    def dominator_tree(self) -> List[List[int]]:
+        """
+        Дерево доминаторов
+        :return: для каждого блока - блоки, непосредственным доминатором которых он является
+        """
+        if self._dominator_children is None:
+            children = [[] for _ in self.blocks]
+            for block in self.reverse_postorder()[1:]:
+                children[self.immediate_dominators()[block]].append(block)
+            self._dominator_children = children
+        return self._dominator_children
+
+    def dominates(self, dominator: int, block: int) -> bool:
+        """
+        Доминирует ли dominator над block (каждый блок доминирует над собой) - за O(1)
+        по номерам входа и выхода при обходе дерева доминаторов
+        :param dominator: номер блока
+        :param block: номер блока
+        :return:
+        """
+        if self._dominator_interval is None:
+            interval = [None] * len(self.blocks)
+            counter = 0
+            if self.reverse_postorder():
+                stack = [(0, iter(self.dominator_tree()[0]))]
+                interval[0] = counter
+                while stack:
+                    node, children = stack[-1]
+                    child = next(children, None)
+                    if child is None:
+                        counter += 1
+                        interval[node] = (interval[node], counter)
+                        stack.pop()
+                    else:
+                        counter += 1
+                        interval[child] = counter
+                        stack.append((child, iter(self.dominator_tree()[child])))
+            self._dominator_interval = interval
+        outer, inner = self._dominator_interval[dominator], self._dominator_interval[block]
+        if outer is None or inner is None:
+            return False
+        return outer[0] <= inner[0] and inner[1] <= outer[1]
+
+    def loops(self) -> List[Loop]:
+        """
+        Естественные циклы: обратное ребро - переход в блок, который доминирует над источником;
+        циклы с общим заголовком объединяются, вложенность определяется по включению блоков
+        :return: циклы от внешних к внутренним (родитель всегда раньше вложенного)
+        """
+        if self._loops is None:
+            latches: Dict[int, List[int]] = dict()
+            for block in self.reverse_postorder():
+                for successor in self.blocks[block].successors:
+                    if self.dominates(successor, block):
+                        latches.setdefault(successor, []).append(block)
+
+            loops = []
+            for header, header_latches in latches.items():
+                body = {header}
+                stack = [latch for latch in header_latches if latch != header]
+                body.update(stack)
+                while stack:
+                    for predecessor in self.blocks[stack.pop()].predecessors:
+                        if predecessor not in body and self.is_reachable(predecessor):
+                            body.add(predecessor)
+                            stack.append(predecessor)
+                loops.append(Loop(header, header_latches, body))
+
+            # внешний цикл содержит все блоки вложенного, поэтому больше его #
+            loops.sort(key=lambda loop: len(loop.blocks), reverse=True)
+            innermost: List[Optional[Loop]] = [None] * len(self.blocks)
+            for loop in loops:
+                parent = innermost[loop.header]
+                if parent is not None:
+                    loop.parent = parent
+                    loop.depth = parent.depth + 1
+                    parent.children.append(loop)
+                for block in loop.blocks:
+                    innermost[block] = loop
+            self._loops = loops
+            self._innermost = innermost
+        return self._loops
+
+    def innermost_loop(self, block: int) -> Optional[Loop]:
+        """
+        Самый вложенный цикл, которому принадлежит блок
+        :param block: номер блока
+        :return: None, если блок не в цикле
+        """
+        self.loops()
+        return self._innermost[block]
+
+    def loop_depth(self, block: int) -> int:
+        """
+        Глубина вложенности циклов блока (0 - вне циклов)
+        :param block: номер блока
+        :return:
+        """
+        loop = self.innermost_loop(block)
+        return loop.depth if loop is not None else 0
@@ -0,0 +1,146 @@
+import hashlib
+import os
+import pickle
+import threading
+import zlib
+from collections import OrderedDict
+
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+
+class AstCache:
+    """
+    Дисковый кэш AST: ключ - хеш текста программы и версии грамматики,
+    значение - сжатый pickle корня дерева (Program)
+
+    Время последнего обращения хранится в mtime файла записи, по нему при превышении
+    размера каталога вытесняются самые давно использованные записи (LRU)
+    """
+
+    SUFFIX = '.ast'
+
+    def __init__(self, directory: str, version: str, max_bytes: int = DEFAULT_MAX_BYTES):
+        """
+        Конструктор
+        :param directory: каталог кэша (создается при необходимости)
+        :param version: версия грамматики - входит в ключ, поэтому смена грамматики сбрасывает кэш
+        :param max_bytes: максимальный суммарный размер записей
+        """
+        self.directory = directory
+        self.version = version
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        # Записи в порядке от давно использованных к недавним: ключ -> размер #
+        self.entries: OrderedDict = None
+        self.size = 0
+        # Индекс записей общий для потоков, файлы пишутся атомарно и без блокировки #
+        self.lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def key(self, text: str) -> str:
+        """
+        Считает ключ записи
+        :param text: исходный код программы
+        :return:
+        """
+        digest = hashlib.sha256(self.version.encode())
+        digest.update(b'\0')
+        digest.update(text.encode())
+        return digest.hexdigest()
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.directory, key + self.SUFFIX)
+
+    def load_entries(self):
+        """
+        Читает список записей каталога, упорядочивая их по времени последнего обращения
+        :return:
+        """
+        found = []
+        for name in os.listdir(self.directory):
+            if name.endswith(self.SUFFIX):
+                try:
+                    stat = os.stat(os.path.join(self.directory, name))
+                except FileNotFoundError:
+                    continue
+                found.append((stat.st_mtime, name[:-len(self.SUFFIX)], stat.st_size))
+        found.sort()
+        self.entries = OrderedDict((key, size) for _, key, size in found)
+        self.size = sum(self.entries.values())
+
+    def get(self, text: str):
+        """
+        Возвращает AST программы из кэша
+        :param text: исходный код программы
+        :return: корень AST или None, если записи нет
+        """
+        key = self.key(text)
+        path = self.path(key)
+        try:
+            with open(path, 'rb') as file:
+                program = pickle.loads(zlib.decompress(file.read()))
+            os.utime(path)
+        except FileNotFoundError:
+            with self.lock:
+                self.misses += 1
+            return None
+        except (OSError, EOFError, zlib.error, pickle.UnpicklingError, AttributeError, ImportError, TypeError):
+            # Поврежденная запись (или запись от другой версии классов AST) считается отсутствующей #
+            with self.lock:
+                self.forget(key)
+                self.misses += 1
+            return None
+        with self.lock:
+            if self.entries is not None and key in self.entries:
+                self.entries.move_to_end(key)
+            self.hits += 1
+        return program
+
+    def put(self, text: str, program):
+        """
+        Сохраняет AST программы и вытесняет давно использованные записи
+        :param text: исходный код программы
+        :param program: корень AST
+        :return:
+        """
+        key = self.key(text)
+        data = zlib.compress(pickle.dumps(program, pickle.HIGHEST_PROTOCOL), 1)
+        if len(data) > self.max_bytes:
+            return
+        path = self.path(key)
+        temp_path = f'{path}.{os.getpid()}.{threading.get_ident()}'
+        with open(temp_path, 'wb') as file:
+            file.write(data)
+        os.replace(temp_path, path)
+
+        with self.lock:
+            if self.entries is None:
+                self.load_entries()
+            self.size += len(data) - self.entries.pop(key, 0)
+            self.entries[key] = len(data)
+            while self.size > self.max_bytes:
+                self.forget(next(iter(self.entries)))
+
+    def forget(self, key: str):
+        """
+        Удаляет запись из кэша (вызывается под блокировкой)
+        :param key: ключ записи
+        :return:
+        """
+        if self.entries is not None:
+            self.size -= self.entries.pop(key, 0)
+        try:
+            os.remove(self.path(key))
+        except FileNotFoundError:
+            pass
+
+    def clear(self):
+        """
+        Удаляет все записи кэша
+        :return:
+        """
+        with self.lock:
+            self.load_entries()
+            for key in list(self.entries):
+                self.forget(key)
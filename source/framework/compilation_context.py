@@ -0,0 +1,68 @@
+from ir_tree.expressions.temp import Temp, TempAllocator
+from ir_tree.label import Label, LabelAllocator
+from symbol_table.table import Table
+from syntax_tree import Position
+
+
+class CompilationContext:
+    """
+    Состояние одной компиляции: нумерация временных переменных и меток,
+    символьная таблица и фреймы методов (хранятся в таблице)
+
+    Контекст передается во все стадии (TableFiller, IRBuilder, EseqCanonizer,
+    NoJumpTree, Muncher), поэтому разные программы можно компилировать
+    в одном процессе и в разных потоках - номера не пересекаются и не копятся
+    """
+
+    def __init__(self, table: Table = None):
+        """
+        Конструктор
+        :param table: символьная таблица программы (по умолчанию пустая)
+        """
+        self.table: Table = table if table is not None else Table()
+        self.temps: TempAllocator = TempAllocator()
+        self.labels: LabelAllocator = LabelAllocator()
+
+    @classmethod
+    def shared(cls, table: Table = None) -> 'CompilationContext':
+        """
+        Контекст поверх общих для процесса счетчиков - используется стадиями,
+        которым не передали свой контекст (поведение до появления контекста)
+        :param table: символьная таблица программы
+        :return:
+        """
+        context = cls(table)
+        context.temps = Temp.allocator
+        context.labels = Label.allocator
+        return context
+
+    def fork(self, index: int) -> 'CompilationContext':
+        """
+        Контекст для обработки одного метода после IRBuilder: временные переменные
+        нумеруются с текущего значения счетчика, нумерованные метки получают префикс
+        с номером метода - результат не зависит от того, в каком порядке и в каком
+        процессе обрабатываются методы
+        Символьная таблица не копируется - стадиям после IRBuilder она не нужна
+        :param index: номер метода
+        :return:
+        """
+        context = CompilationContext()
+        context.temps = TempAllocator(self.temps.counter)
+        context.labels = LabelAllocator(f'{self.labels.prefix}{index}_')
+        return context
+
+    @property
+    def frames(self):
+        return self.table.frames
+
+    def new_temp(self, name: str = None, local_id: int = None, position: Position = Position(0, 0),
+                 unique_id: int = -1) -> Temp:
+        """
+        Создает временную переменную с номером из этой компиляции
+        :param name: имя переменной (для именованных)
+        :param local_id: локальный номер (для безымянных)
+        :param position: расположение в исходном коде
+        :param unique_id: фиксированный номер (для машинных регистров)
+        :return:
+        """
+        return Temp(name, local_id, None, position, unique_id, allocator=self.temps)
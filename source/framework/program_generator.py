@@ -0,0 +1,118 @@
+import random
+
+
+class ProgramGenerator:
+    """
+    Генерирует синтаксически и типово корректные программы на MiniJava
+    заданного размера - используется в стресс-тестах и бенчмарках
+
+    Каждый метод работает с полями класса (int a, b, c; int[] arr; boolean flag),
+    поэтому программы проходят все стадии компиляции
+    """
+
+    def __init__(self, seed: int = 0, indent: str = '    '):
+        """
+        Конструктор
+        :param seed: зерно генератора случайных чисел
+        :param indent: строка отступа (меняет столбцы токенов)
+        """
+        self.random = random.Random(seed)
+        self.indent = indent
+        self.lines = []
+
+    def generate(self, classes: int = 1, methods: int = 1, statements: int = 10, depth: int = 2) -> str:
+        """
+        Генерирует текст программы
+        :param classes: количество классов (кроме главного)
+        :param methods: количество методов в каждом классе
+        :param statements: количество операторов в каждом методе
+        :param depth: максимальная вложенность if и while
+        :return:
+        """
+        self.lines = []
+        self.emit(0, 'class Main {')
+        self.emit(1, 'public static void main(String[] args) {')
+        self.emit(2, 'System.out.println(new C0().m0(1));')
+        self.emit(1, '}')
+        self.emit(0, '}')
+        for class_index in range(classes):
+            self.emit(0, '')
+            self.generate_class(class_index, methods, statements, depth)
+        return '\n'.join(self.lines) + '\n'
+
+    def generate_class(self, class_index, methods, statements, depth):
+        self.emit(0, f'class C{class_index} {{')
+        self.emit(1, 'int a;')
+        self.emit(1, 'int b;')
+        self.emit(1, 'int c;')
+        self.emit(1, 'int[] arr;')
+        self.emit(1, 'boolean flag;')
+        for method_index in range(methods):
+            self.emit(0, '')
+            self.generate_method(method_index, methods, statements, depth)
+        self.emit(0, '}')
+
+    def generate_method(self, method_index, methods, statements, depth):
+        self.emit(1, f'public int m{method_index}(int x) {{')
+        self.emit(2, 'int i;')
+        self.emit(2, 'arr = new int[10];')
+        self.emit(2, 'i = 0;')
+        for _ in range(statements):
+            self.generate_statement(2, depth, method_index, methods)
+        self.emit(2, f'return {self.int_exp(1)};')
+        self.emit(1, '}')
+
+    def generate_statement(self, level, depth, method_index, methods):
+        choice = self.random.randrange(7 if depth > 0 else 4)
+        if choice == 0:
+            self.emit(level, f'{self.random.choice("abc")} = {self.int_exp(2)};')
+        elif choice == 1:
+            self.emit(level, f'arr[{self.random.randrange(10)}] = {self.int_exp(2)};')
+        elif choice == 2:
+            self.emit(level, f'flag = {self.bool_exp(2)};')
+        elif choice == 3:
+            if method_index + 1 < methods and self.random.randrange(2):
+                self.emit(level, f'a = this.m{method_index + 1}({self.int_exp(1)});')
+            else:
+                self.emit(level, f'System.out.println({self.int_exp(2)});')
+        elif choice == 4 or choice == 5:
+            self.emit(level, f'if ({self.bool_exp(2)}) {{')
+            self.generate_statement(level + 1, depth - 1, method_index, methods)
+            self.emit(level, '} else {')
+            self.generate_statement(level + 1, depth - 1, method_index, methods)
+            self.emit(level, '}')
+        else:
+            self.emit(level, 'i = 0;')
+            self.emit(level, f'while (i < {self.random.randrange(1, 10)}) {{')
+            self.generate_statement(level + 1, depth - 1, method_index, methods)
+            self.emit(level + 1, 'i = i + 1;')
+            self.emit(level, '}')
+
+    def int_exp(self, depth):
+        choice = self.random.randrange(6 if depth > 0 else 3)
+        if choice == 0:
+            return str(self.random.randrange(100))
+        elif choice == 1:
+            return self.random.choice(('a', 'b', 'c', 'x', 'i'))
+        elif choice == 2:
+            return f'arr[{self.random.randrange(10)}]'
+        elif choice == 3:
+            return 'arr.length'
+        elif choice == 4:
+            return f'({self.int_exp(depth - 1)})'
+        operation = self.random.choice('+-*')
+        return f'{self.int_exp(depth - 1)} {operation} {self.int_exp(depth - 1)}'
+
+    def bool_exp(self, depth):
+        choice = self.random.randrange(5 if depth > 0 else 2)
+        if choice == 0:
+            return self.random.choice(('true', 'false', 'flag'))
+        elif choice == 1 or choice == 2:
+            # В грамматике LESS связывает сильнее PLUS, поэтому операнды берем в скобки #
+            return f'({self.int_exp(depth - 1)}) < ({self.int_exp(depth - 1)})'
+        elif choice == 3:
+            return f'!({self.bool_exp(depth - 1)})'
+        return f'({self.bool_exp(depth - 1)}) && ({self.bool_exp(depth - 1)})'
+
+    def emit(self, level, line):
+        self.lines.append(self.indent * level + line if line else line)
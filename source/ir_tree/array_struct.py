@@ -1,8 +1,14 @@
+from typing import List
+
 from syntax_tree import Position
 
 from ir_tree.expressions.i_exp import IExp
 from ir_tree.expressions.all import *
+from ir_tree.label import LabelAllocator
+from ir_tree.list import ExpList
+from ir_tree.name_conventions import BOUNDS_ERROR_NAME
 from ir_tree.statements.all import *
+from ir_tree.statements.i_stm import IStm
 
 ELEMENTS_OFFSET = 1
 
@@ -29,3 +35,69 @@ def get_element(base: IExp, element_number: IExp, position: Position):
 
 def get_length(base: IExp, position: Position):
     return Mem(base, position)
+
+
+def bounds_error_call(index: IExp, labels: LabelAllocator, position: Position) -> IStm:
+    """
+    Вызов обработчика выхода за границы массива (программа на нем завершается)
+    :param index: индекс, вышедший за границы
+    :param labels: метки компиляции
+    :param position: расположение в исходном коде
+    :return:
+    """
+    return Exp(Call(Name(BOUNDS_ERROR_NAME, position, labels), ExpList([index], position), position), position)
+
+
+def is_bounds_error(statement) -> bool:
+    """
+    Вызов обработчика выхода за границы массива (bounds_error_call, после EseqCanonizer - источник Move)
+    :param statement: оператор
+    :return:
+    """
+    call = statement.expression if isinstance(statement, Exp) else \
+        statement.source if isinstance(statement, Move) else None
+    return isinstance(call, Call) and isinstance(call.func_expr, Name) and \
+        call.func_expr.label_name.name == BOUNDS_ERROR_NAME
+
+
+def bounds_checks(base: Temp, index: Temp, context, position: Position) -> List[IStm]:
+    """
+    Проверка 0 <= index < длина массива: длина читается в переменную, затем два условных
+    перехода на вызов bounds_error_call - эту форму распознает optimization.bounds_checks
+    :param base: переменная с адресом массива
+    :param index: переменная с индексом
+    :param context: контекст компиляции (переменные и метки)
+    :param position: расположение в исходном коде
+    :return:
+    """
+    length = context.new_temp('length', position=position)
+    fail_label, ok_label = context.labels.next_label(), context.labels.next_label()
+    return [
+        Move(length, get_length(Binop(BinopEnum.PLUS, Temp(None, None, base), Const(0, position), position),
+                                position), position),
+        JumpC(JumpTypeEnum.LT, Temp(None, None, index), Const(0, position), fail_label, position),
+        JumpC(JumpTypeEnum.GE, Temp(None, None, index), Temp(None, None, length), fail_label, position),
+        Jump(ok_label, position),
+        LabelStm(fail_label, position),
+        bounds_error_call(Temp(None, None, index), context.labels, position),
+        LabelStm(ok_label, position),
+    ]
+
+
+def get_checked_element(base: IExp, element_number: IExp, context, position: Position):
+    """
+    Чтение элемента массива с проверкой границ: адрес массива и индекс вычисляются один раз
+    :param base: адрес массива
+    :param element_number: индекс
+    :param context: контекст компиляции (переменные и метки)
+    :param position: расположение в исходном коде
+    :return:
+    """
+    array = context.new_temp('array', position=position)
+    index = context.new_temp('index', position=position)
+    return Eseq(
+        Seq([Move(array, base, position), Move(index, element_number, position),
+             *bounds_checks(array, index, context, position)], position),
+        get_element(Temp(None, None, array), Temp(None, None, index), position),
+        position
+    )
@@ -1,15 +1,17 @@
-from ir_tree.label import Label
+from ir_tree.label import Label, LabelAllocator
 from syntax_tree import Position
 from .i_exp import IExp
 
 
 class Name(IExp):
-    def __init__(self, name: str = None, position: Position = Position(0, 0)):
+    def __init__(self, name: str = None, position: Position = Position(0, 0), labels: LabelAllocator = None):
         IExp.__init__(self, position)
+        if labels is None:
+            labels = Label.allocator
         if str is None:
-            self.label_name = Label.get_next_enumerated_label()
+            self.label_name = labels.next_label()
         else:
-            self.label_name = Label.get_label(name)
+            self.label_name = labels.get_label(name)
 
     def is_commutative(self):
         return True
@@ -11,21 +11,35 @@ class InfoEnum(Enum):
     NAME = 2
 
 
+class TempAllocator:
+    """
+    Отвечает за нумерацию временных переменных в рамках одной компиляции
+    """
+
+    def __init__(self, start: int = 0):
+        self.counter = start
+
+    def next_id(self) -> int:
+        value = self.counter
+        self.counter += 1
+        return value
+
+
 class Temp(IExp):
-    counter: int = 0
     temp_holder_local_id = 9000
 
     def __init__(self, name: str = None, local_id: int = None, temp: 'Temp' = None,
-                 position: Position = Position(0, 0), unique_id: int = -1):
+                 position: Position = Position(0, 0), unique_id: int = -1, allocator: TempAllocator = None):
         IExp.__init__(self, position)
+        if allocator is None:
+            allocator = Temp.allocator
         if name:
             self.id = -1
             self.local_id = -1
             self.info_enum = InfoEnum.ID
             self.unique = False
         if local_id is None and temp is None:
-            self.id = Temp.counter
-            Temp.counter += 1
+            self.id = allocator.next_id()
             self.local_id = 0
             self.name = name
             self.info_enum = InfoEnum.NAME
@@ -34,8 +48,7 @@ class Temp(IExp):
                 self.id = unique_id
                 self.local_id = unique_id
         elif name is None and temp is None:
-            self.id = Temp.counter
-            Temp.counter += 1
+            self.id = allocator.next_id()
             self.local_id = local_id
             self.name = ''
             self.info_enum = InfoEnum.ID
@@ -64,4 +77,7 @@ class Temp(IExp):
         return self.local_id == self.temp_holder_local_id
 
 
+# Временные переменные, созданные без явного аллокатора, нумеруются общим для процесса счетчиком #
+Temp.allocator = TempAllocator()
+
 TempList: List[Temp] = list
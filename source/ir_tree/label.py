@@ -5,29 +5,56 @@ LABEL_PREFIX = 'label_'
 
 
 class Label:
-    Map = dict()
-
     def __init__(self, name):
         self.name = name
 
     @staticmethod
     def get_label(name):
-        found = Label.Map.get(name)
-        if found is None:
-            label = Label(name)
-            Label.Map[name] = label
-            return label
-        else:
-            return found
+        return Label.allocator.get_label(name)
 
     @staticmethod
     def get_next_enumerated_label():
-        id = 0
-        while LABEL_PREFIX + str(id) in Label.Map:
-            id += 1
-        label_name = LABEL_PREFIX + str(id)
-        id += 1
-        return Label.get_label(label_name)
-
+        return Label.allocator.next_label()
+
+
+class LabelAllocator:
+    """
+    Отвечает за выдачу меток в рамках одной компиляции - именованные метки
+    хранятся в словаре, нумерованные выдаются по счетчику за O(1)
+    """
+
+    def __init__(self, prefix: str = LABEL_PREFIX):
+        self.prefix = prefix
+        self.labels: Dict[str, Label] = dict()
+        self.counter = 0
+
+    def get_label(self, name: str) -> Label:
+        """
+        Возвращает метку с данным именем (создает ее при первом запросе)
+        :param name: имя метки
+        :return:
+        """
+        found = self.labels.get(name)
+        if found is None:
+            found = Label(name)
+            self.labels[name] = found
+        return found
+
+    def next_label(self) -> Label:
+        """
+        Возвращает новую нумерованную метку
+        Имя могло быть занято через get_label - тогда счетчик идет дальше
+        :return:
+        """
+        label_name = self.prefix + str(self.counter)
+        self.counter += 1
+        while label_name in self.labels:
+            label_name = self.prefix + str(self.counter)
+            self.counter += 1
+        return self.get_label(label_name)
+
+
+# Метки, созданные без явного аллокатора, попадают в общий для процесса аллокатор #
+Label.allocator = LabelAllocator()
 
 LabelList: List[Label] = list
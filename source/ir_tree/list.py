@@ -1,14 +1,18 @@
 from ir_tree.expressions.i_exp import IExp
 from ir_tree.statements.i_stm import IStm
 from syntax_tree import Position
-from typing import Dict, List
+from typing import Iterable, List, Optional, Tuple
 
 
 class ExpList(IExp):
-    def __init__(self, head: IExp = None, tail: IExp = None, position=Position(0, 0)):
+    """
+    Список выражений (аргументы вызова) - хранится в кортеже,
+    а не цепочкой пар (head, tail)
+    """
+
+    def __init__(self, expressions: Iterable[IExp] = (), position=Position(0, 0)):
         IExp.__init__(self, position)
-        self.head = head
-        self.tail = tail
+        self.expressions: Tuple[IExp, ...] = tuple(expressions)
 
     def is_commutative(self):
         return False
@@ -18,10 +22,45 @@ class ExpList(IExp):
 
 
 class StmList(IStm):
-    def __init__(self, head: IStm = None, tail: IStm = None, position=Position(0, 0)):
+    """
+    Последовательность операторов произвольной длины - заменяет цепочку
+    бинарных Seq(head, tail), на которую уходил узел и вызов обходчика на каждый оператор
+    Вложенные последовательности раскрываются, None пропускается
+    """
+
+    def __init__(self, statements: Iterable[IStm] = (), position=Position(0, 0)):
         IStm.__init__(self, position)
-        self.head = head
-        self.tail = tail
+        self.statements: List[IStm] = []
+        for statement in statements:
+            self.append(statement)
+
+    def append(self, statement: Optional[IStm]):
+        """
+        Добавляет оператор в конец последовательности, вложенная последовательность
+        раскрывается, None пропускается
+        :param statement: оператор
+        :return:
+        """
+        if isinstance(statement, StmList):
+            self.statements.extend(statement.statements)
+        elif statement is not None:
+            self.statements.append(statement)
 
-#ExpList: List[IExp] = list
-#StmList: List[IStm] = list
\ No newline at end of file
+    @staticmethod
+    def concat(first: Optional[IStm], second: Optional[IStm]) -> 'StmList':
+        """
+        Склеивает два оператора (или последовательности) в одну последовательность
+        Если first - последовательность, second дописывается в нее же, поэтому
+        first не должна использоваться где-то еще; результат никогда не None,
+        даже если оба оператора None (как и у Seq(None, None) раньше)
+        :param first: первый оператор
+        :param second: второй оператор
+        :return:
+        """
+        if isinstance(first, StmList):
+            result = first
+        else:
+            result = StmList()
+            result.append(first)
+        result.append(second)
+        return result
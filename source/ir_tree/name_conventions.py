@@ -2,3 +2,5 @@ THIS_NAME = 'this'
 MALLOC_NAME = 'malloc'
 RETURN_ADDRESS = 'RV'
 VTABLE_PREFIX = '_vTable::'
+FP_NAME = 'fp'
+BOUNDS_ERROR_NAME = 'bounds_error'
@@ -9,6 +9,22 @@ class JumpTypeEnum(Enum):
     EQ = 1
     NEQ = 2
     LT = 3
+    GE = 4
+
+    def negate(self) -> 'JumpTypeEnum':
+        """
+        Противоположное условие - нужно, чтобы поменять местами ветви перехода
+        :return:
+        """
+        return negated_jump_types[self]
+
+
+negated_jump_types = {
+    JumpTypeEnum.EQ: JumpTypeEnum.NEQ,
+    JumpTypeEnum.NEQ: JumpTypeEnum.EQ,
+    JumpTypeEnum.LT: JumpTypeEnum.GE,
+    JumpTypeEnum.GE: JumpTypeEnum.LT,
+}
 
 
 class JumpC(IStm):
@@ -0,0 +1,92 @@
+from typing import Dict, FrozenSet, List, Optional
+
+from ir_tree.expressions.all import *
+from ir_tree.expressions.i_exp import IExp
+from ir_tree.name_conventions import FP_NAME
+
+# операции, у которых операнды можно переставлять #
+COMMUTATIVE_OPERATIONS = {BinopEnum.PLUS, BinopEnum.MUL, BinopEnum.AND, BinopEnum.OR}
+
+
+class StructuralHash:
+    """
+    Структурное хеширование чистых поддеревьев IR (hash-consing): структурно равные выражения
+    без вызовов и Eseq получают один номер, поэтому сравнение поддеревьев - сравнение чисел
+
+    Операнды коммутативных операций упорядочиваются, все временные переменные
+    указателя фрейма (IRBuilder создает новую на каждое обращение) считаются одним регистром
+    Для каждого номера запоминаются временные переменные выражения и читает ли оно память
+    """
+
+    def __init__(self):
+        self.numbers: Dict[tuple, int] = dict()
+        self.temps: List[FrozenSet[Temp]] = list()
+        self.reads_memory: List[bool] = list()
+
+    def intern(self, key: tuple, temps: FrozenSet[Temp], reads_memory: bool) -> int:
+        number = self.numbers.get(key)
+        if number is None:
+            number = len(self.temps)
+            self.numbers[key] = number
+            self.temps.append(temps)
+            self.reads_memory.append(reads_memory)
+        return number
+
+    def number_tree(self, exp: IExp, numbers: Dict[int, Optional[int]] = None) -> Dict[int, Optional[int]]:
+        """
+        Нумерует все поддеревья выражения (обход явным стеком в обратном порядке)
+        :param exp: выражение
+        :param numbers: сюда добавляются номера (по id узла)
+        :return: id узла -> номер (None - в поддереве есть вызов или Eseq)
+        """
+        numbers = numbers if numbers is not None else dict()
+        stack = [(exp, False)]
+        while stack:
+            node, ready = stack.pop()
+            children = self.children(node)
+            if not ready and children:
+                stack.append((node, True))
+                stack.extend((child, False) for child in children)
+                continue
+            numbers[id(node)] = self.number_node(node, [numbers[id(child)] for child in children])
+        return numbers
+
+    @staticmethod
+    def children(node: IExp) -> list:
+        if isinstance(node, Binop):
+            return [node.left_expression, node.right_expression]
+        if isinstance(node, (Mem, UnaryOp)):
+            return [node.expression]
+        if isinstance(node, Call):
+            return [node.func_expr] + list(node.args.expressions)
+        return []
+
+    def number_node(self, node: IExp, children: List[Optional[int]]) -> Optional[int]:
+        """
+        Номер узла по номерам его детей
+        :param node: узел
+        :param children: номера детей (в порядке children)
+        :return:
+        """
+        if isinstance(node, Temp):
+            if node.name == FP_NAME:
+                return self.intern(('fp',), frozenset(), False)
+            return self.intern(('temp', node.id), frozenset([node]), False)
+        if isinstance(node, Const):
+            return self.intern(('const', node.value), frozenset(), False)
+        if isinstance(node, Name):
+            return self.intern(('name', node.label_name.name), frozenset(), False)
+        if isinstance(node, (Call, Eseq)) or None in children:
+            return None
+        temps = frozenset().union(*(self.temps[child] for child in children))
+        reads_memory = any(self.reads_memory[child] for child in children)
+        if isinstance(node, Binop):
+            left, right = children
+            if node.operation in COMMUTATIVE_OPERATIONS and right < left:
+                left, right = right, left
+            return self.intern(('binop', node.operation, left, right), temps, reads_memory)
+        if isinstance(node, Mem):
+            return self.intern(('mem', children[0]), temps, True)
+        if isinstance(node, UnaryOp):
+            return self.intern(('unary', node.operation, children[0]), temps, reads_memory)
+        return None
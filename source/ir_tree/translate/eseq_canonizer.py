@@ -1,18 +1,19 @@
+from framework.compilation_context import CompilationContext
 from ir_tree.expressions.all import *
 from ir_tree.expressions.i_exp import IExp
 from ir_tree.ir_visitor import IRVisitor
-from ir_tree.list import ExpList
+from ir_tree.list import ExpList, StmList
 from ir_tree.statements.all import *
 from ir_tree.statements.i_stm import IStm
 from ir_tree.translate.exp_wrapper import ExpWrapper
 from ir_tree.translate.i_subtree_wrapper import ISubtreeWrapper
 from ir_tree.translate.stm_wrapper import StmWrapper
-from syntax_tree import Visitable
 
 
 class EseqCanonizer(IRVisitor):
-    def __init__(self):
+    def __init__(self, context: CompilationContext = None):
         IRVisitor.__init__(self)
+        self.context = context if context is not None else CompilationContext.shared()
         self.last_eseq = Eseq(None, None)
 
     def canonize(self, wrapper: ISubtreeWrapper):
@@ -23,7 +24,12 @@ class EseqCanonizer(IRVisitor):
         return stm_wrapper
 
     def reorder(self, exp: IExp):
-        exp.accept(self)
+        """
+        Канонизирует выражение (используется в обработчиках через yield from)
+        :param exp: выражение
+        :return: пара (операторы, которые нужно выполнить до выражения, выражение)
+        """
+        yield exp
         exp = None
         self.decompose_eseq()
         exp = self.last_eseq.expression
@@ -39,7 +45,7 @@ class EseqCanonizer(IRVisitor):
         else:
             statement = self.last_eseq.statement
             self.last_eseq.statement = None
-            return Seq(statement, stm)
+            return StmList.concat(statement, stm)
 
     def decompose_eseq(self):
         if self.last_eseq.statement is None or self.last_eseq.expression is None:
@@ -47,79 +53,64 @@ class EseqCanonizer(IRVisitor):
         if self.last_eseq.expression.is_commutative():
             return
         else:
-            holder: Temp = Temp(None, Temp.temp_holder_local_id, None)
+            holder: Temp = self.context.new_temp(None, Temp.temp_holder_local_id)
             statement, expression = self.last_eseq.statement, self.last_eseq.expression
             self.last_eseq.statement = None, None
-            self.last_eseq.statement = Seq(statement, Move(holder, expression))
-            self.last_eseq.expression = Mem(Temp(None, None, holder))
-
-    def visit(self, visitable: Visitable):
-        if isinstance(visitable, UnaryOp):
-            self.visit_unary_op(visitable)
-        elif isinstance(visitable, Binop):
-            self.visit_binop(visitable)
-        elif isinstance(visitable, Call):
-            self.visit_call(visitable)
-        elif isinstance(visitable, Const):
-            self.visit_const(visitable)
-        elif isinstance(visitable, Eseq):
-            self.visit_eseq(visitable)
-        elif isinstance(visitable, Mem):
-            self.visit_mem(visitable)
-        elif isinstance(visitable, Name):
-            self.visit_name(visitable)
-        elif isinstance(visitable, Temp):
-            self.visit_temp(visitable)
-        elif isinstance(visitable, Exp):
-            self.visit_exp(visitable)
-        elif isinstance(visitable, Jump):
-            self.visit_jump(visitable)
-        elif isinstance(visitable, JumpC):
-            self.visit_jumpc(visitable)
-        elif isinstance(visitable, LabelStm):
-            self.visit_label_stm(visitable)
-        elif isinstance(visitable, Move):
-            self.visit_move(visitable)
-        elif isinstance(visitable, Seq):
-            self.visit_seq(visitable)
-        elif isinstance(visitable, ExpList):
-            self.visit_exp_list(visitable)
-        elif isinstance(visitable, StmWrapper):
-            self.visit_stm_wrapper(visitable)
-        elif isinstance(visitable, ExpWrapper):
-            self.visit_exp_wrapper(visitable)
+            self.last_eseq.statement = StmList.concat(statement, Move(holder, expression))
+            # значение уже лежит в holder: Mem(holder) вне источника Move Muncher читает как адрес #
+            self.last_eseq.expression = Temp(None, None, holder)
+
+    visit_methods = {
+        UnaryOp: 'visit_unary_op',
+        Binop: 'visit_binop',
+        Call: 'visit_call',
+        Const: 'visit_const',
+        Eseq: 'visit_eseq',
+        Mem: 'visit_mem',
+        Name: 'visit_name',
+        Temp: 'visit_temp',
+        Exp: 'visit_exp',
+        Jump: 'visit_jump',
+        JumpC: 'visit_jumpc',
+        LabelStm: 'visit_label_stm',
+        Move: 'visit_move',
+        Seq: 'visit_seq',
+        ExpList: 'visit_exp_list',
+        StmWrapper: 'visit_stm_wrapper',
+        ExpWrapper: 'visit_exp_wrapper',
+    }
 
     def visit_unary_op(self, obj: UnaryOp):
-        self.last_eseq.statement, obj.expression = self.reorder(obj.expression)
+        self.last_eseq.statement, obj.expression = yield from self.reorder(obj.expression)
         self.last_eseq.expression = obj
 
     def visit_binop(self, obj: Binop):
-        left_statements, obj.left_expression = self.reorder(obj.left_expression)
-        right_statements, obj.right_expression = self.reorder(obj.right_expression)
-        self.last_eseq.statement = Seq(left_statements, right_statements)
+        left_statements, obj.left_expression = yield from self.reorder(obj.left_expression)
+        right_statements, obj.right_expression = yield from self.reorder(obj.right_expression)
+        self.last_eseq.statement = StmList.concat(left_statements, right_statements)
         self.last_eseq.expression = obj
 
     def visit_call(self, obj: Call):
-        obj.args.accept(self)
+        yield obj.args
         obj.args = None
         obj.args = self.last_eseq.expression
         self.last_eseq.expression = None
-        self.last_eseq.statement, obj.func_expr = self.reorder(obj.func_expr)
+        self.last_eseq.statement, obj.func_expr = yield from self.reorder(obj.func_expr)
         self.last_eseq.expression = obj
 
     def visit_const(self, obj: Const):
         self.last_eseq.expression = obj
 
     def visit_eseq(self, obj: Eseq):
-        obj.statement.accept(self)
+        yield obj.statement
         obj.statement = None
-        self.last_eseq.statement, obj.expression = self.reorder(obj.expression)
+        self.last_eseq.statement, obj.expression = yield from self.reorder(obj.expression)
         self.last_eseq.expression = obj.expression
         obj.expression = None
         del obj
 
     def visit_mem(self, obj: Mem):
-        obj.expression.accept(self)
+        yield obj.expression
         obj.expression = None
         obj.expression = self.last_eseq.expression
         self.last_eseq.expression = None
@@ -132,7 +123,7 @@ class EseqCanonizer(IRVisitor):
         self.last_eseq.expression = obj
 
     def visit_exp(self, obj: Exp):
-        stm, obj.expression = self.reorder(obj.expression)
+        stm, obj.expression = yield from self.reorder(obj.expression)
         if stm is not None:
             self.last_eseq.statement = self.add_seq_if_required(stm)
         self.last_eseq.statement = self.add_seq_if_required(obj)
@@ -141,8 +132,8 @@ class EseqCanonizer(IRVisitor):
         self.last_eseq.statement = self.add_seq_if_required(obj)
 
     def visit_jumpc(self, obj: JumpC):
-        left_statements, obj.condition_left_expression = self.reorder(obj.condition_left_expression)
-        right_statements, obj.condition_right_expression = self.reorder(obj.condition_right_expression)
+        left_statements, obj.condition_left_expression = yield from self.reorder(obj.condition_left_expression)
+        right_statements, obj.condition_right_expression = yield from self.reorder(obj.condition_right_expression)
         if left_statements is not None:
             self.last_eseq.statement = self.add_seq_if_required(left_statements)
         if right_statements is not None:
@@ -153,8 +144,12 @@ class EseqCanonizer(IRVisitor):
         self.last_eseq.statement = self.add_seq_if_required(obj)
 
     def visit_move(self, obj: Move):
-        src, obj.source = self.reorder(obj.source)
-        dst, obj.destination = self.reorder(obj.destination)
+        src, obj.source = yield from self.reorder(obj.source)
+        # в приемнике Mem(a) переупорядочивается только адрес: сам Mem остается записью в память #
+        if isinstance(obj.destination, Mem):
+            dst, obj.destination.expression = yield from self.reorder(obj.destination.expression)
+        else:
+            dst, obj.destination = yield from self.reorder(obj.destination)
         if src is not None:
             self.last_eseq.statement = self.add_seq_if_required(src)
         if dst is not None:
@@ -162,29 +157,23 @@ class EseqCanonizer(IRVisitor):
         self.last_eseq.statement = self.add_seq_if_required(obj)
 
     def visit_seq(self, obj: Seq):
-        obj.head.accept(self)
-        obj.head = None
-        if obj.tail is not None:
-            obj.tail.accept(self)
-        obj.tail = None
+        statements, obj.statements = obj.statements, None
+        for statement in statements:
+            yield statement
         del obj
 
     def visit_exp_list(self, obj: ExpList):
-        if obj.head is not None:
-            stm, obj.head = self.reorder(obj.head)
+        expressions = []
+        for expression in obj.expressions:
+            stm, expression = yield from self.reorder(expression)
             if stm is not None:
                 self.last_eseq.statement = self.add_seq_if_required(stm)
-
-        if obj.tail is not None:
-            obj.tail.accept(self)
-            obj.tail = None
-            obj.tail = self.last_eseq.expression
-            self.last_eseq.expression = None
-
+            expressions.append(expression)
+        obj.expressions = tuple(expressions)
         self.last_eseq.expression = obj
 
     def visit_stm_wrapper(self, obj: StmWrapper):
-        obj.to_stm().accept(self)
+        yield obj.to_stm()
 
     def visit_exp_wrapper(self, obj: ExpWrapper):
-        obj.to_stm().accept(self)
+        yield obj.to_stm()
@@ -3,7 +3,7 @@ from ir_tree.expressions.i_exp import IExp
 from ir_tree.statements.exp import Exp
 from ir_tree.label import Label
 from ir_tree.statements.jumpc import JumpC, JumpTypeEnum
-from ir_tree.expressions.temp import Temp
+from ir_tree.expressions.temp import Temp, TempAllocator
 
 
 class ExpWrapper(ISubtreeWrapper):
@@ -16,6 +16,6 @@ class ExpWrapper(ISubtreeWrapper):
     def to_stm(self):
         return Exp(self.expression)
 
-    def to_conditional(self, jump_type: JumpTypeEnum, true_label: Label):
+    def to_conditional(self, jump_type: JumpTypeEnum, true_label: Label, temps: TempAllocator = None):
         name = 'true'
-        return JumpC(jump_type, self.expression, Temp(name, None, None), true_label)
+        return JumpC(jump_type, self.expression, Temp(name, None, None, allocator=temps), true_label)
@@ -1,5 +1,6 @@
 from typing import Dict, List
 
+from ir_tree.expressions.temp import TempAllocator
 from ir_tree.label import Label
 from ir_tree.statements.i_stm import IStm
 from ir_tree.statements.jumpc import JumpTypeEnum
@@ -12,7 +13,7 @@ class ISubtreeWrapper:
     def to_stm(self):
         pass
 
-    def to_conditional(self, jump_type: JumpTypeEnum, true_label: Label):
+    def to_conditional(self, jump_type: JumpTypeEnum, true_label: Label, temps: TempAllocator = None):
         pass
 
     def accept(self, visitor):
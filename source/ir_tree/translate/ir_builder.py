@@ -1,9 +1,9 @@
 from activation_records.i_access import IAccess
 from activation_records.i_frame import IFrame
+from framework.compilation_context import CompilationContext
 from ir_tree import array_struct
 from ir_tree.expressions.all import *
-from ir_tree.label import Label
-from ir_tree.list import ExpList, StmList
+from ir_tree.list import ExpList
 from ir_tree.name_conventions import *
 from ir_tree.statements.all import *
 from ir_tree.translate.exp_wrapper import ExpWrapper
@@ -14,13 +14,16 @@ from symbol_table.type_stack_visitor import TypeScopeSwitcher, MethodScopeSwitch
 from syntax_tree import *
 
 println_name = 'println'
-fp_name = 'fp'
+fp_name = FP_NAME
 
 
 class IRBuilder(Visitor):
-    def __init__(self, table: Table):
+    def __init__(self, table: Table, context: CompilationContext = None, bounds_checks: bool = False):
         Visitor.__init__(self)
         self.table = table
+        self.context = context if context is not None else CompilationContext.shared(table)
+        # проверять ли индексы при обращении к массивам (см. array_struct.bounds_checks) #
+        self.bounds_checks = bounds_checks
         self.main_subtree = None
         self.trees = dict()
         self.current_frame: IFrame = None
@@ -32,49 +35,29 @@ class IRBuilder(Visitor):
     def get_parse_result(self):
         return self.trees
 
-    def visit(self, obj: Visitable):
-        if isinstance(obj, BinaryExpr):
-            self.visit_binary_expr(obj)
-        elif isinstance(obj, Id):
-            self.visit_id(obj)
-        elif isinstance(obj, ClassDecl):
-            self.visit_class_decl(obj)
-        elif isinstance(obj, MainClass):
-            self.visit_main_class(obj)
-        elif isinstance(obj, MethodDecl):
-            self.visit_method_decl(obj)
-        elif isinstance(obj, Program):
-            self.visit_program(obj)
-        elif isinstance(obj, ValueExpr):
-            self.visit_value_expr(obj)
-        elif isinstance(obj, AssignStatement):
-            self.visit_assign_statement(obj)
-        elif isinstance(obj, IfStatement):
-            self.visit_if_statement(obj)
-        elif isinstance(obj, NotExpr):
-            self.visit_not_expr(obj)
-        elif isinstance(obj, CallMethodExpr):
-            self.visit_call_method_expr(obj)
-        elif isinstance(obj, NewIntArrExpr):
-            self.visit_new_int_array_expr(obj)
-        elif isinstance(obj, NewObjectExpr):
-            self.visit_new_object_expr(obj)
-        elif isinstance(obj, RandomAccessAssignStatement):
-            self.visit_random_access_assign_statement(obj)
-        elif isinstance(obj, LengthExpr):
-            self.visit_length_expr(obj)
-        elif isinstance(obj, PrintLineStatement):
-            self.visit_print_line_statement(obj)
-        elif isinstance(obj, WhileStatement):
-            self.visit_while_statement(obj)
-        elif isinstance(obj, Statements):
-            self.visit_statements(obj)
-        elif isinstance(obj, RandomAccessExpr):
-            self.visit_random_access_expr(obj)
-        elif isinstance(obj, ThisExpr):
-            self.visit_this_expr(obj)
-        elif isinstance(obj, ReturnStatement):
-            self.visit_return_statement(obj)
+    visit_methods = {
+        BinaryExpr: 'visit_binary_expr',
+        Id: 'visit_id',
+        ClassDecl: 'visit_class_decl',
+        MainClass: 'visit_main_class',
+        MethodDecl: 'visit_method_decl',
+        Program: 'visit_program',
+        ValueExpr: 'visit_value_expr',
+        AssignStatement: 'visit_assign_statement',
+        IfStatement: 'visit_if_statement',
+        NotExpr: 'visit_not_expr',
+        CallMethodExpr: 'visit_call_method_expr',
+        NewIntArrExpr: 'visit_new_int_array_expr',
+        NewObjectExpr: 'visit_new_object_expr',
+        RandomAccessAssignStatement: 'visit_random_access_assign_statement',
+        LengthExpr: 'visit_length_expr',
+        PrintLineStatement: 'visit_print_line_statement',
+        WhileStatement: 'visit_while_statement',
+        Statements: 'visit_statements',
+        RandomAccessExpr: 'visit_random_access_expr',
+        ThisExpr: 'visit_this_expr',
+        ReturnStatement: 'visit_return_statement',
+    }
 
     def visit_program(self, obj: Program):
         obj.main.accept(self)
@@ -108,25 +91,15 @@ class IRBuilder(Visitor):
             obj.position
         )
         self.current_frame = method_info.get_frame()
-        stm = None
-        if len(obj.statement_list) > 0:
-            statements = []
-            for statement in obj.statement_list:
-                statement.accept(self)
-                statements.append(self.main_subtree.to_stm())
-            assert len(statements) > 0
-            if len(statements) == 1:
-                self.main_subtree = StmWrapper(statements[0])
-            else:
-                seq = Seq(statements[0], statements[1], obj.position)
-                for i in range(2, len(statements), 1):
-                    seq = Seq(seq, statements[i], obj.position)
-                self.main_subtree = StmWrapper(seq)
-            stm = StmList(self.main_subtree.to_stm(), None, obj.position)
+        statements = []
+        for statement in obj.statement_list:
+            statement.accept(self)
+            statements.append(self.main_subtree.to_stm())
 
         obj.return_statement.accept(self)
-        if stm is not None:
-            stm = StmList(stm, self.main_subtree.to_stm(), obj.position)
+        if len(statements) > 0:
+            statements.append(self.main_subtree.to_stm())
+            stm = Seq(statements, obj.position)
         else:
             stm = self.main_subtree.to_stm()
         name = method_info.get_full_name()
@@ -149,70 +122,23 @@ class IRBuilder(Visitor):
         elif obj.binary_enum == BinaryEnum.MOD:
             result = Binop(BinopEnum.MOD, left, right, obj.position)
         elif obj.binary_enum == BinaryEnum.LESS:
-            true_label = Label.get_next_enumerated_label()
-            false_label = Label.get_next_enumerated_label()
-            return_label = Label.get_next_enumerated_label()
+            true_label = self.context.labels.next_label()
+            false_label = self.context.labels.next_label()
+            return_label = self.context.labels.next_label()
             condition = JumpC(JumpTypeEnum.LT, left, right, true_label, obj.position)
-            exp_value = Temp('exp_value', None, None, obj.position)
-            true_branch = Seq(
-                Seq(
-                    LabelStm(
-                        true_label,
-                        obj.position
-                    ),
-                    Move(
-                        exp_value,
-                        Const(
-                            1,
-                            obj.position
-                        ),
-                        obj.position
-                    ),
-                    obj.position
-                ),
-                Jump(
-                    return_label,
-                    obj.position
-                ),
-                obj.position
-            )
-            false_branch = Seq(
-                Seq(
-                    LabelStm(
-                        false_label,
-                        obj.position
-                    ),
-                    Move(
-                        Temp(None, None, exp_value),
-                        Const(
-                            0,
-                            obj.position
-                        ),
-                        obj.position
-                    ),
-                    obj.position
-                ),
-                Jump(
-                    return_label,
-                    obj.position
-                ),
-                obj.position
-            )
+            exp_value = self.context.new_temp('exp_value', position=obj.position)
             result = Eseq(
                 Seq(
-                    Seq(
-                        Seq(
-                            condition,
-                            false_branch,
-                            obj.position
-                        ),
-                        true_branch,
-                        obj.position
-                    ),
-                    LabelStm(
-                        return_label,
-                        obj.position
-                    ),
+                    [
+                        condition,
+                        LabelStm(false_label, obj.position),
+                        Move(Temp(None, None, exp_value), Const(0, obj.position), obj.position),
+                        Jump(return_label, obj.position),
+                        LabelStm(true_label, obj.position),
+                        Move(exp_value, Const(1, obj.position), obj.position),
+                        Jump(return_label, obj.position),
+                        LabelStm(return_label, obj.position),
+                    ],
                     obj.position
                 ),
                 Mem(
@@ -222,86 +148,47 @@ class IRBuilder(Visitor):
                 obj.position
             )
         elif obj.binary_enum == BinaryEnum.AND:
-            true_label = Label.get_next_enumerated_label()
-            false_label = Label.get_next_enumerated_label()
-            return_label = Label.get_next_enumerated_label()
-            exp_value = Temp('exp_value', None, None, obj.position)
+            true_label = self.context.labels.next_label()
+            false_label = self.context.labels.next_label()
+            return_label = self.context.labels.next_label()
+            exp_value = self.context.new_temp('exp_value', position=obj.position)
             condition = JumpC(JumpTypeEnum.NEQ, left, Const(1, obj.position), false_label, obj.position)
-            true_branch = Seq(
-                JumpC(JumpTypeEnum.NEQ, right, Const(1, obj.position), false_label, obj.position),
-                Seq(
-                    Move(exp_value, Const(1, obj.position), obj.position),
-                    Jump(return_label, obj.position),
-                    obj.position
-                ),
-                obj.position
-            )
-            false_branch = Seq(
-                LabelStm(false_label, obj.position),
-                Seq(
-                    Move(Temp(None, None, exp_value), Const(0, obj.position), obj.position),
-                    Jump(return_label, obj.position),
-                    obj.position
-                ),
-                obj.position
-            )
             result = Eseq(
                 Seq(
-                    Seq(
-                        Seq(
-                            condition,
-                            true_branch,
-                            obj.position
-                        ),
-                        false_branch,
-                        obj.position
-                    ),
-                    LabelStm(return_label, obj.position),
+                    [
+                        condition,
+                        JumpC(JumpTypeEnum.NEQ, right, Const(1, obj.position), false_label, obj.position),
+                        Move(exp_value, Const(1, obj.position), obj.position),
+                        Jump(return_label, obj.position),
+                        LabelStm(false_label, obj.position),
+                        Move(Temp(None, None, exp_value), Const(0, obj.position), obj.position),
+                        Jump(return_label, obj.position),
+                        LabelStm(return_label, obj.position),
+                    ],
                     obj.position
                 ),
                 Mem(Temp(None, None, exp_value), obj.position),
                 obj.position
             )
         elif obj.binary_enum == BinaryEnum.OR:
-            true_label = Label.get_next_enumerated_label()
-            false_label = Label.get_next_enumerated_label()
-            return_label = Label.get_next_enumerated_label()
-            exp_value = Temp('exp_value', None, None, obj.position)
+            true_label = self.context.labels.next_label()
+            false_label = self.context.labels.next_label()
+            return_label = self.context.labels.next_label()
+            exp_value = self.context.new_temp('exp_value', position=obj.position)
             condition = JumpC(JumpTypeEnum.EQ, left, Const(1, obj.position), true_label, obj.position)
-            true_branch = Seq(
-                JumpC(JumpTypeEnum.NEQ, right, Const(1, obj.position), false_label, obj.position),
+            result = Eseq(
                 Seq(
-                    LabelStm(true_label, obj.position),
-                    Seq(
+                    [
+                        condition,
+                        JumpC(JumpTypeEnum.NEQ, right, Const(1, obj.position), false_label, obj.position),
+                        LabelStm(true_label, obj.position),
                         Move(exp_value, Const(1, obj.position), obj.position),
                         Jump(return_label, obj.position),
-                        obj.position
-                    ),
-                    obj.position
-                ),
-                obj.position
-            )
-            false_branch = Seq(
-                LabelStm(false_label, obj.position),
-                Seq(
-                    Move(Temp(None, None, exp_value), Const(0, obj.position), obj.position),
-                    Jump(return_label, obj.position),
-                    obj.position
-                ),
-                obj.position
-            )
-            result = Eseq(
-                Seq(
-                    Seq(
-                        Seq(
-                            condition,
-                            true_branch,
-                            obj.position
-                        ),
-                        false_branch,
-                        obj.position
-                    ),
-                    LabelStm(return_label, obj.position),
+                        LabelStm(false_label, obj.position),
+                        Move(Temp(None, None, exp_value), Const(0, obj.position), obj.position),
+                        Jump(return_label, obj.position),
+                        LabelStm(return_label, obj.position),
+                    ],
                     obj.position
                 ),
                 Mem(Temp(None, None, exp_value), obj.position),
@@ -317,10 +204,9 @@ class IRBuilder(Visitor):
         var_access: IAccess = self.current_frame.find_local_or_formal(obj.name)
         if var_access is not None:
             var_exp = var_access.get_exp(
-                Temp(
+                self.context.new_temp(
                     fp_name,
-                    None, None,
-                    obj.position
+                    position=obj.position
                 ),
                 obj.position
             )
@@ -329,10 +215,9 @@ class IRBuilder(Visitor):
             var_exp = self.table.get_scoped_class().class_struct.get_field_from(
                 obj.name,
                 self.current_frame.find_local_or_formal(THIS_NAME).get_exp(
-                    Temp(
+                    self.context.new_temp(
                         fp_name,
-                        None, None,
-                        obj.position
+                        position=obj.position
                     ),
                     obj.position
                 ),
@@ -350,7 +235,7 @@ class IRBuilder(Visitor):
         access = self.current_frame.find_local_or_formal(obj.left.name)
         if access is not None:
             base_address = access.get_exp(
-                Temp(fp_name, None, None, obj.position),
+                self.context.new_temp(fp_name, position=obj.position),
                 obj.position
             )
         else:
@@ -358,7 +243,7 @@ class IRBuilder(Visitor):
                 obj.left.name,
                 self.current_frame.find_local_or_formal(
                     THIS_NAME,
-                ).get_exp(Temp(fp_name, None, None, obj.position), obj.position),
+                ).get_exp(self.context.new_temp(fp_name, position=obj.position), obj.position),
                 obj.position
             )
         self.main_subtree = StmWrapper(Move(base_address, self.main_subtree.to_exp(), obj.position))
@@ -371,7 +256,7 @@ class IRBuilder(Visitor):
 
     def visit_call_method_expr(self, obj: CallMethodExpr):
         obj.expr.accept(self)
-        base_address = Temp(None, 0, None, obj.position)
+        base_address = self.context.new_temp(None, 0, obj.position)
         base_exp = Eseq(
             Move(
                 base_address,
@@ -389,15 +274,13 @@ class IRBuilder(Visitor):
         assert info is not None
         assert info.type_enum == TypeEnum.USER_CLASS
         type_switcher = TypeScopeSwitcher(info, None, self.table, obj.position)
-        arguments = ExpList(base_exp, None, obj.position)
+        arguments = [base_exp]
         for expr in obj.expr_list:
             expr.accept(self)
-            arguments = ExpList(
-                self.main_subtree.to_exp(),
-                arguments,
-                obj.position
-            )
+            arguments.append(self.main_subtree.to_exp())
             self.type_stack_visitor.pop_type_from_stack()
+        # аргументы передаются в обратном порядке, объект - последним #
+        arguments = ExpList(reversed(arguments), obj.position)
 
         class_info = self.table.get_class(info.user_class_name)
         method_address = class_info.class_struct.get_virtual_method_address(
@@ -413,7 +296,7 @@ class IRBuilder(Visitor):
         obj.size.accept(self)
         self.type_stack_visitor.pop_type_from_stack()
         number_of_elements = self.main_subtree.to_exp()
-        args = ExpList(
+        args = ExpList([
             Binop(
                 BinopEnum.MUL,
                 number_of_elements,
@@ -423,13 +306,13 @@ class IRBuilder(Visitor):
                 ),
                 obj.position
             )
-        )
-        self.main_subtree = ExpWrapper(Call(Name(MALLOC_NAME, obj.position), args, obj.position))
+        ])
+        self.main_subtree = ExpWrapper(Call(Name(MALLOC_NAME, obj.position, self.context.labels), args, obj.position))
         self.type_stack_visitor.visit(obj)
 
     def visit_new_object_expr(self, obj: NewObjectExpr):
         class_info = self.table.get_class(obj.id.name)
-        alloc_actions = class_info.class_struct.allocate_new(obj.position)
+        alloc_actions = class_info.class_struct.allocate_new(obj.position, self.context)
         self.main_subtree = ExpWrapper(alloc_actions)
         self.type_stack_visitor.visit(obj)
 
@@ -442,9 +325,9 @@ class IRBuilder(Visitor):
         access = self.current_frame.find_local_or_formal(obj.id.name)
         if access is not None:
             base_address = access.get_exp(
-                Temp(
-                    fp_name, None, None,
-                    obj.position
+                self.context.new_temp(
+                    fp_name,
+                    position=obj.position
                 ),
                 obj.position
             )
@@ -452,11 +335,28 @@ class IRBuilder(Visitor):
             base_address = self.table.get_scoped_class().class_struct.get_field_from(
                 obj.id.name,
                 self.current_frame.find_local_or_formal(THIS_NAME).get_exp(
-                    Temp(fp_name, None, None, obj.position),
+                    self.context.new_temp(fp_name, position=obj.position),
                     obj.position
                 ),
                 obj.position
             )
+        index_exp = position_in_arr_expr.to_exp()
+        value_exp = self.main_subtree.to_exp()
+        checks = []
+        if self.bounds_checks:
+            # индекс и значение вычисляются до проверки, адрес массива и индекс - один раз #
+            array = self.context.new_temp('array', position=obj.position)
+            index = self.context.new_temp('index', position=obj.position)
+            value = self.context.new_temp('value', position=obj.position)
+            checks = [
+                Move(array, base_address, obj.position),
+                Move(index, index_exp, obj.position),
+                Move(value, value_exp, obj.position),
+                *array_struct.bounds_checks(array, index, self.context, obj.position),
+            ]
+            base_address = Temp(None, None, array)
+            index_exp = Temp(None, None, index)
+            value_exp = Temp(None, None, value)
         address = Mem(
             Binop(
                 BinopEnum.PLUS,
@@ -467,14 +367,15 @@ class IRBuilder(Visitor):
                         self.current_frame.type_size(self.current_frame.word_type().type_enum),
                         obj.position
                     ),
-                    position_in_arr_expr.to_exp(),
+                    index_exp,
                     obj.position
                 ),
                 obj.position
             ),
             obj.position
         )
-        self.main_subtree = StmWrapper(Move(address, self.main_subtree.to_exp(), obj.position))
+        store = Move(address, value_exp, obj.position)
+        self.main_subtree = StmWrapper(Seq(checks + [store], obj.position) if checks else store)
 
     def visit_length_expr(self, obj: LengthExpr):
         obj.obj.accept(self)
@@ -489,9 +390,10 @@ class IRBuilder(Visitor):
             Call(
                 Name(
                     println_name,
-                    obj.position
+                    obj.position,
+                    self.context.labels
                 ),
-                ExpList(self.main_subtree.to_exp(), None, obj.position),
+                ExpList([self.main_subtree.to_exp()], obj.position),
                 obj.position
             )
         )
@@ -499,65 +401,43 @@ class IRBuilder(Visitor):
     def visit_if_statement(self, obj: IfStatement):
         obj.condition.accept(self)
         self.type_stack_visitor.pop_type_from_stack()
-        else_branch_label = Label.get_next_enumerated_label()
-        exit_label = Label.get_next_enumerated_label()
-        condition = self.main_subtree.to_conditional(JumpTypeEnum.NEQ, else_branch_label)
+        else_branch_label = self.context.labels.next_label()
+        exit_label = self.context.labels.next_label()
+        condition = self.main_subtree.to_conditional(JumpTypeEnum.NEQ, else_branch_label, self.context.temps)
         obj.if_true.accept(self)
-        if_part = Seq(
-            self.main_subtree.to_stm(),
-            Jump(exit_label, obj.position),
-            obj.position
-        )
+        if_part = self.main_subtree.to_stm()
         obj.if_false.accept(self)
-        else_part = Seq(
-            Seq(
-                LabelStm(else_branch_label, obj.position),
-                self.main_subtree.to_stm(),
-                obj.position
-            ),
-            Jump(exit_label, obj.position),
-            obj.position
-        )
+        else_part = self.main_subtree.to_stm()
         self.main_subtree = StmWrapper(
             Seq(
-                Seq(
+                [
                     condition,
-                    Seq(
-                        if_part,
-                        else_part,
-                        obj.position
-                    ),
-                    obj.position
-                ),
-                LabelStm(exit_label, obj.position),
+                    if_part,
+                    Jump(exit_label, obj.position),
+                    LabelStm(else_branch_label, obj.position),
+                    else_part,
+                    Jump(exit_label, obj.position),
+                    LabelStm(exit_label, obj.position),
+                ],
                 obj.position
             )
         )
 
     def visit_while_statement(self, obj: WhileStatement):
         obj.condition.accept(self)
-        condition_label = Label.get_next_enumerated_label()
-        exit_label = Label.get_next_enumerated_label()
-        condition = self.main_subtree.to_conditional(JumpTypeEnum.NEQ, exit_label)
-        condition_part = Seq(LabelStm(condition_label, obj.position),
-                             condition, obj.position)
+        condition_label = self.context.labels.next_label()
+        exit_label = self.context.labels.next_label()
+        condition = self.main_subtree.to_conditional(JumpTypeEnum.NEQ, exit_label, self.context.temps)
         obj.action.accept(self)
-        body_part = Seq(
-            self.main_subtree.to_stm(),
-            Jump(condition_label, obj.position),
-            obj.position
-        )
         self.main_subtree = StmWrapper(
             Seq(
-                Seq(
-                    condition_part,
-                    body_part,
-                    obj.position
-                ),
-                LabelStm(
-                    exit_label,
-                    obj.position
-                ),
+                [
+                    LabelStm(condition_label, obj.position),
+                    condition,
+                    self.main_subtree.to_stm(),
+                    Jump(condition_label, obj.position),
+                    LabelStm(exit_label, obj.position),
+                ],
                 obj.position
             )
         )
@@ -571,24 +451,25 @@ class IRBuilder(Visitor):
         if len(statements) == 1:
             self.main_subtree = StmWrapper(statements[0])
         else:
-            seq = Seq(statements[0], statements[1], obj.position)
-            for i in range(2, len(statements), 1):
-                seq = Seq(seq, statements[i], obj.position)
-            self.main_subtree = StmWrapper(seq)
+            self.main_subtree = StmWrapper(Seq(statements, obj.position))
 
     def visit_random_access_expr(self, obj: RandomAccessExpr):
         obj.object.accept(self)
         array_base = self.main_subtree.to_exp()
         obj.position_in_arr.accept(self)
         element_number = self.main_subtree.to_exp()
-        self.main_subtree = ExpWrapper(array_struct.get_element(array_base, element_number, obj.position))
+        if self.bounds_checks:
+            element = array_struct.get_checked_element(array_base, element_number, self.context, obj.position)
+        else:
+            element = array_struct.get_element(array_base, element_number, obj.position)
+        self.main_subtree = ExpWrapper(element)
         self.type_stack_visitor.visit(obj)
 
     def visit_this_expr(self, obj: ThisExpr):
         self.main_subtree = ExpWrapper(
             Mem(
                 self.current_frame.find_local_or_formal(THIS_NAME).get_exp(
-                    Temp(fp_name, None, None, obj.position),
+                    self.context.new_temp(fp_name, position=obj.position),
                     obj.position
                 ),
                 obj.position
@@ -600,7 +481,7 @@ class IRBuilder(Visitor):
         obj.expression.accept(self)
         self.type_stack_visitor.pop_type_from_stack()
         return_address = self.current_frame.return_address.get_exp(
-            Temp(fp_name, None, None, obj.position),
+            self.context.new_temp(fp_name, position=obj.position),
             obj.position
         )
         self.main_subtree = StmWrapper(Move(return_address, self.main_subtree.to_exp(), obj.position))
@@ -4,30 +4,30 @@ from ir_tree.list import ExpList
 from ir_tree.statements.all import *
 from ir_tree.translate.exp_wrapper import ExpWrapper
 from ir_tree.translate.stm_wrapper import StmWrapper
-from syntax_tree import Visitable
 
 
 class IRPrinter(IRVisitor):
     def __init__(self, path):
         IRVisitor.__init__(self)
         self.path = path
-        self.out = 'digraph g {graph [ rankdir = LR ]; ' \
-                   'node [fontsize="18" shape="record"]; ' \
-                   'edge [];' \
-                   '\n'
+        # Части текста копятся в списке - склейка строки на каждом узле квадратична #
+        self.out = ['digraph g {graph [ rankdir = LR ]; '
+                    'node [fontsize="18" shape="record"]; '
+                    'edge [];'
+                    '\n']
         self.parent = None
 
     def print_to_file(self):
-        self.out = self.out + "}"
+        self.out.append("}")
         with open(self.path, 'w+') as file:
-            file.write(self.out)
+            file.write(''.join(self.out))
         print(f'IR Tree сохранено в файл {self.path}')
 
     def print_edge(self, obj_to):
-        self.out = self.out + "\tnode" + str(id(self.parent)) + "->" + "node" + str(id(obj_to)) + "\n"
+        self.out.append("\tnode" + str(id(self.parent)) + "->" + "node" + str(id(obj_to)) + "\n")
 
     def print_vertex(self, node, label):
-        self.out = self.out + "\tnode" + str(id(node)) + "[label=\"" + str(label) + "\"]\n"
+        self.out.append("\tnode" + str(id(node)) + "[label=\"" + str(label) + "\"]\n")
 
     def create_graph(self, forest: dict):
         for key, value in forest.items():
@@ -42,63 +42,47 @@ class IRPrinter(IRVisitor):
                 self.parent = key
                 statement.accept(self)
 
-    def visit(self, obj: Visitable):
-        if isinstance(obj, UnaryOp):
-            self.visit_unary_op(obj)
-        elif isinstance(obj, Binop):
-            self.visit_binop(obj)
-        elif isinstance(obj, Call):
-            self.visit_call(obj)
-        elif isinstance(obj, Const):
-            self.visit_const(obj)
-        elif isinstance(obj, Eseq):
-            self.visit_eseq(obj)
-        elif isinstance(obj, Mem):
-            self.visit_mem(obj)
-        elif isinstance(obj, Name):
-            self.visit_name(obj)
-        elif isinstance(obj, Temp):
-            self.visit_temp(obj)
-        elif isinstance(obj, Exp):
-            self.visit_exp(obj)
-        elif isinstance(obj, Jump):
-            self.visit_jump(obj)
-        elif isinstance(obj, JumpC):
-            self.visit_jumpc(obj)
-        elif isinstance(obj, LabelStm):
-            self.visit_label_stm(obj)
-        elif isinstance(obj, Move):
-            self.visit_move(obj)
-        elif isinstance(obj, Seq):
-            self.visit_seq(obj)
-        elif isinstance(obj, ExpList):
-            self.visit_exp_list(obj)
-        elif isinstance(obj, StmWrapper):
-            self.visit_stm_wrapper(obj)
-        elif isinstance(obj, ExpWrapper):
-            self.visit_exp_wrapper(obj)
+    visit_methods = {
+        UnaryOp: 'visit_unary_op',
+        Binop: 'visit_binop',
+        Call: 'visit_call',
+        Const: 'visit_const',
+        Eseq: 'visit_eseq',
+        Mem: 'visit_mem',
+        Name: 'visit_name',
+        Temp: 'visit_temp',
+        Exp: 'visit_exp',
+        Jump: 'visit_jump',
+        JumpC: 'visit_jumpc',
+        LabelStm: 'visit_label_stm',
+        Move: 'visit_move',
+        Seq: 'visit_seq',
+        ExpList: 'visit_exp_list',
+        StmWrapper: 'visit_stm_wrapper',
+        ExpWrapper: 'visit_exp_wrapper',
+    }
 
     def visit_unary_op(self, obj: UnaryOp):
         self.print_vertex(obj, f'Unary | {obj.operation} | {obj.position}')
         self.print_edge(obj)
         self.parent = obj
-        obj.expression.accept(self)
+        yield obj.expression
 
     def visit_binop(self, obj: Binop):
         self.print_vertex(obj, f'Binary | {self.format_binop(obj.operation)} | {obj.position}')
         self.print_edge(obj)
         self.parent = obj
-        obj.left_expression.accept(self)
+        yield obj.left_expression
         self.parent = obj
-        obj.right_expression.accept(self)
+        yield obj.right_expression
 
     def visit_call(self, obj: Call):
         self.print_vertex(obj, f'Call | {obj.position}')
         self.print_edge(obj)
         self.parent = obj
-        obj.args.accept(self)
+        yield obj.args
         self.parent = obj
-        obj.func_expr.accept(self)
+        yield obj.func_expr
 
     def visit_const(self, obj: Const):
         self.print_vertex(obj, f'Const | {str(obj.value)} | {obj.position}')
@@ -108,15 +92,15 @@ class IRPrinter(IRVisitor):
         self.print_vertex(obj, f'Eseq | {obj.position}')
         self.print_edge(obj)
         self.parent = obj
-        obj.statement.accept(self)
+        yield obj.statement
         self.parent = obj
-        obj.expression.accept(self)
+        yield obj.expression
 
     def visit_mem(self, obj: Mem):
         self.print_vertex(obj, f'Mem | {obj.position}')
         self.print_edge(obj)
         self.parent = obj
-        obj.expression.accept(self)
+        yield obj.expression
 
     def visit_name(self, obj: Name):
         self.print_vertex(obj, f'Name | {str(obj.label_name.name)} | {obj.position}')
@@ -130,7 +114,7 @@ class IRPrinter(IRVisitor):
         self.print_vertex(obj, f'Exp | {obj.position}')
         self.print_edge(obj)
         self.parent = obj
-        obj.expression.accept(self)
+        yield obj.expression
 
     def visit_jump(self, obj: Jump):
         self.print_vertex(obj, f'Jump | {obj.label_to_jump.name} | {obj.position}')
@@ -142,9 +126,9 @@ class IRPrinter(IRVisitor):
                                f'{obj.position}')
         self.print_edge(obj)
         self.parent = obj
-        obj.condition_left_expression.accept(self)
+        yield obj.condition_left_expression
         self.parent = obj
-        obj.condition_right_expression.accept(self)
+        yield obj.condition_right_expression
 
     def visit_label_stm(self, obj: LabelStm):
         self.print_vertex(obj, f'LabelStm | {obj.label_name.name} | {obj.position}')
@@ -154,35 +138,29 @@ class IRPrinter(IRVisitor):
         self.print_vertex(obj, f'Move | {obj.position}')
         self.print_edge(obj)
         self.parent = obj
-        obj.source.accept(self)
+        yield obj.source
         self.parent = obj
-        obj.destination.accept(self)
+        yield obj.destination
 
     def visit_seq(self, obj: Seq):
         self.print_vertex(obj, f'Seq | {obj.position}')
         self.print_edge(obj)
-        if obj.head is not None:
+        for statement in obj.statements:
             self.parent = obj
-            obj.head.accept(self)
-        if obj.tail is not None:
-            self.parent = obj
-            obj.tail.accept(self)
+            yield statement
 
     def visit_exp_list(self, obj: ExpList):
         self.print_vertex(obj, f'ExpList | {obj.position}')
         self.print_edge(obj)
-        if obj.head is not None:
-            self.parent = obj
-            obj.head.accept(self)
-        if obj.tail is not None:
+        for expression in obj.expressions:
             self.parent = obj
-            obj.tail.accept(self)
+            yield expression
 
     def visit_stm_wrapper(self, obj: StmWrapper):
-        obj.statement.accept(self)
+        yield obj.statement
 
     def visit_exp_wrapper(self, obj: ExpWrapper):
-        obj.expression.accept(self)
+        yield obj.expression
 
     @staticmethod
     def format_binop(binop_enum: BinopEnum):
@@ -209,6 +187,8 @@ class IRPrinter(IRVisitor):
             return '\\<'
         elif jump_type_enum == JumpTypeEnum.NEQ:
             return '!='
+        elif jump_type_enum == JumpTypeEnum.GE:
+            return '\\>='
         else:
             assert False
 
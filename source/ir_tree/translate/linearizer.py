@@ -8,7 +8,6 @@ from ir_tree.statements.i_stm import IStm
 from ir_tree.translate.exp_wrapper import ExpWrapper
 from ir_tree.translate.i_subtree_wrapper import ISubtreeWrapper
 from ir_tree.translate.stm_wrapper import StmWrapper
-from syntax_tree import Visitable
 
 
 class Linearizer(IRVisitor):
@@ -29,41 +28,25 @@ class Linearizer(IRVisitor):
         self.statements.append(stm)
         self.is_previous_detached = True
 
-    def visit(self, visitable: Visitable):
-        if isinstance(visitable, UnaryOp):
-            self.visit_unary_op(visitable)
-        elif isinstance(visitable, Binop):
-            self.visit_binop(visitable)
-        elif isinstance(visitable, Call):
-            self.visit_call(visitable)
-        elif isinstance(visitable, Const):
-            self.visit_const(visitable)
-        elif isinstance(visitable, Eseq):
-            self.visit_eseq(visitable)
-        elif isinstance(visitable, Mem):
-            self.visit_mem(visitable)
-        elif isinstance(visitable, Name):
-            self.visit_name(visitable)
-        elif isinstance(visitable, Temp):
-            self.visit_temp(visitable)
-        elif isinstance(visitable, Exp):
-            self.visit_exp(visitable)
-        elif isinstance(visitable, Jump):
-            self.visit_jump(visitable)
-        elif isinstance(visitable, JumpC):
-            self.visit_jumpc(visitable)
-        elif isinstance(visitable, LabelStm):
-            self.visit_label_stm(visitable)
-        elif isinstance(visitable, Move):
-            self.visit_move(visitable)
-        elif isinstance(visitable, Seq):
-            self.visit_seq(visitable)
-        elif isinstance(visitable, ExpList):
-            self.visit_exp_list(visitable)
-        elif isinstance(visitable, StmWrapper):
-            self.visit_stm_wrapper(visitable)
-        elif isinstance(visitable, ExpWrapper):
-            self.visit_exp_wrapper(visitable)
+    visit_methods = {
+        UnaryOp: 'visit_unary_op',
+        Binop: 'visit_binop',
+        Call: 'visit_call',
+        Const: 'visit_const',
+        Eseq: 'visit_eseq',
+        Mem: 'visit_mem',
+        Name: 'visit_name',
+        Temp: 'visit_temp',
+        Exp: 'visit_exp',
+        Jump: 'visit_jump',
+        JumpC: 'visit_jumpc',
+        LabelStm: 'visit_label_stm',
+        Move: 'visit_move',
+        Seq: 'visit_seq',
+        ExpList: 'visit_exp_list',
+        StmWrapper: 'visit_stm_wrapper',
+        ExpWrapper: 'visit_exp_wrapper',
+    }
 
     def visit_unary_op(self, _: UnaryOp):
         assert False
@@ -108,21 +91,16 @@ class Linearizer(IRVisitor):
         self.add_to_statements(obj)
 
     def visit_seq(self, obj: Seq):
-        if obj.head is not None:
-            obj.head.accept(self)
+        for index, statement in enumerate(obj.statements):
+            if statement is None:
+                continue
+            yield statement
             if self.is_previous_detached:
                 self.is_previous_detached = False
-                obj.head = None
-        if obj.tail is not None:
-            obj.tail.accept(self)
-            if self.is_previous_detached:
-                self.is_previous_detached = False
-                obj.tail = None
+                obj.statements[index] = None
 
     def visit_stm_wrapper(self, obj: StmWrapper):
-        stm = obj.to_stm()
-        stm.accept(self)
+        yield obj.to_stm()
 
     def visit_exp_wrapper(self, obj: ExpWrapper):
-        stm = obj.to_stm()
-        stm.accept(self)
+        yield obj.to_stm()
@@ -1,14 +1,16 @@
 from typing import List, Dict, Set
 
+from framework.compilation_context import CompilationContext
 from ir_tree.expressions.all import *
-from ir_tree.i_node import INode
 from ir_tree.ir_visitor import IRVisitor
 from ir_tree.label import Label
 from ir_tree.list import ExpList
 from ir_tree.statements.all import *
+from ir_tree.statements.i_stm import IStm
 from ir_tree.translate.exp_wrapper import ExpWrapper
 from ir_tree.translate.i_subtree_wrapper import LinearTree
 from ir_tree.translate.stm_wrapper import StmWrapper
+from ir_tree.translate.trace_scheduler import TraceScheduler
 
 
 class BaseLabelVisitor(IRVisitor):
@@ -19,41 +21,25 @@ class BaseLabelVisitor(IRVisitor):
     def get_label(self) -> Label:
         return self.label
 
-    def visit(self, obj: INode):
-        if isinstance(obj, UnaryOp):
-            self.visit_unary_op(obj)
-        if isinstance(obj, Binop):
-            self.visit_binop(obj)
-        if isinstance(obj, Call):
-            self.visit_call(obj)
-        if isinstance(obj, Const):
-            self.visit_const(obj)
-        if isinstance(obj, Eseq):
-            self.visit_eseq(obj)
-        if isinstance(obj, Mem):
-            self.visit_mem(obj)
-        if isinstance(obj, Name):
-            self.visit_name(obj)
-        if isinstance(obj, Temp):
-            self.visit_temp(obj)
-        if isinstance(obj, ExpList):
-            self.visit_exp_list(obj)
-        if isinstance(obj, Exp):
-            self.visit_exp(obj)
-        if isinstance(obj, Jump):
-            self.visit_jump(obj)
-        if isinstance(obj, JumpC):
-            self.visit_jump_c(obj)
-        if isinstance(obj, LabelStm):
-            self.visit_label_stm(obj)
-        if isinstance(obj, Move):
-            self.visit_move(obj)
-        if isinstance(obj, Seq):
-            self.visit_seq(obj)
-        if isinstance(obj, StmWrapper):
-            self.visit_stm_wrapper(obj)
-        if isinstance(obj, ExpWrapper):
-            self.visit_exp_wrapper(obj)
+    visit_methods = {
+        UnaryOp: 'visit_unary_op',
+        Binop: 'visit_binop',
+        Call: 'visit_call',
+        Const: 'visit_const',
+        Eseq: 'visit_eseq',
+        Mem: 'visit_mem',
+        Name: 'visit_name',
+        Temp: 'visit_temp',
+        ExpList: 'visit_exp_list',
+        Exp: 'visit_exp',
+        Jump: 'visit_jump',
+        JumpC: 'visit_jump_c',
+        LabelStm: 'visit_label_stm',
+        Move: 'visit_move',
+        Seq: 'visit_seq',
+        StmWrapper: 'visit_stm_wrapper',
+        ExpWrapper: 'visit_exp_wrapper',
+    }
 
     def visit_unary_op(self, obj: UnaryOp):
         pass
@@ -109,6 +95,16 @@ class BaseLabelVisitor(IRVisitor):
     def set_label(self, label):
         self.label = label
 
+    def label_of(self, stm: IStm) -> Label:
+        """
+        Сбрасывает метку и обходит оператор - один обходчик используется для всех операторов
+        :param stm: оператор
+        :return: найденная метка или None
+        """
+        self.label = None
+        stm.accept(self)
+        return self.label
+
 
 class InLabelVisitor(BaseLabelVisitor):
     def __init__(self):
@@ -130,17 +126,17 @@ class OutLabelVisitor(BaseLabelVisitor):
 
 
 class NoJumpBlock:
-    def __init__(self, tree: LinearTree):
+    def __init__(self, tree: LinearTree, in_visitor: InLabelVisitor = None, out_visitor: OutLabelVisitor = None):
+        """
+        Конструктор
+        :param tree: операторы блока
+        :param in_visitor: обходчик для метки в начале блока (по умолчанию новый)
+        :param out_visitor: обходчик для метки перехода в конце блока (по умолчанию новый)
+        """
         self.tree: LinearTree = tree
-        self.in_label: Label = None
-        self.out_label: Label = None
         assert len(self.tree) > 0
-        in_visitor = InLabelVisitor()
-        self.tree[0].accept(in_visitor)
-        self.in_label = in_visitor.get_label()
-        out_visitor = OutLabelVisitor()
-        self.tree[-1].accept(out_visitor)
-        self.out_label = out_visitor.get_label()
+        self.in_label: Label = (in_visitor or InLabelVisitor()).label_of(self.tree[0])
+        self.out_label: Label = (out_visitor or OutLabelVisitor()).label_of(self.tree[-1])
 
     @classmethod
     def copy(cls, other: 'NoJumpBlock'):
@@ -172,106 +168,117 @@ BaseBlocks: List[NoJumpBlock] = list
 
 
 class NoJumpTree:
-    def __init__(self, full_tree: LinearTree):
+    def __init__(self, full_tree: LinearTree, context: CompilationContext = None):
+        """
+        Разбивает линеаризованный метод на блоки за один проход по индексу
+        (операторы не удаляются из начала списка), список full_tree опустошается
+        :param full_tree: линеаризованный метод
+        :param context: контекст компиляции (метки для новых переходов)
+        """
+        self.context = context if context is not None else CompilationContext.shared()
         self.blocks: BaseBlocks = list()
         self.curr_tree: LinearTree = list()
-        while len(full_tree) > 0:
-            in_visitor = InLabelVisitor()
-            full_tree[0].accept(in_visitor)
-            if in_visitor.get_label() is not None and len(self.curr_tree) > 0:
-                self.add_with_jump_at_the_end(in_visitor.get_label())
+        self.in_visitor = InLabelVisitor()
+        self.out_visitor = OutLabelVisitor()
+        position = 0
+        while position < len(full_tree):
+            in_label = self.in_visitor.label_of(full_tree[position])
+            if in_label is not None and len(self.curr_tree) > 0:
+                self.add_with_jump_at_the_end(in_label)
                 continue
-            self.curr_tree.append(full_tree[0])
-            full_tree.pop(0)
-            out_visitor = OutLabelVisitor()
-            self.curr_tree[-1].accept(out_visitor)
-            if out_visitor.get_label() is not None and len(full_tree) > 0:
-                self.add_ended_with(out_visitor.get_label(), full_tree)
+            self.curr_tree.append(full_tree[position])
+            position += 1
+            out_label = self.out_visitor.label_of(self.curr_tree[-1])
+            if out_label is not None and position < len(full_tree):
+                self.add_ended_with(out_label, full_tree[position])
                 continue
+        full_tree.clear()
 
         if len(self.curr_tree) > 0:
             self.add_last()
 
     @classmethod
     def copy(cls, other):
-        obj = cls(list())
+        obj = cls(list(), other.context)
         obj.blocks = other.blocks
         other.blocks = None
         return obj
 
-    def build_tree(self) -> LinearTree:
+    def build_tree(self, traces: bool = False) -> LinearTree:
+        """
+        Собирает блоки обратно в линеаризованный метод
+        :param traces: раскладывать ли блоки трассами (TraceScheduler); иначе - в исходном порядке
+        :return:
+        """
+        if traces:
+            tree = TraceScheduler(self.blocks, self.context).schedule()
+            self.blocks = list()
+            self.delete_unused_labels(tree)
+            return tree
+
         tree: LinearTree = list()
         for i in range(len(self.blocks)):
-            go_from = 0
             miss_first = i < len(self.blocks) - 1 and \
                          self.blocks[i].get_out_label() == self.blocks[i + 1].get_in_label()
-            go_to = len(self.blocks[i].get_tree())
-            if miss_first:
-                go_to -= 1
             subtree: LinearTree = self.blocks[i].release_tree()
-            while go_from < go_to:
-                tree.append(subtree[go_from])
-                go_from += 1
+            if miss_first:
+                subtree.pop()
+            tree.extend(subtree)
 
         self.delete_unused_labels(tree)
         return tree
 
-    def add_with_jump_at_the_end(self, label: Label):
-        out_visitor = OutLabelVisitor()
-        self.curr_tree[-1].accept(out_visitor)
-        if out_visitor.get_label() != label:
-            self.curr_tree.append(Jump(label))
-        self.blocks.append(NoJumpBlock(self.curr_tree))
+    def add_block(self):
+        self.blocks.append(NoJumpBlock(self.curr_tree, self.in_visitor, self.out_visitor))
         self.curr_tree = list()
 
-    def add_ended_with(self, label: Label, full_tree: LinearTree) -> None:
-        if len(full_tree) == 0:
-            self.blocks.append(NoJumpBlock(self.curr_tree))
-            self.curr_tree = list()
-            return
-        in_visitor = InLabelVisitor()
-        full_tree[0].accept(in_visitor)
-        if in_visitor.get_label() == label:
-            self.blocks.append(NoJumpBlock(self.curr_tree))
-            self.curr_tree = list()
+    def add_with_jump_at_the_end(self, label: Label):
+        if self.out_visitor.label_of(self.curr_tree[-1]) != label:
+            self.curr_tree.append(Jump(label))
+        self.add_block()
+
+    def add_ended_with(self, label: Label, next_stm: IStm) -> None:
+        """
+        Закрывает блок, который кончается переходом: если следующий оператор -
+        не метка перехода, добавляет переход на новую метку, с которой начнется следующий блок
+        :param label: метка перехода в конце блока
+        :param next_stm: оператор после блока
+        :return:
+        """
+        if self.in_visitor.label_of(next_stm) == label:
+            self.add_block()
             return  # reset curr_tree
-        label = Label.get_next_enumerated_label()
+        label = self.context.labels.next_label()
         self.curr_tree.append(Jump(label))
-        self.blocks.append(NoJumpBlock(self.curr_tree))
-        self.curr_tree = list()
+        self.add_block()
         self.curr_tree.append(LabelStm(label))
         return  # reset curr_tree
 
     def add_last(self):
-        self.blocks.append(NoJumpBlock(self.curr_tree))
+        self.blocks.append(NoJumpBlock(self.curr_tree, self.in_visitor, self.out_visitor))
 
     @staticmethod
     def delete_unused_labels(tree: LinearTree):
+        """
+        Удаляет метки, на которые нет ни одного перехода: первый проход собирает
+        метки переходов, второй пересобирает список без лишних меток
+        :param tree: линеаризованный метод (меняется на месте)
+        :return:
+        """
+        in_visitor = InLabelVisitor()
+        out_visitor = OutLabelVisitor()
         used_labels: Set[Label] = set()
-        unused_labels: Dict[Label, List[int]] = dict()
-        for i in range(len(tree)):
-            tree_el = tree[i]
-            in_visitor = InLabelVisitor()
-            tree_el.accept(in_visitor)
-            out_visitor = OutLabelVisitor()
-            tree_el.accept(out_visitor)
-            if out_visitor.get_label() is not None:
-                used_labels.add(out_visitor.get_label())
-                unused_labels.pop(out_visitor.get_label(), None)
-            in_label = in_visitor.get_label()
-            if in_label is not None and in_label not in used_labels:
-                if in_label not in unused_labels:
-                    unused_labels[in_label] = list()
-                unused_labels[in_label].append(i)
-        indexes = set()
-
-        for key, value in unused_labels.items():
-            for pos in value:
-                indexes.add(pos)
-        deleted = 0
-        for pos in indexes:
-            tree.pop(pos - deleted)
-            deleted += 1
+        for tree_el in tree:
+            out_label = out_visitor.label_of(tree_el)
+            if out_label is not None:
+                used_labels.add(out_label)
+
+        kept: LinearTree = list()
+        for tree_el in tree:
+            in_label = in_visitor.label_of(tree_el)
+            if in_label is None or in_label in used_labels:
+                kept.append(tree_el)
+        tree[:] = kept
 
 
 NoJumpBlocksForest: Dict[str, NoJumpTree] = dict
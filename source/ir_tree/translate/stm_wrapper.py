@@ -1,4 +1,5 @@
 from .i_subtree_wrapper import ISubtreeWrapper
+from ir_tree.expressions.temp import TempAllocator
 from ir_tree.statements.i_stm import IStm
 from ir_tree.label import Label
 from ir_tree.statements.jumpc import JumpTypeEnum
@@ -14,5 +15,5 @@ class StmWrapper(ISubtreeWrapper):
     def to_stm(self):
         return self.statement
 
-    def to_conditional(self, jump_type: JumpTypeEnum, true_label: Label):
+    def to_conditional(self, jump_type: JumpTypeEnum, true_label: Label, temps: TempAllocator = None):
         assert False
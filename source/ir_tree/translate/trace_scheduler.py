@@ -0,0 +1,294 @@
+from typing import Dict, List, Optional
+
+from framework.compilation_context import CompilationContext
+from ir_tree.label import Label
+from ir_tree.statements.all import *
+from ir_tree.translate.i_subtree_wrapper import LinearTree
+
+
+class BlockExit:
+    """
+    Как заканчивается базовый блок: безусловный переход (jump), условный переход
+    с двумя целями (condition, true_label, false_label) или выход из метода (все None)
+    """
+
+    def __init__(self, jump: Label = None, condition: JumpC = None, false_label: Label = None):
+        """
+        Конструктор
+        :param jump: метка безусловного перехода
+        :param condition: условный переход (сравнение и его исходная цель)
+        :param false_label: цель при невыполнении условия
+        """
+        self.jump = jump
+        self.condition = condition
+        self.true_label = condition.true_label if condition is not None else None
+        self.false_label = false_label
+
+    def successors(self) -> List[Label]:
+        if self.condition is not None:
+            return [self.false_label, self.true_label]
+        if self.jump is not None:
+            return [self.jump]
+        return []
+
+    def fall_through(self) -> Optional[Label]:
+        """
+        Цель, в которую блок проваливается без инверсии условия
+        :return:
+        """
+        return self.false_label if self.condition is not None else self.jump
+
+    def redirect(self, resolve):
+        """
+        Заменяет цели переходов
+        :param resolve: функция метка -> новая метка
+        :return:
+        """
+        if self.jump is not None:
+            self.jump = resolve(self.jump)
+        if self.condition is not None:
+            self.true_label = resolve(self.true_label)
+            self.false_label = resolve(self.false_label)
+            if self.true_label is self.false_label:
+                self.jump, self.condition, self.true_label, self.false_label = self.true_label, None, None, None
+
+    def is_return(self) -> bool:
+        return self.jump is None and self.condition is None
+
+
+class TraceScheduler:
+    """
+    Раскладывает базовые блоки метода трассами (Appel, Modern Compiler Implementation, 8.2):
+    трасса жадно продолжается в следующий непомещенный блок, чтобы переход в него
+    стал проваливанием и исчез
+
+    - переходы на блоки из одного Jump ведут сразу в конечную цель, сами такие блоки
+    удаляются, если на них больше нет переходов
+    - у условного перехода сначала выбирается ветвь false (JumpC остается как есть),
+    иначе ветвь true - тогда условие инвертируется, и проваливается уже она
+    - в заголовок цикла трасса входит по обратному ребру: вход в цикл остается
+    переходом (выполняется один раз), а проверка условия встает после тела
+    - новая трасса начинается с блока, в который нельзя провалиться
+    из еще не помещенного блока (поиск идет назад по переходам)
+    - блок выхода из метода ставится последним, перед ним - трасса, которая в него переходит
+    """
+
+    def __init__(self, blocks: list, context: CompilationContext = None):
+        """
+        Конструктор
+        :param blocks: базовые блоки метода в исходном порядке (NoJumpBlock), первый - вход в метод
+        :param context: контекст компиляции (метка конца метода)
+        """
+        self.context = context if context is not None else CompilationContext.shared()
+        self.bodies: List[LinearTree] = []
+        self.labels: List[Optional[Label]] = []
+        self.exits: List[BlockExit] = []
+        for block in blocks:
+            body, block_exit = self.split_block(block.get_tree())
+            label = block.get_in_label()
+            self.bodies.append(body[1:] if label is not None else body)
+            self.labels.append(label)
+            self.exits.append(block_exit)
+        self.index: Dict[Label, int] = {label: i for i, label in enumerate(self.labels) if label is not None}
+
+        for block_exit in self.exits:
+            block_exit.redirect(self.resolve)
+        self.successors: List[List[int]] = [[self.index[label] for label in block_exit.successors()]
+                                            for block_exit in self.exits]
+        self.predecessors: List[List[int]] = [[] for _ in self.bodies]
+        for i, successors in enumerate(self.successors):
+            for successor in successors:
+                self.predecessors[successor].append(i)
+        self.latches: List[List[int]] = self.find_back_edges()
+
+        # пустые блоки, на которые не осталось переходов, не раскладываются #
+        self.marked: List[bool] = [i > 0 and not self.bodies[i] and not self.predecessors[i]
+                                   for i in range(len(self.bodies))]
+        self.remaining = self.marked.count(False)
+
+    @staticmethod
+    def split_block(tree: LinearTree):
+        """
+        Отделяет от блока переходы в конце
+        Блок, который кончается JumpC без Jump, проваливается в метку true_label
+        (NoJumpTree заканчивает им блок, только если дальше идет эта метка) - это безусловный переход
+        :param tree: операторы блока
+        :return: пара (операторы без переходов, BlockExit)
+        """
+        control = len(tree)
+        while control > 0 and isinstance(tree[control - 1], (Jump, JumpC)):
+            control -= 1
+        body = tree[:control]
+        if control == len(tree):
+            return body, BlockExit()
+        first = tree[control]
+        # операторы после первого перехода недостижимы #
+        if isinstance(first, Jump):
+            return body, BlockExit(jump=first.label_to_jump)
+        if control + 1 < len(tree) and isinstance(tree[control + 1], Jump):
+            return body, BlockExit(condition=first, false_label=tree[control + 1].label_to_jump)
+        return body, BlockExit(jump=first.true_label)
+
+    def resolve(self, label: Label) -> Label:
+        """
+        Проходит цепочку блоков, состоящих из одного безусловного перехода
+        :param label: метка перехода
+        :return: метка первого блока цепочки, в котором есть операторы (или метка на цикле из переходов)
+        """
+        seen = set()
+        while label not in seen:
+            seen.add(label)
+            block = self.index[label]
+            if self.bodies[block] or self.exits[block].condition is not None or self.exits[block].jump is None:
+                return label
+            label = self.exits[block].jump
+        return label
+
+    def find_back_edges(self) -> List[List[int]]:
+        """
+        Ищет обратные ребра обходом в глубину от входа в метод
+        :return: для каждого блока - блоки, из которых в него ведут обратные ребра
+        """
+        latches: List[List[int]] = [[] for _ in self.bodies]
+        if not self.bodies:
+            return latches
+        state = [0] * len(self.bodies)  # 0 - не посещен, 1 - на стеке, 2 - обработан #
+        state[0] = 1
+        stack = [(0, iter(self.successors[0]))]
+        while stack:
+            block, successors = stack[-1]
+            for successor in successors:
+                if state[successor] == 1:
+                    latches[successor].append(block)
+                elif state[successor] == 0:
+                    state[successor] = 1
+                    stack.append((successor, iter(self.successors[successor])))
+                    break
+            else:
+                state[block] = 2
+                stack.pop()
+        return latches
+
+    def can_continue(self, block: int, successor: int) -> bool:
+        """
+        Можно ли продолжить трассу из block в successor
+        В заголовок цикла можно войти только по обратному ребру, пока тело цикла не помещено,
+        в блок выхода из метода - только когда остальные блоки помещены
+        :param block: последний блок трассы
+        :param successor: кандидат
+        :return:
+        """
+        if self.marked[successor]:
+            return False
+        if self.exits[successor].is_return() and self.remaining > 1:
+            return False
+        latches = self.latches[successor]
+        return block in latches or all(self.marked[latch] for latch in latches)
+
+    def next_in_trace(self, block: int) -> Optional[int]:
+        for successor in self.successors[block]:
+            if self.can_continue(block, successor):
+                return successor
+        return None
+
+    def trace_head(self, block: int) -> int:
+        """
+        Идет назад от block, пока в блок можно провалиться из непомещенного блока
+        :param block: первый непомещенный блок
+        :return: блок, с которого начнется трасса
+        """
+        visited = {block}
+        while True:
+            predecessor = next((predecessor for predecessor in self.predecessors[block]
+                                if not self.marked[predecessor] and predecessor not in visited
+                                and self.exits[predecessor].fall_through() is self.labels[block]), None)
+            if predecessor is None:
+                return block
+            visited.add(predecessor)
+            block = predecessor
+
+    def next_start(self, start: int) -> int:
+        """
+        Первый непомещенный блок, начиная с start (блок выхода из метода - только последним)
+        :param start: номер блока, до которого все блоки помещены или отложены
+        :return:
+        """
+        for block in range(start, len(self.marked)):
+            if not self.marked[block] and (self.remaining == 1 or not self.exits[block].is_return()):
+                return block
+        return self.marked.index(False)
+
+    def build_traces(self) -> List[List[int]]:
+        traces = []
+        start = 0
+        while self.remaining > 0:
+            start = self.next_start(start)
+            # трасса входа в метод начинается с первого блока #
+            block = self.trace_head(start) if traces else start
+            trace = []
+            while block is not None:
+                self.marked[block] = True
+                self.remaining -= 1
+                trace.append(block)
+                block = self.next_in_trace(block)
+            traces.append(trace)
+
+        # перед одиноким блоком выхода ставится трасса, которая в него переходит #
+        if len(traces) > 2 and len(traces[-1]) == 1 and self.exits[traces[-1][0]].is_return():
+            exit_trace = traces.pop()
+            for i in range(len(traces) - 1, 0, -1):
+                if exit_trace[0] in self.successors[traces[i][-1]]:
+                    traces.append(traces.pop(i))
+                    break
+            traces.append(exit_trace)
+        return traces
+
+    def schedule(self) -> LinearTree:
+        """
+        Раскладывает блоки трассами и расставляет переходы: переход в следующий
+        по порядку блок опускается, условный переход при необходимости инвертируется
+        :return: линеаризованный метод
+        """
+        order = [block for trace in self.build_traces() for block in trace]
+        tree: LinearTree = list()
+        end_label: Label = None
+        for position, block in enumerate(order):
+            following = self.labels[order[position + 1]] if position + 1 < len(order) else None
+            if self.labels[block] is not None:
+                tree.append(LabelStm(self.labels[block]))
+            tree.extend(self.bodies[block])
+            block_exit = self.exits[block]
+            if block_exit.condition is not None:
+                if block_exit.false_label is following:
+                    tree.append(self.condition(block_exit, False))
+                elif block_exit.true_label is following:
+                    tree.append(self.condition(block_exit, True))
+                else:
+                    tree.append(self.condition(block_exit, False))
+                    tree.append(Jump(block_exit.false_label))
+            elif block_exit.jump is not None:
+                if block_exit.jump is not following:
+                    tree.append(Jump(block_exit.jump))
+            elif position + 1 < len(order):
+                if end_label is None:
+                    end_label = self.context.labels.next_label()
+                tree.append(Jump(end_label))
+        if end_label is not None:
+            tree.append(LabelStm(end_label))
+        return tree
+
+    @staticmethod
+    def condition(block_exit: BlockExit, negate: bool) -> JumpC:
+        """
+        Условный переход в конце блока
+        :param block_exit: конец блока
+        :param negate: инвертировать ли условие (тогда переход идет в false_label)
+        :return:
+        """
+        condition = block_exit.condition
+        jump_type = condition.jump_type_enum.negate() if negate else condition.jump_type_enum
+        target = block_exit.false_label if negate else block_exit.true_label
+        if jump_type is condition.jump_type_enum and target is condition.true_label:
+            return condition
+        return JumpC(jump_type, condition.condition_left_expression, condition.condition_right_expression,
+                     target, condition.position)
@@ -3,6 +3,8 @@
 # http://www.dabeaz.com/ply/ply.html
 """
 
+from bisect import bisect_right
+
 # Список токенов, которые распознаются программой #
 tokens = [
     "L_BRACKET",
@@ -115,9 +117,36 @@ def t_error(t):
 t_ignore = ' \t'
 
 
-# функция определения столбца токена #
-def find_column(input, token):
-    last_cr = input.rfind('\n', 0, token.lexpos)
+class LineIndex:
+    """
+    Таблица смещений начал строк текста - строится один раз за проход по тексту,
+    после чего начало строки для любой позиции находится бинарным поиском
+    """
+
+    def __init__(self, text: str):
+        """
+        Конструктор
+        :param text: исходный текст
+        """
+        self.starts = [0]
+        position = text.find('\n')
+        while position >= 0:
+            self.starts.append(position + 1)
+            position = text.find('\n', position + 1)
+
+    def last_newline(self, lex_pos: int) -> int:
+        """
+        Возвращает позицию последнего перевода строки перед lex_pos
+        (то же, что text.rfind('\\n', 0, lex_pos))
+        :param lex_pos: позиция в тексте
+        :return: позиция перевода строки или -1, если его нет
+        """
+        return self.starts[bisect_right(self.starts, lex_pos) - 1] - 1
+
+
+# функция определения столбца токена (таблица строк строится один раз на текст) #
+def find_column(lines: LineIndex, token):
+    last_cr = lines.last_newline(token.lexpos)
     if last_cr < 0:
         last_cr = 0
     column = (token.lexpos - last_cr) + 1
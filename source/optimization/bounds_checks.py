@@ -0,0 +1,211 @@
+from collections import Counter
+from typing import List, Optional, Set
+
+from flow_graph.control_flow_graph import ControlFlowGraph, Loop
+from framework.compilation_context import CompilationContext
+from ir_tree.array_struct import bounds_error_call, is_bounds_error
+from ir_tree.expressions.all import *
+from ir_tree.expressions.i_exp import IExp
+from ir_tree.label import Label
+from ir_tree.statements.all import *
+from ir_tree.translate.i_subtree_wrapper import LinearTree
+from optimization.constant_folding import constant_value, may_fault
+from optimization.copy_propagation import is_pinned, statement_calls, statement_defines
+from optimization.loop_invariants import insert_preheader, loop_header_label
+from optimization.value_ranges import ValueRangeAnalysis, length_array
+
+
+def failure_labels(graph: ControlFlowGraph) -> Set[Label]:
+    """
+    Метки блоков, которые вызывают обработчик выхода за границы массива
+    :param graph: граф потока управления
+    :return:
+    """
+    return {block.label for block in graph.blocks
+            if block.label is not None and any(is_bounds_error(statement) for statement in block.items)}
+
+
+class BoundsCheckElimination:
+    """
+    Удаление и вынос из циклов проверок границ массивов в линеаризованном каноническом IR
+
+    Проверка - условный переход на блок с вызовом обработчика (array_struct.bounds_checks).
+    Проверка удаляется, если по анализу диапазонов (ValueRangeAnalysis) переход по ней невозможен:
+    индекс не меньше нуля или уже сравнивался с длиной того же массива. Проверка из начала
+    цикла, до которой на каждом проходе выполняются только присваивания переменным без вызовов
+    и другие вынесенные проверки, а операнды в цикле не меняются, переносится в предзаголовок
+    с собственным блоком вызова обработчика (обработчик завершает программу, поэтому ошибка
+    на первом проходе и перед циклом неразличимы). Циклы обрабатываются от внутренних к внешним
+    """
+
+    def __init__(self, tree: LinearTree, context: CompilationContext):
+        """
+        Конструктор
+        :param tree: линеаризованный метод (меняется на месте)
+        :param context: контекст метода (метки и переменные предзаголовков)
+        """
+        self.tree = tree
+        self.context = context
+        self.removed = 0
+        self.hoisted = 0
+
+    def eliminate(self) -> int:
+        """
+        Удаляет избыточные проверки и выносит инвариантные
+        :return: количество проверок, которых больше нет на прежнем месте
+        """
+        graph = ControlFlowGraph.from_linear_tree(self.tree)
+        failures = failure_labels(graph)
+        if not failures:
+            return 0
+        self.removed = self.remove_redundant(graph, failures)
+        self.hoisted = self.hoist(failures)
+        return self.removed + self.hoisted
+
+    def remove_redundant(self, graph: ControlFlowGraph, failures: Set[Label]) -> int:
+        """
+        Удаляет проверки, переход по которым невозможен
+        :param graph: граф потока управления
+        :param failures: метки блоков с вызовом обработчика
+        :return: количество удаленных проверок
+        """
+        analysis = ValueRangeAnalysis(graph).solve()
+        redundant = []
+        for block in graph.blocks:
+            if analysis.entry[block.index] is None:
+                continue
+            for statement, state in analysis.states(block.index):
+                if isinstance(statement, JumpC) and statement.true_label in failures and \
+                        analysis.assume(state, statement, True) is None:
+                    redundant.append(statement)
+        removed = {id(statement) for statement in redundant}
+        self.tree[:] = [statement for statement in graph.statements() if id(statement) not in removed]
+        return len(redundant)
+
+    def hoist(self, failures: Set[Label]) -> int:
+        """
+        Выносит инвариантные проверки из всех циклов
+        :param failures: метки блоков с вызовом обработчика
+        :return: количество вынесенных проверок
+        """
+        hoisted = 0
+        while True:
+            graph = ControlFlowGraph.from_linear_tree(self.tree)
+            for loop in reversed(graph.loops()):
+                checks = self.invariant_checks(graph, loop, failures)
+                if checks and loop_header_label(graph, loop) is not None:
+                    self.move_to_preheader(graph, loop, checks)
+                    hoisted += len(checks)
+                    break
+            else:
+                return hoisted
+
+    def invariant_checks(self, graph: ControlFlowGraph, loop: Loop, failures: Set[Label]) -> List[JumpC]:
+        """
+        Проверки, которые выполняются в начале каждого прохода цикла раньше любых побочных эффектов
+        и сравнивают неизменные в цикле значения
+        :param graph: граф потока управления
+        :param loop: цикл
+        :param failures: метки блоков с вызовом обработчика
+        :return:
+        """
+        items = [statement for index in loop.blocks for statement in graph.blocks[index].items]
+        defined = Counter(temp_id for statement in items for temp_id in statement_defines(statement))
+
+        def invariant(exp: IExp) -> bool:
+            if constant_value(exp) is not None:
+                return True
+            array = self.loop_length(graph, loop, exp)
+            if array is not None and defined[exp.id] == 1:
+                exp = array
+            return isinstance(exp, Temp) and not defined[exp.id]
+
+        checks, index = [], loop.header
+        while True:
+            for statement in graph.blocks[index].items:
+                if isinstance(statement, LabelStm):
+                    continue
+                if isinstance(statement, Move) and isinstance(statement.destination, Temp) and \
+                        not is_pinned(statement.destination) and not statement_calls(statement) and \
+                        not may_fault(statement.source):
+                    continue
+                if not isinstance(statement, JumpC) or statement.true_label not in failures or \
+                        not invariant(statement.condition_left_expression) or \
+                        not invariant(statement.condition_right_expression):
+                    return checks
+                checks.append(statement)
+            following = index + 1
+            if following not in loop.blocks or graph.blocks[following].predecessors != [index]:
+                return checks
+            index = following
+
+    def move_to_preheader(self, graph: ControlFlowGraph, loop: Loop, checks: List[JumpC]):
+        """
+        Переносит проверки из цикла в новый предзаголовок: каждая проверка переходит
+        на свой блок вызова обработчика, который затем продолжает в заголовке
+        :param graph: граф потока управления
+        :param loop: цикл
+        :param checks: вынесенные проверки
+        :return:
+        """
+        header_label = loop_header_label(graph, loop)
+        hoisted = {id(statement) for statement in checks}
+        for index in loop.blocks:
+            graph.blocks[index].items[:] = [item for item in graph.blocks[index].items if id(item) not in hoisted]
+
+        statements, failure_blocks = [], []
+        for check in checks:
+            failure_label = self.context.labels.next_label()
+            statements.extend(self.preheader_check(graph, loop, check, failure_label))
+            failure_blocks += [LabelStm(failure_label), bounds_error_call(self.index_of(check), self.context.labels,
+                                                                          check.position), Jump(header_label)]
+        statements.append(Jump(header_label))
+        self.tree[:] = insert_preheader(graph, loop, statements + failure_blocks[:-1],
+                                        self.context.labels.next_label())
+
+    def preheader_check(self, graph: ControlFlowGraph, loop: Loop, check: JumpC, failure_label: Label) -> list:
+        """
+        Копия проверки для предзаголовка: длина массива, прочитанная в цикле, читается заново
+        :param graph: граф потока управления
+        :param loop: цикл
+        :param check: проверка
+        :param failure_label: метка блока вызова обработчика
+        :return: операторы
+        """
+        operands, statements = [], []
+        for operand in (check.condition_left_expression, check.condition_right_expression):
+            array = self.loop_length(graph, loop, operand)
+            if array is None:
+                operands.append(Temp(None, None, operand) if isinstance(operand, Temp) else operand)
+                continue
+            length = self.context.new_temp('length')
+            statements.append(Move(length, Mem(Binop(BinopEnum.PLUS, Temp(None, None, array), Const(0)))))
+            operands.append(Temp(None, None, length))
+        statements.append(JumpC(check.jump_type_enum, operands[0], operands[1], failure_label, check.position))
+        return statements
+
+    @staticmethod
+    def loop_length(graph: ControlFlowGraph, loop: Loop, operand: IExp) -> Optional[Temp]:
+        """
+        :param graph: граф потока управления
+        :param loop: цикл
+        :param operand: операнд проверки
+        :return: массив, если операнд - переменная, в которую цикл читает длину этого массива
+        """
+        if not isinstance(operand, Temp):
+            return None
+        for index in loop.blocks:
+            for statement in graph.blocks[index].items:
+                if isinstance(statement, Move) and isinstance(statement.destination, Temp) and \
+                        statement.destination.id == operand.id:
+                    return length_array(statement.source)
+        return None
+
+    @staticmethod
+    def index_of(check: JumpC) -> IExp:
+        """
+        :param check: проверка
+        :return: проверяемый индекс (аргумент обработчика)
+        """
+        operand = check.condition_left_expression
+        return Temp(None, None, operand) if isinstance(operand, Temp) else operand
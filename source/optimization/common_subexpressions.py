@@ -0,0 +1,234 @@
+from typing import Dict, List, Optional, Set
+
+from flow_graph.control_flow_graph import ControlFlowGraph
+from ir_tree.expressions.all import *
+from ir_tree.expressions.i_exp import IExp
+from ir_tree.statements.all import *
+from ir_tree.structural_hash import StructuralHash
+from ir_tree.translate.i_subtree_wrapper import LinearTree
+from optimization.copy_propagation import is_pinned, statement_calls, statement_defines
+from optimization.dataflow import available_at_entry, solve_available
+
+# Места выражения в операторе: от места зависит, как Muncher прочитает подставленную Temp #
+OPERAND = 'operand'
+SOURCE = 'source'  # источник Move: Mem(Temp) здесь - пересылка, а не чтение памяти #
+ADDRESS = 'address'  # адрес под Mem: Mem(Temp) - чтение памяти по адресу из Temp #
+SOURCE_ADDRESS = 'source address'  # адрес под Mem в источнике Move: заменять нельзя #
+SKIP = 'skip'  # адрес вызываемой функции: Muncher разбирает его сам #
+
+
+class CommonSubexpressionElimination:
+    """
+    Удаление общих подвыражений в линеаризованном каноническом IR
+
+    Чистое выражение (без вызовов), которое записано в Move(Temp t, e), доступно дальше
+    в блоке и во всех блоках, куда управление приходит только через такие пересылки
+    (пересечение по предшественникам - в том числе из доминирующих блоков): повторное
+    вычисление структурно равного выражения (StructuralHash) заменяется чтением t
+
+    Доступность пропадает, когда пишется t или переменная выражения, выражения
+    с чтением памяти - при записи в память (Move в Mem) и при вызове, выражения
+    с закрепленными переменными (is_pinned) - при вызове
+    Адрес PLUS с константой прямо под Mem не заменяется - Muncher сворачивает
+    его в адресацию [r + k]
+    """
+
+    def __init__(self, tree: LinearTree):
+        """
+        Конструктор
+        :param tree: линеаризованный метод (меняется на месте)
+        """
+        self.tree = tree
+        self.graph = ControlFlowGraph.from_linear_tree(tree)
+        self.hash = StructuralHash()
+        # номера поддеревьев операторов до замены (id оператора -> id узла -> номер) #
+        self.numbers: Dict[int, Dict[int, Optional[int]]] = dict()
+        # номер выражения, которое оператор кладет во временную переменную (id оператора -> номер) #
+        self.recorded: Dict[int, Optional[int]] = dict()
+        self.reused = 0
+
+    def eliminate(self) -> int:
+        """
+        Заменяет повторные вычисления чтениями временных переменных
+        :return: количество замененных выражений
+        """
+        for block in self.graph.blocks:
+            for statement in block.items:
+                numbers = self.number_statement(statement)
+                recorded = self.recorded_expression(statement)
+                self.numbers[id(statement)] = numbers
+                self.recorded[id(statement)] = numbers.get(id(recorded)) if recorded is not None else None
+        blocks = self.graph.blocks
+
+        def transfer_block(index: int, available: Dict[int, Temp]) -> Dict[int, Temp]:
+            mentions = self.mentions_of(available)
+            for statement in blocks[index].items:
+                self.transfer(statement, available, mentions)
+            return available
+
+        outputs = solve_available(self.graph, transfer_block)
+        for index in self.graph.reverse_postorder():
+            available = available_at_entry(self.graph, index, outputs)
+            mentions = self.mentions_of(available)
+            for statement in blocks[index].items:
+                self.rewrite(statement, available)
+                self.transfer(statement, available, mentions)
+        self.tree[:] = self.graph.statements()
+        return self.reused
+
+    def number_statement(self, statement) -> Dict[int, Optional[int]]:
+        numbers = dict()
+        for exp in self.expressions(statement):
+            self.hash.number_tree(exp, numbers)
+        return numbers
+
+    @staticmethod
+    def expressions(statement) -> List[IExp]:
+        if isinstance(statement, Move):
+            return [statement.source, statement.destination]
+        if isinstance(statement, Exp):
+            return [statement.expression]
+        if isinstance(statement, JumpC):
+            return [statement.condition_left_expression, statement.condition_right_expression]
+        return []
+
+    def mentions_of(self, available: Dict[int, Temp]) -> Dict[int, Set[int]]:
+        """
+        Обратный индекс доступных выражений
+        :param available: номер выражения -> переменная, в которой лежит его значение
+        :return: номер переменной -> номера выражений, которые ее читают или в ней лежат
+        """
+        mentions: Dict[int, Set[int]] = dict()
+        for number, holder in available.items():
+            mentions.setdefault(holder.id, set()).add(number)
+            for temp in self.hash.temps[number]:
+                mentions.setdefault(temp.id, set()).add(number)
+        return mentions
+
+    @staticmethod
+    def recorded_expression(statement) -> Optional[IExp]:
+        """
+        Выражение, значение которого оператор кладет во временную переменную
+        :param statement: оператор
+        :return: None, если это не Move(Temp, выражение) или это пересылка
+        """
+        if not isinstance(statement, Move) or not isinstance(statement.destination, Temp):
+            return None
+        source = statement.source
+        if isinstance(source, Mem) and isinstance(source.expression, Temp):
+            return None
+        return source if isinstance(source, (Binop, Mem, UnaryOp)) else None
+
+    def transfer(self, statement, available: Dict[int, Temp], mentions: Dict[int, Set[int]]):
+        """
+        Меняет набор доступных выражений после оператора
+        :param statement: оператор
+        :param available: номер выражения -> переменная с его значением
+        :param mentions: обратный индекс (mentions_of)
+        :return:
+        """
+        number = self.recorded[id(statement)]
+        for temp_id in statement_defines(statement):
+            for killed in mentions.pop(temp_id, ()):
+                available.pop(killed, None)
+        calls = statement_calls(statement)
+        if calls or isinstance(statement, Move) and isinstance(statement.destination, Mem):
+            for killed in [killed for killed in available if self.hash.reads_memory[killed]]:
+                del available[killed]
+        if calls:
+            for killed in [killed for killed in available if any(is_pinned(temp) for temp in self.hash.temps[killed])]:
+                del available[killed]
+
+        if number is None or number in available:
+            return
+        holder = statement.destination
+        if is_pinned(holder) or holder in self.hash.temps[number]:
+            return
+        available[number] = holder
+        mentions.setdefault(holder.id, set()).add(number)
+        for temp in self.hash.temps[number]:
+            mentions.setdefault(temp.id, set()).add(number)
+
+    def rewrite(self, statement, available: Dict[int, Temp]):
+        """
+        Заменяет в операторе доступные выражения временными переменными
+        :param statement: оператор
+        :param available: номер выражения -> переменная с его значением
+        :return:
+        """
+        numbers = self.numbers[id(statement)]
+        if isinstance(statement, Move):
+            statement.source = self.rewrite_expression(statement.source, SOURCE, numbers, available)
+            if isinstance(statement.destination, Mem):
+                destination = statement.destination
+                destination.expression = self.rewrite_expression(destination.expression, ADDRESS, numbers, available)
+        elif isinstance(statement, Exp):
+            statement.expression = self.rewrite_expression(statement.expression, OPERAND, numbers, available)
+        elif isinstance(statement, JumpC):
+            statement.condition_left_expression = self.rewrite_expression(
+                statement.condition_left_expression, OPERAND, numbers, available)
+            statement.condition_right_expression = self.rewrite_expression(
+                statement.condition_right_expression, OPERAND, numbers, available)
+
+    def replacement(self, node: IExp, place: str, numbers: Dict[int, Optional[int]],
+                    available: Dict[int, Temp]) -> Optional[Temp]:
+        """
+        Временная переменная, которой можно заменить узел на данном месте
+        :param node: узел
+        :param place: место узла (OPERAND, SOURCE, ADDRESS, SOURCE_ADDRESS, SKIP)
+        :param numbers: номера поддеревьев оператора
+        :param available: доступные выражения
+        :return:
+        """
+        if place in (SOURCE_ADDRESS, SKIP) or not isinstance(node, (Binop, Mem, UnaryOp)):
+            return None
+        if place == SOURCE and isinstance(node, Mem) and isinstance(node.expression, Temp):
+            return None
+        if place == ADDRESS and isinstance(node, Binop) and node.operation == BinopEnum.PLUS and \
+                (isinstance(node.left_expression, Const) or isinstance(node.right_expression, Const)):
+            return None
+        number = numbers.get(id(node))
+        holder = available.get(number) if number is not None else None
+        return Temp(None, None, holder) if holder is not None else None
+
+    def rewrite_expression(self, exp: IExp, place: str, numbers: Dict[int, Optional[int]],
+                           available: Dict[int, Temp]) -> IExp:
+        """
+        Заменяет доступные поддеревья сверху вниз (обход явным стеком)
+        :param exp: выражение
+        :param place: место выражения в операторе
+        :param numbers: номера поддеревьев оператора
+        :param available: доступные выражения
+        :return: новое выражение
+        """
+        replaced = self.replacement(exp, place, numbers, available)
+        if replaced is not None:
+            self.reused += 1
+            return replaced
+        stack = [(exp, place)]
+        while stack:
+            node, place = stack.pop()
+            if place == SKIP:
+                continue
+            if isinstance(node, Binop):
+                node.left_expression = self.rewrite_child(node.left_expression, OPERAND, numbers, available, stack)
+                node.right_expression = self.rewrite_child(node.right_expression, OPERAND, numbers, available, stack)
+            elif isinstance(node, UnaryOp):
+                node.expression = self.rewrite_child(node.expression, OPERAND, numbers, available, stack)
+            elif isinstance(node, Mem):
+                child_place = SOURCE_ADDRESS if place == SOURCE else ADDRESS
+                node.expression = self.rewrite_child(node.expression, child_place, numbers, available, stack)
+            elif isinstance(node, Call):
+                stack.append((node.func_expr, SKIP))
+                node.args.expressions = tuple(self.rewrite_child(argument, OPERAND, numbers, available, stack)
+                                              for argument in node.args.expressions)
+        return exp
+
+    def rewrite_child(self, child: IExp, place: str, numbers: Dict[int, Optional[int]], available: Dict[int, Temp],
+                      stack: list) -> IExp:
+        replaced = self.replacement(child, place, numbers, available)
+        if replaced is not None:
+            self.reused += 1
+            return replaced
+        stack.append((child, place))
+        return child
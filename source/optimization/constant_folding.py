@@ -0,0 +1,400 @@
+from collections import Counter
+from typing import Dict, Optional
+
+from framework.compilation_context import CompilationContext
+from ir_tree.expressions.all import *
+from ir_tree.expressions.i_exp import IExp
+from ir_tree.ir_visitor import IRVisitor
+from ir_tree.label import Label
+from ir_tree.list import ExpList, StmList
+from ir_tree.statements.all import *
+from ir_tree.translate.exp_wrapper import ExpWrapper
+from ir_tree.translate.i_subtree_wrapper import ISubtreeWrapper, LinearTree
+from ir_tree.translate.stm_wrapper import StmWrapper
+from optimization.copy_propagation import statement_uses
+
+# Значения логических констант: IRBuilder хранит их в Const строками, #
+# а в условиях сравнивает с временной переменной 'true' (ExpWrapper.to_conditional) #
+BOOLEAN_VALUES = {'true': 1, 'false': 0}
+TRUE_TEMP_NAME = 'true'
+
+WORD_BITS = 32
+
+
+def wrap_word(value: int) -> int:
+    """
+    Приводит результат к знаковому 32-битному слову (как при вычислении на x86)
+    :param value: значение
+    :return:
+    """
+    value &= (1 << WORD_BITS) - 1
+    return value - (1 << WORD_BITS) if value >> (WORD_BITS - 1) else value
+
+
+def constant_value(exp: IExp) -> Optional[int]:
+    """
+    Значение константного выражения
+    :param exp: выражение
+    :return: число (логические константы - 1 и 0) или None, если выражение не константа
+    """
+    if isinstance(exp, Const):
+        if isinstance(exp.value, bool):
+            return int(exp.value)
+        if isinstance(exp.value, int):
+            return exp.value
+        return BOOLEAN_VALUES.get(exp.value)
+    return None
+
+
+def condition_value(exp: IExp) -> Optional[int]:
+    """
+    Значение операнда условного перехода: как constant_value, но еще и временная переменная 'true'
+    :param exp: операнд JumpC
+    :return:
+    """
+    if isinstance(exp, Temp) and exp.name == TRUE_TEMP_NAME:
+        return BOOLEAN_VALUES[TRUE_TEMP_NAME]
+    return constant_value(exp)
+
+
+def may_fault(exp: IExp) -> bool:
+    """
+    Может ли вычисление выражения прерваться (остаток от деления на переменную или ноль:
+    muncher выбирает для него IDIV, а Java бросает ArithmeticException)
+    :param exp: выражение
+    :return:
+    """
+    stack = [exp]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, Binop):
+            if node.operation == BinopEnum.MOD and constant_value(node.right_expression) in (None, 0):
+                return True
+            stack.extend((node.left_expression, node.right_expression))
+        elif isinstance(node, (Mem, UnaryOp)):
+            stack.append(node.expression)
+    return False
+
+
+def is_pure(exp: IExp) -> bool:
+    """
+    Можно ли выбросить выражение, не потеряв побочных эффектов (нет вызовов, Eseq и операций,
+    которые могут прервать программу, см. may_fault)
+    :param exp: выражение
+    :return:
+    """
+    stack = [exp]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, (Call, Eseq)):
+            return False
+        if isinstance(node, Binop):
+            stack.append(node.left_expression)
+            stack.append(node.right_expression)
+        elif isinstance(node, (UnaryOp, Mem)):
+            stack.append(node.expression)
+    return not may_fault(exp)
+
+
+def can_replace_with(exp: IExp) -> bool:
+    """
+    Можно ли заменить операцию ее операндом exp
+    Muncher читает Mem(Temp) в источнике Move как саму временную переменную,
+    а в остальных местах - как память по адресу из нее, поэтому такой операнд
+    не поднимается туда, где смысл может поменяться
+    :param exp: операнд
+    :return:
+    """
+    return not (isinstance(exp, Mem) and isinstance(exp.expression, Temp))
+
+
+def evaluate_binop(operation: BinopEnum, left: int, right: int) -> Optional[int]:
+    """
+    Вычисляет бинарную операцию над константами по правилам Java
+    :param operation: операция
+    :param left: левый операнд
+    :param right: правый операнд
+    :return: результат или None, если операцию нельзя вычислить (остаток от деления на 0)
+    """
+    if operation == BinopEnum.PLUS:
+        return wrap_word(left + right)
+    if operation == BinopEnum.MINUS:
+        return wrap_word(left - right)
+    if operation == BinopEnum.MUL:
+        return wrap_word(left * right)
+    if operation == BinopEnum.MOD:
+        if right == 0:
+            return None
+        # остаток в Java имеет знак делимого #
+        remainder = abs(left) % abs(right)
+        return wrap_word(-remainder if left < 0 else remainder)
+    if operation == BinopEnum.AND:
+        return left & right
+    if operation == BinopEnum.OR:
+        return left | right
+    return None
+
+
+def evaluate_condition(jump_type: JumpTypeEnum, left: int, right: int) -> bool:
+    if jump_type == JumpTypeEnum.EQ:
+        return left == right
+    if jump_type == JumpTypeEnum.NEQ:
+        return left != right
+    if jump_type == JumpTypeEnum.LT:
+        return left < right
+    if jump_type == JumpTypeEnum.GE:
+        return left >= right
+    raise NotImplementedError()
+
+
+class ConstantFolder(IRVisitor):
+    """
+    Свертка констант и алгебраические упрощения IR дерева метода (после IRBuilder):
+
+    - бинарные операции и NOT над константами вычисляются
+    - x + 0, 0 + x, x - 0, x * 1, 1 * x заменяются на x, x * 0 и x % 1 - на 0 (если в x нет вызовов)
+    - NOT(NOT x) заменяется на x
+    - JumpC над константами становится Jump, если условие выполнено, и удаляется, если нет
+
+    Обработчики возвращают новый узел вместо старого. Адрес, непосредственно
+    под Mem, в виде PLUS с константой не упрощается - Muncher сворачивает его
+    в адресацию [r + k], а Mem(Temp) в источнике Move читает саму временную переменную
+    (см. can_replace_with)
+    """
+
+    def fold(self, wrapper: ISubtreeWrapper) -> ISubtreeWrapper:
+        """
+        Сворачивает константы в дереве метода
+        :param wrapper: IR дерево метода
+        :return: новое дерево метода
+        """
+        return StmWrapper(self.visit(wrapper))
+
+    visit_methods = {
+        UnaryOp: 'visit_unary_op',
+        Binop: 'visit_binop',
+        Call: 'visit_call',
+        Const: 'visit_leaf',
+        Eseq: 'visit_eseq',
+        Mem: 'visit_mem',
+        Name: 'visit_leaf',
+        Temp: 'visit_leaf',
+        ExpList: 'visit_exp_list',
+        Exp: 'visit_exp',
+        Jump: 'visit_leaf',
+        JumpC: 'visit_jumpc',
+        LabelStm: 'visit_leaf',
+        Move: 'visit_move',
+        Seq: 'visit_seq',
+        StmWrapper: 'visit_stm_wrapper',
+        ExpWrapper: 'visit_stm_wrapper',
+    }
+
+    def visit_leaf(self, obj):
+        return obj
+
+    def visit_unary_op(self, obj: UnaryOp):
+        obj.expression = yield obj.expression
+        if obj.operation == UnaryOpEnum.NOT:
+            value = constant_value(obj.expression)
+            if value is not None:
+                return Const('false' if value else 'true', obj.position)
+            if isinstance(obj.expression, UnaryOp) and obj.expression.operation == UnaryOpEnum.NOT \
+                    and can_replace_with(obj.expression.expression):
+                return obj.expression.expression
+        return obj
+
+    def visit_binop(self, obj: Binop):
+        obj.left_expression = yield obj.left_expression
+        obj.right_expression = yield obj.right_expression
+        return self.simplify(obj)
+
+    @staticmethod
+    def simplify(obj: Binop) -> IExp:
+        """
+        Вычисляет или упрощает бинарную операцию с уже свернутыми операндами
+        :param obj: операция
+        :return: новое выражение
+        """
+        left, right = constant_value(obj.left_expression), constant_value(obj.right_expression)
+        if left is not None and right is not None:
+            value = evaluate_binop(obj.operation, left, right)
+            if value is not None:
+                return Const(value, obj.position)
+            return obj
+        if obj.operation == BinopEnum.PLUS:
+            if right == 0 and can_replace_with(obj.left_expression):
+                return obj.left_expression
+            if left == 0 and can_replace_with(obj.right_expression):
+                return obj.right_expression
+        elif obj.operation == BinopEnum.MINUS:
+            if right == 0 and can_replace_with(obj.left_expression):
+                return obj.left_expression
+        elif obj.operation == BinopEnum.MUL:
+            if right == 1 and can_replace_with(obj.left_expression):
+                return obj.left_expression
+            if left == 1 and can_replace_with(obj.right_expression):
+                return obj.right_expression
+            if (right == 0 and is_pure(obj.left_expression)) or (left == 0 and is_pure(obj.right_expression)):
+                return Const(0, obj.position)
+        elif obj.operation == BinopEnum.MOD:
+            if right == 1 and is_pure(obj.left_expression):
+                return Const(0, obj.position)
+        return obj
+
+    def visit_call(self, obj: Call):
+        obj.args = yield obj.args
+        obj.func_expr = yield obj.func_expr
+        return obj
+
+    def visit_eseq(self, obj: Eseq):
+        obj.statement = yield obj.statement
+        obj.expression = yield obj.expression
+        if obj.statement is None:
+            return obj.expression
+        return obj
+
+    def visit_mem(self, obj: Mem):
+        address = obj.expression
+        if not isinstance(address, Binop):
+            obj.expression = yield address
+            return obj
+        address.left_expression = yield address.left_expression
+        address.right_expression = yield address.right_expression
+        folded = self.simplify(address)
+        # [r + k] Muncher и так выбирает адресацией, а адрес из одной Temp читает иначе #
+        offset = address.operation == BinopEnum.PLUS and \
+            (isinstance(address.left_expression, Const) or isinstance(address.right_expression, Const))
+        if isinstance(folded, Const) or not (offset or isinstance(folded, Temp)):
+            obj.expression = folded
+        return obj
+
+    def visit_exp_list(self, obj: ExpList):
+        expressions = []
+        for expression in obj.expressions:
+            expressions.append((yield expression))
+        obj.expressions = tuple(expressions)
+        return obj
+
+    def visit_exp(self, obj: Exp):
+        obj.expression = yield obj.expression
+        return obj
+
+    def visit_jumpc(self, obj: JumpC):
+        obj.condition_left_expression = yield obj.condition_left_expression
+        obj.condition_right_expression = yield obj.condition_right_expression
+        left = condition_value(obj.condition_left_expression)
+        right = condition_value(obj.condition_right_expression)
+        if left is None or right is None:
+            return obj
+        if evaluate_condition(obj.jump_type_enum, left, right):
+            return Jump(obj.true_label, obj.position)
+        return None
+
+    def visit_move(self, obj: Move):
+        obj.source = yield obj.source
+        obj.destination = yield obj.destination
+        return obj
+
+    def visit_seq(self, obj: Seq):
+        statements, obj.statements = obj.statements, []
+        for statement in statements:
+            obj.append((yield statement))
+        return obj if obj.statements else None
+
+    def visit_stm_wrapper(self, obj: ISubtreeWrapper):
+        statement = yield obj.to_stm()
+        return statement if statement is not None else StmList(position=obj.to_stm().position)
+
+
+def thread_jumps(tree: LinearTree, context: CompilationContext) -> int:
+    """
+    Продевает переходы через проверку только что присвоенной константы: IRBuilder записывает
+    значение условия в переменную (0 на одной ветке, 1 на другой) и переходит к ее сравнению с true
+    Переход Jump(L) сразу после t = c, где за меткой L стоит JumpC над t (или над ее копиями,
+    которые больше нигде не читаются) и константой, направляется туда, куда приведет сравнение:
+    на метку JumpC или на метку после него (новую, если ее нет). Ставшие недостижимыми
+    сравнения удаляет remove_dead_branches
+    :param tree: линеаризованный метод (меняется на месте)
+    :param context: контекст метода (новые метки)
+    :return: количество продетых переходов
+    """
+    positions = {statement.label_name: index for index, statement in enumerate(tree)
+                 if isinstance(statement, LabelStm)}
+    reads = Counter(temp.id for statement in tree for temp in statement_uses(statement))
+    # позиция JumpC -> метка оператора после него #
+    next_labels: Dict[int, Label] = dict()
+    threaded = 0
+    for index in range(1, len(tree)):
+        jump, move = tree[index], tree[index - 1]
+        if not isinstance(jump, Jump) or not isinstance(move, Move) or not isinstance(move.destination, Temp):
+            continue
+        value = constant_value(move.source)
+        target = positions.get(jump.label_to_jump)
+        if value is None or target is None:
+            continue
+        # копии значения до проверки (Mem(Temp) в источнике Move - тоже пересылка) #
+        aliases = {move.destination.id}
+        position = target + 1
+        while position < len(tree) and isinstance(tree[position], Move) and \
+                isinstance(tree[position].destination, Temp) and reads[tree[position].destination.id] == 1:
+            source = tree[position].source
+            source = source.expression if isinstance(source, Mem) else source
+            if not isinstance(source, Temp) or source.id not in aliases:
+                break
+            aliases.add(tree[position].destination.id)
+            position += 1
+        if position >= len(tree) or not isinstance(tree[position], JumpC):
+            continue
+        test = tree[position]
+        left, right = test.condition_left_expression, test.condition_right_expression
+        if isinstance(left, Temp) and left.id in aliases and condition_value(right) is not None:
+            taken = evaluate_condition(test.jump_type_enum, value, condition_value(right))
+        elif isinstance(right, Temp) and right.id in aliases and condition_value(left) is not None:
+            taken = evaluate_condition(test.jump_type_enum, condition_value(left), value)
+        else:
+            continue
+        if taken:
+            jump.label_to_jump = test.true_label
+        elif position + 1 < len(tree) and isinstance(tree[position + 1], LabelStm):
+            jump.label_to_jump = tree[position + 1].label_name
+        else:
+            if position not in next_labels:
+                next_labels[position] = context.labels.next_label()
+            jump.label_to_jump = next_labels[position]
+        threaded += 1
+    for position in sorted(next_labels, reverse=True):
+        tree.insert(position + 1, LabelStm(next_labels[position]))
+    return threaded
+
+
+def remove_dead_branches(tree: LinearTree) -> LinearTree:
+    """
+    Удаляет ветви, ставшие недостижимыми после свертки условных переходов:
+    операторы после безусловного перехода до метки, на которую еще есть переходы
+    Повторяется, пока удаляются переходы (вместе с ними метки теряют ссылки)
+    :param tree: линеаризованный метод
+    :return: тот же список без недостижимых операторов
+    """
+    changed = True
+    while changed:
+        referenced = set()
+        for statement in tree:
+            if isinstance(statement, Jump):
+                referenced.add(statement.label_to_jump)
+            elif isinstance(statement, JumpC):
+                referenced.add(statement.true_label)
+        kept = []
+        reachable = True
+        changed = False
+        for statement in tree:
+            if isinstance(statement, LabelStm) and statement.label_name in referenced:
+                reachable = True
+            if reachable:
+                kept.append(statement)
+            elif isinstance(statement, (Jump, JumpC)):
+                changed = True
+            if isinstance(statement, Jump):
+                reachable = False
+        tree[:] = kept
+    return tree
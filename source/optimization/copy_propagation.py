@@ -0,0 +1,496 @@
+from typing import Dict, List, Optional, Set, Tuple
+
+from activation_records.in_reg_access import InRegAccess
+from code_generation.instruction import IInstruction, InstructionList
+from flow_graph.control_flow_graph import ControlFlowGraph
+from ir_tree.expressions.all import *
+from ir_tree.expressions.i_exp import IExp
+from ir_tree.list import ExpList
+from ir_tree.statements.all import *
+from ir_tree.translate.i_subtree_wrapper import LinearTree
+from optimization.dataflow import available_at_entry, live_out, solve_available
+from x86.x86_instruction_set import RegMove, Regs
+
+# Копия - пара (куда, откуда) #
+Copy = Tuple[Temp, Temp]
+
+
+def is_pinned(temp: Temp) -> bool:
+    """
+    Закреплена ли временная переменная за регистром вне метода: формальные параметры
+    в регистрах и регистр возвращаемого значения (InRegAccess) видны вызывающему
+    и могут меняться при вызовах
+    :param temp: временная переменная
+    :return:
+    """
+    return temp.unique or (temp.name is not None and temp.name.startswith(InRegAccess.AR_Prefix))
+
+
+def expression_temps(exp: IExp) -> List[Temp]:
+    """
+    Временные переменные, которые читает выражение канонического IR (обход явным стеком)
+    :param exp: выражение
+    :return:
+    """
+    temps = []
+    stack = [exp]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, Temp):
+            temps.append(node)
+        elif isinstance(node, Binop):
+            stack.append(node.left_expression)
+            stack.append(node.right_expression)
+        elif isinstance(node, (Mem, UnaryOp)):
+            stack.append(node.expression)
+        elif isinstance(node, Call):
+            stack.append(node.func_expr)
+            stack.extend(node.args.expressions)
+        elif isinstance(node, ExpList):
+            stack.extend(node.expressions)
+    return temps
+
+
+def replace_temps(exp: IExp, replace) -> IExp:
+    """
+    Заменяет листья Temp в выражении канонического IR (узлы меняются на месте)
+    :param exp: выражение
+    :param replace: функция Temp -> Temp
+    :return: выражение (новое, если само выражение - Temp)
+    """
+    if isinstance(exp, Temp):
+        return replace(exp)
+    stack = [exp]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, Binop):
+            node.left_expression = replace(node.left_expression) if isinstance(node.left_expression, Temp) \
+                else node.left_expression
+            node.right_expression = replace(node.right_expression) if isinstance(node.right_expression, Temp) \
+                else node.right_expression
+            stack.append(node.left_expression)
+            stack.append(node.right_expression)
+        elif isinstance(node, (Mem, UnaryOp)):
+            if isinstance(node.expression, Temp):
+                node.expression = replace(node.expression)
+            stack.append(node.expression)
+        elif isinstance(node, Call):
+            if isinstance(node.func_expr, Temp):
+                node.func_expr = replace(node.func_expr)
+            stack.append(node.func_expr)
+            stack.append(node.args)
+        elif isinstance(node, ExpList):
+            node.expressions = tuple(replace(expression) if isinstance(expression, Temp) else expression
+                                     for expression in node.expressions)
+            stack.extend(node.expressions)
+    return exp
+
+
+def statement_uses(statement) -> List[Temp]:
+    """
+    Временные переменные, которые читает оператор канонического IR
+    (адрес в приемнике Move тоже читается)
+    :param statement: оператор
+    :return:
+    """
+    if isinstance(statement, Move):
+        temps = expression_temps(statement.source)
+        if not isinstance(statement.destination, Temp):
+            temps += expression_temps(statement.destination)
+        return temps
+    if isinstance(statement, Exp):
+        return expression_temps(statement.expression)
+    if isinstance(statement, JumpC):
+        return expression_temps(statement.condition_left_expression) + \
+            expression_temps(statement.condition_right_expression)
+    return []
+
+
+def statement_defines(statement) -> List[int]:
+    """
+    Номера временных переменных, которые может изменить оператор канонического IR:
+    приемник Move(Temp t, ...) и t в Move(Mem(Temp t), ...) - так IR пишет регистры InRegAccess
+    :param statement: оператор
+    :return:
+    """
+    if isinstance(statement, Move):
+        destination = statement.destination
+        if isinstance(destination, Mem):
+            destination = destination.expression
+        if isinstance(destination, Temp):
+            return [destination.id]
+    return []
+
+
+def statement_calls(statement) -> bool:
+    """
+    Есть ли в операторе вызов (в каноническом IR вызов стоит только
+    в источнике Move или в Exp)
+    :param statement: оператор
+    :return:
+    """
+    if isinstance(statement, Move):
+        return isinstance(statement.source, Call) or isinstance(statement.destination, Call)
+    return isinstance(statement, Exp) and isinstance(statement.expression, Call)
+
+
+class CopyPropagation:
+    """
+    Распространение копий и удаление лишних пересылок временных переменных в методе:
+
+    - доступные копии (d <- s, после которой ни d, ни s не переопределялись) ищутся
+    анализом потока данных по графу потока управления, и чтения d заменяются чтениями s
+    - затем по живости удаляются пересылки в мертвые переменные и пересылки переменной в себя
+    (удаление повторяется, пока освобождаются цепочки пересылок)
+    - наконец пересылки d <- s, после которых s мертва, сливаются внутри блока:
+    s переименовывается в d от своего определения, если d там не читается и не пишется
+    (само определение s читать d может)
+
+    Пересылки в закрепленные переменные (is_pinned) не удаляются, а копии с ними
+    не переживают вызовов. Наследники задают, что в их представлении копия,
+    чтение и запись (IRCopyPropagation - операторы IR, MachineCopyPropagation - инструкции)
+    """
+
+    def __init__(self, graph: ControlFlowGraph):
+        """
+        Конструктор
+        :param graph: граф потока управления метода
+        """
+        self.graph = graph
+        self.forwarded = 0
+        # номера закрепленных переменных, в которые встречались копии #
+        self.pinned: Set[int] = set()
+
+    def copy_of(self, item) -> Optional[Copy]:
+        raise NotImplementedError()
+
+    def uses(self, item) -> List[Temp]:
+        raise NotImplementedError()
+
+    def defines(self, item) -> List[int]:
+        """
+        Номера переменных, которые элемент может изменить
+        :param item: оператор или инструкция
+        :return:
+        """
+        raise NotImplementedError()
+
+    def is_call(self, item) -> bool:
+        raise NotImplementedError()
+
+    def substitute(self, item, replace):
+        """
+        Заменяет чтения переменных в элементе
+        :param item: оператор или инструкция
+        :param replace: функция Temp -> Temp
+        :return:
+        """
+        raise NotImplementedError()
+
+    def starts_range(self, item, temp: Temp) -> bool:
+        """
+        Начинает ли элемент новое значение переменной: пишет ее, не читая старое
+        :param item: оператор или инструкция
+        :param temp: переменная
+        :return:
+        """
+        raise NotImplementedError()
+
+    def rename(self, item, old: Temp, new: Temp):
+        """
+        Переименовывает переменную в элементе (и чтения, и записи)
+        :param item: оператор или инструкция
+        :param old: переменная
+        :param new: новое имя
+        :return:
+        """
+        raise NotImplementedError()
+
+    def propagate(self) -> int:
+        """
+        Распространяет копии и удаляет лишние пересылки
+        :return: количество удаленных пересылок
+        """
+        self.forward_copies()
+        removed = 0
+        while True:
+            removed_now = self.remove_dead_moves()
+            if not removed_now:
+                break
+            removed += removed_now
+        return removed + self.coalesce()
+
+    def live_out(self) -> List[Set[int]]:
+        return live_out(self.graph, self.uses, self.defines)
+
+    def transfer(self, item, copies: Dict[int, Temp], users: Dict[int, Set[int]]):
+        """
+        Меняет набор доступных копий после элемента
+        :param item: оператор или инструкция
+        :param copies: номер переменной -> переменная, копия которой в ней лежит
+        :param users: номер переменной -> номера переменных, которые сейчас ее копии
+        :return:
+        """
+        killed = list(self.defines(item))
+        if self.is_call(item):
+            killed.extend(destination for destination, source in copies.items()
+                          if destination in self.pinned or is_pinned(source))
+        for temp_id in killed:
+            source = copies.pop(temp_id, None)
+            if source is not None and source.id in users:
+                users[source.id].discard(temp_id)
+            for destination in users.pop(temp_id, ()):
+                copies.pop(destination, None)
+        copy = self.copy_of(item)
+        if copy is not None and copy[0].id != copy[1].id:
+            destination, source = copy
+            if is_pinned(destination):
+                self.pinned.add(destination.id)
+            copies[destination.id] = source
+            users.setdefault(source.id, set()).add(destination.id)
+
+    @staticmethod
+    def users_of(copies: Dict[int, Temp]) -> Dict[int, Set[int]]:
+        users: Dict[int, Set[int]] = dict()
+        for temp_id, source in copies.items():
+            users.setdefault(source.id, set()).add(temp_id)
+        return users
+
+    def forward_copies(self):
+        """
+        Ищет доступные копии (solve_available) и заменяет чтения переменных их источниками
+        На выходе из блока остаются только копии в живые переменные
+        :return:
+        """
+        live = self.live_out()
+        blocks = self.graph.blocks
+
+        def transfer_block(index: int, copies: Dict[int, Temp]) -> Dict[int, Temp]:
+            users = self.users_of(copies)
+            for item in blocks[index].items:
+                self.transfer(item, copies, users)
+            return {temp_id: source for temp_id, source in copies.items() if temp_id in live[index]}
+
+        outputs = solve_available(self.graph, transfer_block)
+
+        def replace(temp: Temp) -> Temp:
+            source = copies.get(temp.id)
+            if source is None:
+                return temp
+            self.forwarded += 1
+            return source
+
+        for index in self.graph.reverse_postorder():
+            copies = available_at_entry(self.graph, index, outputs)
+            users = self.users_of(copies)
+            for item in blocks[index].items:
+                self.substitute(item, replace)
+                self.transfer(item, copies, users)
+
+    def remove_dead_moves(self) -> int:
+        """
+        Удаляет пересылки в переменные, которые дальше не читаются, и пересылки переменной в себя
+        :return: количество удаленных пересылок
+        """
+        live_out = self.live_out()
+        removed = 0
+        for block in self.graph.blocks:
+            live = set(live_out[block.index])
+            kept = []
+            for item in reversed(block.items):
+                copy = self.copy_of(item)
+                if copy is not None and (copy[0].id == copy[1].id or
+                                         (copy[0].id not in live and not is_pinned(copy[0]))):
+                    removed += 1
+                    continue
+                live.difference_update(self.defines(item))
+                live.update(temp.id for temp in self.uses(item))
+                kept.append(item)
+            kept.reverse()
+            block.items[:] = kept
+        return removed
+
+    def coalesce(self) -> int:
+        """
+        Сливает пересылки d <- s с определением s выше в том же блоке
+        (обход блока с конца с живостью после каждого элемента)
+        :return: количество удаленных пересылок
+        """
+        live_out = self.live_out()
+        removed = 0
+        for block in self.graph.blocks:
+            items = block.items
+            live = set(live_out[block.index])
+            deleted = set()
+            for position in range(len(items) - 1, -1, -1):
+                item = items[position]
+                copy = self.copy_of(item)
+                if copy is not None and copy[1].id not in live and not is_pinned(copy[0]) \
+                        and not is_pinned(copy[1]) and self.coalesce_range(items, position, copy):
+                    deleted.add(position)
+                    removed += 1
+                    continue
+                live.difference_update(self.defines(item))
+                live.update(temp.id for temp in self.uses(item))
+            if deleted:
+                items[:] = [item for position, item in enumerate(items) if position not in deleted]
+        return removed
+
+    def coalesce_range(self, items: list, position: int, copy: Copy) -> bool:
+        """
+        Ищет выше пересылки определение источника и переименовывает источник в приемник
+        :param items: элементы блока
+        :param position: позиция пересылки
+        :param copy: пересылка (d, s)
+        :return: удалось ли слить
+        """
+        destination, source = copy
+        start = position - 1
+        while start >= 0:
+            item = items[start]
+            if destination.id in self.defines(item):
+                return False
+            # определение s может читать d: чтение выполняется раньше записи (t = d + 1; d = t -> d = d + 1) #
+            if self.starts_range(item, source):
+                break
+            if source.id in self.defines(item) or any(temp.id == destination.id for temp in self.uses(item)):
+                return False
+            start -= 1
+        if start < 0:
+            return False
+        for item in items[start:position]:
+            self.rename(item, source, destination)
+        return True
+
+
+class IRCopyPropagation(CopyPropagation):
+    """
+    Распространение копий в линеаризованном каноническом IR (после Linearizer)
+
+    Копии - Move(Temp d, Temp s) и Move(Temp d, Mem(Temp s)): Muncher превращает обе
+    в MOV d s. Замена листа Temp d на Temp s сохраняет смысл и в Mem(Temp d) -
+    там, где Muncher читает память по адресу из d. Адрес Mem(Temp t) в приемнике Move
+    не заменяется и считается записью в t (statement_defines)
+    """
+
+    def __init__(self, tree: LinearTree):
+        """
+        Конструктор
+        :param tree: линеаризованный метод (меняется на месте)
+        """
+        super().__init__(ControlFlowGraph.from_linear_tree(tree))
+        self.tree = tree
+
+    def propagate(self) -> int:
+        removed = super().propagate()
+        self.tree[:] = self.graph.statements()
+        return removed
+
+    def copy_of(self, item) -> Optional[Copy]:
+        if not isinstance(item, Move) or not isinstance(item.destination, Temp):
+            return None
+        source = item.source
+        if isinstance(source, Mem):
+            source = source.expression
+        return (item.destination, source) if isinstance(source, Temp) else None
+
+    def uses(self, item) -> List[Temp]:
+        return statement_uses(item)
+
+    def defines(self, item) -> List[int]:
+        return statement_defines(item)
+
+    def is_call(self, item) -> bool:
+        return statement_calls(item)
+
+    def substitute(self, item, replace):
+        if isinstance(item, Move):
+            item.source = replace_temps(item.source, replace)
+            destination = item.destination
+            if isinstance(destination, Mem) and not isinstance(destination.expression, Temp):
+                replace_temps(destination.expression, replace)
+        elif isinstance(item, Exp):
+            item.expression = replace_temps(item.expression, replace)
+        elif isinstance(item, JumpC):
+            item.condition_left_expression = replace_temps(item.condition_left_expression, replace)
+            item.condition_right_expression = replace_temps(item.condition_right_expression, replace)
+
+    def starts_range(self, item, temp: Temp) -> bool:
+        return isinstance(item, Move) and isinstance(item.destination, Temp) and item.destination.id == temp.id \
+            and all(used.id != temp.id for used in expression_temps(item.source))
+
+    def rename(self, item, old: Temp, new: Temp):
+        if isinstance(item, Move) and isinstance(item.destination, Temp) and item.destination.id == old.id:
+            item.destination = new
+        self.substitute(item, lambda temp: new if temp.id == old.id else temp)
+
+
+class MachineCopyPropagation(CopyPropagation):
+    """
+    Распространение копий в инструкциях после Muncher
+
+    Копии - RegMove "MOV %0 %1" между временными переменными. Машинные регистры
+    (EAX, EDX) не заменяются и не распространяются: CALL и IDIV пишут их неявно.
+    Двухадресные операции (ADD %0 ..., NOT %0) читают свой приемник, поэтому
+    операнд, совпадающий с приемником, не заменяется, а приемник считается прочитанным
+    """
+
+    # неявно записываемые регистры #
+    CALL_DEFINES = [register.value for register in Regs]
+    IDIV_DEFINES = [Regs.EAX.value, Regs.EDX.value]
+
+    def __init__(self, instruction_list: InstructionList):
+        """
+        Конструктор
+        :param instruction_list: инструкции метода (меняются на месте)
+        """
+        super().__init__(ControlFlowGraph.from_instructions(instruction_list))
+        self.instruction_list = instruction_list
+
+    def propagate(self) -> int:
+        removed = super().propagate()
+        self.instruction_list.instructions[:] = self.graph.statements()
+        return removed
+
+    def copy_of(self, item: IInstruction) -> Optional[Copy]:
+        if not isinstance(item, RegMove) or item.asm_code != 'MOV %0 %1' or len(item.src) != 1 \
+                or len(item.dst) != 1:
+            return None
+        source, destination = item.src[0], item.dst[0]
+        if not isinstance(source, Temp) or source.unique or destination.unique:
+            return None
+        return destination, source
+
+    def uses(self, item: IInstruction) -> List[Temp]:
+        temps = [temp for temp in item.src if isinstance(temp, Temp)]
+        if item.asm_code is not None and not item.asm_code.startswith('MOV'):
+            temps += item.dst
+        return temps
+
+    def defines(self, item: IInstruction) -> List[int]:
+        defined = [temp.id for temp in item.dst]
+        if item.asm_code is not None:
+            if item.asm_code.startswith('CALL'):
+                defined += self.CALL_DEFINES
+            elif item.asm_code.startswith('IDIV'):
+                defined += self.IDIV_DEFINES
+        return defined
+
+    def is_call(self, item: IInstruction) -> bool:
+        return item.asm_code is not None and item.asm_code.startswith('CALL')
+
+    def substitute(self, item: IInstruction, replace):
+        if not item.src:
+            return
+        defined = {temp.id for temp in item.dst}
+        item.src = [replace(temp) if isinstance(temp, Temp) and not temp.unique and temp.id not in defined
+                    else temp for temp in item.src]
+
+    def starts_range(self, item: IInstruction, temp: Temp) -> bool:
+        return any(defined.id == temp.id for defined in item.dst) and \
+            all(used.id != temp.id for used in self.uses(item))
+
+    def rename(self, item: IInstruction, old: Temp, new: Temp):
+        item.src = [new if isinstance(temp, Temp) and not temp.unique and temp.id == old.id else temp
+                    for temp in item.src]
+        item.dst = [new if not temp.unique and temp.id == old.id else temp for temp in item.dst]
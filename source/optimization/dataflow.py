@@ -0,0 +1,112 @@
+from typing import Callable, Dict, Iterable, List, Optional, Set
+
+from flow_graph.control_flow_graph import ControlFlowGraph
+
+
+def live_out(graph: ControlFlowGraph, uses: Callable[[object], Iterable], defines: Callable[[object], Iterable[int]]) \
+        -> List[Set[int]]:
+    """
+    Живые на выходе из блоков переменные (номера) - обратный анализ с очередью блоков
+    Считаются только переменные, которые в методе пишутся: остальные (fp, 'true',
+    параметры) живы от входа до чтения, и их множества сделали бы анализ квадратичным
+    :param graph: граф потока управления
+    :param uses: элемент -> читаемые временные переменные
+    :param defines: элемент -> номера переменных, которые он может изменить
+    :return:
+    """
+    blocks = graph.blocks
+    gen: List[Set[int]] = []
+    kill: List[Set[int]] = []
+    for block in blocks:
+        block_gen, block_kill = set(), set()
+        for item in reversed(block.items):
+            defined = defines(item)
+            block_gen.difference_update(defined)
+            block_kill.update(defined)
+            block_gen.update(temp.id for temp in uses(item))
+        gen.append(block_gen)
+        kill.append(block_kill)
+    written = set().union(*kill)
+    gen = [block_gen & written for block_gen in gen]
+
+    live_in: List[Set[int]] = [set(block_gen) for block_gen in gen]
+    result: List[Set[int]] = [set() for _ in blocks]
+    # обработка с конца: сначала преемники, в очередь возвращаются предшественники изменившихся блоков #
+    pending = list(range(len(blocks)))
+    queued = [True] * len(blocks)
+    while pending:
+        index = pending.pop()
+        queued[index] = False
+        out = set()
+        for successor in blocks[index].successors:
+            out |= live_in[successor]
+        result[index] = out
+        new_in = gen[index] | (out - kill[index])
+        if new_in != live_in[index]:
+            live_in[index] = new_in
+            for predecessor in blocks[index].predecessors:
+                if not queued[predecessor]:
+                    queued[predecessor] = True
+                    pending.append(predecessor)
+    return result
+
+
+def block_live_in(graph: ControlFlowGraph, index: int, live: List[Set[int]], uses: Callable[[object], Iterable],
+                  defines: Callable[[object], Iterable[int]]) -> Set[int]:
+    """
+    Живые на входе в блок переменные - обратный проход по блоку от живых на выходе
+    :param graph: граф потока управления
+    :param index: номер блока
+    :param live: результат live_out
+    :param uses: элемент -> читаемые временные переменные
+    :param defines: элемент -> номера переменных, которые он может изменить
+    :return:
+    """
+    result = set(live[index])
+    for item in reversed(graph.blocks[index].items):
+        result.difference_update(defines(item))
+        result.update(temp.id for temp in uses(item))
+    return result
+
+
+def available_at_entry(graph: ControlFlowGraph, index: int, outputs: List[Optional[Dict]]) -> Dict:
+    """
+    Факты, доступные на входе в блок: пересечение выходов посчитанных предшественников
+    (факт - пара ключ -> временная переменная, переменные сравниваются по номеру)
+    :param graph: граф потока управления
+    :param index: номер блока
+    :param outputs: факты на выходе из блоков (None - блок еще не посчитан)
+    :return:
+    """
+    if index == 0:
+        return dict()
+    result = None
+    for predecessor in graph.blocks[index].predecessors:
+        output = outputs[predecessor]
+        if output is None:
+            continue
+        if result is None:
+            result = dict(output)
+        else:
+            result = {key: temp for key, temp in result.items() if key in output and output[key].id == temp.id}
+    return result if result is not None else dict()
+
+
+def solve_available(graph: ControlFlowGraph, transfer: Callable[[int, Dict], Dict]) -> List[Optional[Dict]]:
+    """
+    Прямой анализ доступности (пересечение по предшественникам) - итерации
+    по обратному постпорядку до неподвижной точки
+    :param graph: граф потока управления
+    :param transfer: (номер блока, факты на входе) -> факты на выходе
+    :return: факты на выходе из блоков (у недостижимых - None)
+    """
+    outputs: List[Optional[Dict]] = [None] * len(graph.blocks)
+    changed = True
+    while changed:
+        changed = False
+        for index in graph.reverse_postorder():
+            output = transfer(index, available_at_entry(graph, index, outputs))
+            if output != outputs[index]:
+                outputs[index] = output
+                changed = True
+    return outputs
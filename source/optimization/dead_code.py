@@ -0,0 +1,89 @@
+from flow_graph.control_flow_graph import ControlFlowGraph
+from ir_tree.expressions.all import *
+from ir_tree.statements.all import *
+from ir_tree.translate.i_subtree_wrapper import LinearTree
+from optimization.constant_folding import may_fault
+from optimization.copy_propagation import is_pinned, statement_calls, statement_defines, statement_uses
+from optimization.dataflow import live_out
+
+
+class DeadCodeElimination:
+    """
+    Удаление мертвого кода в линеаризованном каноническом IR
+
+    Блоки, до которых нельзя дойти от входа по графу потока управления, удаляются целиком
+    (в отличие от remove_dead_branches находятся и недостижимые циклы, и ветви, на которые
+    переходят только из недостижимых блоков). Затем по живости удаляются операторы без
+    побочных эффектов: Move(Temp t, e) без вызова, если t дальше не читается, и Exp без вызова
+    (Muncher превращает его в чтение в новую переменную). Удаление повторяется, пока живость
+    меняется. Move в закрепленные переменные (is_pinned), записи в память и операторы, которые
+    могут прервать программу (may_fault - остаток от деления на переменную), не удаляются
+    """
+
+    def __init__(self, tree: LinearTree):
+        """
+        Конструктор
+        :param tree: линеаризованный метод (меняется на месте)
+        """
+        self.tree = tree
+        self.graph = ControlFlowGraph.from_linear_tree(tree)
+
+    def eliminate(self) -> int:
+        """
+        Удаляет недостижимые блоки и мертвые операторы
+        :return: количество удаленных операторов
+        """
+        removed = self.remove_unreachable_blocks()
+        while True:
+            removed_now = self.remove_dead_statements()
+            if not removed_now:
+                break
+            removed += removed_now
+        self.tree[:] = self.graph.statements()
+        return removed
+
+    def remove_unreachable_blocks(self) -> int:
+        removed = 0
+        for block in self.graph.blocks:
+            if block.items and not self.graph.is_reachable(block.index):
+                removed += len(block.items)
+                block.items[:] = []
+        return removed
+
+    @staticmethod
+    def is_dead(statement, live) -> bool:
+        """
+        Можно ли удалить оператор
+        :param statement: оператор
+        :param live: номера живых после оператора переменных
+        :return:
+        """
+        if statement_calls(statement):
+            return False
+        if isinstance(statement, Exp):
+            return not may_fault(statement.expression)
+        if isinstance(statement, Move) and isinstance(statement.destination, Temp):
+            return statement.destination.id not in live and not is_pinned(statement.destination) and \
+                not may_fault(statement.source)
+        return False
+
+    def remove_dead_statements(self) -> int:
+        """
+        Один обратный проход по блокам с живостью на выходе из блоков
+        :return: количество удаленных операторов
+        """
+        live_after = live_out(self.graph, statement_uses, statement_defines)
+        removed = 0
+        for block in self.graph.blocks:
+            live = set(live_after[block.index])
+            kept = []
+            for statement in reversed(block.items):
+                if self.is_dead(statement, live):
+                    removed += 1
+                    continue
+                live.difference_update(statement_defines(statement))
+                live.update(temp.id for temp in statement_uses(statement))
+                kept.append(statement)
+            kept.reverse()
+            block.items[:] = kept
+        return removed
@@ -0,0 +1,184 @@
+from enum import Enum
+from typing import Dict, Optional, Set
+
+from framework.compilation_context import CompilationContext
+from ir_tree.expressions.all import *
+from ir_tree.expressions.i_exp import IExp
+from ir_tree.ir_visitor import IRVisitor
+from ir_tree.label import Label
+from ir_tree.list import ExpList, StmList
+from ir_tree.name_conventions import FP_NAME
+from ir_tree.statements.all import *
+from ir_tree.translate.exp_wrapper import ExpWrapper
+from ir_tree.translate.i_subtree_wrapper import ISubtreeWrapper
+from ir_tree.translate.stm_wrapper import StmWrapper
+
+LOCAL_NAME = 'local'
+
+
+def frame_offset(exp: IExp) -> Optional[int]:
+    """
+    Смещение ячейки фрейма, если адрес - fp или fp + константа
+    :param exp: адрес
+    :return: None, если адрес другой
+    """
+    if isinstance(exp, Temp):
+        return 0 if exp.name == FP_NAME else None
+    if isinstance(exp, Binop) and exp.operation == BinopEnum.PLUS:
+        left, right = exp.left_expression, exp.right_expression
+        if isinstance(left, Const):
+            left, right = right, left
+        if isinstance(left, Temp) and left.name == FP_NAME and isinstance(right, Const):
+            return right.value
+    return None
+
+
+def frame_slots(root) -> Optional[Set[int]]:
+    """
+    Смещения ячеек фрейма, которые читает и пишет IR дерево метода
+    (обход явным стеком, как в count_ir_nodes)
+    :param root: IR дерево метода
+    :return: None, если fp встречается не только в адресе под Mem - адрес ячейки может уйти из метода
+    """
+    offsets = set()
+    seen = set()
+    stack = [root]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, (list, tuple)):
+            stack.extend(node)
+            continue
+        if not type(node).__module__.startswith('ir_tree') or isinstance(node, (Enum, Label)) or id(node) in seen:
+            continue
+        seen.add(id(node))
+        if isinstance(node, Mem) and frame_offset(node.expression) is not None:
+            offsets.add(frame_offset(node.expression))
+        elif isinstance(node, Temp) and node.name == FP_NAME:
+            return None
+        else:
+            stack.extend(vars(node).values())
+    return offsets
+
+
+class FramePromotion(IRVisitor):
+    """
+    Перенос ячеек фрейма во временные переменные в IR дереве метода (до канонизации)
+
+    IRBuilder читает и пишет локальные переменные (и формальные параметры, не попавшие
+    в регистры) как Mem(fp + k). Указателей в языке нет, поэтому ячейку, адрес которой
+    встречается только под Mem, не видят ни вызванные методы, ни записи в кучу: каждая
+    такая ячейка заменяется своей временной переменной, а в начало метода ставится чтение
+    ячейки в эту переменную (значение параметра или неинициализированной переменной;
+    ненужные чтения удаляет dead-code). Если fp встречается в другом виде, метод не меняется
+
+    После переноса счетчики циклов и индексы - временные переменные, с которыми
+    работают copies, licm, induction и bounds
+    """
+
+    def __init__(self, context: CompilationContext):
+        """
+        Конструктор
+        :param context: контекст метода (новые временные переменные)
+        """
+        IRVisitor.__init__(self)
+        self.context = context
+        self.locals: Dict[int, Temp] = dict()
+
+    def promote(self, wrapper: ISubtreeWrapper) -> ISubtreeWrapper:
+        """
+        Переносит ячейки фрейма метода во временные переменные
+        :param wrapper: IR дерево метода
+        :return: новое дерево метода (то же, если переносить нечего)
+        """
+        offsets = frame_slots(wrapper)
+        if not offsets:
+            return wrapper
+        self.locals = {offset: self.context.new_temp(LOCAL_NAME) for offset in sorted(offsets)}
+        body = StmList(Move(Temp(None, None, temp), Mem(Binop(BinopEnum.PLUS, self.context.new_temp(FP_NAME),
+                                                                Const(offset))))
+                       for offset, temp in self.locals.items())
+        body.append(self.visit(wrapper))
+        return StmWrapper(body)
+
+    visit_methods = {
+        UnaryOp: 'visit_unary_op',
+        Binop: 'visit_binop',
+        Call: 'visit_call',
+        Const: 'visit_leaf',
+        Eseq: 'visit_eseq',
+        Mem: 'visit_mem',
+        Name: 'visit_leaf',
+        Temp: 'visit_leaf',
+        ExpList: 'visit_exp_list',
+        Exp: 'visit_exp',
+        Jump: 'visit_leaf',
+        JumpC: 'visit_jumpc',
+        LabelStm: 'visit_leaf',
+        Move: 'visit_move',
+        Seq: 'visit_seq',
+        StmWrapper: 'visit_stm_wrapper',
+        ExpWrapper: 'visit_stm_wrapper',
+    }
+
+    def visit_leaf(self, obj):
+        return obj
+
+    def visit_unary_op(self, obj: UnaryOp):
+        obj.expression = yield obj.expression
+        return obj
+
+    def visit_binop(self, obj: Binop):
+        obj.left_expression = yield obj.left_expression
+        obj.right_expression = yield obj.right_expression
+        return obj
+
+    def visit_call(self, obj: Call):
+        obj.args = yield obj.args
+        obj.func_expr = yield obj.func_expr
+        return obj
+
+    def visit_eseq(self, obj: Eseq):
+        obj.statement = yield obj.statement
+        obj.expression = yield obj.expression
+        return obj
+
+    def visit_mem(self, obj: Mem):
+        offset = frame_offset(obj.expression)
+        if offset is not None:
+            return Temp(None, None, self.locals[offset], obj.position)
+        address = obj.expression
+        obj.expression = yield address
+        if address is not obj.expression:
+            # Mem(Temp) в источнике Move Muncher читает как пересылку, а здесь нужно чтение по адресу #
+            obj.expression = Binop(BinopEnum.PLUS, obj.expression, Const(0, obj.position), obj.position)
+        return obj
+
+    def visit_exp_list(self, obj: ExpList):
+        expressions = []
+        for expression in obj.expressions:
+            expressions.append((yield expression))
+        obj.expressions = tuple(expressions)
+        return obj
+
+    def visit_exp(self, obj: Exp):
+        obj.expression = yield obj.expression
+        return obj
+
+    def visit_jumpc(self, obj: JumpC):
+        obj.condition_left_expression = yield obj.condition_left_expression
+        obj.condition_right_expression = yield obj.condition_right_expression
+        return obj
+
+    def visit_move(self, obj: Move):
+        obj.source = yield obj.source
+        obj.destination = yield obj.destination
+        return obj
+
+    def visit_seq(self, obj: Seq):
+        statements, obj.statements = obj.statements, []
+        for statement in statements:
+            obj.append((yield statement))
+        return obj
+
+    def visit_stm_wrapper(self, obj: ISubtreeWrapper):
+        return (yield obj.to_stm())
@@ -0,0 +1,354 @@
+from collections import Counter
+from typing import Dict, Optional, Tuple
+
+from flow_graph.control_flow_graph import ControlFlowGraph, Loop
+from framework.compilation_context import CompilationContext
+from ir_tree.expressions.all import *
+from ir_tree.expressions.i_exp import IExp
+from ir_tree.statements.all import *
+from ir_tree.structural_hash import StructuralHash
+from ir_tree.translate.i_subtree_wrapper import LinearTree
+from optimization.common_subexpressions import ADDRESS, OPERAND, SKIP, SOURCE, SOURCE_ADDRESS
+from optimization.constant_folding import WORD_BITS, constant_value, wrap_word
+from optimization.copy_propagation import is_pinned, statement_calls, statement_defines, statement_uses
+from optimization.dataflow import block_live_in, live_out
+from optimization.loop_invariants import insert_preheader, loop_header_label
+
+# Линейная форма выражения: (базовая индукционная переменная i, множитель, инвариантное слагаемое) - #
+# значение равно множитель * i + слагаемое; для инвариантного выражения i = None, а слагаемое - оно само #
+Affine = Tuple[Optional[Temp], int, Optional[IExp]]
+
+
+def add_offsets(first: Optional[IExp], second: Optional[IExp]) -> Optional[IExp]:
+    if first is None or second is None:
+        return second if first is None else first
+    return Binop(BinopEnum.PLUS, first, second)
+
+
+def copy_expression(exp: IExp) -> IExp:
+    """
+    Копия инвариантного слагаемого (в нем только Binop, Const и Temp)
+    :param exp: выражение
+    :return:
+    """
+    if isinstance(exp, Binop):
+        return Binop(exp.operation, copy_expression(exp.left_expression), copy_expression(exp.right_expression))
+    if isinstance(exp, Temp):
+        return Temp(None, None, exp)
+    return Const(exp.value)
+
+
+class InductionVariableReduction:
+    """
+    Понижение стоимости индукционных переменных в линеаризованном каноническом IR
+
+    Базовая индукционная переменная цикла - незакрепленная i, которую цикл пишет только
+    оператором i = i +- c. Поддерево, линейное по i (k * i + b, где b собрано из констант
+    и не меняющихся в цикле переменных), в котором есть умножение или хотя бы две операции,
+    заменяется указателем p: p = k * i + b вычисляется в предзаголовке, а сразу после
+    увеличения i добавляется p = p + k * c. Одинаковые формы делят один указатель
+
+    Если после замены i читает только условие выхода i < N (или i >= N) с константой N,
+    i начинается с константы, проходит N точно и увеличение и проверка выполняются
+    ровно раз за проход, условие переписывается как p != k * N + b (p == k * N + b),
+    а увеличение i удаляется. Сравнение на неравенство не зависит от переполнения:
+    p различает все значения i до N, пока |k| * (N - i0) меньше 2 ** 32
+    """
+
+    def __init__(self, tree: LinearTree, context: CompilationContext):
+        """
+        Конструктор
+        :param tree: линеаризованный метод (меняется на месте)
+        :param context: контекст метода (указатели и метки предзаголовков)
+        """
+        self.tree = tree
+        self.context = context
+        self.hash = StructuralHash()
+        self.rewritten_tests = 0
+
+    def reduce(self) -> int:
+        """
+        Заменяет вычисления, линейные по индукционным переменным, во всех циклах
+        :return: количество замененных поддеревьев
+        """
+        reduced = 0
+        while True:
+            graph = ControlFlowGraph.from_linear_tree(self.tree)
+            live = live_out(graph, statement_uses, statement_defines)
+            for loop in reversed(graph.loops()):
+                reduced_now = self.reduce_loop(graph, loop, live)
+                if reduced_now:
+                    reduced += reduced_now
+                    break
+            else:
+                return reduced
+
+    @staticmethod
+    def increment_step(statement) -> Optional[int]:
+        """
+        Шаг, если оператор - i = i + c, i = c + i или i = i - c
+        :param statement: оператор
+        :return: None, если оператор другой
+        """
+        if not isinstance(statement, Move) or not isinstance(statement.destination, Temp) or \
+                not isinstance(statement.source, Binop):
+            return None
+        temp, source = statement.destination, statement.source
+        left, right = source.left_expression, source.right_expression
+        if source.operation == BinopEnum.PLUS and isinstance(right, Temp) and right.id == temp.id:
+            left, right = right, left
+        if not isinstance(left, Temp) or left.id != temp.id or constant_value(right) is None:
+            return None
+        if source.operation == BinopEnum.PLUS:
+            return wrap_word(constant_value(right))
+        if source.operation == BinopEnum.MINUS:
+            return wrap_word(-constant_value(right))
+        return None
+
+    def reduce_loop(self, graph: ControlFlowGraph, loop: Loop, live) -> int:
+        """
+        Понижает стоимость индукционных переменных одного цикла и строит предзаголовок
+        :param graph: граф потока управления
+        :param loop: цикл
+        :param live: живые на выходе из блоков переменные
+        :return: количество замененных поддеревьев
+        """
+        if loop_header_label(graph, loop) is None:
+            return 0
+        items = [(index, statement) for index in sorted(loop.blocks) for statement in graph.blocks[index].items]
+        defined = Counter(temp_id for _, statement in items for temp_id in statement_defines(statement))
+        calls = any(statement_calls(statement) for _, statement in items)
+        increments: Dict[int, Tuple[int, object, int]] = dict()
+        for index, statement in items:
+            step = self.increment_step(statement)
+            if step and defined[statement.destination.id] == 1 and not is_pinned(statement.destination):
+                increments[statement.destination.id] = (index, statement, step)
+        if not increments:
+            return 0
+
+        def invariant(temp: Temp) -> bool:
+            return not defined[temp.id] and not (calls and is_pinned(temp))
+
+        # (номер i, множитель, номер слагаемого) -> (указатель, i, множитель, слагаемое) #
+        pointers: Dict[tuple, Tuple[Temp, Temp, int, Optional[IExp]]] = dict()
+        increment_ids = {id(statement) for _, statement, _ in increments.values()}
+        reduced = 0
+        for _, statement in items:
+            if id(statement) not in increment_ids and not statement_calls(statement):
+                reduced += self.rewrite(statement, increments, invariant, pointers)
+        if not reduced:
+            return 0
+
+        preheader = []
+        for pointer, temp, scale, offset in pointers.values():
+            index, increment, step = increments[temp.id]
+            block = graph.blocks[index].items
+            block.insert(next(position for position, item in enumerate(block) if item is increment) + 1,
+                         Move(Temp(None, None, pointer),
+                              Binop(BinopEnum.PLUS, Temp(None, None, pointer), Const(wrap_word(scale * step)))))
+            start = Binop(BinopEnum.MUL, Temp(None, None, temp), Const(scale)) if scale != 1 else Temp(None, None, temp)
+            preheader.append(Move(pointer, add_offsets(start, offset)))
+        for temp_id, (index, increment, step) in increments.items():
+            pointer = next((value for value in pointers.values() if value[1].id == temp_id), None)
+            if pointer is not None:
+                preheader += self.rewrite_test(graph, loop, live, increment, step, pointer)
+        self.tree[:] = insert_preheader(graph, loop, preheader, self.context.labels.next_label())
+        return reduced
+
+    def affine_forms(self, exp: IExp, increments, invariant) -> Dict[int, Optional[Tuple[Affine, int, bool]]]:
+        """
+        Линейные формы всех поддеревьев выражения (обход явным стеком, как в StructuralHash)
+        :param exp: выражение
+        :param increments: номера базовых индукционных переменных
+        :param invariant: Temp -> не меняется ли переменная в цикле
+        :return: id узла -> (форма, количество операций, есть ли умножение) или None
+        """
+        forms = dict()
+        stack = [(exp, False)]
+        while stack:
+            node, ready = stack.pop()
+            children = [node.left_expression, node.right_expression] if isinstance(node, Binop) else \
+                [node.expression] if isinstance(node, (Mem, UnaryOp)) else []
+            if not ready and children:
+                stack.append((node, True))
+                stack.extend((child, False) for child in children)
+                continue
+            if isinstance(node, Temp):
+                form = (node, 1, None) if node.id in increments else (None, 0, node) if invariant(node) else None
+                forms[id(node)] = (form, 0, False) if form is not None else None
+            elif isinstance(node, Const):
+                forms[id(node)] = ((None, 0, node), 0, False) if constant_value(node) is not None else None
+            elif isinstance(node, Binop) and all(forms[id(child)] is not None for child in children):
+                (left, left_operations, left_multiply), (right, right_operations, right_multiply) = \
+                    forms[id(children[0])], forms[id(children[1])]
+                form = self.combine(node, left, right)
+                forms[id(node)] = (form, left_operations + right_operations + 1,
+                                   left_multiply or right_multiply or node.operation == BinopEnum.MUL) \
+                    if form is not None else None
+            else:
+                forms[id(node)] = None
+        return forms
+
+    @staticmethod
+    def combine(node: Binop, left: Affine, right: Affine) -> Optional[Affine]:
+        """
+        Линейная форма операции по формам операндов
+        :param node: операция
+        :param left: форма левого операнда
+        :param right: форма правого операнда
+        :return: None, если результат не линеен по одной индукционной переменной
+        """
+        left_temp, left_scale, left_offset = left
+        right_temp, right_scale, right_offset = right
+        if left_temp is None and right_temp is None:
+            return None, 0, node
+        if left_temp is not None and right_temp is not None:
+            return None
+        if node.operation == BinopEnum.PLUS:
+            if left_temp is None:
+                return right_temp, right_scale, add_offsets(left_offset, right_offset)
+            return left_temp, left_scale, add_offsets(left_offset, right_offset)
+        if node.operation == BinopEnum.MINUS:
+            if left_temp is None:
+                offset = Binop(BinopEnum.MINUS, left_offset, right_offset) if right_offset is not None else left_offset
+                return right_temp, wrap_word(-right_scale), offset
+            return left_temp, left_scale, Binop(BinopEnum.MINUS, left_offset if left_offset is not None else Const(0),
+                                                right_offset)
+        if node.operation == BinopEnum.MUL:
+            temp, scale, offset, factor = (left_temp, left_scale, left_offset, right_offset) if right_temp is None \
+                else (right_temp, right_scale, right_offset, left_offset)
+            value = constant_value(factor)
+            if value is None:
+                return None
+            return temp, wrap_word(scale * value), \
+                Binop(BinopEnum.MUL, offset, Const(value)) if offset is not None else None
+        return None
+
+    def rewrite(self, statement, increments, invariant, pointers) -> int:
+        """
+        Заменяет в операторе наибольшие линейные поддеревья указателями
+        :param statement: оператор
+        :param increments: базовые индукционные переменные
+        :param invariant: Temp -> не меняется ли переменная в цикле
+        :param pointers: уже созданные указатели (дополняются)
+        :return: количество замен
+        """
+        if isinstance(statement, Move):
+            roots = [('source', statement, SOURCE)]
+            if isinstance(statement.destination, Mem):
+                roots.append(('expression', statement.destination, ADDRESS))
+        elif isinstance(statement, Exp):
+            roots = [('expression', statement, OPERAND)]
+        elif isinstance(statement, JumpC):
+            roots = [('condition_left_expression', statement, OPERAND),
+                     ('condition_right_expression', statement, OPERAND)]
+        else:
+            return 0
+        replaced = 0
+        for field, owner, place in roots:
+            forms = self.affine_forms(getattr(owner, field), increments, invariant)
+            stack = [(owner, field, place)]
+            while stack:
+                owner, field, place = stack.pop()
+                node = getattr(owner, field)
+                replacement = self.replacement(node, place, forms, pointers)
+                if replacement is not None:
+                    setattr(owner, field, replacement)
+                    replaced += 1
+                elif isinstance(node, Binop):
+                    stack += [(node, 'left_expression', OPERAND), (node, 'right_expression', OPERAND)]
+                elif isinstance(node, UnaryOp):
+                    stack.append((node, 'expression', OPERAND))
+                elif isinstance(node, Mem):
+                    stack.append((node, 'expression', SOURCE_ADDRESS if place == SOURCE else ADDRESS))
+        return replaced
+
+    def replacement(self, node: IExp, place: str, forms, pointers) -> Optional[IExp]:
+        """
+        Указатель вместо поддерева (SOURCE_ADDRESS - p + 0: Mem(Temp) в источнике Move - пересылка)
+        :param node: поддерево
+        :param place: место поддерева в операторе
+        :param forms: линейные формы поддеревьев оператора
+        :param pointers: созданные указатели (дополняются)
+        :return: None, если заменять не нужно
+        """
+        found = forms.get(id(node))
+        if place == SKIP or not isinstance(node, Binop) or found is None:
+            return None
+        (temp, scale, offset), operations, multiply = found
+        if temp is None or not scale or not multiply and operations < 2:
+            return None
+        offset_number = self.hash.number_tree(offset)[id(offset)] if offset is not None else None
+        key = (temp.id, scale, offset_number)
+        if key not in pointers:
+            pointers[key] = (self.context.new_temp('pointer'), temp, scale, offset)
+        pointer = Temp(None, None, pointers[key][0])
+        return Binop(BinopEnum.PLUS, pointer, Const(0)) if place == SOURCE_ADDRESS else pointer
+
+    def rewrite_test(self, graph: ControlFlowGraph, loop: Loop, live, increment, step: int, pointer) -> list:
+        """
+        Переписывает условие выхода из цикла через указатель, если i больше ни для чего не нужна
+        :param graph: граф потока управления
+        :param loop: цикл
+        :param live: живые на выходе из блоков переменные (до замен)
+        :param increment: оператор i = i + c
+        :param step: шаг c
+        :param pointer: (p, i, множитель, слагаемое)
+        :return: операторы предзаголовка для границы (пусто, если условие не переписано)
+        """
+        pointer_temp, temp, scale, offset = pointer
+        users = [(index, statement) for index in loop.blocks for statement in graph.blocks[index].items
+                 if statement is not increment and any(used.id == temp.id for used in statement_uses(statement))]
+        if step <= 0 or len(users) != 1 or not isinstance(users[0][1], JumpC):
+            return []
+        test_block, test = users[0]
+        left, right = test.condition_left_expression, test.condition_right_expression
+        bound = constant_value(right)
+        if not isinstance(left, Temp) or left.id != temp.id or bound is None or \
+                test.jump_type_enum not in (JumpTypeEnum.LT, JumpTypeEnum.GE):
+            return []
+        start = self.start_value(graph, loop, temp)
+        if start is None or start >= bound or (bound - start) % step or abs(scale) * (bound - start) >> WORD_BITS:
+            return []
+        increment_block = next(index for index in loop.blocks
+                               if any(item is increment for item in graph.blocks[index].items))
+        for block in (test_block, increment_block):
+            if graph.innermost_loop(block) is not loop or \
+                    not all(graph.dominates(block, latch) for latch in loop.latches):
+                return []
+        if any(temp.id in block_live_in(graph, exit_block, live, statement_uses, statement_defines)
+               for exit_block in loop.exits(graph)):
+            return []
+
+        limit_value = Const(wrap_word(scale * bound))
+        preheader = []
+        if offset is None:
+            limit = limit_value
+        else:
+            limit = self.context.new_temp('limit')
+            preheader.append(Move(limit, Binop(BinopEnum.PLUS, copy_expression(offset), limit_value)))
+            limit = Temp(None, None, limit)
+        test.jump_type_enum = JumpTypeEnum.NEQ if test.jump_type_enum == JumpTypeEnum.LT else JumpTypeEnum.EQ
+        test.condition_left_expression = Temp(None, None, pointer_temp)
+        test.condition_right_expression = limit
+        graph.blocks[increment_block].items[:] = [item for item in graph.blocks[increment_block].items
+                                                  if item is not increment]
+        self.rewritten_tests += 1
+        return preheader
+
+    @staticmethod
+    def start_value(graph: ControlFlowGraph, loop: Loop, temp: Temp) -> Optional[int]:
+        """
+        Значение i при входе в цикл: единственная запись i вне цикла - константа,
+        и ее блок доминирует над заголовком
+        :param graph: граф потока управления
+        :param loop: цикл
+        :param temp: индукционная переменная
+        :return: None, если значение неизвестно
+        """
+        definitions = [(block.index, statement) for block in graph.blocks if block.index not in loop.blocks
+                       for statement in block.items if temp.id in statement_defines(statement)]
+        if len(definitions) != 1 or not graph.dominates(definitions[0][0], loop.header):
+            return None
+        statement = definitions[0][1]
+        return constant_value(statement.source) if isinstance(statement.destination, Temp) else None
@@ -0,0 +1,204 @@
+from collections import Counter
+from typing import List, Optional, Set
+
+from flow_graph.control_flow_graph import ControlFlowGraph, Loop
+from framework.compilation_context import CompilationContext
+from ir_tree.expressions.all import *
+from ir_tree.expressions.i_exp import IExp
+from ir_tree.label import Label
+from ir_tree.name_conventions import FP_NAME
+from ir_tree.statements.all import *
+from ir_tree.translate.i_subtree_wrapper import LinearTree
+from optimization.constant_folding import may_fault
+from optimization.copy_propagation import expression_temps, is_pinned, statement_calls, statement_defines, \
+    statement_uses
+from optimization.dataflow import block_live_in, live_out
+
+
+def is_frame_address(exp: IExp) -> bool:
+    """
+    Адрес ячейки фрейма: fp или fp + константа
+    В ячейки фрейма пишут только по таким адресам (указателей на фрейм в языке нет),
+    а вызванный метод работает со своим фреймом
+    :param exp: адрес
+    :return:
+    """
+    if isinstance(exp, Temp):
+        return exp.name == FP_NAME
+    if isinstance(exp, Binop) and exp.operation == BinopEnum.PLUS:
+        left, right = exp.left_expression, exp.right_expression
+        if isinstance(left, Const):
+            left, right = right, left
+        return isinstance(left, Temp) and left.name == FP_NAME and isinstance(right, Const)
+    return False
+
+
+def expression_loads(exp: IExp) -> List[IExp]:
+    """
+    Адреса, которые читает выражение (источник Move или операнд)
+    :param exp: выражение
+    :return:
+    """
+    addresses = []
+    stack = [exp]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, Mem):
+            addresses.append(node.expression)
+            stack.append(node.expression)
+        elif isinstance(node, Binop):
+            stack.extend((node.left_expression, node.right_expression))
+        elif isinstance(node, UnaryOp):
+            stack.append(node.expression)
+    return addresses
+
+
+def loop_header_label(graph: ControlFlowGraph, loop: Loop) -> Optional[Label]:
+    """
+    :param graph: граф потока управления
+    :param loop: цикл
+    :return: метка в начале заголовка цикла (None, если ее нет)
+    """
+    items = graph.blocks[loop.header].items
+    return items[0].label_name if items and isinstance(items[0], LabelStm) else None
+
+
+def insert_preheader(graph: ControlFlowGraph, loop: Loop, statements: list, preheader_label: Label) -> list:
+    """
+    Ставит перед заголовком цикла предзаголовок с операторами: переходы в заголовок снаружи
+    цикла перенаправляются в предзаголовок, а блок цикла, который проваливался в заголовок,
+    получает явный переход
+    :param graph: граф потока управления (переходы меняются на месте)
+    :param loop: цикл, заголовок которого начинается меткой (loop_header_label)
+    :param statements: операторы предзаголовка
+    :param preheader_label: метка предзаголовка
+    :return: операторы метода с предзаголовком
+    """
+    header_label = loop_header_label(graph, loop)
+    for predecessor in graph.blocks[loop.header].predecessors:
+        if predecessor in loop.blocks:
+            continue
+        last = graph.blocks[predecessor].items[-1] if graph.blocks[predecessor].items else None
+        if isinstance(last, Jump) and last.label_to_jump == header_label:
+            last.label_to_jump = preheader_label
+        elif isinstance(last, JumpC) and last.true_label == header_label:
+            last.true_label = preheader_label
+
+    tree = []
+    for block in graph.blocks:
+        if block.index == loop.header:
+            if loop.header - 1 in loop.blocks and not isinstance(tree[-1] if tree else None, Jump):
+                tree.append(Jump(header_label))
+            tree.append(LabelStm(preheader_label))
+            tree.extend(statements)
+        tree.extend(block.items)
+    return tree
+
+
+class LoopInvariantCodeMotion:
+    """
+    Вынос инвариантов циклов в линеаризованном каноническом IR
+
+    Move(Temp t, e) выносится в новый блок-предзаголовок перед заголовком цикла, если
+    t пишется в цикле только здесь и не читается до записи, переменные e не меняются
+    в цикле (или определены уже вынесенными операторами; закрепленные переменные
+    меняет любой вызов в цикле), а e читает память, которую
+    цикл не меняет: ячейки фрейма - если в цикле нет записей по адресам фрейма,
+    остальную память - если в цикле нет ни записей, ни вызовов
+    Оператор, который выполняется не на каждом проходе (его блок не доминирует над выходами),
+    выносится, только если его вычисление безопасно (без чтения кучи и деления) и t
+    не нужна после цикла. Циклы обрабатываются от внутренних к внешним, пока что-то выносится
+    """
+
+    def __init__(self, tree: LinearTree, context: CompilationContext):
+        """
+        Конструктор
+        :param tree: линеаризованный метод (меняется на месте)
+        :param context: контекст метода (метки предзаголовков)
+        """
+        self.tree = tree
+        self.context = context
+
+    def hoist(self) -> int:
+        """
+        Выносит инварианты из всех циклов
+        :return: количество вынесенных операторов
+        """
+        hoisted = 0
+        while True:
+            graph = ControlFlowGraph.from_linear_tree(self.tree)
+            live = live_out(graph, statement_uses, statement_defines)
+            for loop in reversed(graph.loops()):
+                statements = self.invariant_statements(graph, loop, live)
+                if statements and self.move_to_preheader(graph, loop, statements):
+                    hoisted += len(statements)
+                    break
+            else:
+                return hoisted
+
+    def invariant_statements(self, graph: ControlFlowGraph, loop: Loop, live: List[Set[int]]) -> list:
+        """
+        Операторы цикла, которые можно вынести, в порядке, в котором их можно выполнить
+        :param graph: граф потока управления
+        :param loop: цикл
+        :param live: живые на выходе из блоков переменные
+        :return:
+        """
+        blocks = [index for index in graph.reverse_postorder() if index in loop.blocks]
+        items = [(index, statement) for index in blocks for statement in graph.blocks[index].items]
+        defined = Counter(temp_id for _, statement in items for temp_id in statement_defines(statement))
+        stores = [statement.destination.expression for _, statement in items
+                  if isinstance(statement, Move) and isinstance(statement.destination, Mem)]
+        frame_written = any(is_frame_address(address) for address in stores)
+        calls = any(statement_calls(statement) for _, statement in items)
+        heap_written = bool(stores) or calls
+        exits = loop.exits(graph)
+        dominating = {index for index in blocks if all(graph.dominates(index, exit_block) for exit_block in exits)}
+        header_live = block_live_in(graph, loop.header, live, statement_uses, statement_defines)
+        exit_live = set().union(*(block_live_in(graph, exit_block, live, statement_uses, statement_defines)
+                                  for exit_block in exits))
+
+        result, invariant = [], set()
+        changed = True
+        while changed:
+            changed = False
+            for index, statement in items:
+                if not isinstance(statement, Move) or not isinstance(statement.destination, Temp) or \
+                        statement.destination.id in invariant:
+                    continue
+                destination, source = statement.destination, statement.source
+                if not isinstance(source, (Binop, Mem, UnaryOp)) or statement_calls(statement) or \
+                        isinstance(source, Mem) and isinstance(source.expression, Temp):
+                    continue
+                if is_pinned(destination) or defined[destination.id] != 1 or destination.id in header_live:
+                    continue
+                # закрепленные переменные меняются при вызовах (is_pinned) #
+                if any(defined[temp.id] and temp.id not in invariant or calls and is_pinned(temp)
+                       for temp in expression_temps(source)):
+                    continue
+                loads = expression_loads(source)
+                heap_loads = [address for address in loads if not is_frame_address(address)]
+                if frame_written and len(heap_loads) < len(loads) or heap_written and heap_loads:
+                    continue
+                if index not in dominating and (heap_loads or may_fault(source) or destination.id in exit_live):
+                    continue
+                result.append(statement)
+                invariant.add(destination.id)
+                changed = True
+        return result
+
+    def move_to_preheader(self, graph: ControlFlowGraph, loop: Loop, statements: list) -> bool:
+        """
+        Переносит операторы из цикла в новый предзаголовок
+        :param graph: граф потока управления
+        :param loop: цикл
+        :param statements: вынесенные операторы
+        :return: False, если у заголовка нет метки
+        """
+        if loop_header_label(graph, loop) is None:
+            return False
+        hoisted = {id(statement) for statement in statements}
+        for index in loop.blocks:
+            graph.blocks[index].items[:] = [item for item in graph.blocks[index].items if id(item) not in hoisted]
+        self.tree[:] = insert_preheader(graph, loop, statements, self.context.labels.next_label())
+        return True
@@ -0,0 +1,377 @@
+import json
+import time
+from enum import Enum
+from typing import Dict, List, Optional
+
+from code_generation.instruction import InstructionList
+from framework.compilation_context import CompilationContext
+from ir_tree.label import Label
+from ir_tree.translate.eseq_canonizer import EseqCanonizer
+from ir_tree.translate.i_subtree_wrapper import ISubtreeWrapper, LinearTree
+from ir_tree.translate.linearizer import Linearizer
+from ir_tree.translate.no_jump_block import NoJumpTree
+from optimization.bounds_checks import BoundsCheckElimination
+from optimization.common_subexpressions import CommonSubexpressionElimination
+from optimization.constant_folding import ConstantFolder, remove_dead_branches, thread_jumps
+from optimization.copy_propagation import IRCopyPropagation, MachineCopyPropagation
+from optimization.dead_code import DeadCodeElimination
+from optimization.frame_promotion import FramePromotion
+from optimization.induction_variables import InductionVariableReduction
+from optimization.loop_invariants import LoopInvariantCodeMotion
+from reg_lifecycle.lifecycle_graph import LifecycleGraph
+from reg_lifecycle.variable_graph import VariableGraph
+from x86.strength_reduction import X86_COST_MODEL
+from x86.x86_code_generation import Muncher
+
+
+def count_ir_nodes(roots):
+    """
+    Считает узлы IR деревьев (вместе с обертками StmWrapper/ExpWrapper),
+    узел, на который есть несколько ссылок, считается один раз
+    :param roots: корни деревьев или списки операторов
+    :return:
+    """
+    seen = set()
+    stack = list(roots)
+    while stack:
+        node = stack.pop()
+        if isinstance(node, (list, tuple)):
+            stack.extend(node)
+        elif type(node).__module__.startswith('ir_tree') and not isinstance(node, (Enum, Label)) \
+                and id(node) not in seen:
+            seen.add(id(node))
+            stack.extend(vars(node).values())
+    return len(seen)
+
+
+class MethodUnit:
+    """
+    Метод на пути через бэкенд: проходы заменяют его текущее представление -
+    IR дерево (tree), затем линеаризованный метод (linear), затем инструкции (instructions)
+    """
+
+    def __init__(self, key: str, tree: ISubtreeWrapper, context: CompilationContext):
+        """
+        Конструктор
+        :param key: имя метода (ключ в IRBuilder.trees)
+        :param tree: IR дерево метода
+        :param context: контекст метода (CompilationContext.fork)
+        """
+        self.key = key
+        self.context = context
+        self.tree = tree
+        self.linear: Optional[LinearTree] = None
+        self.instructions: Optional[InstructionList] = None
+        self.interference: Optional[Dict[int, List[int]]] = None
+
+    def size(self) -> int:
+        """
+        Размер текущего представления: инструкции или узлы IR
+        :return:
+        """
+        if self.instructions is not None:
+            return len(self.instructions.instructions)
+        if self.linear is not None:
+            return count_ir_nodes(self.linear)
+        return count_ir_nodes([self.tree])
+
+
+class IPass:
+    """
+    Проход бэкенда над одним методом
+    kind - 'ir' для проходов над IR и 'machine' для проходов над инструкциями
+    run может вернуть количество сделанных изменений (например, удаленных пересылок) -
+    оно попадает в отчет
+    """
+
+    name = ''
+    kind = 'ir'
+
+    def run(self, unit: MethodUnit) -> Optional[int]:
+        raise NotImplementedError()
+
+
+class FoldPass(IPass):
+    name = 'fold'
+
+    def run(self, unit: MethodUnit):
+        unit.tree = ConstantFolder().fold(unit.tree)
+
+
+class PromotePass(IPass):
+    name = 'promote'
+
+    def run(self, unit: MethodUnit):
+        promotion = FramePromotion(unit.context)
+        unit.tree = promotion.promote(unit.tree)
+        return len(promotion.locals)
+
+
+class DeadBranchesPass(IPass):
+    name = 'dead-branches'
+
+    def run(self, unit: MethodUnit):
+        threaded = thread_jumps(unit.linear, unit.context)
+        remove_dead_branches(unit.linear)
+        return threaded
+
+
+class CanonizePass(IPass):
+    name = 'canonize'
+
+    def run(self, unit: MethodUnit):
+        unit.tree = EseqCanonizer(unit.context).canonize(unit.tree)
+
+
+class LinearizePass(IPass):
+    name = 'linearize'
+
+    def run(self, unit: MethodUnit):
+        unit.linear = Linearizer().linearize(unit.tree, [])
+        unit.tree = None
+
+
+class ReblockPass(IPass):
+    """
+    Разбиение на блоки (NoJumpTree) с раскладкой в исходном порядке или трассами
+    """
+
+    def __init__(self, traces: bool):
+        self.traces = traces
+        self.name = 'traces' if traces else 'reblock'
+
+    def run(self, unit: MethodUnit):
+        unit.linear = NoJumpTree(unit.linear, unit.context).build_tree(self.traces)
+
+
+class CopiesPass(IPass):
+    name = 'copies'
+
+    def run(self, unit: MethodUnit):
+        return IRCopyPropagation(unit.linear).propagate()
+
+
+class LicmPass(IPass):
+    name = 'licm'
+
+    def run(self, unit: MethodUnit):
+        return LoopInvariantCodeMotion(unit.linear, unit.context).hoist()
+
+
+class InductionPass(IPass):
+    name = 'induction'
+
+    def run(self, unit: MethodUnit):
+        return InductionVariableReduction(unit.linear, unit.context).reduce()
+
+
+class CsePass(IPass):
+    name = 'cse'
+
+    def run(self, unit: MethodUnit):
+        return CommonSubexpressionElimination(unit.linear).eliminate()
+
+
+class BoundsPass(IPass):
+    name = 'bounds'
+
+    def run(self, unit: MethodUnit):
+        return BoundsCheckElimination(unit.linear, unit.context).eliminate()
+
+
+class DeadCodePass(IPass):
+    name = 'dead-code'
+
+    def run(self, unit: MethodUnit):
+        return DeadCodeElimination(unit.linear).eliminate()
+
+
+class MachineCopiesPass(IPass):
+    name = 'machine-copies'
+    kind = 'machine'
+
+    def run(self, unit: MethodUnit):
+        return MachineCopyPropagation(unit.instructions).propagate()
+
+
+class MunchPass(IPass):
+    """
+    Выбор инструкций (Muncher), с понижением стоимости операций по модели стоимости x86 или без него
+    """
+
+    kind = 'machine'
+
+    def __init__(self, strength_reduction: bool = False):
+        self.cost_model = X86_COST_MODEL if strength_reduction else None
+        self.name = 'strength-munch' if strength_reduction else 'munch'
+
+    def run(self, unit: MethodUnit):
+        unit.instructions = Muncher(unit.linear, unit.context, self.cost_model).create_instructions_list()
+        unit.linear = None
+
+
+class LivenessPass(IPass):
+    """
+    Граф живости (LifecycleGraph) и граф конфликтов временных переменных (VariableGraph)
+    """
+
+    name = 'liveness'
+    kind = 'machine'
+
+    def run(self, unit: MethodUnit):
+        lifecycle_graph = LifecycleGraph(unit.instructions)
+        lifecycle_graph.build_Lifecycle()
+        variable_graph = VariableGraph(lifecycle_graph)
+        unit.interference = {temp.id: sorted(other.reg.id for other in node._connections)
+                             for temp, node in variable_graph.nodes.items()}
+
+
+# Проходы по имени - имена используются в уровнях оптимизации и в отчете #
+PASSES = {
+    'fold': FoldPass,
+    'promote': PromotePass,
+    'canonize': CanonizePass,
+    'linearize': LinearizePass,
+    'dead-branches': DeadBranchesPass,
+    'copies': CopiesPass,
+    'licm': LicmPass,
+    'induction': InductionPass,
+    'cse': CsePass,
+    'bounds': BoundsPass,
+    'dead-code': DeadCodePass,
+    'reblock': lambda: ReblockPass(traces=False),
+    'traces': lambda: ReblockPass(traces=True),
+    'munch': MunchPass,
+    'strength-munch': lambda: MunchPass(strength_reduction=True),
+    'machine-copies': MachineCopiesPass,
+    'liveness': LivenessPass,
+}
+
+# -O0 - блоки в исходном порядке, -O1 - свертка констант, раскладка трассами и понижение #
+# стоимости умножения и деления на константу, -O2 - еще и перенос локальных переменных из фрейма во временные, #
+# оптимизации, которым нужен анализ потока данных, вынос инвариантов циклов, понижение стоимости #
+# индукционных переменных и удаление лишних проверок границ #
+OPTIMIZATION_LEVELS = {
+    0: ['canonize', 'linearize', 'reblock', 'munch'],
+    1: ['fold', 'canonize', 'linearize', 'dead-branches', 'traces', 'strength-munch'],
+    2: ['fold', 'promote', 'canonize', 'linearize', 'dead-branches', 'copies', 'licm', 'induction', 'cse', 'bounds',
+        'dead-code', 'traces', 'strength-munch', 'machine-copies'],
+}
+
+DEFAULT_LEVEL = 1
+
+
+class PassRecord:
+    """
+    Замер одного прохода над одним методом (объект передается между процессами)
+    """
+
+    def __init__(self, name: str, kind: str, elapsed: float, size_before: int = None, size_after: int = None,
+                 changes: int = None):
+        """
+        Конструктор
+        :param name: имя прохода
+        :param kind: 'ir' или 'machine'
+        :param elapsed: время прохода в секундах
+        :param size_before: размер представления до прохода (None, если не считался)
+        :param size_after: размер представления после прохода
+        :param changes: количество изменений, которое вернул проход (None, если проход его не считает)
+        """
+        self.name = name
+        self.kind = kind
+        self.elapsed = elapsed
+        self.size_before = size_before
+        self.size_after = size_after
+        self.changes = changes
+
+
+class PassManager:
+    """
+    Проводит метод через список проходов и замеряет каждый проход
+    """
+
+    def __init__(self, passes: List[str] = None, level: int = DEFAULT_LEVEL, liveness: bool = False,
+                 count_sizes: bool = False):
+        """
+        Конструктор
+        :param passes: имена проходов (по умолчанию - проходы уровня level)
+        :param level: уровень оптимизации (ключ OPTIMIZATION_LEVELS)
+        :param liveness: добавить ли в конец построение графов живости и конфликтов
+        :param count_sizes: считать ли размер представления до и после каждого прохода
+        (узлы IR или инструкции - требует обхода метода)
+        """
+        names = list(passes if passes is not None else OPTIMIZATION_LEVELS[level])
+        if liveness and 'liveness' not in names:
+            names.append('liveness')
+        unknown = [name for name in names if name not in PASSES]
+        if unknown:
+            raise ValueError(f'Неизвестные проходы: {", ".join(unknown)}')
+        self.names = names
+        self.count_sizes = count_sizes
+
+    def run(self, unit: MethodUnit) -> List[PassRecord]:
+        """
+        Применяет проходы к методу
+        :param unit: метод
+        :return: замеры проходов
+        """
+        records = []
+        size = unit.size() if self.count_sizes else None
+        for name in self.names:
+            current = PASSES[name]()
+            start = time.perf_counter()
+            changes = current.run(unit)
+            elapsed = time.perf_counter() - start
+            new_size = unit.size() if self.count_sizes else None
+            records.append(PassRecord(name, current.kind, elapsed, size, new_size, changes))
+            size = new_size
+        return records
+
+
+class PassReport:
+    """
+    Сводка замеров проходов по всем методам (и файлам): время, размеры и изменения
+    суммируются по имени прохода в порядке первого появления
+    """
+
+    def __init__(self):
+        self.rows: Dict[str, dict] = dict()
+
+    def add(self, records: List[PassRecord]):
+        for record in records:
+            row = self.rows.get(record.name)
+            if row is None:
+                row = dict(name=record.name, kind=record.kind, runs=0, elapsed=0.0, size_before=None, size_after=None,
+                           changes=None)
+                self.rows[record.name] = row
+            row['runs'] += 1
+            row['elapsed'] += record.elapsed
+            if record.size_before is not None:
+                row['size_before'] = (row['size_before'] or 0) + record.size_before
+                row['size_after'] = (row['size_after'] or 0) + record.size_after
+            if record.changes is not None:
+                row['changes'] = (row['changes'] or 0) + record.changes
+
+    def total(self) -> float:
+        return sum(row['elapsed'] for row in self.rows.values())
+
+    def format_table(self) -> str:
+        """
+        Таблица: проход, вид, число запусков, время, доля времени, размеры до и после, изменения
+        :return:
+        """
+        total = self.total()
+        lines = [f'{"pass":>14} {"kind":>8} {"runs":>8} {"time, s":>10} {"share":>7} {"size before":>12} '
+                 f'{"size after":>12} {"changes":>8}']
+        for row in self.rows.values():
+            share = row['elapsed'] / total if total else 0.0
+            before = '-' if row['size_before'] is None else row['size_before']
+            after = '-' if row['size_after'] is None else row['size_after']
+            changes = '-' if row['changes'] is None else row['changes']
+            lines.append(f'{row["name"]:>14} {row["kind"]:>8} {row["runs"]:>8} {row["elapsed"]:>10.4f} '
+                         f'{share:>7.1%} {before:>12} {after:>12} {changes:>8}')
+        lines.append(f'{"total":>14} {"":>8} {"":>8} {total:>10.4f}')
+        return '\n'.join(lines)
+
+    def to_json(self) -> str:
+        return json.dumps({'passes': list(self.rows.values()), 'total': self.total()}, indent=2)
@@ -0,0 +1,425 @@
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from flow_graph.control_flow_graph import ControlFlowGraph
+from ir_tree.array_struct import is_bounds_error
+from ir_tree.expressions.all import *
+from ir_tree.expressions.i_exp import IExp
+from ir_tree.name_conventions import FP_NAME
+from ir_tree.statements.all import *
+from optimization.constant_folding import WORD_BITS, constant_value
+from optimization.copy_propagation import is_pinned, statement_calls, statement_defines, statement_uses
+
+WORD_MIN = -(1 << (WORD_BITS - 1))
+WORD_MAX = (1 << (WORD_BITS - 1)) - 1
+
+# Диапазон значений переменной - отрезок (нижняя граница, верхняя граница) #
+Range = Tuple[int, int]
+
+# После стольких пересчетов входа в заголовок цикла растущие границы расширяются до порогов #
+WIDENING_VISITS = 3
+
+
+def length_array(exp: IExp) -> Optional[Temp]:
+    """
+    Чтение длины массива: Mem(Temp base + 0) (array_struct.bounds_checks), кроме ячеек фрейма
+    (поля объектов начинаются со смещения слова). Слово длины программа не пишет - элементы
+    начинаются с ELEMENTS_OFFSET
+    :param exp: выражение
+    :return: переменная с адресом массива или None
+    """
+    if not isinstance(exp, Mem) or not isinstance(exp.expression, Binop) or \
+            exp.expression.operation != BinopEnum.PLUS:
+        return None
+    base, offset = exp.expression.left_expression, exp.expression.right_expression
+    return base if isinstance(base, Temp) and base.name != FP_NAME and constant_value(offset) == 0 else None
+
+
+def affine_source(exp: IExp) -> Optional[Tuple[Temp, int]]:
+    """
+    Источник Move вида s, Mem(Temp s) (копия), s + c или s - c
+    :param exp: источник
+    :return: пара (s, c) или None
+    """
+    if isinstance(exp, Temp):
+        return exp, 0
+    if isinstance(exp, Mem) and isinstance(exp.expression, Temp):
+        return exp.expression, 0
+    if isinstance(exp, Binop) and exp.operation in (BinopEnum.PLUS, BinopEnum.MINUS):
+        left, right = exp.left_expression, exp.right_expression
+        if exp.operation == BinopEnum.PLUS and constant_value(left) is not None:
+            left, right = right, left
+        value = constant_value(right)
+        if isinstance(left, Temp) and value is not None:
+            return left, value if exp.operation == BinopEnum.PLUS else -value
+    return None
+
+
+def fits_word(low: int, high: int) -> bool:
+    return WORD_MIN <= low and high <= WORD_MAX
+
+
+class RangeState:
+    """
+    Факты о переменных в точке метода:
+    ranges - диапазоны значений (нет ключа - любое значение слова),
+    lengths - переменная l -> переменная b, если l = длина массива b,
+    offsets - переменная t -> (s, c), если t = s + c без переполнения,
+    below - (t, b) -> k >= 0, если t + k < длина массива b
+    """
+
+    def __init__(self):
+        self.ranges: Dict[int, Range] = dict()
+        self.lengths: Dict[int, int] = dict()
+        self.offsets: Dict[int, Tuple[int, int]] = dict()
+        self.below: Dict[Tuple[int, int], int] = dict()
+
+    def copy(self) -> 'RangeState':
+        result = RangeState()
+        result.ranges = dict(self.ranges)
+        result.lengths = dict(self.lengths)
+        result.offsets = dict(self.offsets)
+        result.below = dict(self.below)
+        return result
+
+    def __eq__(self, other):
+        return isinstance(other, RangeState) and self.ranges == other.ranges and self.lengths == other.lengths \
+            and self.offsets == other.offsets and self.below == other.below
+
+    def range_of(self, temp_id: int) -> Range:
+        return self.ranges.get(temp_id, (WORD_MIN, WORD_MAX))
+
+    def set_range(self, temp_id: int, value: Optional[Range]):
+        if value is None or value == (WORD_MIN, WORD_MAX):
+            self.ranges.pop(temp_id, None)
+        else:
+            self.ranges[temp_id] = value
+
+    def kill(self, temp_id: int):
+        """
+        Забывает факты о переменной, которая получила новое значение
+        :param temp_id: номер переменной
+        :return:
+        """
+        self.ranges.pop(temp_id, None)
+        self.lengths = {length: array for length, array in self.lengths.items() if temp_id not in (length, array)}
+        self.offsets = {temp: (base, offset) for temp, (base, offset) in self.offsets.items()
+                        if temp_id not in (temp, base)}
+        self.below = {(temp, array): slack for (temp, array), slack in self.below.items()
+                      if temp_id not in (temp, array)}
+
+    def slack(self, temp_id: int, array_id: int) -> Optional[int]:
+        """
+        :param temp_id: номер переменной
+        :param array_id: номер переменной с адресом массива
+        :return: наибольшее известное k, при котором temp + k < длина array (None - факта нет)
+        """
+        return self.below.get((temp_id, array_id))
+
+    def add_below(self, temp_id: int, array_id: int, slack: int):
+        """
+        Добавляет факт temp + slack < длина array и следствия для переменных
+        вида temp + c и для s, если temp = s + c
+        :param temp_id: номер переменной
+        :param array_id: номер переменной с адресом массива
+        :param slack: запас до длины
+        :return:
+        """
+        facts = [(temp_id, slack)]
+        facts += [(temp, slack - offset) for temp, (base, offset) in self.offsets.items() if base == temp_id]
+        if temp_id in self.offsets:
+            base, offset = self.offsets[temp_id]
+            facts.append((base, slack + offset))
+        for temp, value in facts:
+            if value >= 0 and value > self.below.get((temp, array_id), -1):
+                self.below[(temp, array_id)] = value
+
+    def join(self, other: 'RangeState') -> 'RangeState':
+        """
+        Факты, верные на обоих путях: объединение диапазонов, пересечение остального
+        :param other: состояние на другом входе
+        :return:
+        """
+        result = RangeState()
+        for temp_id, (low, high) in self.ranges.items():
+            if temp_id in other.ranges:
+                other_low, other_high = other.ranges[temp_id]
+                result.set_range(temp_id, (min(low, other_low), max(high, other_high)))
+        result.lengths = {length: array for length, array in self.lengths.items()
+                          if other.lengths.get(length) == array}
+        result.offsets = {temp: value for temp, value in self.offsets.items() if other.offsets.get(temp) == value}
+        result.below = {key: min(slack, other.below[key]) for key, slack in self.below.items() if key in other.below}
+        return result
+
+    def widen(self, previous: 'RangeState', thresholds: List[int]):
+        """
+        Расширяет границы, которые вышли за прошлые, до ближайшего порога (или до границ слова)
+        :param previous: прошлое состояние на входе в блок
+        :param thresholds: пороги по возрастанию
+        :return:
+        """
+        for temp_id, (low, high) in list(self.ranges.items()):
+            if temp_id not in previous.ranges:
+                self.ranges.pop(temp_id)
+                continue
+            previous_low, previous_high = previous.ranges[temp_id]
+            if low < previous_low:
+                low = max((value for value in thresholds if value <= low), default=WORD_MIN)
+            if high > previous_high:
+                high = min((value for value in thresholds if value >= high), default=WORD_MAX)
+            self.set_range(temp_id, (min(low, previous_low), max(high, previous_high)))
+
+
+class ValueRangeAnalysis:
+    """
+    Прямой анализ диапазонов значений временных переменных в линеаризованном каноническом IR
+
+    Диапазоны считаются по присваиваниям (константы, копии, сложение, вычитание и умножение
+    без переполнения, остаток от деления на константу) и уточняются на ребрах условных переходов,
+    которые сравнивают переменную с константой или другой переменной. Сравнение t < l, где l -
+    длина массива base (Mem(base + 0) или переменная, прочитанная оттуда) или длина минус k,
+    дает факт t + k < длина base, он переносится копиями и на переменные вида t + c, если
+    запас остается неотрицательным. Обработчик выхода за границы массива не возвращается,
+    поэтому из его блока факты не выходят. На входе в блок факты предшественников
+    объединяются, а в заголовках циклов границы, которые продолжают расти, расширяются до
+    ближайшей константы из условий или до границ слова - так анализ сходится на циклах
+    """
+
+    def __init__(self, graph: ControlFlowGraph):
+        """
+        Конструктор
+        :param graph: граф потока управления
+        """
+        self.graph = graph
+        temps = [temp for block in graph.blocks for statement in block.items
+                 for temp in statement_uses(statement) + ([statement.destination] if isinstance(statement, Move) and
+                                                          isinstance(statement.destination, Temp) else [])]
+        self.pinned = {temp.id for temp in temps if is_pinned(temp)}
+        self.entry: List[Optional[RangeState]] = [None] * len(graph.blocks)
+
+    def solve(self) -> 'ValueRangeAnalysis':
+        """
+        Итерации по обратному постпорядку до неподвижной точки
+        :return: сам анализ (состояния на входе в блоки - entry, у недостижимых None)
+        """
+        blocks = self.graph.blocks
+        edges: Dict[Tuple[int, int], RangeState] = dict()
+        visits = [0] * len(blocks)
+        headers = {loop.header for loop in self.graph.loops()}
+        # пороги расширения - константы из условий и соседние с ними числа #
+        constants = {constant_value(operand) for block in blocks for statement in block.items
+                     if isinstance(statement, JumpC)
+                     for operand in (statement.condition_left_expression, statement.condition_right_expression)}
+        thresholds = sorted({value + delta for value in constants if value is not None for delta in (-1, 0, 1)} |
+                            {-1, 0})
+        changed = True
+        while changed:
+            changed = False
+            for index in self.graph.reverse_postorder():
+                state = RangeState() if index == 0 else None
+                for predecessor in blocks[index].predecessors:
+                    incoming = edges.get((predecessor, index))
+                    if incoming is not None:
+                        state = incoming.copy() if state is None else state.join(incoming)
+                if state is None:
+                    continue
+                visits[index] += 1
+                if index in headers and visits[index] > WIDENING_VISITS and self.entry[index] is not None:
+                    state.widen(self.entry[index], thresholds)
+                if state == self.entry[index]:
+                    continue
+                self.entry[index] = state
+                changed = True
+                for successor, output in self.block_outputs(index, state):
+                    if output is None:
+                        edges.pop((index, successor), None)
+                    else:
+                        edges[(index, successor)] = output
+        return self
+
+    def block_outputs(self, index: int, state: RangeState) -> List[Tuple[int, Optional[RangeState]]]:
+        """
+        Состояния на выходных ребрах блока
+        :param index: номер блока
+        :param state: состояние на входе
+        :return: пары (преемник, состояние; None - ребро невозможно)
+        """
+        block = self.graph.blocks[index]
+        if any(is_bounds_error(statement) for statement in block.items):
+            # обработчик выхода за границы массива завершает программу #
+            return [(successor, None) for successor in block.successors]
+        state = state.copy()
+        for statement in block.items[:-1] if block.items else []:
+            self.transfer(state, statement)
+        last = block.items[-1] if block.items else None
+        if not isinstance(last, JumpC):
+            if last is not None:
+                self.transfer(state, last)
+            return [(successor, state) for successor in block.successors]
+        taken = self.graph.labels[last.true_label]
+        fallthrough = index + 1 if index + 1 < len(self.graph.blocks) else None
+        if fallthrough is None or fallthrough == taken:
+            return [(successor, state) for successor in block.successors]
+        return [(taken, self.assume(state, last, True)), (fallthrough, self.assume(state, last, False))]
+
+    def states(self, index: int) -> Iterator[Tuple[object, RangeState]]:
+        """
+        Операторы достижимого блока с состоянием перед каждым из них
+        :param index: номер блока
+        :return:
+        """
+        state = self.entry[index].copy()
+        for statement in self.graph.blocks[index].items:
+            yield statement, state
+            state = state.copy()
+            self.transfer(state, statement)
+
+    def evaluate(self, exp: IExp, state: RangeState, source: bool = False) -> Optional[Range]:
+        """
+        Диапазон значения выражения
+        :param exp: выражение
+        :param state: состояние
+        :param source: выражение - источник Move (там Mem(Temp s) - копия s)
+        :return: диапазон или None, если известно только, что это слово
+        """
+        value = constant_value(exp)
+        if value is not None:
+            return value, value
+        if isinstance(exp, Temp):
+            return state.ranges.get(exp.id)
+        if source and isinstance(exp, Mem) and isinstance(exp.expression, Temp):
+            return state.ranges.get(exp.expression.id)
+        if not isinstance(exp, Binop):
+            return None
+        right_value = constant_value(exp.right_expression)
+        if exp.operation == BinopEnum.MOD and right_value:
+            bound = abs(right_value) - 1
+            left = self.evaluate(exp.left_expression, state)
+            return (0, bound) if left is not None and left[0] >= 0 else (-bound, bound)
+        if exp.operation not in (BinopEnum.PLUS, BinopEnum.MINUS, BinopEnum.MUL):
+            return None
+        left, right = self.evaluate(exp.left_expression, state), self.evaluate(exp.right_expression, state)
+        if left is None or right is None:
+            return None
+        if exp.operation == BinopEnum.PLUS:
+            low, high = left[0] + right[0], left[1] + right[1]
+        elif exp.operation == BinopEnum.MINUS:
+            low, high = left[0] - right[1], left[1] - right[0]
+        else:
+            products = [first * second for first in left for second in right]
+            low, high = min(products), max(products)
+        return (low, high) if fits_word(low, high) else None
+
+    def transfer(self, state: RangeState, statement):
+        """
+        Меняет состояние после оператора
+        :param state: состояние (меняется на месте)
+        :param statement: оператор
+        :return:
+        """
+        defined = statement_defines(statement)
+        if statement_calls(statement):
+            for temp_id in self.pinned:
+                state.kill(temp_id)
+        if not defined:
+            return
+        if not isinstance(statement, Move) or not isinstance(statement.destination, Temp) or \
+                isinstance(statement.source, Call):
+            for temp_id in defined:
+                state.kill(temp_id)
+            return
+
+        destination, source = statement.destination.id, statement.source
+        value = self.evaluate(source, state, source=True)
+        below = dict()
+        affine = affine_source(source)
+        if affine is not None:
+            base, offset = affine[0].id, affine[1]
+            low, high = state.range_of(base)
+            if base == destination or not fits_word(low + offset, high + offset):
+                affine = None
+            else:
+                # base + k < длина, значит, (base + offset) + (k - offset) < длина #
+                below = {array: slack - offset for (temp, array), slack in state.below.items()
+                         if temp == base and slack >= offset}
+        array = length_array(source)
+        state.kill(destination)
+        state.set_range(destination, value)
+        if affine is not None:
+            state.offsets[destination] = (affine[0].id, affine[1])
+            if affine[1] == 0 and affine[0].id in state.lengths:
+                state.lengths[destination] = state.lengths[affine[0].id]
+        if array is not None and array.id != destination:
+            state.lengths[destination] = array.id
+            state.set_range(destination, (0, WORD_MAX))
+        state.below.update(((destination, array_id), slack) for array_id, slack in below.items()
+                           if array_id != destination)
+
+    @staticmethod
+    def length_bound(exp: IExp, state: RangeState) -> Optional[Tuple[int, int]]:
+        """
+        :param exp: операнд сравнения
+        :param state: состояние
+        :return: пара (номер переменной с адресом массива, k), если операнд - длина массива минус k >= 0
+        """
+        array = length_array(exp)
+        if array is not None:
+            return array.id, 0
+        if not isinstance(exp, Temp):
+            return None
+        if exp.id in state.lengths:
+            return state.lengths[exp.id], 0
+        base, offset = state.offsets.get(exp.id, (None, 1))
+        return (state.lengths[base], -offset) if offset <= 0 and base in state.lengths else None
+
+    def assume(self, state: RangeState, statement: JumpC, taken: bool) -> Optional[RangeState]:
+        """
+        Уточняет состояние на ребре условного перехода
+        :param state: состояние перед переходом
+        :param statement: условный переход
+        :param taken: ребро перехода по метке (иначе - проваливание)
+        :return: новое состояние или None, если условие на этом ребре не может выполниться
+        """
+        jump_type = statement.jump_type_enum if taken else statement.jump_type_enum.negate()
+        left, right = statement.condition_left_expression, statement.condition_right_expression
+        if not isinstance(left, Temp):
+            # c < t - то же, что t >= c + 1, c >= t - то же, что t < c + 1 #
+            value = constant_value(left)
+            if value is None or not isinstance(right, Temp):
+                return state
+            swapped = {JumpTypeEnum.LT: JumpTypeEnum.GE, JumpTypeEnum.GE: JumpTypeEnum.LT}
+            left, right = right, Const(value + 1 if jump_type in swapped else value)
+            jump_type = swapped.get(jump_type, jump_type)
+
+        low, high = state.range_of(left.id)
+        right_range = self.evaluate(right, state)
+        bound = self.length_bound(right, state)
+        if jump_type == JumpTypeEnum.GE and bound is not None and \
+                state.slack(left.id, bound[0]) is not None and state.slack(left.id, bound[0]) >= bound[1]:
+            return None
+        result = state.copy()
+        if right_range is not None:
+            right_low, right_high = right_range
+            if jump_type == JumpTypeEnum.LT:
+                high = min(high, right_high - 1)
+            elif jump_type == JumpTypeEnum.GE:
+                low = max(low, right_low)
+            elif jump_type == JumpTypeEnum.EQ:
+                low, high = max(low, right_low), min(high, right_high)
+            elif right_low == right_high:
+                low, high = low + (low == right_low), high - (high == right_low)
+            if low > high:
+                return None
+            result.set_range(left.id, (low, high))
+            if isinstance(right, Temp) and jump_type in (JumpTypeEnum.LT, JumpTypeEnum.GE):
+                other_low, other_high = right_range
+                if jump_type == JumpTypeEnum.LT:
+                    other_low = max(other_low, low + 1)
+                else:
+                    other_high = min(other_high, high)
+                if other_low > other_high:
+                    return None
+                result.set_range(right.id, (other_low, other_high))
+        if jump_type == JumpTypeEnum.LT and bound is not None:
+            result.add_below(left.id, *bound)
+        return result
+
@@ -0,0 +1,456 @@
+import re
+
+import syntax_tree as ast
+from lex import reserved
+
+"""
+# Рукописный парсер: лексер на одном регулярном выражении и рекурсивный спуск,
+# выражения разбираются методом Пратта. Строит те же узлы и те же Position, что и yacc.py
+"""
+
+# Порядок альтернатив повторяет порядок правил в мастер-выражении PLY: #
+# сначала функции из lex.py (в порядке объявления), потом строки по убыванию длины #
+TOKEN_REGEX = re.compile(r"""
+      (?P<ignore>[ \t]+)
+    | (?P<STATIC_VOID_MAIN>static\svoid\smain)
+    | (?P<SYSTEM_OUT_PRINTLN>System\.out\.println)
+    | (?P<INTEGER>[1-9][0-9]*|0)
+    | (?P<ID>[a-zA-Z_]+[a-zA-Z0-9_]*)
+    | (?P<COMMENT>//.*)
+    | (?P<newline>\n+)
+    | (?P<AND>&&)
+    | (?P<OR>\|\|)
+    | (?P<punctuation>[{}()\[\];\-+%=,.*<!])
+    | (?P<error>[\s\S])
+""", re.VERBOSE)
+
+PUNCTUATION = {
+    '{': 'L_BRACKET',
+    '}': 'R_BRACKET',
+    '(': 'L_ROUND',
+    ')': 'R_ROUND',
+    '[': 'L_SQUARE',
+    ']': 'R_SQUARE',
+    ';': 'SEMICOLON',
+    '-': 'MINUS',
+    '+': 'PLUS',
+    '%': 'PERCENT',
+    '=': 'EQUALS',
+    ',': 'COMMA',
+    '.': 'DOT',
+    '*': 'STAR',
+    '<': 'LESS',
+    '!': 'BANG',
+}
+
+# Сила связывания инфиксных операций - повторяет таблицу precedence из yacc.py #
+BINARY_POWER = {
+    'OR': 1,
+    'AND': 2,
+    'MINUS': 3,
+    'PLUS': 3,
+    'PERCENT': 4,
+    'STAR': 5,
+    'LESS': 6,
+}
+BANG_POWER = 7
+DOT_POWER = 8
+L_SQUARE_POWER = 9
+
+TYPE_START = ('INT', 'BOOLEAN', 'ID')
+STATEMENT_START = ('L_BRACKET', 'IF', 'WHILE', 'SYSTEM_OUT_PRINTLN', 'ID')
+
+
+class RecursiveDescentParser:
+    """
+    Отвечает за разбор программ без PLY - интерфейс тот же, что у yacc.Parser
+    Хранит свой текст и токены, поэтому разные экземпляры можно использовать из разных потоков
+    """
+
+    def __init__(self):
+        self.text: str = None
+        self.types = []
+        self.values = []
+        self.lines = []
+        self.columns = []
+        self.lex_positions = []
+        self.positions = []
+        self.index = 0
+
+    def parse_source(self, text: str) -> ast.Program:
+        """
+        Разбирает программу, заданную текстом
+        :param text: исходный код программы
+        :return: корень AST
+        """
+        self.text = text
+        self.tokenize(text)
+        self.positions = [None] * len(self.types)
+        self.index = 0
+        program = self.parse_goal()
+        if self.types[self.index] != '$end':
+            self.error()
+        return program
+
+    def parse_file(self, file_path) -> ast.Program:
+        """
+        Разбирает программу из файла
+        :param file_path: путь до файла
+        :return: корень AST
+        """
+        with open(file_path) as file:
+            return self.parse_source(file.read())
+
+    def tokenize(self, text: str):
+        """
+        Разбивает текст на токены, для каждого сразу считает строку и столбец
+        так же, как это делают лексер PLY и yacc.find_column
+        Нераспознанный текст превращается в токен error - ошибка поднимается,
+        только когда парсер до него дойдет (как у ленивого лексера PLY)
+        :param text: исходный код программы
+        :return:
+        """
+        types = self.types = []
+        values = self.values = []
+        lines = self.lines = []
+        columns = self.columns = []
+        lex_positions = self.lex_positions = []
+        line = 1
+        last_cr = -1
+        for match in TOKEN_REGEX.finditer(text):
+            kind = match.lastgroup
+            if kind == 'ignore' or kind == 'COMMENT':
+                continue
+            value = match.group()
+            lex_pos = match.start()
+            if kind == 'newline':
+                line += len(value)
+                last_cr = match.end() - 1
+                continue
+            if kind == 'punctuation':
+                kind = PUNCTUATION[value]
+            elif kind == 'ID':
+                kind = reserved.get(value, 'ID')
+            elif kind == 'INTEGER':
+                value = int(value)
+            elif kind == 'error':
+                value = "Unknown text '%s'" % (text[lex_pos:],)
+            types.append(kind)
+            values.append(value)
+            lines.append(line)
+            columns.append((lex_pos - last_cr) if last_cr >= 0 else (lex_pos or 1))
+            lex_positions.append(lex_pos)
+            if kind == 'error':
+                break
+            if kind == 'STATIC_VOID_MAIN' and '\n' in value:
+                # Перевод строки внутри токена не меняет номер строки, но сдвигает столбцы #
+                last_cr = lex_pos + value.rfind('\n')
+        types.append('$end')
+        values.append(None)
+        lines.append(line)
+        columns.append(0)
+        lex_positions.append(len(text))
+
+    def position(self, index: int) -> ast.Position:
+        """
+        Возвращает расположение токена - один экземпляр на токен,
+        его делят все узлы, которые с этого токена начинаются
+        :param index: номер токена
+        :return:
+        """
+        position = self.positions[index]
+        if position is None:
+            position = ast.Position(self.columns[index], self.lines[index])
+            self.positions[index] = position
+        return position
+
+    def error(self):
+        """
+        Сообщает об ошибке на текущем токене тем же исключением, что и yacc.py
+        :return:
+        """
+        index = self.index
+        kind = self.types[index]
+        if kind == 'error':
+            raise TypeError(self.values[index])
+        if kind == '$end':
+            raise SyntaxError("Syntax error in input! Text: None")
+        raise SyntaxError("Syntax error in input! Text: LexToken(%s,%r,%d,%d)" % (
+            kind, self.values[index], self.lines[index], self.lex_positions[index]))
+
+    def expect(self, kind: str):
+        if self.types[self.index] != kind:
+            self.error()
+        self.index += 1
+
+    def parse_goal(self):
+        start = self.index
+        main_class = self.parse_main_class()
+        class_s = None
+        if self.types[self.index] == 'CLASS':
+            class_s = self.parse_class_s()
+        elif self.types[self.index] != '$end':
+            self.error()
+        return ast.Program(main_class, class_s, self.position(start))
+
+    def parse_main_class(self):
+        start = self.index
+        self.expect('CLASS')
+        class_id = self.parse_id()
+        for kind in ('L_BRACKET', 'PUBLIC', 'STATIC_VOID_MAIN', 'L_ROUND', 'STRING', 'L_SQUARE', 'R_SQUARE'):
+            self.expect(kind)
+        param_id = self.parse_id()
+        self.expect('R_ROUND')
+        self.expect('L_BRACKET')
+        statement_s = self.parse_statement_s()
+        self.expect('R_BRACKET')
+        self.expect('R_BRACKET')
+        return ast.MainClass(class_id, param_id, statement_s, self.position(start))
+
+    def parse_class_s(self):
+        class_s = ast.ClassDeclList(self.parse_class(), None)
+        while self.types[self.index] == 'CLASS':
+            class_s = ast.ClassDeclList(self.parse_class(), class_s)
+        return class_s
+
+    def parse_class(self):
+        start = self.index
+        self.expect('CLASS')
+        class_id = self.parse_id()
+        extends = None
+        if self.types[self.index] == 'EXTENDS':
+            self.index += 1
+            extends = self.parse_id()
+        self.expect('L_BRACKET')
+        var_s = None
+        if self.types[self.index] in TYPE_START:
+            var_s = ast.VarDeclList(self.parse_var(), None)
+            while self.types[self.index] in TYPE_START:
+                var_s = ast.VarDeclList(self.parse_var(), var_s)
+        method_s = None
+        if self.types[self.index] in ('PUBLIC', 'PRIVATE'):
+            method_s = ast.MethodDeclList(self.parse_method(), None)
+            while self.types[self.index] in ('PUBLIC', 'PRIVATE'):
+                method_s = ast.MethodDeclList(self.parse_method(), method_s)
+        self.expect('R_BRACKET')
+        return ast.ClassDecl(class_id, extends, var_s, method_s, self.position(start))
+
+    def parse_var(self):
+        start = self.index
+        type_of = self.parse_type()
+        var_id = self.parse_id()
+        self.expect('SEMICOLON')
+        return ast.VarDecl(type_of, var_id, self.position(start))
+
+    def at_method_var(self) -> bool:
+        """
+        В теле метода объявление переменной начинается с типа: int, boolean
+        или имени класса, за которым идет имя переменной (иначе это присваивание)
+        :return:
+        """
+        kind = self.types[self.index]
+        return kind == 'INT' or kind == 'BOOLEAN' or (kind == 'ID' and self.types[self.index + 1] == 'ID')
+
+    def parse_method(self):
+        start = self.index
+        if self.types[self.index] not in ('PUBLIC', 'PRIVATE'):
+            self.error()
+        modifier = str(self.values[self.index])
+        self.index += 1
+        type_of = self.parse_type()
+        method_id = self.parse_id()
+        self.expect('L_ROUND')
+        arg_s = self.parse_arg_s()
+        self.expect('R_ROUND')
+        self.expect('L_BRACKET')
+        var_s = None
+        if self.at_method_var():
+            var_s = ast.VarDeclList(self.parse_var(), None)
+            while self.at_method_var():
+                var_s = ast.VarDeclList(self.parse_var(), var_s)
+        statement_s = self.parse_statement_s() if self.types[self.index] in STATEMENT_START else None
+        stm_ret = self.parse_stm_ret()
+        self.expect('R_BRACKET')
+        return ast.MethodDecl(modifier, type_of, method_id, arg_s, var_s, statement_s, stm_ret,
+                              self.position(start))
+
+    def parse_stm_ret(self):
+        start = self.index
+        self.expect('RETURN')
+        expression = self.parse_exp(0)
+        self.expect('SEMICOLON')
+        return ast.ReturnStatement(expression, self.position(start))
+
+    def parse_arg_s(self):
+        # Грамматика допускает пустой список перед запятой: arg_s : empty | arg_s COMMA arg #
+        arg_s = None
+        if self.types[self.index] in TYPE_START:
+            arg_s = ast.ArgDeclList(self.parse_arg(), None)
+        while self.types[self.index] == 'COMMA':
+            self.index += 1
+            arg_s = ast.ArgDeclList(self.parse_arg(), arg_s)
+        return arg_s
+
+    def parse_arg(self):
+        start = self.index
+        type_of = self.parse_type()
+        arg_id = self.parse_id()
+        return ast.ArgDecl(type_of, arg_id, self.position(start))
+
+    def parse_type(self):
+        kind = self.types[self.index]
+        if kind == 'INT':
+            self.index += 1
+            if self.types[self.index] == 'L_SQUARE':
+                self.index += 1
+                self.expect('R_SQUARE')
+                return ast.BasicType('int_array')
+            return ast.BasicType('int')
+        elif kind == 'BOOLEAN':
+            self.index += 1
+            return ast.BasicType('boolean')
+        elif kind == 'ID':
+            return ast.ClassType(self.parse_id())
+        self.error()
+
+    def parse_statement_s(self):
+        statement_s = ast.StatementList(self.parse_statement(), None)
+        while self.types[self.index] in STATEMENT_START:
+            statement_s = ast.StatementList(self.parse_statement(), statement_s)
+        return statement_s
+
+    def parse_statement(self):
+        start = self.index
+        kind = self.types[start]
+        if kind == 'L_BRACKET':
+            self.index += 1
+            statement_s = self.parse_statement_s()
+            self.expect('R_BRACKET')
+            return ast.Statements(statement_s)
+        elif kind == 'IF':
+            self.index += 1
+            self.expect('L_ROUND')
+            condition = self.parse_exp(0)
+            self.expect('R_ROUND')
+            if_true = self.parse_statement()
+            self.expect('ELSE')
+            if_false = self.parse_statement()
+            return ast.IfStatement(condition, if_true, if_false, self.position(start))
+        elif kind == 'WHILE':
+            self.index += 1
+            self.expect('L_ROUND')
+            condition = self.parse_exp(0)
+            self.expect('R_ROUND')
+            action = self.parse_statement()
+            return ast.WhileStatement(condition, action, self.position(start))
+        elif kind == 'SYSTEM_OUT_PRINTLN':
+            self.index += 1
+            self.expect('L_ROUND')
+            expression = self.parse_exp(0)
+            self.expect('R_ROUND')
+            self.expect('SEMICOLON')
+            return ast.PrintLineStatement(expression, self.position(start))
+        elif kind == 'ID':
+            left = self.parse_id()
+            if self.types[self.index] == 'EQUALS':
+                self.index += 1
+                expression = self.parse_exp(0)
+                self.expect('SEMICOLON')
+                return ast.AssignStatement(left, expression, self.position(start))
+            self.expect('L_SQUARE')
+            position_in_arr = self.parse_exp(0)
+            self.expect('R_SQUARE')
+            self.expect('EQUALS')
+            expression = self.parse_exp(0)
+            self.expect('SEMICOLON')
+            return ast.RandomAccessAssignStatement(left, position_in_arr, expression, self.position(start))
+        self.error()
+
+    def parse_exp_s(self):
+        exp_s = ast.ExprList(self.parse_exp(0), None)
+        while self.types[self.index] == 'COMMA':
+            self.index += 1
+            exp_s = ast.ExprList(self.parse_exp(0), exp_s)
+        return exp_s
+
+    def parse_exp(self, power: int):
+        """
+        Разбирает выражение методом Пратта
+        Расположение составного выражения - первый токен его левой части
+        (для выражения в скобках это сама скобка), как при tracking=True в PLY
+        :param power: сила связывания операции слева от выражения
+        :return: узел выражения
+        """
+        start = self.index
+        left = self.parse_exp_prefix()
+        types = self.types
+        while True:
+            kind = types[self.index]
+            if kind == 'L_SQUARE' and L_SQUARE_POWER > power:
+                self.index += 1
+                position_in_arr = self.parse_exp(0)
+                self.expect('R_SQUARE')
+                left = ast.RandomAccessExpr(left, position_in_arr, self.position(start))
+            elif kind == 'DOT' and DOT_POWER > power:
+                self.index += 1
+                if types[self.index] == 'LENGTH':
+                    self.index += 1
+                    left = ast.LengthExpr(left, self.position(start))
+                    continue
+                method_id = self.parse_id()
+                self.expect('L_ROUND')
+                exp_s = None
+                if types[self.index] != 'R_ROUND':
+                    exp_s = self.parse_exp_s()
+                self.expect('R_ROUND')
+                left = ast.CallMethodExpr(left, method_id, exp_s, self.position(start))
+            elif kind in BINARY_POWER and BINARY_POWER[kind] > power:
+                label = self.values[self.index]
+                self.index += 1
+                right = self.parse_exp(BINARY_POWER[kind])
+                left = ast.BinaryExpr(left, label, right, self.position(start))
+            else:
+                return left
+
+    def parse_exp_prefix(self):
+        start = self.index
+        kind = self.types[start]
+        if kind == 'INTEGER':
+            self.index += 1
+            return ast.ValueExpr(ast.ValueEnum.INTEGER, self.values[start], self.position(start))
+        elif kind == 'TRUE' or kind == 'FALSE':
+            self.index += 1
+            return ast.ValueExpr(ast.ValueEnum.BOOLEAN, self.values[start], self.position(start))
+        elif kind == 'ID':
+            return self.parse_id()
+        elif kind == 'THIS':
+            self.index += 1
+            return ast.ThisExpr(self.position(start))
+        elif kind == 'NEW':
+            self.index += 1
+            if self.types[self.index] == 'INT':
+                self.index += 1
+                self.expect('L_SQUARE')
+                size = self.parse_exp(0)
+                self.expect('R_SQUARE')
+                return ast.NewIntArrExpr(size, self.position(start))
+            class_id = self.parse_id()
+            self.expect('L_ROUND')
+            self.expect('R_ROUND')
+            return ast.NewObjectExpr(class_id, self.position(start))
+        elif kind == 'BANG':
+            self.index += 1
+            return ast.NotExpr(self.parse_exp(BANG_POWER), self.position(start))
+        elif kind == 'L_ROUND':
+            self.index += 1
+            expression = self.parse_exp(0)
+            self.expect('R_ROUND')
+            return expression
+        self.error()
+
+    def parse_id(self):
+        index = self.index
+        if self.types[index] != 'ID':
+            self.error()
+        self.index += 1
+        return ast.Id(self.values[index], self.position(index))
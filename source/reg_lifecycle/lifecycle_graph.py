@@ -1,12 +1,19 @@
 # coding: utf-8
 
-from source.code_generation.instruction import InstructionList
+from code_generation.instruction import InstructionList
+from flow_graph.control_flow_graph import ControlFlowGraph
 
 from .lifecycle_node import LifecycleNode
 
 
 class LifecycleGraph(object):
-    def __init__(self, instruction_list: InstructionList):
+    def __init__(self, instruction_list: InstructionList, flow_graph: ControlFlowGraph = None):
+        """
+        Конструктор
+        :param instruction_list: инструкции метода
+        :param flow_graph: граф потока управления по этим инструкциям (по умолчанию строится здесь)
+        """
+        self.flow_graph = flow_graph if flow_graph is not None else ControlFlowGraph.from_instructions(instruction_list)
         self._regs = set()
         self._nodes = list()
         self.labels_positions = dict()
@@ -26,13 +33,19 @@ class LifecycleGraph(object):
             if instruction.__class__.__name__ == 'LabelInstruction':
                 self.labels_positions[instruction.label] = len(self._nodes) - 1
 
-            if len(self._nodes) > 1:
-                self._nodes[-2].add_connection(self._nodes[-1])
-
-        for i in range(len(instruction_list.instructions)):
-            labels = instruction_list.instructions[i].label_list
-            for l in labels:
-                self._nodes[i].add_connection(self._nodes[self.labels_positions[l]])
+        # внутри блока инструкции идут подряд, последняя связана с первыми инструкциями блоков-преемников #
+        first = 0
+        starts = []
+        for block in self.flow_graph.blocks:
+            starts.append(first)
+            for i in range(first + 1, first + len(block.items)):
+                self._nodes[i - 1].add_connection(self._nodes[i])
+            first += len(block.items)
+        for block in self.flow_graph.blocks:
+            if block.items:
+                last = self._nodes[starts[block.index] + len(block.items) - 1]
+                for successor in block.successors:
+                    last.add_connection(self._nodes[starts[successor]])
 
     def build_Lifecycle(self):
         nodes_to_update = set()
@@ -1,6 +1,6 @@
 # coding: utf-8
 
-from source.code_generation.instruction import IInstruction, MoveInstruction
+from code_generation.instruction import IInstruction, MoveInstruction
 
 
 class LifecycleNode(object):
@@ -14,7 +14,7 @@ class LifecycleNode(object):
         self._in = set()
         self._out = set()
         if isinstance(instruction, MoveInstruction) and instruction.dst:
-            self._is_move = instruction.pure_move()
+            self._is_move = instruction.pure_move
 
     @property
     def instruction(self):
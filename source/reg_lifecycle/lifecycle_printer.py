@@ -1,6 +1,6 @@
 # coding: utf-8
 
-from source.framework.dot_print import DotPrint
+from framework.dot_print import DotPrint
 
 from .lifecycle_node import LifecycleNode
 
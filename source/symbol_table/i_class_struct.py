@@ -37,5 +37,5 @@ class IClassStruct:
     def get_virtual_method_address(self, method_name, base, position):
         pass
 
-    def allocate_new(self, position: Position):
+    def allocate_new(self, position: Position, context=None):
         pass
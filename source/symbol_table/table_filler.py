@@ -1,5 +1,6 @@
 from activation_records.frame_filler import FrameFiller
-from syntax_tree import Visitor, Program, Visitable, \
+from framework.compilation_context import CompilationContext
+from syntax_tree import Visitor, Program, \
     MainClass, ClassDecl, Position
 from .class_info import ClassInfo
 from .method_info import MethodInfo, AccessModifierEnum
@@ -14,15 +15,17 @@ class TableFiller(Visitor):
     при обходе абстрактного синтаксического дерева
     """
 
-    def __init__(self, table: Table, verbose: bool = False):
+    def __init__(self, table: Table, verbose: bool = False, context: CompilationContext = None):
         """
         Конструктор (передаем заполняемую таблицу)
         :param table: символьная таблица для заполнения
         :param verbose: отвечает за вывод таблицы на экран
+        :param context: контекст компиляции (для нумерации регистров во фреймах)
         """
         Visitor.__init__(self)
         self.table = table
         self.verbose = verbose
+        self.context = context
 
     def fill_table(self, program: Program):
         """
@@ -63,19 +66,11 @@ class TableFiller(Visitor):
                     added_methods.add(method_info)
                     class_struct.add_to_vtable(method_info)
 
-    def visit(self, visitable: Visitable):
-        """
-        Отвечает за посещение произвольного узла дерева (начальный пункт)
-        :param visitable: посещаемый узел
-        :return:
-        TODO переписать на декораторах?
-        """
-        if isinstance(visitable, Program):
-            self._visit_program(visitable)
-        elif isinstance(visitable, MainClass):
-            self._visit_main_class(visitable)
-        elif isinstance(visitable, ClassDecl):
-            self._visit_class_decl(visitable)
+    visit_methods = {
+        Program: '_visit_program',
+        MainClass: '_visit_main_class',
+        ClassDecl: '_visit_class_decl',
+    }
 
     def _visit_program(self, program: Program):
         """
@@ -113,7 +108,7 @@ class TableFiller(Visitor):
         :param class_decl: узел AST класса ClassDecl
         :return:
         """
-        frame_filler = FrameFiller(self.table)
+        frame_filler = FrameFiller(self.table, context=self.context)
         class_info = ClassInfo(class_decl.id.name, class_decl.position)
         if class_decl.extends is not None:
             class_info.add_super_class(class_decl.extends.name)
@@ -147,7 +142,7 @@ class TableFiller(Visitor):
                     var_decl.position,
                     TypeInfo.from_type(var_decl.type_of)
                 ))
-            method_info.add_frame_info(frame_filler.create_frame(class_info, method_info))
+            method_info.add_frame_info(frame_filler.create_frame(class_info, method_info, self.context))
             class_info.add_method_info(method_info)
             self.table.add_frame(method_info.get_full_name(), method_info.get_frame())
         self.table.add_class(class_info)
@@ -63,27 +63,18 @@ class TypeStackVisitor(Visitor):
         self.types_stack.pop(len(self.types_stack) - 1)
         return result
 
-    def visit(self, obj: Visitable):
-        if isinstance(obj, BinaryExpr):
-            self.visit_binary_expr(obj)
-        elif isinstance(obj, ValueExpr):
-            self.visit_value_expr(obj)
-        elif isinstance(obj, Id):
-            self.visit_id(obj)
-        elif isinstance(obj, NotExpr):
-            self.visit_not_expr(obj)
-        elif isinstance(obj, CallMethodExpr):
-            self.visit_call_method_expr(obj)
-        elif isinstance(obj, NewIntArrExpr):
-            self.visit_new_int_array_expr(obj)
-        elif isinstance(obj, NewObjectExpr):
-            self.visit_new_object_expr(obj)
-        elif isinstance(obj, LengthExpr):
-            self.visit_length_expr(obj)
-        elif isinstance(obj, RandomAccessExpr):
-            self.visit_random_access_expr(obj)
-        elif isinstance(obj, ThisExpr):
-            self.visit_this_expr(obj)
+    visit_methods = {
+        BinaryExpr: 'visit_binary_expr',
+        ValueExpr: 'visit_value_expr',
+        Id: 'visit_id',
+        NotExpr: 'visit_not_expr',
+        CallMethodExpr: 'visit_call_method_expr',
+        NewIntArrExpr: 'visit_new_int_array_expr',
+        NewObjectExpr: 'visit_new_object_expr',
+        LengthExpr: 'visit_length_expr',
+        RandomAccessExpr: 'visit_random_access_expr',
+        ThisExpr: 'visit_this_expr',
+    }
 
     def visit_binary_expr(self, obj: BinaryExpr):
         if obj.binary_enum in [BinaryEnum.PLUS, BinaryEnum.MULT, BinaryEnum.MINUS, BinaryEnum.MOD]:
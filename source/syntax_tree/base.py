@@ -1,8 +1,13 @@
+from types import GeneratorType
+
+
 class Position:
     """
     Класс для хранение расположения (столбца и строки)
     """
 
+    __slots__ = ('x', 'y')
+
     def __init__(self, x: int, y: int):
         self.x = x
         self.y = y
@@ -15,16 +20,115 @@ class Position:
         return f'(line: {self.y}, col: {self.x})'
 
 
+class PositionTable:
+    """
+    Выдает общие экземпляры Position в рамках одного разбора - узлы, которые начинаются
+    с одного токена (например, бинарное выражение и его левый операнд), делят одно расположение
+    Поэтому расположения узлов нельзя изменять на месте
+    """
+
+    __slots__ = ('positions',)
+
+    def __init__(self):
+        self.positions = dict()
+
+    def get(self, x: int, y: int) -> Position:
+        """
+        Возвращает расположение с данными координатами (создает его при первом запросе)
+        :param x: столбец
+        :param y: строка
+        :return:
+        """
+        key = (x, y)
+        position = self.positions.get(key)
+        if position is None:
+            position = Position(x, y)
+            self.positions[key] = position
+        return position
+
+
+def find_handler(owner: type, methods: dict, node_class: type):
+    """
+    Ищет обработчик узла по MRO его класса
+    :param owner: класс обходчика
+    :param methods: таблица обработчиков (класс узла -> имя метода)
+    :param node_class: класс узла
+    :return: функция-обработчик или None, если узел не обрабатывается
+    """
+    for cls in node_class.__mro__:
+        name = methods.get(cls)
+        if name is not None:
+            return getattr(owner, name)
+    return None
+
+
 class Visitor:
     """
     Базовый класс для всех классов, обходящих дерево
+
+    Подклассы перечисляют обработчики в visit_methods (класс узла -> имя метода),
+    visit находит обработчик по классу узла один раз для каждого класса обходчика
+    и дальше берет его из кэша - вместо цепочки isinstance на каждый узел
+    Переопределенный в подклассе обработчик подхватывается по имени
+
+    Обработчик может быть генератором: вместо child.accept(self) он делает
+    yield child и получает результат обработчика потомка. Такие обработчики
+    visit выполняет на явном стеке, поэтому глубина дерева (например, выражения
+    из тысяч слагаемых) не ограничена глубиной рекурсии Python
     """
 
+    visit_methods = dict()
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls.visit_cache = dict()
+
     def __init__(self):
         pass
 
+    def dispatch(self, visitable):
+        """
+        Вызывает обработчик узла
+        :param visitable: узел
+        :return: результат обработчика (генератор, если обработчик обходит потомков через yield)
+        """
+        try:
+            method = self.visit_cache[visitable.__class__]
+        except KeyError:
+            method = find_handler(type(self), self.visit_methods, visitable.__class__)
+            self.visit_cache[visitable.__class__] = method
+        if method is not None:
+            return method(self, visitable)
+        return None
+
     def visit(self, visitable):
-        pass
+        """
+        Обходит (под)дерево с корнем в данном узле
+        :param visitable: узел
+        :return: результат обработчика узла
+        """
+        result = self.dispatch(visitable)
+        if result.__class__ is not GeneratorType:
+            return result
+
+        # Стек приостановленных обработчиков: верхний ждет результат потомка #
+        stack = [result]
+        result = None
+        while stack:
+            try:
+                child = stack[-1].send(result)
+            except StopIteration as stop:
+                stack.pop()
+                result = stop.value
+                continue
+            result = self.dispatch(child)
+            if result.__class__ is GeneratorType:
+                stack.append(result)
+                result = None
+        return result
+
+
+Visitor.visit_cache = dict()
 
 
 class Visitable:
@@ -32,8 +136,23 @@ class Visitable:
     Базовый класс для всех классов AST
     """
 
+    __slots__ = ('position',)
+
     def __init__(self, position: Position):
         self.position = position
 
     def accept(self, visitor: Visitor):
         visitor.visit(self)
+
+
+def node_fields(node):
+    """
+    Перечисляет заполненные поля узла AST - узлы хранят их в __slots__, а не в __dict__
+    :param node: узел
+    :return: пары (имя поля, значение)
+    """
+    for cls in type(node).__mro__:
+        for name in getattr(cls, '__slots__', ()):
+            if hasattr(node, name):
+                yield name, getattr(node, name)
+
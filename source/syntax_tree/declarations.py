@@ -17,6 +17,8 @@ class ArgDecl(Visitable):
     Декларация аргумента функции
     """
 
+    __slots__ = ('type_of', 'id')
+
     def __init__(self, type_of: Type, id: str, position: Position):
         Visitable.__init__(self, position)
         self.type_of = type_of
@@ -28,6 +30,8 @@ class ArgDeclList:
     Список деклараций аргументов
     """
 
+    __slots__ = ('arg_decl_list',)
+
     def __init__(self, arg_decl: ArgDecl, prev: 'ArgDeclList' = None):
         if prev is None:
             self.arg_decl_list = []
@@ -43,6 +47,8 @@ class VarDecl(Visitable):
     Декларация переменной
     """
 
+    __slots__ = ('type_of', 'id')
+
     def __init__(self, type_of, id, position):
         Visitable.__init__(self, position)
         self.type_of = type_of
@@ -55,6 +61,8 @@ class VarDeclList:
     Список деклараций переменных
     """
 
+    __slots__ = ('var_decl_list',)
+
     def __init__(self, var_decl, prev=None):
         if prev is None:
             self.var_decl_list = []
@@ -68,6 +76,9 @@ class MethodDecl(Visitable):
     Декларация метода
     """
 
+    __slots__ = ('access_modifier', 'type_of', 'id', 'arg_decl_list', 'var_decl_list', 'statement_list',
+                 'return_statement')
+
     def __init__(self, access_modifier: str, type_of: Type, id: str, args: ArgDeclList, vars: VarDeclList,
                  statements: StatementList, return_statement: ReturnStatement, position: Position):
         Visitable.__init__(self, position)
@@ -85,6 +96,8 @@ class MethodDeclList:
     Список деклараций методов
     """
 
+    __slots__ = ('method_decl_list',)
+
     def __init__(self, method_decl: MethodDecl, prev: 'MethodDeclList' = None):
         if prev is None:
             self.method_decl_list = []
@@ -98,6 +111,8 @@ class ClassDecl(Visitable):
     Декларация класса (не главного)
     """
 
+    __slots__ = ('id', 'extends', 'var_decl_list', 'method_decl_list')
+
     def __init__(self, id: Id = None, extends: Id = None, vars: VarDeclList = None, methods: MethodDeclList = None,
                  position: Position = None):
         Visitable.__init__(self, position)
@@ -112,6 +127,8 @@ class ClassDeclList:
     Список деклараций классов (без главного)
     """
 
+    __slots__ = ('class_decl_list',)
+
     def __init__(self, class_decl: ClassDecl, prev: 'ClassDeclList' = None):
         if prev is None:
             self.class_decl_list = []
@@ -125,6 +142,8 @@ class MainClass(Visitable):
     Декларация главного класса (с функцией main)
     """
 
+    __slots__ = ('id', 'param_id', 'statement_list')
+
     def __init__(self, id: str, param_id: str, statements: StatementList, position):
         Visitable.__init__(self, position)
         self.id = id
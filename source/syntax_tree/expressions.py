@@ -3,12 +3,16 @@ from enum import Enum
 
 
 class Expr(Visitable):
+    __slots__ = ('label',)
+
     def __init__(self, label: str, position: Position):
         self.label = label
         Visitable.__init__(self, position)
 
 
 class ExprList():
+    __slots__ = ('expr_list',)
+
     def __init__(self, expr: Expr, prev: 'ExprList' = None):
         if prev is None:
             self.expr_list = []
@@ -45,6 +49,8 @@ class BinaryEnum(Enum):
 
 
 class BinaryExpr(Expr):
+    __slots__ = ('binary_enum', 'left', 'right', 'id')
+
     def __init__(self, left: Expr, label: str, right: Expr, position: Position):
         self.binary_enum, self.label = BinaryEnum.clean_label(label)
         Expr.__init__(self, label, position)
@@ -54,6 +60,8 @@ class BinaryExpr(Expr):
 
 
 class CallMethodExpr(Expr):
+    __slots__ = ('expr', 'id', 'expr_list')
+
     def __init__(self, expr: Expr, id: str, params: ExprList, position: Position):
         Expr.__init__(self, expr.label, position)
         self.expr = expr
@@ -67,6 +75,8 @@ class ValueEnum(Enum):
 
 
 class ValueExpr(Expr):
+    __slots__ = ('value_enum', 'value')
+
     def __init__(self, value_enum, value, position):
         Expr.__init__(self, value, position)
         self.value_enum = value_enum
@@ -74,36 +84,48 @@ class ValueExpr(Expr):
 
 
 class Id(Expr):
+    __slots__ = ('name',)
+
     def __init__(self, name, position: Position):
         Expr.__init__(self, name, position)
         self.name = name
 
 
 class LengthExpr(Expr):
+    __slots__ = ('obj',)
+
     def __init__(self, obj, position):
         Expr.__init__(self, "Length", position)
         self.obj = obj
 
 
 class NewIntArrExpr(Expr):
+    __slots__ = ('size',)
+
     def __init__(self, size, position):
         Expr.__init__(self, 'NewIntArrExpr', position)
         self.size = size
 
 
 class NewObjectExpr(Expr):
+    __slots__ = ('id',)
+
     def __init__(self, id, position):
         Expr.__init__(self, "NewObjectExpr", position)
         self.id = id
 
 
 class NotExpr(Expr):
+    __slots__ = ('right',)
+
     def __init__(self, right, position):
         Expr.__init__(self, "NotExpr", position)
         self.right = right
 
 
 class RandomAccessExpr(Expr):
+    __slots__ = ('object', 'position_in_arr')
+
     def __init__(self, object, position_in_arr, position):
         Expr.__init__(self, "RandomAccessExpr", position)
         self.object = object
@@ -111,5 +133,7 @@ class RandomAccessExpr(Expr):
 
 
 class ThisExpr(Expr):
+    __slots__ = ()
+
     def __init__(self, position):
         Expr.__init__(self, "ThisExpr", position)
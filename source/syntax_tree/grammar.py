@@ -9,6 +9,8 @@ class Program(Visitable):
     Корень дерева - включает в себя главный класс и список классов
     """
 
+    __slots__ = ('main', 'class_decl_list')
+
     def __init__(self, main: MainClass, classes: Optional[ClassDeclList], position):
         Visitable.__init__(self, position)
         self.main = main
@@ -9,102 +9,81 @@ class Printer(Visitor):
     def __init__(self, path):
         Visitor.__init__(self)
         self.path = path
-        self.out = 'digraph g {graph [ rankdir = LR ]; ' \
-                   'node [fontsize="18" shape="record"]; ' \
-                   'edge [];' \
-                   '\n'
+        # Части текста копятся в списке - склейка строки на каждом узле квадратична #
+        self.out = ['digraph g {graph [ rankdir = LR ]; '
+                    'node [fontsize="18" shape="record"]; '
+                    'edge [];'
+                    '\n']
 
     def print_to_file(self):
-        self.out = self.out + "}"
+        self.out.append("}")
         with open(self.path, 'w+') as file:
-            file.write(self.out)
+            file.write(''.join(self.out))
         print(f'Абстрактное синтаксическое дерево сохранено в файл {self.path}')
 
     def print_edge(self, obj_from, obj_to, label=None):
         if label is None:
-            self.out = self.out + "\tnode" + str(id(obj_from)) + "->" + "node" + str(id(obj_to)) + "\n"
+            self.out.append("\tnode" + str(id(obj_from)) + "->" + "node" + str(id(obj_to)) + "\n")
         else:
-            self.out = self.out + "\tnode" + str(id(obj_from)) + "->" + "node" + str(
-                id(obj_to)) + "[label=\"" + label + "\"]\n"
+            self.out.append("\tnode" + str(id(obj_from)) + "->" + "node" + str(
+                id(obj_to)) + "[label=\"" + label + "\"]\n")
 
     def print_vertex(self, node, label):
-        self.out = self.out + "\tnode" + str(id(node)) + "[label=\"" + str(label) + "\"]\n"
-
-    def visit(self, obj):
-        if isinstance(obj, BinaryExpr):
-            self.visit_binary_expr(obj)
-        elif isinstance(obj, Id):
-            self.visit_id(obj)
-        elif isinstance(obj, ClassDecl):
-            self.visit_class_decl(obj)
-        elif isinstance(obj, MainClass):
-            self.visit_main_class(obj)
-        elif isinstance(obj, MethodDecl):
-            self.visit_method_decl(obj)
-        elif isinstance(obj, Program):
-            self.visit_program(obj)
-        elif isinstance(obj, ValueExpr):
-            self.visit_value_expr(obj)
-        elif isinstance(obj, AssignStatement):
-            self.visit_assign_statement(obj)
-        elif isinstance(obj, IfStatement):
-            self.visit_if_statement(obj)
-        elif isinstance(obj, NotExpr):
-            self.visit_not_expr(obj)
-        elif isinstance(obj, CallMethodExpr):
-            self.visit_call_method_expr(obj)
-        elif isinstance(obj, NewIntArrExpr):
-            self.visit_new_int_array_expr(obj)
-        elif isinstance(obj, NewObjectExpr):
-            self.visit_new_object_expr(obj)
-        elif isinstance(obj, RandomAccessAssignStatement):
-            self.visit_random_access_assign_statement(obj)
-        elif isinstance(obj, LengthExpr):
-            self.visit_length_expr(obj)
-        elif isinstance(obj, PrintLineStatement):
-            self.visit_print_line_statement(obj)
-        elif isinstance(obj, WhileStatement):
-            self.visit_while_statement(obj)
-        elif isinstance(obj, Statements):
-            self.visit_statements(obj)
-        elif isinstance(obj, RandomAccessExpr):
-            self.visit_random_access_expr(obj)
-        elif isinstance(obj, ArgDecl):
-            self.visit_arg_decl(obj)
-        elif isinstance(obj, VarDecl):
-            self.visit_var_decl(obj)
-        elif isinstance(obj, ThisExpr):
-            self.visit_this_expr(obj)
-        elif isinstance(obj, ReturnStatement):
-            self.visit_return_statement(obj)
+        self.out.append("\tnode" + str(id(node)) + "[label=\"" + str(label) + "\"]\n")
+
+    visit_methods = {
+        BinaryExpr: 'visit_binary_expr',
+        Id: 'visit_id',
+        ClassDecl: 'visit_class_decl',
+        MainClass: 'visit_main_class',
+        MethodDecl: 'visit_method_decl',
+        Program: 'visit_program',
+        ValueExpr: 'visit_value_expr',
+        AssignStatement: 'visit_assign_statement',
+        IfStatement: 'visit_if_statement',
+        NotExpr: 'visit_not_expr',
+        CallMethodExpr: 'visit_call_method_expr',
+        NewIntArrExpr: 'visit_new_int_array_expr',
+        NewObjectExpr: 'visit_new_object_expr',
+        RandomAccessAssignStatement: 'visit_random_access_assign_statement',
+        LengthExpr: 'visit_length_expr',
+        PrintLineStatement: 'visit_print_line_statement',
+        WhileStatement: 'visit_while_statement',
+        Statements: 'visit_statements',
+        RandomAccessExpr: 'visit_random_access_expr',
+        ArgDecl: 'visit_arg_decl',
+        VarDecl: 'visit_var_decl',
+        ThisExpr: 'visit_this_expr',
+        ReturnStatement: 'visit_return_statement',
+    }
 
     def visit_program(self, obj: Program):
         self.print_vertex(obj, f"Program | {obj.position}")
-        obj.main.accept(self)
+        yield obj.main
         self.print_edge(obj, obj.main)
         if obj.class_decl_list is not None:
             for class_decl in obj.class_decl_list:
-                class_decl.accept(self)
+                yield class_decl
                 self.print_edge(obj, class_decl)
 
     def visit_main_class(self, obj: MainClass):
         self.print_vertex(obj, f"Main Class | {obj.id.name} | {obj.position}")
-        obj.id.accept(self)
+        yield obj.id
         self.print_edge(obj, obj.id)
         if obj.statement_list is not None:
             for statement in obj.statement_list:
-                statement.accept(self)
+                yield statement
                 self.print_edge(obj, statement)
 
     def visit_class_decl(self, obj: ClassDecl):
         extends = "| extends " + obj.extends.name if obj.extends is not None else ""
         self.print_vertex(obj, f'Class | {obj.id.name} {extends} '
                                f'| {obj.position}')
-        obj.id.accept(self)
+        yield obj.id
         self.print_edge(obj, obj.id)
         if obj.method_decl_list is not None:
             for method in obj.method_decl_list:
-                method.accept(self)
+                yield method
                 self.print_edge(obj, method)
 
     def visit_var_decl(self, obj: VarDecl):
@@ -116,27 +95,27 @@ class Printer(Visitor):
     def visit_method_decl(self, obj: MethodDecl):
         self.print_vertex(obj, f'Method | {obj.access_modifier} {obj.type_of.label} {obj.id.name}() | '
                                f'{obj.id.position}')
-        obj.id.accept(self)
+        yield obj.id
         self.print_edge(obj, obj.id)
         if obj.var_decl_list is not None:
             for var in obj.var_decl_list:
-                var.accept(self)
+                yield var
                 self.print_edge(obj, var, 'local var')
         if obj.statement_list is not None:
             for statement in obj.statement_list:
-                statement.accept(self)
+                yield statement
                 self.print_edge(obj, statement)
         if obj.arg_decl_list is not None:
             for arg in obj.arg_decl_list:
-                arg.accept(self)
+                yield arg
                 self.print_edge(obj, arg, 'argument')
-        obj.return_statement.accept(self)
+        yield obj.return_statement
         self.print_edge(obj, obj.return_statement, 'returns')
 
     def visit_binary_expr(self, obj: BinaryExpr):
         self.print_vertex(obj, f'Binary | {self.format_binary(obj)} | {obj.position}')
-        obj.left.accept(self)
-        obj.right.accept(self)
+        yield obj.left
+        yield obj.right
         self.print_edge(obj, obj.right, 'right')
         self.print_edge(obj, obj.left, 'left')
 
@@ -152,84 +131,84 @@ class Printer(Visitor):
 
     def visit_assign_statement(self, obj: AssignStatement):
         self.print_vertex(obj, f'Assign | {obj.left.name} | {obj.position}')
-        obj.left.accept(self)
-        obj.right.accept(self)
+        yield obj.left
+        yield obj.right
         self.print_edge(obj, obj.left)
         self.print_edge(obj, obj.right)
 
     def visit_if_statement(self, obj: IfStatement):
         self.print_vertex(obj, f'If Else | {obj.position}')
-        obj.condition.accept(self)
+        yield obj.condition
         self.print_edge(obj, obj.condition, 'condition')
-        obj.if_false.accept(self)
+        yield obj.if_false
         self.print_edge(obj, obj.if_false, 'if False')
-        obj.if_true.accept(self)
+        yield obj.if_true
         self.print_edge(obj, obj.if_true, 'if True')
 
     def visit_not_expr(self, obj: NotExpr):
         self.print_vertex(obj, f'not | {obj.position}')
-        obj.right.accept(self)
+        yield obj.right
         self.print_edge(obj, obj.right)
 
     def visit_call_method_expr(self, obj: CallMethodExpr):
         self.print_vertex(obj, f' .{obj.id.name}() | {obj.position}')
-        obj.id.accept(self)
+        yield obj.id
         self.print_edge(obj, obj.id)
-        obj.expr.accept(self)
+        yield obj.expr
         self.print_edge(obj, obj.expr)
         if obj.expr_list is not None:
             for param in obj.expr_list:
-                param.accept(self)
+                yield param
                 self.print_edge(obj, param, 'parameter')
 
     def visit_new_int_array_expr(self, obj: NewIntArrExpr):
         self.print_vertex(obj, f'new int [] | {obj.position}')
-        obj.size.accept(self)
+        yield obj.size
         self.print_edge(obj, obj.size, 'size')
 
     def visit_new_object_expr(self, obj: NewObjectExpr):
         self.print_vertex(obj, f'new | {obj.position}')
-        obj.id.accept(self)
+        yield obj.id
         self.print_edge(obj, obj.id)
 
     def visit_random_access_assign_statement(self, obj: RandomAccessAssignStatement):
         self.print_vertex(obj, f'Assign | {obj.id.name}[{obj.position_in_arr}] | {obj.position}')
-        obj.id.accept(self)
+        yield obj.id
         self.print_edge(obj, obj.id, 'array')
-        obj.position_in_arr.accept(self)
+        yield obj.position_in_arr
         self.print_edge(obj, obj.position_in_arr, 'position')
-        obj.expr.accept(self)
+        yield obj.expr
         self.print_edge(obj, obj.expr)
 
     def visit_length_expr(self, obj: LengthExpr):
         self.print_vertex(obj, f'Length | {obj.position}')
-        obj.obj.accept(self)
+        yield obj.obj
         self.print_edge(obj, obj.obj, 'object')
 
     def visit_print_line_statement(self, obj: PrintLineStatement):
         self.print_vertex(obj, f'Println | {obj.position}')
-        obj.obj.accept(self)
+        yield obj.obj
         self.print_edge(obj, obj.obj)
 
     def visit_while_statement(self, obj: WhileStatement):
         self.print_vertex(obj, f'While | {obj.position}')
-        obj.condition.accept(self)
+        yield obj.condition
         self.print_edge(obj, obj.condition, 'condition')
-        obj.action.accept(self)
+        yield obj.action
         self.print_edge(obj, obj.action, 'action')
 
     def visit_statements(self, obj: Statements):
         self.print_vertex(obj, f'Statements[] | {obj.position}')
         if obj.statement_list is not None:
             for statement in obj.statement_list:
-                statement.accept(self)
+                yield statement
                 self.print_edge(obj, statement)
 
     def visit_random_access_expr(self, obj: RandomAccessExpr):
         self.print_vertex(obj, f'[] | {obj.position}')
-        obj.object.accept(self)
+        yield obj.object
         self.print_edge(obj, obj.object, 'array')
-        obj.position_in_arr.accept(self)
+        yield obj.position_in_arr
         self.print_edge(obj, obj.position_in_arr, 'index')
 
     def visit_this_expr(self, obj: ThisExpr):
@@ -237,7 +216,7 @@ class Printer(Visitor):
 
     def visit_return_statement(self, obj: ReturnStatement):
         self.print_vertex(obj, f'Return | {obj.position}')
-        obj.expression.accept(self)
+        yield obj.expression
         self.print_edge(obj, obj.expression)
 
     def format_binary(self, obj:BinaryExpr):
@@ -2,11 +2,15 @@ from .base import Visitable
 
 
 class Statement(Visitable):
+    __slots__ = ()
+
     def __init__(self, position):
         Visitable.__init__(self, position)
 
 
 class StatementList:
+    __slots__ = ('statement_list',)
+
     def __init__(self, statement, prev=None):
         if prev is None:
             self.statement_list = []
@@ -16,12 +20,16 @@ class StatementList:
 
 
 class Statements(Statement):
+    __slots__ = ('statement_list',)
+
     def __init__(self, statement_list):
         Statement.__init__(self, None)
         self.statement_list = statement_list.statement_list
 
 
 class AssignStatement(Statement):
+    __slots__ = ('left', 'right')
+
     def __init__(self, left, right, position):
         Statement.__init__(self, position)
         self.left = left
@@ -29,6 +37,8 @@ class AssignStatement(Statement):
 
 
 class IfStatement(Statement):
+    __slots__ = ('condition', 'if_true', 'if_false')
+
     def __init__(self, condition, if_true, if_false, position):
         Statement.__init__(self, position)
         self.condition = condition
@@ -37,12 +47,16 @@ class IfStatement(Statement):
 
 
 class PrintLineStatement(Statement):
+    __slots__ = ('obj',)
+
     def __init__(self, obj, position):
         Statement.__init__(self, position)
         self.obj = obj
 
 
 class RandomAccessAssignStatement(Statement):
+    __slots__ = ('id', 'position_in_arr', 'expr')
+
     def __init__(self, id, position_in_arr, expr, position):
         Statement.__init__(self, position)
         self.id = id
@@ -51,6 +65,8 @@ class RandomAccessAssignStatement(Statement):
 
 
 class WhileStatement(Statement):
+    __slots__ = ('condition', 'action')
+
     def __init__(self, condition, action, position):
         Statement.__init__(self, position)
         self.condition = condition
@@ -58,6 +74,8 @@ class WhileStatement(Statement):
 
 
 class ReturnStatement(Statement):
+    __slots__ = ('expression',)
+
     def __init__(self, expression, position):
         Statement.__init__(self, position)
         self.expression = expression
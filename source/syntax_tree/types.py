@@ -1,14 +1,20 @@
 class Type:
+    __slots__ = ('label',)
+
     def __init__(self, label):
         self.label = label
 
 
 class BasicType(Type):
+    __slots__ = ()
+
     def __init__(self, label):
         Type.__init__(self, label)
 
 
 class ClassType(Type):
+    __slots__ = ('id',)
+
     def __init__(self, id):
         Type.__init__(self, id.name)
         self.id = id
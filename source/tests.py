@@ -1,19 +1,51 @@
 import os
+import random
+import re
 import sys
+import tempfile
+from enum import Enum
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 import click
 
 from activation_records.frame_filler import FrameFiller
-from ir_tree.translate.eseq_canonizer import EseqCanonizer
+from activation_records.in_reg_access import InRegAccess
+from code_generation.instruction import LabelInstruction
+from driver import build_ir, collect_files, compile_files, compile_method, compile_methods, output_paths, run_driver
+from flow_graph.control_flow_graph import ControlFlowGraph
+from framework.ast_cache import AstCache
+from framework.compilation_context import CompilationContext
+from framework.program_generator import ProgramGenerator
+from ir_tree.array_struct import bounds_checks
+from ir_tree.expressions.all import Binop, BinopEnum, Call, Const, Mem, Name, Temp, UnaryOp, UnaryOpEnum
+from ir_tree.label import Label
+from ir_tree.list import ExpList, StmList
+from ir_tree.name_conventions import BOUNDS_ERROR_NAME, FP_NAME
+from ir_tree.statements.all import Exp, Jump, JumpC, JumpTypeEnum, LabelStm, Move
+from ir_tree.structural_hash import StructuralHash
 from ir_tree.translate.ir_builder import IRBuilder
 from ir_tree.translate.ir_printer import IRPrinter
-from ir_tree.translate.linearizer import Linearizer
+from ir_tree.translate.exp_wrapper import ExpWrapper
+from ir_tree.translate.stm_wrapper import StmWrapper
+from optimization.bounds_checks import BoundsCheckElimination
+from optimization.common_subexpressions import CommonSubexpressionElimination
+from optimization.constant_folding import BOOLEAN_VALUES, TRUE_TEMP_NAME, WORD_BITS, ConstantFolder, \
+    condition_value, constant_value, evaluate_binop, wrap_word
+from optimization.dead_code import DeadCodeElimination
+from optimization.frame_promotion import FramePromotion, frame_slots
+from optimization.induction_variables import InductionVariableReduction
+from optimization.loop_invariants import LoopInvariantCodeMotion
+from optimization.value_ranges import ValueRangeAnalysis
+from optimization.pass_manager import OPTIMIZATION_LEVELS, MethodUnit, PassManager, PassReport
 from symbol_table.table import Table
 from symbol_table.table_filler import TableFiller
-from syntax_tree import Printer
+from syntax_tree import Position, Printer, node_fields
 from type_checker.type_checker import TypeChecker
-from yacc import parse_program
+from x86.strength_reduction import X86_COST_MODEL, CostModel, multiply_plan
+from x86.x86_code_generation import Muncher
+from x86.x86_instruction_set import Regs
+from yacc import GRAMMAR_HASH, PARSER_BACKENDS, Parser, parse_file, parse_program, parse_source
 
 
 # TODO обновить тесты с учетом example! Хотя нужно ли заполнение class struct сейчас?
@@ -198,8 +230,9 @@ def run_ir_tests():
         program = parse_program(Path("../samples/good") / Path(sample))
         print()
 
-        table = Table()
-        filler = TableFiller(table, verbose=False)
+        context = CompilationContext()
+        table = context.table
+        filler = TableFiller(table, verbose=False, context=context)
         filler.fill_table(program)
         table = filler.table
 
@@ -209,10 +242,10 @@ def run_ir_tests():
         filler.fill_class_struct()
         table = filler.table
 
-        frame_filler = FrameFiller(table, verbose=False)
+        frame_filler = FrameFiller(table, verbose=False, context=context)
         frame_filler.fill()
 
-        builder = IRBuilder(table)
+        builder = IRBuilder(table, context)
         builder.parse(program)
         trees = builder.trees
 
@@ -222,6 +255,21 @@ def run_ir_tests():
         print()
 
 
+def method_units(trees, context: CompilationContext, passes) -> list:
+    """
+    Проводит методы через проходы (PassManager), каждый - со своим CompilationContext.fork
+    :param trees: IR деревья методов (IRBuilder.trees)
+    :param context: контекст компиляции после IRBuilder
+    :param passes: имена проходов
+    :return: методы (MethodUnit) после проходов в порядке trees
+    """
+    manager = PassManager(passes)
+    units = [MethodUnit(key, tree, context.fork(index)) for index, (key, tree) in enumerate(trees.items())]
+    for unit in units:
+        manager.run(unit)
+    return units
+
+
 def run_cir_tests():
     """
     Прогоняет тесты канонизации IR деревьев
@@ -245,8 +293,9 @@ def run_cir_tests():
         program = parse_program(Path("../samples/good") / Path(sample))
         print()
 
-        table = Table()
-        filler = TableFiller(table, verbose=False)
+        context = CompilationContext()
+        table = context.table
+        filler = TableFiller(table, verbose=False, context=context)
         filler.fill_table(program)
         table = filler.table
 
@@ -256,18 +305,14 @@ def run_cir_tests():
         filler.fill_class_struct()
         table = filler.table
 
-        frame_filler = FrameFiller(table, verbose=False)
+        frame_filler = FrameFiller(table, verbose=False, context=context)
         frame_filler.fill()
 
-        builder = IRBuilder(table)
+        builder = IRBuilder(table, context)
         builder.parse(program)
         trees = builder.trees
 
-        canonizer = EseqCanonizer()
-        canonized_trees = dict()
-        for key, tree in trees.items():
-            canonized_tree = canonizer.canonize(tree)
-            canonized_trees[key] = canonized_tree
+        canonized_trees = {unit.key: unit.tree for unit in method_units(trees, context, ['canonize'])}
 
         printer = IRPrinter(Path('../tests/cir_tree/good') / Path(sample.replace('.java', '.gv')))
         printer.create_graph(canonized_trees)
@@ -298,8 +343,9 @@ def run_lir_tests():
         program = parse_program(Path("../samples/good") / Path(sample))
         print()
 
-        table = Table()
-        filler = TableFiller(table, verbose=False)
+        context = CompilationContext()
+        table = context.table
+        filler = TableFiller(table, verbose=False, context=context)
         filler.fill_table(program)
         table = filler.table
 
@@ -309,24 +355,14 @@ def run_lir_tests():
         filler.fill_class_struct()
         table = filler.table
 
-        frame_filler = FrameFiller(table, verbose=False)
+        frame_filler = FrameFiller(table, verbose=False, context=context)
         frame_filler.fill()
 
-        builder = IRBuilder(table)
+        builder = IRBuilder(table, context)
         builder.parse(program)
         trees = builder.trees
 
-        canonizer = EseqCanonizer()
-        canonized_trees = dict()
-        for key, tree in trees.items():
-            canonized_tree = canonizer.canonize(tree)
-            canonized_trees[key] = canonized_tree
-
-        linearizer = Linearizer()
-        linearized = dict()
-        for tree_key, tree_value in canonized_trees.items():
-            linearized[tree_key] = []
-            linearized[tree_key] = linearizer.linearize(tree_value, linearized[tree_key])
+        linearized = {unit.key: unit.linear for unit in method_units(trees, context, ['canonize', 'linearize'])}
 
         printer = IRPrinter(Path('../tests/lir_tree/good') / Path(sample.replace('.java', '.gv')))
         printer.create_linearized_graph(linearized)
@@ -334,9 +370,1380 @@ def run_lir_tests():
         print()
 
 
+def collect_positions(node, result=None):
+    """
+    Собирает расположения всех узлов AST в порядке обхода
+    :param node: корень (под)дерева
+    :param result: список, в который добавляются пары (узел, расположение)
+    :return:
+    """
+    if result is None:
+        result = []
+    if isinstance(node, list):
+        for item in node:
+            collect_positions(item, result)
+    elif type(node).__module__.startswith('syntax_tree'):
+        position = getattr(node, 'position', None)
+        if isinstance(position, Position):
+            result.append((type(node).__name__, position.x, position.y))
+        for _, value in node_fields(node):
+            collect_positions(value, result)
+    return result
+
+
+def check_position(lines, node):
+    """
+    Проверяет, что расположение узла указывает на непробельный символ исходного кода
+    В первой строке столбец считается от нуля (так устроен yacc.find_column)
+    :param lines: строки исходного кода
+    :param node: тройка (имя класса узла, столбец, строка)
+    :return:
+    """
+    name, x, y = node
+    assert 1 <= y <= len(lines), f'{name}: строка {y} вне файла'
+    index = x if y == 1 and x != 1 else x - 1
+    line = lines[y - 1]
+    assert 0 <= index < len(line) and not line[index].isspace(), f'{name}: ({y}, {x}) не указывает на токен'
+
+
+def run_parser_stress_tests(count=300, jobs=8):
+    """
+    Разбирает сотни сгенерированных программ одновременно из пула потоков
+    и сверяет все расположения с последовательным разбором
+    :param count: количество программ
+    :param jobs: количество потоков
+    :return:
+    """
+    print("### Стресс-тест парсера ###")
+    print()
+
+    indents = ('    ', '\t', '  ')
+    with tempfile.TemporaryDirectory() as directory:
+        paths = []
+        for index in range(count):
+            generator = ProgramGenerator(seed=index, indent=indents[index % len(indents)])
+            path = Path(directory) / Path(f'Generated{index}.java')
+            path.write_text(generator.generate(classes=1 + index % 3, methods=1 + index % 4, statements=5 + index % 20))
+            paths.append(path)
+
+        parser = Parser()
+        expected = []
+        for path in paths:
+            positions = collect_positions(parser.parse_file(path))
+            lines = path.read_text().split('\n')
+            for node in positions:
+                check_position(lines, node)
+            expected.append(positions)
+
+        with ThreadPoolExecutor(max_workers=jobs) as executor:
+            programs = list(executor.map(parse_file, paths))
+
+    checked = 0
+    for path, program, positions in zip(paths, programs, expected):
+        actual = collect_positions(program)
+        assert actual == positions, f'Расположения в {path.name} отличаются от последовательного разбора'
+        checked += len(actual)
+    print(f'Разобрано программ: {count}, потоков: {jobs}, проверено расположений: {checked}')
+    print()
+
+
+def dump_tree(node):
+    """
+    Строит структурное представление AST (классы, поля и расположения узлов)
+    для сравнения деревьев, построенных разными парсерами
+    :param node: корень (под)дерева
+    :return:
+    """
+    if isinstance(node, list):
+        return [dump_tree(item) for item in node]
+    if isinstance(node, Position):
+        return node.x, node.y
+    if type(node).__module__.startswith('syntax_tree') and not isinstance(node, Enum):
+        return type(node).__name__, sorted((key, dump_tree(value)) for key, value in node_fields(node))
+    return repr(node)
+
+
+def parse_outcome(text, backend):
+    """
+    Разбирает программу и возвращает либо дерево, либо возникшую ошибку
+    :param text: исходный код
+    :param backend: реализация парсера
+    :return:
+    """
+    try:
+        return dump_tree(parse_source(text, backend))
+    except Exception as error:
+        return type(error).__name__, str(error)
+
+
+# Программы на тонкие места грамматики: приоритеты, пустые аргументы, перевод строки внутри токена #
+PARSER_EDGE_CASES = [
+    'class M { public static void main(String[] a) { x = !a.b()[1] < 2 + 3 * 4 % 5 - 6 && c || d; } }\n'
+    'class B extends A { int[] x; A y; public int f(, int a, B b) { A z; z = new A(); return (z).g(); } }',
+    'class M {\n  public static\nvoid\tmain(String[] a) { x = (((1))); y = new int[5][2]; }\n}\n'
+    'class A { private boolean g() { // comment\n return this.x(1, 2).length; } }\n',
+    'class M { public static void main(String[] a) { { if (true) x[1] = 2; else while (false) {y = 3;} } } }'
+    'class A { public int f() { int a; a = 1; } }',
+    'class M { public static void main(String[] a) { x = 007; } } class A { }',
+    'class M { public static void main(String[] a) { x = 1; } } class A { int x; x = 2; }',
+    'class M { public static void main(String[] a) { x = 1; } } class A { public int f() { return 1 } }',
+    'class M { public static void main(String[] a) { x = 1; } } class A { public int f() { int a; } }',
+    'class M { public static void main(String[] a) { x = a[1 + ]; } }',
+    'class M { public static void main(String[] a) { x = 1; } }\r\n',
+    '',
+]
+
+
+def run_parser_backend_tests(count=200):
+    """
+    Сверяет рукописный парсер с парсером PLY: деревья, расположения и ошибки
+    на всех примерах и на сгенерированных программах (в том числе записанных в одну строку)
+    :param count: количество сгенерированных программ
+    :return:
+    """
+    print("### Тесты парсеров (ply против rd) ###")
+    print()
+
+    texts = [(f'Edge{index}', text) for index, text in enumerate(PARSER_EDGE_CASES)]
+    for directory in ('../samples/good', '../samples/bad'):
+        for sample in os.listdir(directory):
+            texts.append((sample, (Path(directory) / Path(sample)).read_text()))
+
+    indents = ('    ', '\t', ' ')
+    for index in range(count):
+        generator = ProgramGenerator(seed=index, indent=indents[index % len(indents)])
+        text = generator.generate(classes=1 + index % 3, methods=1 + index % 4, statements=5 + index % 20, depth=3)
+        texts.append((f'Generated{index}', text))
+        texts.append((f'Generated{index} (одна строка)', text.replace('\n', ' ')))
+        # Обрезанная программа проверяет совпадение синтаксических ошибок #
+        texts.append((f'Generated{index} (обрезана)', text[:len(text) * (index % 10 + 1) // 11]))
+
+    for name, text in texts:
+        expected = parse_outcome(text, 'ply')
+        for backend in PARSER_BACKENDS:
+            assert parse_outcome(text, backend) == expected, f'{name}: {backend} расходится с ply'
+    print(f'Проверено программ: {len(texts)}, парсеры: {", ".join(PARSER_BACKENDS)}')
+    print()
+
+
+def run_ast_cache_tests(count=50):
+    """
+    Проверяет дисковый кэш AST: деревья из кэша совпадают с разобранными,
+    смена версии грамматики и повреждение записи сбрасывают кэш, размер кэша ограничен
+    :param count: количество сгенерированных программ
+    :return:
+    """
+    print("### Тесты кэша AST ###")
+    print()
+
+    texts = [ProgramGenerator(seed=index).generate(classes=1 + index % 3, methods=1 + index % 4,
+                                                   statements=5 + index % 20) for index in range(count)]
+    with tempfile.TemporaryDirectory() as directory:
+        cache = AstCache(directory, GRAMMAR_HASH)
+        expected = [dump_tree(parse_source(text, cache=cache)) for text in texts]
+        assert cache.misses == count and cache.hits == 0, 'Первый разбор не должен попадать в кэш'
+
+        # Новый объект кэша в том же каталоге - как повторный запуск сборки #
+        cache = AstCache(directory, GRAMMAR_HASH)
+        for text, tree in zip(texts, expected):
+            assert dump_tree(parse_source(text, cache=cache)) == tree, 'Дерево из кэша отличается от разобранного'
+        assert cache.hits == count and cache.misses == 0, 'Повторный разбор должен браться из кэша'
+
+        other = AstCache(directory, GRAMMAR_HASH + 'x')
+        assert other.get(texts[0]) is None, 'Кэш другой версии грамматики не должен использоваться'
+
+        Path(cache.path(cache.key(texts[0]))).write_bytes(b'broken')
+        assert cache.get(texts[0]) is None, 'Поврежденная запись должна считаться отсутствующей'
+        assert not os.path.exists(cache.path(cache.key(texts[0]))), 'Поврежденная запись должна удаляться'
+
+    with tempfile.TemporaryDirectory() as directory:
+        cache = AstCache(directory, GRAMMAR_HASH)
+        for text in texts[:2]:
+            parse_source(text, cache=cache)
+        cache.get(texts[0])
+        keys = [cache.key(text) for text in texts[:2]]
+        assert list(cache.entries) == keys[::-1], 'Обращение к записи должно делать ее последней в порядке вытеснения'
+
+        # Лимит на две записи: новая запись вытесняет самые давно использованные, #
+        # а запись больше лимита не сохраняется вовсе #
+        cache.max_bytes = cache.size
+        for text in texts[2:]:
+            parse_source(text, cache=cache)
+            total = sum(os.path.getsize(Path(directory) / name) for name in os.listdir(directory))
+            assert total == cache.size <= cache.max_bytes, 'Размер кэша превышает лимит'
+            stored = os.path.exists(cache.path(cache.key(text)))
+            assert stored == (cache.key(text) in cache.entries), 'Индекс кэша расходится с каталогом'
+        print(f'Записей в кэше после вытеснения: {len(cache.entries)} из {count}, байт: {cache.size}')
+    print()
+
+
+def run_driver_tests(count=20, jobs=4):
+    """
+    Компилирует примеры и сгенерированные программы в пуле процессов
+    и сверяет результаты с последовательной компиляцией
+    :param count: количество сгенерированных программ
+    :param jobs: количество процессов
+    :return:
+    """
+    print("### Тесты пакетной компиляции ###")
+    print()
+
+    with tempfile.TemporaryDirectory() as directory:
+        for index in range(count):
+            generator = ProgramGenerator(seed=index)
+            path = Path(directory) / Path(f'Generated{index}.java')
+            path.write_text(generator.generate(classes=1 + index % 3, methods=1 + index % 4, statements=5 + index % 10))
+        paths = [file for _, file in collect_files(['../samples/good', '../samples/bad', directory])]
+
+        expected = {result.path: result for result in compile_files(paths)}
+        actual = {result.path: result for result in compile_files(paths, jobs)}
+
+    assert sorted(actual) == sorted(expected) == sorted(map(str, paths)), 'Получены результаты не для всех файлов'
+    for path, result in expected.items():
+        assert (result.code, result.error) == (actual[path].code, actual[path].error), \
+            f'{path}: результат в пуле отличается от последовательной компиляции'
+        assert result.ok == ('samples/bad' not in path), f'{path}: {result.error}'
+    print(f'Скомпилировано файлов: {len(paths)}, процессов: {jobs}')
+
+    # одноименные файлы из разных папок пишутся по своим относительным путям, а не друг поверх друга #
+    with tempfile.TemporaryDirectory() as directory:
+        sources, output = Path(directory) / 'src', Path(directory) / 'out'
+        for index, folder in enumerate(['a', 'b']):
+            os.makedirs(sources / folder)
+            (sources / folder / 'X.java').write_text(ProgramGenerator(seed=index).generate(classes=1, statements=5))
+        run_driver.main([str(sources), '--jobs', str(jobs), '--output', str(output)], standalone_mode=False)
+        for index, folder in enumerate(['a', 'b']):
+            expected = compile_files([sources / folder / 'X.java'])
+            assert (output / folder / 'X.asm').read_text() == next(expected).code, f'{folder}/X.asm не записан'
+        try:
+            output_paths(collect_files([sources / 'a' / 'X.java', sources / 'b' / 'X.java']), output)
+        except click.UsageError:
+            pass
+        else:
+            assert False, 'Совпадение путей результатов не обнаружено'
+    print()
+
+
+def program_texts(programs: int, statements: int = 10, spread: int = 1, methods: int = 1, **options) -> list:
+    """
+    Примеры из samples/good и сгенерированные программы (ProgramGenerator с seed = номер программы)
+    :param programs: количество сгенерированных программ
+    :param statements: количество операторов в методах сгенерированных программ
+    :param spread: у программы с номером index операторов statements + index % spread
+    :param methods: у программы с номером index методов в классе methods + index % 4
+    :param options: остальные параметры ProgramGenerator.generate
+    :return: исходные коды программ
+    """
+    texts = [(Path('../samples/good') / Path(sample)).read_text() for sample in os.listdir('../samples/good')]
+    texts += [ProgramGenerator(seed=index).generate(classes=1 + index % 3, methods=methods + index % 4,
+                                                    statements=statements + index % spread, **options)
+              for index in range(programs)]
+    return texts
+
+
+def run_method_pipeline_tests(count=10, jobs=3):
+    """
+    Проводит методы через бэкенд (вместе с графами живости и конфликтов) в пуле процессов
+    и сверяет результаты и их порядок с последовательной обработкой
+    :param count: количество сгенерированных программ
+    :param jobs: количество процессов
+    :return:
+    """
+    print("### Тесты параллельного бэкенда методов ###")
+    print()
+
+    texts = program_texts(count, statements=3, methods=2)
+    methods = 0
+    for text in texts:
+        trees, context = build_ir(text)
+        keys = list(trees)
+        expected = compile_methods(trees, context, liveness=True)
+        trees, context = build_ir(text)
+        actual = compile_methods(trees, context, jobs, liveness=True)
+        assert [result.key for result in actual] == [result.key for result in expected] == keys, \
+            'Порядок методов отличается от порядка IRBuilder.trees'
+        for left, right in zip(expected, actual):
+            assert (left.instructions, left.interference) == (right.instructions, right.interference), \
+                f'{left.key}: результат в пуле отличается от последовательной обработки'
+        methods += len(keys)
+    print(f'Программ: {len(texts)}, методов: {methods}, процессов: {jobs}')
+    print()
+
+
+def run_deep_tree_tests(statements=5000, terms=3000):
+    """
+    Проводит через обходчики деревья, глубина которых больше лимита рекурсии:
+    тело метода из statements операторов и выражение из terms слагаемых (AST)
+    :param statements: количество операторов в методе
+    :param terms: количество слагаемых в выражении
+    :return:
+    """
+    print("### Тесты глубоких деревьев ###")
+    print()
+
+    # предыдущие тесты и пул процессов поднимают лимит, здесь нужен стандартный #
+    previous_limit = sys.getrecursionlimit()
+    limit = 1000
+    sys.setrecursionlimit(limit)
+    assert statements > limit and terms > limit, 'Деревья должны быть глубже лимита рекурсии'
+
+    def generate_program(body: str) -> str:
+        return ('class Main {\n    public static void main(String[] args) {\n'
+                '        System.out.println(new A().m());\n    }\n}\n'
+                'class A {\n    int a;\n    public int m() {\n' + body + '\n        return a;\n    }\n}\n')
+
+    with tempfile.TemporaryDirectory() as directory:
+        expression = ' + '.join(str(index % 10) for index in range(terms))
+        program = parse_source(generate_program(f'        a = {expression};'))
+        printer = Printer(Path(directory) / Path('deep_ast.gv'))
+        printer.visit(program)
+        printer.print_to_file()
+
+        text = generate_program('\n'.join(f'        a = a + {index % 7};' for index in range(statements)))
+        trees, context = build_ir(text)
+        printer = IRPrinter(Path(directory) / Path('deep_ir.gv'))
+        printer.create_graph(trees)
+        printer.print_to_file()
+
+        units = method_units(trees, context, ['canonize'])
+        printer = IRPrinter(Path(directory) / Path('deep_cir.gv'))
+        printer.create_graph({unit.key: unit.tree for unit in units})
+        printer.print_to_file()
+
+        for unit in units:
+            PassManager(['linearize']).run(unit)
+        linearized_trees = {unit.key: unit.linear for unit in units}
+        printer = IRPrinter(Path(directory) / Path('deep_lir.gv'))
+        printer.create_linearized_graph(linearized_trees)
+        printer.print_to_file()
+
+    trees, context = build_ir(text)
+    results = [compile_method(key, tree, context.fork(index)) for index, (key, tree) in enumerate(trees.items())]
+    assert len(results[-1].instructions) > statements, 'Метод скомпилирован не полностью'
+    assert sys.getrecursionlimit() == limit, 'Лимит рекурсии изменился'
+    sys.setrecursionlimit(previous_limit)
+    print(f'Операторов в методе: {statements}, слагаемых в выражении: {terms}, лимит рекурсии: {limit}')
+    print()
+
+
+def run_to_branch(tree, labels, position):
+    """
+    Исполняет линеаризованный метод с позиции position до условного перехода или выхода
+    :param tree: линеаризованный метод
+    :param labels: метка -> позиция в tree
+    :param position: позиция начала
+    :return: пара (id пройденных операторов, развилка): развилка - None при выходе из метода,
+    иначе (сравнение, левое выражение, правое выражение, позиция при истине, позиция при лжи)
+    """
+    passed = []
+    visited = set()
+    while position < len(tree) and position not in visited:
+        visited.add(position)
+        statement = tree[position]
+        if isinstance(statement, Jump):
+            position = labels[statement.label_to_jump]
+        elif isinstance(statement, JumpC):
+            jump_type, taken, fallen = statement.jump_type_enum, labels[statement.true_label], position + 1
+            # инвертированное условие сводится к исходному с переставленными целями #
+            if jump_type in (JumpTypeEnum.NEQ, JumpTypeEnum.GE):
+                jump_type, taken, fallen = jump_type.negate(), fallen, taken
+            return passed, (jump_type, id(statement.condition_left_expression),
+                            id(statement.condition_right_expression), taken, fallen)
+        else:
+            if not isinstance(statement, LabelStm):
+                passed.append(id(statement))
+            position += 1
+    return passed, None
+
+
+def same_control_flow(first, second) -> bool:
+    """
+    Проверяет, что две раскладки метода исполняют одни и те же операторы в одном порядке
+    при любых исходах условных переходов (совместный обход развилок)
+    :param first: линеаризованный метод
+    :param second: та же программа в другой раскладке
+    :return:
+    """
+    first_labels = {statement.label_name: i for i, statement in enumerate(first) if isinstance(statement, LabelStm)}
+    second_labels = {statement.label_name: i for i, statement in enumerate(second) if isinstance(statement, LabelStm)}
+    stack, visited = [(0, 0)], set()
+    while stack:
+        pair = stack.pop()
+        if pair in visited:
+            continue
+        visited.add(pair)
+        first_passed, first_branch = run_to_branch(first, first_labels, pair[0])
+        second_passed, second_branch = run_to_branch(second, second_labels, pair[1])
+        if first_passed != second_passed or (first_branch is None) != (second_branch is None):
+            return False
+        if first_branch is not None:
+            if first_branch[:3] != second_branch[:3]:
+                return False
+            stack.extend([(first_branch[3], second_branch[3]), (first_branch[4], second_branch[4])])
+    return True
+
+
+def run_trace_tests(count=40):
+    """
+    Сравнивает раскладку блоков трассами с раскладкой в исходном порядке:
+    управление должно проходить те же операторы, а безусловных переходов не должно стать больше
+    :param count: количество сгенерированных программ
+    :return:
+    """
+    print("### Тесты раскладки трассами ###")
+    print()
+
+    texts = program_texts(count, statements=5, spread=10)
+    before = after = methods = 0
+    for text in texts:
+        trees, context = build_ir(text)
+        for unit in method_units(trees, context, ['canonize', 'linearize']):
+            layouts = []
+            for layout in ('reblock', 'traces'):
+                copy = MethodUnit(unit.key, None, unit.context)
+                copy.linear = list(unit.linear)
+                PassManager([layout]).run(copy)
+                layouts.append(copy.linear)
+            key, (ordered, scheduled) = unit.key, layouts
+            assert same_control_flow(ordered, scheduled), f'{key}: раскладка трассами меняет поток управления'
+            before += sum(isinstance(statement, Jump) for statement in ordered)
+            after += sum(isinstance(statement, Jump) for statement in scheduled)
+            methods += 1
+    assert after <= before, 'Раскладка трассами добавила безусловные переходы'
+    print(f'Программ: {len(texts)}, методов: {methods}, переходов Jump: {before} -> {after}')
+    print()
+
+
+def naive_dominators(graph: ControlFlowGraph):
+    """
+    Множества доминаторов итерациями по определению: Dom(n) = {n} + пересечение Dom(p) по предшественникам
+    :param graph: граф потока управления
+    :return: для каждого достижимого блока - множество его доминаторов
+    """
+    reachable = set(graph.reverse_postorder())
+    dominators = {block: set(reachable) for block in reachable}
+    dominators[0] = {0}
+    changed = True
+    while changed:
+        changed = False
+        for block in reachable - {0}:
+            predecessors = [dominators[predecessor] for predecessor in graph.blocks[block].predecessors
+                            if predecessor in reachable]
+            new = set.intersection(*predecessors) | {block}
+            if new != dominators[block]:
+                dominators[block] = new
+                changed = True
+    return dominators
+
+
+def check_flow_graph(graph: ControlFlowGraph, name: str):
+    """
+    Сверяет дерево доминаторов с наивным алгоритмом и проверяет найденные циклы
+    :param graph: граф потока управления
+    :param name: имя метода для сообщений
+    :return: количество циклов
+    """
+    dominators = naive_dominators(graph)
+    for block, expected in dominators.items():
+        actual = {dominator for dominator in range(len(graph)) if graph.dominates(dominator, block)}
+        assert actual == expected, f'{name}: доминаторы блока {block} отличаются от наивного алгоритма'
+        for successor in graph.blocks[block].successors:
+            assert block in graph.blocks[successor].predecessors, f'{name}: ребра несимметричны'
+    for loop in graph.loops():
+        assert all(graph.dominates(loop.header, block) for block in loop.blocks), \
+            f'{name}: заголовок цикла не доминирует над его телом'
+        assert loop.parent is None or loop.blocks < loop.parent.blocks, f'{name}: цикл не вложен в родителя'
+        assert graph.loop_depth(loop.header) == loop.depth, f'{name}: неверная глубина цикла'
+    return len(graph.loops())
+
+
+def run_cfg_tests(count=40):
+    """
+    Строит графы потока управления по линеаризованным методам и по инструкциям
+    и проверяет доминаторы и циклы: циклов столько же, сколько while в программе
+    :param count: количество сгенерированных программ
+    :return:
+    """
+    print("### Тесты графа потока управления ###")
+    print()
+
+    texts = program_texts(count, statements=5, spread=10, depth=3)
+    blocks = loops = 0
+    for text in texts:
+        trees, context = build_ir(text)
+        tree_loops = instruction_loops = 0
+        for unit in method_units(trees, context, ['canonize', 'linearize']):
+            key = unit.key
+            graph = ControlFlowGraph.from_linear_tree(list(unit.linear))
+            tree_loops += check_flow_graph(graph, key)
+            PassManager(['reblock']).run(unit)
+            assert len(ControlFlowGraph.from_linear_tree(unit.linear).loops()) == len(graph.loops()), \
+                f'{key}: раскладка блоков изменила количество циклов'
+            PassManager(['munch']).run(unit)
+            instruction_loops += check_flow_graph(ControlFlowGraph.from_instructions(unit.instructions), key)
+            blocks += len(graph)
+        expected = text.count('while (')
+        assert tree_loops == instruction_loops == expected, f'Найдено циклов: {tree_loops}, ожидалось {expected}'
+        loops += expected
+    print(f'Программ: {len(texts)}, блоков: {blocks}, циклов: {loops}')
+    print()
+
+
+def run_pass_manager_tests(count=10):
+    """
+    Проводит методы через PassManager на всех уровнях оптимизации: размеры
+    представления между проходами согласованы, компиляция на каждом уровне совпадает
+    с прогоном явного списка его проходов
+    :param count: количество сгенерированных программ
+    :return:
+    """
+    print("### Тесты менеджера проходов ###")
+    print()
+
+    texts = program_texts(count, statements=8)
+    report = PassReport()
+    for text in texts:
+        results = dict()
+        for level in sorted(OPTIMIZATION_LEVELS):
+            trees, context = build_ir(text)
+            results[level] = compile_methods(trees, context, level=level, count_sizes=True)
+            for result in results[level]:
+                assert [record.name for record in result.records] == OPTIMIZATION_LEVELS[level], \
+                    f'{result.key}: проходы не совпадают с уровнем -O{level}'
+                for previous, record in zip(result.records, result.records[1:]):
+                    assert previous.size_after == record.size_before, f'{result.key}: размеры проходов расходятся'
+                report.add(result.records)
+
+        for level in sorted(OPTIMIZATION_LEVELS):
+            trees, context = build_ir(text)
+            explicit = [[instruction.format_long() for instruction in unit.instructions.instructions]
+                        for unit in method_units(trees, context, OPTIMIZATION_LEVELS[level])]
+            assert explicit == [result.instructions for result in results[level]], \
+                f'-O{level} отличается от явного списка проходов'
+
+    try:
+        PassManager(['canonize', 'unknown'])
+    except ValueError:
+        pass
+    else:
+        raise AssertionError('Неизвестный проход не обнаружен')
+    print(report.format_table())
+    print()
+
+
+def random_expression(generator: random.Random, temps, depth: int):
+    """
+    Случайное выражение без побочных эффектов: целые операции над константами
+    и временными переменными, NOT над логическими константами
+    :param generator: генератор случайных чисел
+    :param temps: временные переменные, которые можно использовать
+    :param depth: максимальная глубина
+    :return:
+    """
+    choice = generator.randrange(6 if depth > 0 else 3)
+    if choice == 0:
+        return Const(generator.choice([0, 1, 2, -3, 7, 2 ** 31 - 1]))
+    if choice == 1:
+        return generator.choice(temps)
+    if choice == 2:
+        return Const(generator.choice(['true', 'false']))
+    if choice == 3:
+        return UnaryOp(UnaryOpEnum.NOT, Const(generator.choice(['true', 'false'])))
+    operation = generator.choice([BinopEnum.PLUS, BinopEnum.MINUS, BinopEnum.MUL, BinopEnum.MOD])
+    return Binop(operation, random_expression(generator, temps, depth - 1), random_expression(generator, temps, depth - 1))
+
+
+def evaluate_expression(exp, values):
+    """
+    Вычисляет выражение из random_expression (ссылочный вычислитель для тестов свертки)
+    :param exp: выражение
+    :param values: номер временной переменной -> значение
+    :return: значение или None, если в выражении остаток от деления на 0
+    """
+    if isinstance(exp, Temp):
+        return values[exp.id]
+    if isinstance(exp, UnaryOp):
+        value = evaluate_expression(exp.expression, values)
+        return None if value is None else 1 - value
+    if isinstance(exp, Binop):
+        left, right = evaluate_expression(exp.left_expression, values), evaluate_expression(exp.right_expression, values)
+        if left is None or right is None:
+            return None
+        return evaluate_binop(exp.operation, left, right)
+    return constant_value(exp)
+
+
+def run_fold_tests(count=2000, programs=20):
+    """
+    Сверяет значения случайных выражений до и после свертки констант, затем
+    проверяет на программах, что после -O1 не осталось условных переходов над константами
+    и что свертка не увеличивает число инструкций
+    :param count: количество случайных выражений
+    :param programs: количество сгенерированных программ
+    :return:
+    """
+    print("### Тесты свертки констант ###")
+    print()
+
+    generator = random.Random(0)
+    context = CompilationContext()
+    temps = [context.new_temp(f't{index}') for index in range(3)]
+    folded_nodes = 0
+    for index in range(count):
+        values = {temp.id: generator.choice([0, 1, 5, -8]) for temp in temps}
+        expression = random_expression(generator, temps, 4)
+        expected = evaluate_expression(expression, values)
+        folded = ConstantFolder().fold(ExpWrapper(expression)).to_stm().expression
+        if expected is not None:
+            assert evaluate_expression(folded, values) == expected, f'Выражение {index}: свертка изменила значение'
+        folded_nodes += isinstance(folded, Const)
+
+    # остаток от деления на переменную или ноль может прервать программу - умножение на ноль его не выбрасывает #
+    for divisor, faults in ((Temp(None, None, temps[1]), True), (Const(0), True), (Const(3), False)):
+        product = Binop(BinopEnum.MUL, Binop(BinopEnum.MOD, Temp(None, None, temps[0]), divisor), Const(0))
+        folded = ConstantFolder().fold(ExpWrapper(product)).to_stm().expression
+        assert isinstance(folded, Const) != faults, 'Свертка обошлась с остатком от деления вопреки may_fault'
+
+    texts = program_texts(programs, statements=8)
+    texts.append('class Main {\n    public static void main(String[] args) {\n'
+                 '        System.out.println(new A().m());\n    }\n}\n'
+                 'class A {\n    public int m() {\n        int a;\n        a = 2 * 3 + 0;\n'
+                 '        if (true) a = a * 1; else a = a - 1;\n        while (false) a = a + 1;\n'
+                 '        if (!true) a = 0; else a = 1 - 1;\n        return a;\n    }\n}\n')
+    before = after = 0
+    for text in texts:
+        trees, context = build_ir(text)
+        plain = compile_methods(trees, context, level=0)
+        trees, context = build_ir(text)
+        for index, (key, tree) in enumerate(trees.items()):
+            unit = MethodUnit(key, tree, context.fork(index))
+            PassManager(['fold', 'canonize', 'linearize', 'dead-branches']).run(unit)
+            assert not any(isinstance(statement, JumpC) and condition_value(statement.condition_left_expression)
+                           is not None and condition_value(statement.condition_right_expression) is not None
+                           for statement in unit.linear), f'{key}: остался условный переход над константами'
+            PassManager(['reblock', 'munch']).run(unit)
+            after += len(unit.instructions.instructions)
+            before += len(plain[index].instructions)
+    assert after < before, 'Свертка констант не уменьшила число инструкций'
+    print(f'Выражений: {count}, свернуто в константу: {folded_nodes}')
+    print(f'Программ: {len(texts)}, инструкций: {before} -> {after}')
+    print()
+
+
+INSTRUCTION_PATTERNS = [(re.compile(pattern), kind) for pattern, kind in [
+    (r'^MOV %0 %1$', 'copy'),
+    (r'^MOV %0 (-?\d+|true|false)$', 'const'),
+    (r'^MOV %0 \[%1 ?\+ ?(-?\d+)\]$', 'load'),
+    (r'^MOV %0 \[%1\]$', 'load'),
+    (r'^MOV %0 \[(-?\d+)\]$', 'load_const'),
+    (r'^MOV \[%0 \+ (-?\d+)\] %1$', 'store'),
+    (r'^MOV \[%0\] %1$', 'store'),
+    (r'^MOV %0(\S+)$', 'name'),
+    (r'^(ADD|SUB|AND|OR|IMUL) %0 (-?\d+|true|false)$', 'operation_const'),
+    (r'^(ADD|SUB|AND|OR|IMUL) %0 %1$', 'operation'),
+    (r'^IMUL %0 %1 (-?\d+|true|false)$', 'multiply'),
+    (r'^NOT %0$', 'not'),
+    (r'^NEG %0$', 'negate'),
+    (r'^(SHL|SAR|SHR) %0 (\d+)$', 'shift'),
+    (r'^LEA %0 \[%1\+%1\*(\d)\]$', 'lea'),
+    (r'^IDIV %1$', 'divide'),
+    (r'^CALL (\S+)$', 'call'),
+    (r'^CMP %0 (-?\d+|true|false)$', 'compare_const'),
+    (r'^CMP %0 %1$', 'compare'),
+    (r'^(JMP|JE|JNE|JL|JGE) %l$', 'jump'),
+]]
+
+OPERATIONS = {'ADD': BinopEnum.PLUS, 'SUB': BinopEnum.MINUS, 'AND': BinopEnum.AND, 'OR': BinopEnum.OR,
+              'IMUL': BinopEnum.MUL}
+
+
+def execute_instructions(instructions, seed: int, step_limit: int = 3000):
+    """
+    Исполняет инструкции метода после Muncher (ссылочный исполнитель для тестов оптимизаций)
+    Значения непроинициализированных переменных и памяти и результаты вызовов
+    детерминированно зависят от seed, вызовы и записи в память попадают в журнал,
+    вызов обработчика выхода за границы массива завершает метод
+    :param instructions: инструкции метода
+    :param seed: начальное значение
+    :param step_limit: максимальное число исполняемых инструкций
+    :return: пара (журнал событий, завершился ли метод за step_limit шагов)
+    """
+    registers, memory, events = dict(), dict(), []
+    labels = {instruction.label: index for index, instruction in enumerate(instructions)
+              if isinstance(instruction, LabelInstruction)}
+    decoded = []
+    for instruction in instructions:
+        if isinstance(instruction, LabelInstruction):
+            decoded.append(None)
+            continue
+        match = next(((kind, found) for pattern, kind in INSTRUCTION_PATTERNS
+                      for found in [pattern.match(instruction.asm_code)] if found), None)
+        assert match is not None, f'Неизвестная инструкция {instruction.asm_code}'
+        decoded.append(match)
+
+    def constant(text: str) -> int:
+        return BOOLEAN_VALUES[text] if text in BOOLEAN_VALUES else int(text)
+
+    def read(temp) -> int:
+        key = (temp.id, temp.unique)
+        if key not in registers:
+            if temp.name == 'fp':
+                registers[key] = 4096
+            elif temp.name == TRUE_TEMP_NAME:
+                registers[key] = 1
+            else:
+                registers[key] = wrap_word(temp.id * 40503 + seed * 977 + 7)
+        return registers[key]
+
+    def write(temp, value: int):
+        registers[(temp.id, temp.unique)] = wrap_word(value)
+
+    def load(address: int) -> int:
+        return memory.get(address, wrap_word(address * 2654435761 + seed))
+
+    flags = (0, 0)
+    position = steps = 0
+    while position < len(instructions):
+        steps += 1
+        if steps > step_limit:
+            return events, False
+        instruction, match = instructions[position], decoded[position]
+        position += 1
+        if match is None:
+            continue
+        kind, found = match
+        if kind == 'copy':
+            write(instruction.dst[0], read(instruction.src[0]))
+        elif kind == 'const':
+            write(instruction.dst[0], constant(found.group(1)))
+        elif kind == 'load':
+            offset = int(found.group(1)) if found.groups() else 0
+            write(instruction.dst[0], load(read(instruction.src[0]) + offset))
+        elif kind == 'load_const':
+            write(instruction.dst[0], load(int(found.group(1))))
+        elif kind == 'store':
+            offset = int(found.group(1)) if found.groups() else 0
+            address, value = read(instruction.src[1]) + offset, read(instruction.src[0])
+            memory[address] = value
+            events.append(('store', address, value))
+        elif kind == 'name':
+            write(instruction.dst[0], sum(map(ord, found.group(1))))
+        elif kind in ('operation_const', 'operation'):
+            right = constant(found.group(2)) if kind == 'operation_const' else read(instruction.src[0])
+            write(instruction.dst[0], evaluate_binop(OPERATIONS[found.group(1)], read(instruction.dst[0]), right))
+        elif kind == 'multiply':
+            write(instruction.dst[0], read(instruction.src[0]) * constant(found.group(1)))
+        elif kind == 'not':
+            write(instruction.dst[0], ~read(instruction.dst[0]))
+        elif kind == 'negate':
+            write(instruction.dst[0], -read(instruction.dst[0]))
+        elif kind == 'shift':
+            value, shift = read(instruction.dst[0]), int(found.group(2))
+            if found.group(1) == 'SHR':
+                value &= (1 << WORD_BITS) - 1
+            write(instruction.dst[0], value << shift if found.group(1) == 'SHL' else value >> shift)
+        elif kind == 'lea':
+            write(instruction.dst[0], read(instruction.src[0]) * (1 + int(found.group(1))))
+        elif kind == 'divide':
+            divisor, dividend = read(instruction.src[0]), read(instruction.src[1])
+            if divisor == 0:
+                events.append(('division by zero',))
+                return events, True
+            write(instruction.dst[0], evaluate_binop(BinopEnum.MOD, dividend, divisor))
+        elif kind == 'call':
+            arguments = tuple(read(temp) for temp in instruction.src if isinstance(temp, Temp))
+            target = found.group(1)
+            events.append(('call', target, arguments))
+            if target == BOUNDS_ERROR_NAME:
+                return events, True
+            result = sum((index + 1) * value for index, value in enumerate(arguments)) + len(target) + seed
+            registers[(Regs.EAX.value, True)] = wrap_word(result)
+        elif kind in ('compare_const', 'compare'):
+            right = constant(found.group(1)) if kind == 'compare_const' else read(instruction.src[1])
+            flags = (read(instruction.src[0]), right)
+        else:
+            condition = found.group(1)
+            if condition == 'JMP' or (condition == 'JE' and flags[0] == flags[1]) or \
+                    (condition == 'JNE' and flags[0] != flags[1]) or (condition == 'JL' and flags[0] < flags[1]) or \
+                    (condition == 'JGE' and flags[0] >= flags[1]):
+                position = labels[instruction.label_list[0]]
+    return events, True
+
+
+def same_behaviour(first, second, seeds=(0, 1, 2)) -> bool:
+    """
+    Сравнивает журналы исполнения двух вариантов метода (execute_instructions)
+    Если вариант не завершился за ограничение шагов, его журнал должен быть началом журнала другого
+    :param first: инструкции метода
+    :param second: инструкции того же метода после оптимизаций
+    :param seeds: начальные значения
+    :return:
+    """
+    for seed in seeds:
+        first_events, first_finished = execute_instructions(first, seed)
+        second_events, second_finished = execute_instructions(second, seed)
+        if first_finished and second_finished:
+            if first_events != second_events:
+                return False
+        else:
+            common = min(len(first_events), len(second_events))
+            if first_events[:common] != second_events[:common]:
+                return False
+            if first_finished and len(second_events) > len(first_events) or \
+                    second_finished and len(first_events) > len(second_events):
+                return False
+    return True
+
+
+def compare_without_pass(texts, remove, replace=None, bounds_checks=False) -> list:
+    """
+    Компилирует методы программ проходами -O2 и теми же проходами без remove
+    (или с replace на их месте) и сверяет исполнение каждого метода (same_behaviour)
+    :param texts: исходные коды программ
+    :param remove: название прохода или кортеж названий
+    :param replace: проход, который ставится на место удаленного (None - проход просто убирается)
+    :param bounds_checks: проверять ли индексы при обращении к массивам (см. build_ir)
+    :return: четверки (ключ метода, инструкции без прохода, инструкции -O2, замеры проходов -O2)
+    """
+    removed = (remove,) if isinstance(remove, str) else remove
+    passes = OPTIMIZATION_LEVELS[2]
+    plain_passes = []
+    for name in passes:
+        if name not in removed:
+            plain_passes.append(name)
+        elif replace is not None:
+            plain_passes.append(replace)
+    comparisons = []
+    for text in texts:
+        trees, context = build_ir(text, bounds_checks)
+        plain = []
+        for index, (key, tree) in enumerate(trees.items()):
+            unit = MethodUnit(key, tree, context.fork(index))
+            PassManager(plain_passes).run(unit)
+            plain.append(unit.instructions.instructions)
+
+        trees, context = build_ir(text, bounds_checks)
+        for index, (key, tree) in enumerate(trees.items()):
+            unit = MethodUnit(key, tree, context.fork(index))
+            records = PassManager(passes, count_sizes=True).run(unit)
+            instructions = unit.instructions.instructions
+            assert same_behaviour(plain[index], instructions), \
+                f'{key}: поведение без проходов {", ".join(removed)} и с ними различается'
+            comparisons.append((key, plain[index], instructions, records))
+    return comparisons
+
+
+def run_promote_tests():
+    """
+    Проверяет перенос ячеек фрейма во временные переменные: значения локальных переменных
+    доходят до записи в память, ячейка, адрес которой уходит из метода, остается во фрейме,
+    а в методах примеров из samples/good к фрейму обращаются только чтения при входе
+    :return:
+    """
+    print("### Тесты переноса ячеек фрейма во временные переменные ###")
+    print()
+
+    context = CompilationContext()
+    out = context.new_temp('out')
+    frame = lambda offset: Mem(Binop(BinopEnum.PLUS, context.new_temp(FP_NAME), Const(offset)))
+    tree = StmList([Move(frame(0), Const(5)), Move(frame(4), Binop(BinopEnum.MUL, frame(0), Const(3))),
+                    Move(frame(0), Binop(BinopEnum.PLUS, frame(4), frame(0))), Move(Mem(out), frame(0))])
+    unit = MethodUnit('Main@promote', StmWrapper(tree), context)
+    records = PassManager(['promote', 'canonize', 'linearize', 'munch']).run(unit)
+    assert records[0].changes == 2, 'Перенесены не все ячейки фрейма'
+    for seed in (0, 1, 2):
+        events, _ = execute_instructions(unit.instructions.instructions, seed)
+        assert [event[2] for event in events if event[0] == 'store'] == [20], 'Неверное значение локальной переменной'
+
+    tree = StmList([Move(frame(0), Const(5)),
+                    Move(out, Binop(BinopEnum.PLUS, context.new_temp(FP_NAME), Const(0)))])
+    promotion = FramePromotion(context)
+    assert promotion.promote(StmWrapper(tree)).to_stm() is tree and not promotion.locals, \
+        'Перенесена ячейка, адрес которой уходит из метода'
+
+    promoted = 0
+    for sample in sorted(os.listdir('../samples/good')):
+        trees, context = build_ir((Path('../samples/good') / Path(sample)).read_text())
+        for index, (key, tree) in enumerate(trees.items()):
+            unit = MethodUnit(key, tree, context.fork(index))
+            count = PassManager(['fold', 'promote']).run(unit)[1].changes
+            body = unit.tree.to_stm().statements[count:] if count else unit.tree
+            assert frame_slots(body) == set(), f'{key}: в методе остались ячейки фрейма'
+            promoted += count
+    assert promoted, 'В примерах не перенесено ни одной ячейки фрейма'
+    print(f'Перенесено ячеек фрейма: {promoted}')
+    print()
+
+
+def run_copy_tests(programs=30):
+    """
+    Сравнивает исполнение методов с распространением копий и без него, проверяет,
+    что удаленных пересылок столько, сколько сообщил проход, и что инструкций стало меньше
+    :param programs: количество сгенерированных программ
+    :return:
+    """
+    print("### Тесты распространения копий ###")
+    print()
+
+    texts = program_texts(programs)
+    before = after = removed = 0
+    for key, plain, instructions, records in compare_without_pass(texts, ('copies', 'machine-copies')):
+        machine = next(record for record in records if record.name == 'machine-copies')
+        assert machine.size_before - machine.size_after == machine.changes, \
+            f'{key}: число удаленных пересылок не совпадает с отчетом'
+        assert not any(instruction.asm_code == 'MOV %0 %1' and instruction.src[0] == instruction.dst[0]
+                       and not instruction.dst[0].unique for instruction in instructions), \
+            f'{key}: осталась пересылка переменной в себя'
+        assert len(instructions) <= len(plain), f'{key}: инструкций стало больше'
+        before += len(plain)
+        after += len(instructions)
+        removed += sum(record.changes for record in records if record.changes is not None)
+    assert after < before, 'Распространение копий не уменьшило число инструкций'
+    print(f'Программ: {len(texts)}, инструкций: {before} -> {after}, удалено пересылок: {removed}')
+    print()
+
+
+def cse_reuses(statements) -> list:
+    """
+    Применяет удаление общих подвыражений к линейному списку операторов
+    :param statements: операторы (первым должна идти метка)
+    :return: источники Move после прохода
+    """
+    CommonSubexpressionElimination(statements).eliminate()
+    return [statement.source for statement in statements if isinstance(statement, Move)]
+
+
+def run_cse_tests(programs=30):
+    """
+    Проверяет структурное хеширование и правила доступности выражений на построенных
+    вручную методах, затем сравнивает исполнение методов -O2 с удалением общих
+    подвыражений и без него
+    :param programs: количество сгенерированных программ
+    :return:
+    """
+    print("### Тесты удаления общих подвыражений ###")
+    print()
+
+    context = CompilationContext()
+    a, b, c, d, e = (context.new_temp(name) for name in 'abcde')
+    fp_first, fp_second = context.new_temp(FP_NAME), context.new_temp(FP_NAME)
+    pinned = context.new_temp(InRegAccess.AR_Prefix + 'p')
+    structural_hash = StructuralHash()
+    number = lambda exp: structural_hash.number_tree(exp)[id(exp)]
+    assert number(Binop(BinopEnum.PLUS, a, Mem(b))) == number(Binop(BinopEnum.PLUS, Mem(b), a))
+    assert number(Binop(BinopEnum.MINUS, a, b)) != number(Binop(BinopEnum.MINUS, b, a))
+    assert number(Mem(Binop(BinopEnum.PLUS, fp_first, Const(4)))) == \
+        number(Mem(Binop(BinopEnum.PLUS, fp_second, Const(4))))
+    assert number(Binop(BinopEnum.PLUS, a, Call(Name(Label('f')), ExpList([])))) is None
+
+    square = lambda: Binop(BinopEnum.MUL, Mem(a), Mem(a))
+    field = lambda: Mem(Binop(BinopEnum.PLUS, Mem(a), Const(4)))
+    labels = [Label(f'L{index}') for index in range(3)]
+    label = lambda index: LabelStm(labels[index])
+    sources = cse_reuses([label(0), Move(c, square()), Move(d, Binop(BinopEnum.PLUS, square(), Const(1)))])
+    assert isinstance(sources[1].left_expression, Temp) and sources[1].left_expression.id == c.id, \
+        'Повторное вычисление в блоке не заменено'
+    sources = cse_reuses([label(0), Move(c, field()), Move(Mem(e), Const(7)), Move(d, field())])
+    assert isinstance(sources[2], Mem), 'Чтение памяти заменено после записи в память'
+    sources = cse_reuses([label(0), Move(c, Binop(BinopEnum.MUL, pinned, b)),
+                          Move(Mem(pinned), Const(3)), Move(d, Binop(BinopEnum.MUL, pinned, b))])
+    assert isinstance(sources[2], Binop), 'Выражение заменено после изменения его переменной'
+    sources = cse_reuses([label(0), Move(c, Binop(BinopEnum.MUL, pinned, b)),
+                          Exp(Call(Name(Label('f')), ExpList([]))), Move(d, Binop(BinopEnum.MUL, pinned, b))])
+    assert isinstance(sources[1], Binop), 'Выражение с закрепленной переменной заменено после вызова'
+    sources = cse_reuses([label(0), Move(c, square()), Jump(labels[1]),
+                          label(1), Move(d, square())])
+    assert isinstance(sources[1], Temp), 'Выражение из доминирующего блока не заменено'
+    sources = cse_reuses([label(0), Move(c, square()), JumpC(JumpTypeEnum.LT, b, Const(0), labels[2]),
+                          label(1), Move(Mem(e), Const(7)), label(2), Move(d, square())])
+    assert isinstance(sources[2], Binop), 'Выражение заменено, хотя на одном из путей оно перестало быть доступным'
+
+    texts = program_texts(programs)
+    before = after = reused = 0
+    for key, plain, instructions, records in compare_without_pass(texts, 'cse'):
+        before += len(plain)
+        after += len(instructions)
+        reused += next(record.changes for record in records if record.name == 'cse')
+    assert after < before, 'Удаление общих подвыражений не уменьшило число инструкций'
+    print(f'Программ: {len(texts)}, инструкций: {before} -> {after}, заменено выражений: {reused}')
+    print()
+
+
+def run_dead_code_tests(programs=30):
+    """
+    Проверяет удаление недостижимых блоков и мертвых операторов на построенных вручную
+    методах, затем сравнивает исполнение методов -O2 с удалением мертвого кода и без него
+    (в том числе метода, из бесконечного цикла которого нельзя дойти до выхода)
+    :param programs: количество сгенерированных программ
+    :return:
+    """
+    print("### Тесты удаления мертвого кода ###")
+    print()
+
+    context = CompilationContext()
+    a, b, c, d = (context.new_temp(name) for name in 'abcd')
+    pinned = context.new_temp(InRegAccess.AR_Prefix + 'p')
+    call = lambda: Call(Name(Label('f')), ExpList([]))
+    labels = [Label(f'L{index}') for index in range(4)]
+    tree = [LabelStm(labels[0]), Move(a, Const(1)), Jump(labels[3]),
+            LabelStm(labels[1]), Move(b, Mem(a)), Jump(labels[2]),
+            LabelStm(labels[2]), Move(Mem(b), Const(2)), Jump(labels[1]),
+            LabelStm(labels[3]), Move(pinned, Mem(a))]
+    removed = DeadCodeElimination(tree).eliminate()
+    assert removed == 6 and not any(isinstance(statement, LabelStm) and statement.label_name in labels[1:3]
+                                    for statement in tree), 'Недостижимый цикл не удален'
+
+    tree = [LabelStm(labels[0]), Move(a, Mem(pinned)), Move(b, Binop(BinopEnum.PLUS, Mem(a), Const(1))),
+            Jump(labels[1]), LabelStm(labels[1]), Move(c, Mem(b)), Exp(Mem(a)), Move(d, call()),
+            Move(Mem(d), Const(3)), Move(pinned, Const(0))]
+    assert DeadCodeElimination(tree).eliminate() == 4, 'Удалены не все мертвые операторы'
+    assert [type(statement) for statement in tree] == [LabelStm, Jump, LabelStm, Move, Move, Move], \
+        'Удален оператор с побочным эффектом'
+
+    # остаток от деления на переменную или ноль может прервать программу, даже если результат не нужен #
+    remainder = lambda divisor: Binop(BinopEnum.MOD, Temp(None, None, a), divisor)
+    tree = [LabelStm(labels[0]), Move(b, remainder(Temp(None, None, c))), Exp(remainder(Const(0))),
+            Move(d, remainder(Const(3))), Move(pinned, Const(0))]
+    assert DeadCodeElimination(tree).eliminate() == 1 and [type(statement) for statement in tree] == \
+        [LabelStm, Move, Exp, Move], 'Удален остаток от деления, который может прервать программу'
+
+    texts = program_texts(programs)
+    texts.append('class Main {\n    public static void main(String[] args) {\n'
+                 '        System.out.println(new A().m(3));\n    }\n}\n'
+                 'class A {\n    public int m(int a) {\n        int x;\n        x = a;\n'
+                 '        while (true) x = x + 1;\n        return x;\n    }\n}\n')
+    before = after = removed = 0
+    for key, plain, instructions, records in compare_without_pass(texts, 'dead-code'):
+        assert len(instructions) <= len(plain), f'{key}: инструкций стало больше'
+        record = next(record for record in records if record.name == 'dead-code')
+        assert record.size_after < record.size_before or not record.changes, \
+            f'{key}: удалены операторы, а размер IR не уменьшился'
+        before += len(plain)
+        after += len(instructions)
+        removed += record.changes
+    assert after < before, 'Удаление мертвого кода не уменьшило число инструкций'
+    print(f'Программ: {len(texts)}, инструкций: {before} -> {after}, удалено операторов: {removed}')
+    print()
+
+
+def run_strength_tests(programs=30):
+    """
+    Сверяет умножение и остаток от деления на константы после понижения стоимости
+    с IMUL и IDIV на граничных значениях, затем сравнивает исполнение методов -O2
+    с понижением стоимости и без него
+    :param programs: количество сгенерированных программ
+    :return:
+    """
+    print("### Тесты понижения стоимости операций ###")
+    print()
+
+    context = CompilationContext()
+    value, address, result = (context.new_temp(name) for name in ('value', 'address', 'result'))
+    constants = list(range(-20, 21)) + [sign * (1 << shift) + delta for shift in range(5, 31)
+                                        for sign in (1, -1) for delta in (-1, 0, 1)]
+    values = [-(1 << 31), -(1 << 31) + 1, -100, -7, -4, -1, 0, 1, 5, 8, 99, (1 << 31) - 1, -987654321]
+    reduced_count = 0
+    for operation in (BinopEnum.MUL, BinopEnum.MOD):
+        for constant in constants:
+            if operation == BinopEnum.MOD and constant == 0:
+                continue
+            for left in values:
+                tree = [Move(value, Const(left)), Move(result, Binop(operation, value, Const(constant))),
+                        Move(Mem(address), result)]
+                plain = Muncher(tree, context).create_instructions_list().instructions
+                reduced = Muncher(tree, context, X86_COST_MODEL).create_instructions_list().instructions
+                assert execute_instructions(plain, 0) == execute_instructions(reduced, 0), \
+                    f'{left} {operation.name} {constant}: понижение стоимости изменило результат'
+            reduced_count += not any(instruction.asm_code.startswith(('IMUL', 'IDIV')) for instruction in reduced)
+    assert multiply_plan(4, X86_COST_MODEL) == [('SHL', 2)] and multiply_plan(9, X86_COST_MODEL) == [('LEA', 8)]
+    assert multiply_plan(7, CostModel({**X86_COST_MODEL.costs, 'IMUL': 1})) is None, \
+        'Модель стоимости не учитывается'
+
+    texts = program_texts(programs)
+    before = after = 0
+    for key, plain, instructions, _ in compare_without_pass(texts, 'strength-munch', replace='munch'):
+        assert not any(re.match(r'^IMUL %0 %1 -?(1|2|4|8|16)$', instruction.asm_code or '')
+                       for instruction in instructions), f'{key}: осталось умножение на степень двойки'
+        before += sum((instruction.asm_code or '').startswith(('IMUL', 'IDIV')) for instruction in plain)
+        after += sum((instruction.asm_code or '').startswith(('IMUL', 'IDIV')) for instruction in instructions)
+    assert after < before, 'Понижение стоимости не убрало ни одного IMUL или IDIV'
+    print(f'Констант: {len(constants)}, заменено операций: {reduced_count}')
+    print(f'Программ: {len(texts)}, IMUL и IDIV: {before} -> {after}')
+    print()
+
+
+def run_licm_tests(programs=30):
+    """
+    Проверяет выбор выносимых из цикла операторов и построение предзаголовка на построенных
+    вручную методах, затем сравнивает исполнение методов -O2 с выносом инвариантов и без него
+    :param programs: количество сгенерированных программ
+    :return:
+    """
+    print("### Тесты выноса инвариантов циклов ###")
+    print()
+
+    context = CompilationContext()
+    a, b, k, m, n, p, q, v, w, z = (context.new_temp(name) for name in 'abkmnpqvwz')
+    frame = lambda: Mem(Binop(BinopEnum.PLUS, context.new_temp(FP_NAME), Const(0)))
+    labels = [Label(f'L{index}') for index in range(4)]
+    tree = [LabelStm(labels[0]), Move(a, Const(5)), Jump(labels[1]),
+            LabelStm(labels[1]), Move(n, frame()), Move(m, Binop(BinopEnum.PLUS, n, Const(1))), Move(v, Mem(p)),
+            Move(Mem(q), k), JumpC(JumpTypeEnum.GE, v, m, labels[3]),
+            LabelStm(labels[2]), Move(w, Binop(BinopEnum.MUL, a, Const(3))), Move(z, Binop(BinopEnum.MOD, a, b)),
+            Move(k, Binop(BinopEnum.PLUS, a, Const(2))),
+            Move(Mem(p), Binop(BinopEnum.PLUS, Binop(BinopEnum.PLUS, v, w), Binop(BinopEnum.PLUS, z, k))),
+            Jump(labels[1]),
+            LabelStm(labels[3]), Move(Mem(q), m)]
+    hoisted = LoopInvariantCodeMotion(tree, context).hoist()
+    header = tree.index(next(statement for statement in tree
+                             if isinstance(statement, LabelStm) and statement.label_name is labels[1]))
+    preheader = tree[header - 4]
+    assert hoisted == 3 and isinstance(preheader, LabelStm), 'Вынесены не те операторы'
+    assert [statement.destination.id for statement in tree[header - 3:header]] == [n.id, m.id, w.id], \
+        'Вынесенные операторы стоят не в порядке вычисления'
+    assert tree[2].label_to_jump is preheader.label_name and tree[-3].label_to_jump is labels[1], \
+        'Вход в цикл не перенаправлен в предзаголовок'
+
+    tree = [LabelStm(labels[0]), Jump(labels[1]),
+            LabelStm(labels[1]), Move(v, Mem(Binop(BinopEnum.PLUS, p, Const(8)))), Move(n, frame()),
+            JumpC(JumpTypeEnum.LT, n, v, labels[1]),
+            LabelStm(labels[2]), Move(Mem(q), v)]
+    assert LoopInvariantCodeMotion(tree, context).hoist() == 2, 'Не вынесено чтение памяти из цикла без записей'
+    tree = [LabelStm(labels[0]), Jump(labels[1]),
+            LabelStm(labels[1]), Move(v, Mem(Binop(BinopEnum.PLUS, p, Const(8)))), Move(n, frame()),
+            Exp(Call(Name(Label('f')), ExpList([]))), JumpC(JumpTypeEnum.LT, n, v, labels[1]),
+            LabelStm(labels[2]), Move(Mem(q), v)]
+    assert LoopInvariantCodeMotion(tree, context).hoist() == 1 and tree[3].destination.id == n.id, \
+        'Чтение памяти вынесено из цикла с вызовом'
+
+    # закрепленная переменная (параметр в регистре) меняется при вызове в цикле #
+    pinned = context.new_temp(InRegAccess.AR_Prefix + 'p')
+    for call, expected in (([], 1), ([Exp(Call(Name(Label('f')), ExpList([])))], 0)):
+        tree = [LabelStm(labels[0]), Jump(labels[1]),
+                LabelStm(labels[1]), Move(w, Binop(BinopEnum.MUL, Temp(None, None, pinned), Const(3))), *call,
+                Move(Mem(q), w), Move(n, Binop(BinopEnum.PLUS, n, Const(1))),
+                JumpC(JumpTypeEnum.LT, n, Const(10), labels[1]),
+                LabelStm(labels[2]), Move(Mem(q), a)]
+        hoisted = LoopInvariantCodeMotion(tree, context).hoist()
+        assert hoisted == expected, 'Выражение с закрепленной переменной вынесено из цикла с вызовом'
+
+    texts = program_texts(programs)
+    hoisted = 0
+    for _, _, _, records in compare_without_pass(texts, 'licm'):
+        hoisted += next(record for record in records if record.name == 'licm').changes
+    assert hoisted, 'Из циклов ничего не вынесено'
+    print(f'Программ: {len(texts)}, вынесено операторов: {hoisted}')
+    print()
+
+
+def run_induction_tests(programs=30):
+    """
+    Проверяет замену адресной арифметики указателями и перепись условия выхода на построенных
+    вручную циклах (в том числе вложенных, как в сортировке пузырьком) по исполнению инструкций,
+    затем сравнивает исполнение методов -O2 с понижением стоимости индукционных переменных и без него
+    (счетчики циклов там - локальные переменные, перенесенные из фрейма проходом promote)
+    :param programs: количество сгенерированных программ
+    :return:
+    """
+    print("### Тесты понижения стоимости индукционных переменных ###")
+    print()
+
+    def element(base, index, shift=0):
+        return Binop(BinopEnum.PLUS, Binop(BinopEnum.PLUS, base, Const(shift)), Binop(BinopEnum.MUL, Const(4), index))
+
+    def array_sum(step, bound, keep_counter):
+        context = CompilationContext()
+        i, s, x, base, out, result = (context.new_temp(name) for name in ('i', 's', 'x', 'base', 'out', 'result'))
+        labels = [Label(f'L{index}') for index in range(4)]
+        tree = [LabelStm(labels[0]), Move(i, Const(0)), Move(s, Const(0)), Jump(labels[1]),
+                LabelStm(labels[1]), JumpC(JumpTypeEnum.GE, i, Const(bound), labels[3]),
+                LabelStm(labels[2]), Move(x, Mem(element(base, i, 1))),
+                Move(Mem(Binop(BinopEnum.PLUS, out, Binop(BinopEnum.MUL, i, Const(4)))), x),
+                Move(s, Binop(BinopEnum.PLUS, s, x)), Move(i, Binop(BinopEnum.PLUS, i, Const(step))), Jump(labels[1]),
+                LabelStm(labels[3]), Move(Mem(result), i if keep_counter else s)]
+        return tree, context, labels
+
+    def bubble_sort():
+        context = CompilationContext()
+        i, j, x, y, array, result = (context.new_temp(name) for name in ('i', 'j', 'x', 'y', 'array', 'result'))
+        labels = [Label(f'L{index}') for index in range(10)]
+        tree = [LabelStm(labels[0]), Move(j, Const(0)), Jump(labels[1]),
+                LabelStm(labels[1]), JumpC(JumpTypeEnum.GE, j, Const(5), labels[9]),
+                LabelStm(labels[2]), Move(i, Const(0)), Jump(labels[3]),
+                LabelStm(labels[3]), JumpC(JumpTypeEnum.GE, i, Const(6), labels[8]),
+                LabelStm(labels[4]), Move(x, Mem(element(array, i))),
+                Move(y, Mem(element(array, Binop(BinopEnum.PLUS, i, Const(1))))),
+                JumpC(JumpTypeEnum.LT, x, y, labels[6]),
+                LabelStm(labels[5]), Move(Mem(element(array, i)), y), Move(Mem(element(array, i, 4)), x),
+                Jump(labels[6]),
+                LabelStm(labels[6]), Move(i, Binop(BinopEnum.PLUS, i, Const(1))), Jump(labels[3]),
+                LabelStm(labels[8]), Move(j, Binop(BinopEnum.PLUS, j, Const(1))), Jump(labels[1]),
+                LabelStm(labels[9]), Move(Mem(result), j)]
+        return tree, context, labels
+
+    reductions = []
+
+    def reduce(tree, context):
+        plain = Muncher(tree, context).create_instructions_list().instructions
+        reduction = InductionVariableReduction(tree, context)
+        reduced = reduction.reduce()
+        reductions.append(reduced)
+        instructions = Muncher(tree, context).create_instructions_list().instructions
+        for seed in (0, 1, 2):
+            assert execute_instructions(plain, seed) == execute_instructions(instructions, seed), \
+                'Понижение стоимости индукционных переменных изменило поведение'
+        return reduced, reduction.rewritten_tests
+
+    def loop_statements(tree, labels):
+        start = next(index for index, statement in enumerate(tree)
+                     if isinstance(statement, LabelStm) and statement.label_name is labels[1])
+        end = next(index for index, statement in enumerate(tree)
+                   if isinstance(statement, LabelStm) and statement.label_name is labels[-1])
+        return tree[start:end]
+
+    tree, context, labels = array_sum(1, 10, False)
+    assert reduce(tree, context) == (2, 1), 'Адреса элементов не заменены указателями'
+    body = loop_statements(tree, labels)
+    assert not any(isinstance(statement, Move) and isinstance(statement.destination, Temp) and
+                   statement.destination.name == 'i' for statement in body), 'Счетчик не удален из цикла'
+    assert not any(isinstance(statement, Move) and isinstance(statement.source, Binop) and
+                   statement.source.operation == BinopEnum.MUL for statement in body), 'В цикле осталось умножение'
+    tree, context, labels = array_sum(1, 10, True)
+    assert reduce(tree, context) == (2, 0), 'Условие переписано, хотя счетчик нужен после цикла'
+    tree, context, labels = array_sum(3, 10, False)
+    assert reduce(tree, context) == (2, 0), 'Условие переписано, хотя счетчик перескакивает границу'
+    tree, context, labels = bubble_sort()
+    assert reduce(tree, context) == (4, 1), 'Адреса во вложенном цикле не заменены указателями'
+    print(f'Циклов: {len(reductions)}, заменено адресов: {sum(reductions)}')
+
+    texts = program_texts(programs)
+    reduced = [(key, next(record for record in records if record.name == 'induction').changes)
+               for key, _, _, records in compare_without_pass(texts, 'induction')]
+    assert dict(reduced).get('Summer@Run'), 'Адреса в цикле Summer.Run из ArraySum не заменены указателями'
+    print(f'Программ: {len(texts)}, заменено адресов: {sum(changes for _, changes in reduced)}')
+    print()
+
+
+def run_bounds_tests(programs=30):
+    """
+    Проверяет удаление и вынос проверок границ массивов на построенных вручную циклах
+    по исполнению инструкций, затем сравнивает исполнение методов -O2 с проверками границ
+    с удалением лишних проверок и без него: на циклах по длине локального массива и на сгенерированных программах
+    :param programs: количество сгенерированных программ
+    :return:
+    """
+    print("### Тесты удаления проверок границ массивов ###")
+    print()
+
+    def element(array, index):
+        return Mem(Binop(BinopEnum.PLUS, Binop(BinopEnum.PLUS, array, Const(1)), index))
+
+    def length(array):
+        return Mem(Binop(BinopEnum.PLUS, array, Const(0)))
+
+    def kernel(name):
+        context = CompilationContext()
+        i, j, k, s, x, y, n, m, array, other, pointer, out, result = (context.new_temp(temp) for temp in (
+            'i', 'j', 'k', 's', 'x', 'y', 'n', 'm', 'array', 'other', 'pointer', 'out', 'result'))
+        labels = [Label(f'L{index}') for index in range(4)]
+        checks = lambda index, checked=array: bounds_checks(checked, index, context, Position(0, 0))
+        # длина массива неотрицательна, а память исполнителя заполнена случайными словами #
+        allocate = [Move(length(array), Const(6)), Move(length(other), Const(3))]
+        if name == 'sum':
+            tree = [LabelStm(labels[0]), *allocate, Move(i, Const(0)), Move(s, Const(0)), Move(n, length(array)),
+                    Jump(labels[1]),
+                    LabelStm(labels[1]), JumpC(JumpTypeEnum.GE, i, n, labels[3]),
+                    LabelStm(labels[2]), *checks(i), Move(x, element(array, i)), Move(s, Binop(BinopEnum.PLUS, s, x)),
+                    Move(i, Binop(BinopEnum.PLUS, i, Const(1))), Jump(labels[1]),
+                    LabelStm(labels[3]), Move(Mem(result), s)]
+        elif name == 'pairs':
+            tree = [LabelStm(labels[0]), *allocate, Move(i, Const(0)), Move(n, length(array)),
+                    Move(m, Binop(BinopEnum.MINUS, n, Const(1))), Jump(labels[1]),
+                    LabelStm(labels[1]), JumpC(JumpTypeEnum.GE, i, m, labels[3]),
+                    LabelStm(labels[2]), *checks(i), Move(x, element(array, i)),
+                    Move(j, Binop(BinopEnum.PLUS, i, Const(1))), *checks(j), Move(y, element(array, j)),
+                    Move(Mem(out), Binop(BinopEnum.PLUS, x, y)), Move(i, j), Jump(labels[1]),
+                    LabelStm(labels[3]), Move(Mem(result), i)]
+        elif name == 'other':
+            tree = [LabelStm(labels[0]), *allocate, Move(i, Const(-1)), Move(n, length(other)), Jump(labels[1]),
+                    LabelStm(labels[1]), JumpC(JumpTypeEnum.GE, i, n, labels[3]),
+                    LabelStm(labels[2]), *checks(i), Move(Mem(out), element(array, i)),
+                    Move(i, Binop(BinopEnum.PLUS, i, Const(1))), Jump(labels[1]),
+                    LabelStm(labels[3]), Move(Mem(result), i)]
+        else:
+            store = [Move(Mem(out), i)] if name == 'store' else []
+            tree = [LabelStm(labels[0]), *allocate, Move(k, Mem(Binop(BinopEnum.PLUS, pointer, Const(4)))),
+                    Move(i, Const(0)), Jump(labels[1]),
+                    LabelStm(labels[1]), *store, *checks(k), Move(x, element(array, k)), Move(Mem(out), x),
+                    Move(i, Binop(BinopEnum.PLUS, i, Const(1))), JumpC(JumpTypeEnum.LT, i, Const(10), labels[1]),
+                    LabelStm(labels[3]), Move(Mem(result), i)]
+        return tree, context
+
+    def eliminate(name):
+        tree, context = kernel(name)
+        plain = Muncher(tree, context).create_instructions_list().instructions
+        elimination = BoundsCheckElimination(tree, context)
+        elimination.eliminate()
+        instructions = Muncher(tree, context).create_instructions_list().instructions
+        for seed in (0, 1, 2):
+            assert execute_instructions(plain, seed) == execute_instructions(instructions, seed), \
+                f'{name}: удаление проверок границ изменило поведение'
+        return elimination.removed, elimination.hoisted
+
+    assert eliminate('sum') == (2, 0), 'Не удалены проверки индекса, ограниченного условием цикла'
+    assert eliminate('pairs') == (4, 0), 'Не удалены проверки a[i] и a[i + 1] при i < a.length - 1'
+    assert eliminate('other') == (0, 0), 'Удалены проверки, которые условие цикла не доказывает'
+    assert eliminate('invariant') == (0, 2), 'Проверки инвариантного индекса не вынесены из цикла'
+    assert eliminate('store') == (0, 0), 'Проверки вынесены из цикла через запись в память'
+
+    graph = ControlFlowGraph.from_linear_tree(kernel('sum')[0])
+    analysis = ValueRangeAnalysis(graph).solve()
+    assert analysis.entry[2].range_of(0) == (0, (1 << (WORD_BITS - 1)) - 2), 'Неверный диапазон счетчика в теле'
+
+    # локальный массив и счетчики - ячейки фрейма: до bounds их переносит promote, #
+    # а условие цикла, вычисленное в exp_value, продевает dead-branches #
+    loops = '\n'.join((
+        'class Loop {',
+        '    public static void main(String[] a){',
+        '        System.out.println(new Summer().Sum(10));',
+        '    }',
+        '}',
+        'class Summer {',
+        '    public int Sum(int n){',
+        '        int[] values ;',
+        '        int i ;',
+        '        int s ;',
+        '        values = new int[n] ;',
+        '        i = 0 ;',
+        '        while (i < values.length) {',
+        '            values[i] = i ;',
+        '            i = i + 1 ;',
+        '        }',
+        '        s = 0 ;',
+        '        i = 0 ;',
+        '        while (i < values.length) {',
+        '            s = s + values[i] ;',
+        '            i = i + 1 ;',
+        '        }',
+        '        return s ;',
+        '    }',
+        '}'))
+    removed = {key: next(record for record in records if record.name == 'bounds').changes
+               for key, _, _, records in compare_without_pass([loops], 'bounds', bounds_checks=True)}
+    assert removed['Summer@Sum'] == 4, 'Проверки a[i] в циклах while (i < a.length) не удалены'
+
+    texts = program_texts(programs)
+    eliminated = 0
+    for _, _, _, records in compare_without_pass(texts, 'bounds', bounds_checks=True):
+        eliminated += next(record for record in records if record.name == 'bounds').changes
+    assert eliminated, 'В программах не удалено и не вынесено ни одной проверки границ'
+    print(f'Программ: {len(texts)}, удалено и вынесено проверок: {eliminated}')
+    print()
+
+
 @click.command()
 @click.option('--test', '-t', default='all',
-              help='What to test? (ast, st, tc, ar, ir, cir, lir, all).')
+              help='What to test? (ast, st, tc, ar, ir, cir, lir, parser, backends, cache, driver, methods, deep, traces, cfg, passes, fold, promote, copies, cse, dead, strength, licm, induction, bounds, all).')
 def run_tests(test):
     if not os.path.exists('../tests'):
         os.mkdir('../tests')
@@ -368,6 +1775,60 @@ def run_tests(test):
     if test == 'lir' or test == 'all':
         run_lir_tests()
 
+    if test == 'parser' or test == 'all':
+        run_parser_stress_tests()
+
+    if test == 'backends' or test == 'all':
+        run_parser_backend_tests()
+
+    if test == 'cache' or test == 'all':
+        run_ast_cache_tests()
+
+    if test == 'driver' or test == 'all':
+        run_driver_tests()
+
+    if test == 'methods' or test == 'all':
+        run_method_pipeline_tests()
+
+    if test == 'deep' or test == 'all':
+        run_deep_tree_tests()
+
+    if test == 'traces' or test == 'all':
+        run_trace_tests()
+
+    if test == 'cfg' or test == 'all':
+        run_cfg_tests()
+
+    if test == 'passes' or test == 'all':
+        run_pass_manager_tests()
+
+    if test == 'fold' or test == 'all':
+        run_fold_tests()
+
+    if test == 'promote' or test == 'all':
+        run_promote_tests()
+
+    if test == 'copies' or test == 'all':
+        run_copy_tests()
+
+    if test == 'cse' or test == 'all':
+        run_cse_tests()
+
+    if test == 'dead' or test == 'all':
+        run_dead_code_tests()
+
+    if test == 'strength' or test == 'all':
+        run_strength_tests()
+
+    if test == 'licm' or test == 'all':
+        run_licm_tests()
+
+    if test == 'induction' or test == 'all':
+        run_induction_tests()
+
+    if test == 'bounds' or test == 'all':
+        run_bounds_tests()
+
 
 if __name__ == '__main__':
     run_tests()
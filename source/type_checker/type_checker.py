@@ -54,58 +54,31 @@ class TypeChecker(Visitor):
             if self.verbose:
                 print('Проверка типов пройдена успешно!')
 
-    def visit(self, visitable: Visitable):
-        """
-        Отвечает за посещение узлов дерева
-        :param visitable: посещаемый узел AST
-        :return:
-        """
-        if isinstance(visitable, Program):
-            self.visit_program(visitable)
-        elif isinstance(visitable, MainClass):
-            self.visit_main_class(visitable)
-        elif isinstance(visitable, ClassDecl):
-            self.visit_class_decl(visitable)
-        elif isinstance(visitable, VarDecl):
-            self.visit_var_decl(visitable)
-        elif isinstance(visitable, ArgDecl):
-            self.visit_arg_decl(visitable)
-        elif isinstance(visitable, MethodDecl):
-            self.visit_method_decl(visitable)
-        elif isinstance(visitable, RandomAccessAssignStatement):
-            self.visit_random_access_assign_statement(visitable)
-        elif isinstance(visitable, AssignStatement):
-            self.visit_assign_statement(visitable)
-        elif isinstance(visitable, PrintLineStatement):
-            self.visit_print_line_statement(visitable)
-        elif isinstance(visitable, WhileStatement):
-            self.visit_while_statement(visitable)
-        elif isinstance(visitable, Statements):
-            self.visit_statements(visitable)
-        elif isinstance(visitable, IfStatement):
-            self.visit_if_statement(visitable)
-        elif isinstance(visitable, BinaryExpr):
-            self.visit_binary_expr(visitable)
-        elif isinstance(visitable, RandomAccessExpr):
-            self.visit_random_access_expr(visitable)
-        elif isinstance(visitable, LengthExpr):
-            self.visit_length_expr(visitable)
-        elif isinstance(visitable, CallMethodExpr):
-            self.visit_call_method_expr(visitable)
-        elif isinstance(visitable, ValueExpr):
-            self.visit_value_expr(visitable)
-        elif isinstance(visitable, Id):
-            self.visit_id(visitable)
-        elif isinstance(visitable, ThisExpr):
-            self.visit_this_expr(visitable)
-        elif isinstance(visitable, NewObjectExpr):
-            self.visit_new_object_expr(visitable)
-        elif isinstance(visitable, NewIntArrExpr):
-            self.visit_new_int_arr_expr(visitable)
-        elif isinstance(visitable, NotExpr):
-            self.visit_not_expr(visitable)
-        elif isinstance(visitable, ReturnStatement):
-            self.visit_return_statement(visitable)
+    visit_methods = {
+        Program: 'visit_program',
+        MainClass: 'visit_main_class',
+        ClassDecl: 'visit_class_decl',
+        VarDecl: 'visit_var_decl',
+        ArgDecl: 'visit_arg_decl',
+        MethodDecl: 'visit_method_decl',
+        RandomAccessAssignStatement: 'visit_random_access_assign_statement',
+        AssignStatement: 'visit_assign_statement',
+        PrintLineStatement: 'visit_print_line_statement',
+        WhileStatement: 'visit_while_statement',
+        Statements: 'visit_statements',
+        IfStatement: 'visit_if_statement',
+        BinaryExpr: 'visit_binary_expr',
+        RandomAccessExpr: 'visit_random_access_expr',
+        LengthExpr: 'visit_length_expr',
+        CallMethodExpr: 'visit_call_method_expr',
+        ValueExpr: 'visit_value_expr',
+        Id: 'visit_id',
+        ThisExpr: 'visit_this_expr',
+        NewObjectExpr: 'visit_new_object_expr',
+        NewIntArrExpr: 'visit_new_int_arr_expr',
+        NotExpr: 'visit_not_expr',
+        ReturnStatement: 'visit_return_statement',
+    }
 
     def visit_program(self, program: Program):
         program.main.accept(self)
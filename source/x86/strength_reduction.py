@@ -0,0 +1,105 @@
+from typing import Dict, List, Optional, Tuple
+
+from optimization.constant_folding import WORD_BITS
+
+# Шаг плана умножения: ('SHL', k) - сдвиг результата, ('LEA', s) - результат = x + x * s, #
+# ('ADD', None) / ('SUB', None) - прибавить или вычесть x, ('NEG', None) - сменить знак #
+Step = Tuple[str, Optional[int]]
+
+LEA_SCALES = (2, 4, 8)
+
+
+class CostModel:
+    """
+    Стоимость инструкций цели (в тактах задержки): по ней Muncher решает, заменять ли
+    умножение и деление на константу последовательностью сдвигов, масок и сложений
+    """
+
+    def __init__(self, costs: Dict[str, int]):
+        """
+        Конструктор
+        :param costs: мнемоника -> стоимость
+        """
+        self.costs = costs
+
+    def cost(self, opcodes: List[str]) -> int:
+        return sum(self.costs[opcode] for opcode in opcodes)
+
+
+# Задержки на типичном ядре x86: пересылка регистра исчезает при переименовании, #
+# IMUL - 3 такта, IDIV 32-битного слова - больше 20 #
+X86_COST_MODEL = CostModel({
+    'MOV': 0, 'ADD': 1, 'SUB': 1, 'AND': 1, 'NEG': 1, 'SHL': 1, 'SAR': 1, 'SHR': 1, 'LEA': 1, 'IMUL': 3, 'IDIV': 26,
+})
+
+
+def power_of_two(value: int) -> Optional[int]:
+    """
+    :param value: положительное число
+    :return: k, если value = 2 ** k, иначе None
+    """
+    return value.bit_length() - 1 if value > 0 and value & (value - 1) == 0 else None
+
+
+def multiply_candidates(value: int) -> List[List[Step]]:
+    """
+    Последовательности, умножающие x на положительную константу
+    :param value: множитель
+    :return:
+    """
+    candidates = []
+    shift = power_of_two(value)
+    if shift is not None:
+        candidates.append([('SHL', shift)] if shift else [])
+    for scale in LEA_SCALES:
+        if value % (scale + 1) == 0:
+            shift = power_of_two(value // (scale + 1))
+            if shift is not None:
+                candidates.append([('LEA', scale)] + ([('SHL', shift)] if shift else []))
+    for delta, opcode in ((1, 'ADD'), (-1, 'SUB')):
+        shift = power_of_two(value - delta)
+        if shift is not None and shift > 0:
+            candidates.append([('SHL', shift), (opcode, None)])
+    return candidates
+
+
+def multiply_plan(value: int, model: CostModel) -> Optional[List[Step]]:
+    """
+    Самая дешевая по модели стоимости замена IMUL на константу
+    :param value: множитель
+    :param model: модель стоимости цели
+    :return: шаги (результат начинается с копии x, если первый шаг - не LEA) или None, если IMUL дешевле
+    """
+    magnitude = abs(value)
+    if value == 0 or magnitude >= 1 << (WORD_BITS - 1):
+        return None
+    best, best_cost = None, model.cost(['IMUL'])
+    for steps in multiply_candidates(magnitude):
+        if value < 0:
+            steps = steps + [('NEG', None)]
+        opcodes = [opcode for opcode, _ in steps]
+        if not opcodes or opcodes[0] != 'LEA':
+            opcodes.append('MOV')
+        cost = model.cost(opcodes)
+        if cost < best_cost:
+            best, best_cost = steps, cost
+    return best
+
+
+# Остаток от деления на 2 ** k со знаком делимого (как в Java): t = (x >> 31) >>> (32 - k) - #
+# поправка для отрицательного x, результат = ((x + t) & (2 ** k - 1)) - t #
+MODULO_OPCODES = ['MOV', 'SAR', 'SHR', 'MOV', 'ADD', 'AND', 'SUB']
+DIVISION_OPCODES = ['MOV', 'MOV', 'IDIV', 'MOV']
+
+
+def modulo_shift(value: int, model: CostModel) -> Optional[int]:
+    """
+    Можно ли заменить остаток от деления на константу маской
+    :param value: делитель
+    :param model: модель стоимости цели
+    :return: k, если |value| = 2 ** k и маска дешевле IDIV, иначе None
+    """
+    shift = power_of_two(abs(value))
+    if shift is None or not 0 < shift < WORD_BITS - 1:
+        return None
+    return shift if model.cost(MODULO_OPCODES) < model.cost(DIVISION_OPCODES) else None
@@ -66,38 +66,43 @@ class X86MiniJavaClassStruct(IClassStruct):
             position
         )
 
-    def allocate_new(self, position: Position):
+    def allocate_new(self, position: Position, context=None):
+        """
+        Отвечает за выделение памяти под объект и заполнение его полей
+        :param position: расположение выражения new
+        :param context: контекст компиляции (CompilationContext), из которого
+        берутся номера временных переменных и метки; без него - общие счетчики
+        :return:
+        """
+        temps = context.temps if context is not None else None
+        labels = context.labels if context is not None else None
         word_size = self.type_spec.word_size()
-        alloc_arg = ExpList(Const(self.total_fields_size + word_size * (len(self.vtable_entries) + 1), position),
-                            None, position)
+        alloc_arg = ExpList([Const(self.total_fields_size + word_size * (len(self.vtable_entries) + 1), position)],
+                            position)
         base_address_id = 0
-        base_address: Temp = Temp(None, base_address_id, None, position)
+        base_address: Temp = Temp(None, base_address_id, None, position, allocator=temps)
         prepare_actions: StmList = StmList(
-            Move(
-                base_address,
-                Call(
-                    Name(MALLOC_NAME, position),
-                    alloc_arg,
-                    position),
-                position
-            ),
-            None,
-            position
-        )
-        prepare_actions = StmList(
-            prepare_actions,
-            Move(
-                Mem(
-                    Temp(None, None, base_address), position
+            [
+                Move(
+                    base_address,
+                    Call(
+                        Name(MALLOC_NAME, position, labels),
+                        alloc_arg,
+                        position),
+                    position
                 ),
-                Name(self.get_table_name(), position),
-                position
-            ),
+                Move(
+                    Mem(
+                        Temp(None, None, base_address), position
+                    ),
+                    Name(self.get_table_name(), position, labels),
+                    position
+                ),
+            ],
             position
         )
         for offset in self.fields_offsets.items():
-            prepare_actions = StmList(
-                prepare_actions,
+            prepare_actions.append(
                 Move(
                     Binop(
                         BinopEnum.PLUS,
@@ -110,7 +115,6 @@ class X86MiniJavaClassStruct(IClassStruct):
                     ),
                     Const(0, position),
                     position
-                ),
-                position
+                )
             )
         return Eseq(prepare_actions, Mem(Temp(None, None, base_address), position), position)
@@ -1,6 +1,11 @@
+from typing import List
+
 from code_generation.instruction import IInstruction, MoveInstruction, \
     LabelInstruction, InstructionList
+from framework.compilation_context import CompilationContext
+from optimization.constant_folding import WORD_BITS
 from x86.x86_instruction_set import CISCOperation, RegMove, Regs
+from x86.strength_reduction import CostModel, Step, multiply_plan, modulo_shift
 from ir_tree.expressions.temp import Temp, TempList
 from ir_tree.expressions.mem import Mem
 from ir_tree.expressions.i_exp import IExp
@@ -10,7 +15,6 @@ from ir_tree.expressions.const import Const
 from ir_tree.expressions.name import Name
 from ir_tree.expressions.unary_op import UnaryOp, UnaryOpEnum
 from ir_tree.label import Label
-from ir_tree.list import ExpList
 from ir_tree.statements.i_stm import IStm
 from ir_tree.statements.jump import Jump
 from ir_tree.statements.jumpc import JumpC, JumpTypeEnum
@@ -18,12 +22,22 @@ from ir_tree.statements.move import Move
 from ir_tree.statements.exp import Exp
 from ir_tree.statements.label_stm import LabelStm
 from ir_tree.translate.i_subtree_wrapper import LinearTree
+from syntax_tree import find_handler
 
 
 class Muncher:
-    def __init__(self, tree: LinearTree):
+    def __init__(self, tree: LinearTree, context: CompilationContext = None, cost_model: CostModel = None):
+        """
+        Конструктор
+        :param tree: линеаризованный метод
+        :param context: контекст компиляции
+        :param cost_model: модель стоимости цели - если задана, умножение и остаток от деления
+        на константу заменяются сдвигами, масками и LEA, когда это дешевле (x86.strength_reduction)
+        """
+        self.context = context if context is not None else CompilationContext.shared()
         self.stm_list = tree
         self.instructions_list = InstructionList()
+        self.cost_model = cost_model
 
     def create_instructions_list(self):
         self.generation()
@@ -33,68 +47,110 @@ class Muncher:
         for stm in self.stm_list:
             self.munch_stm(stm)
 
+    # Обработчики узлов IR: класс узла -> имя метода (см. syntax_tree.Visitor) #
+    stm_methods = {
+        Move: 'munch_move_statement',
+        Jump: 'munch_jump_statement',
+        JumpC: 'munch_jumpc_statement',
+        LabelStm: 'munch_label_statement',
+        Exp: 'munch_exp_statement',
+    }
+
+    exp_methods = {
+        Mem: 'munch_mem',
+        Binop: 'munch_binop',
+        Const: 'munch_const',
+        Temp: 'munch_temp',
+        Call: 'munch_call',
+        Name: 'munch_name',
+        UnaryOp: 'munch_unary_op',
+    }
+
+    stm_cache = dict()
+    exp_cache = dict()
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls.stm_cache = dict()
+        cls.exp_cache = dict()
+
     def munch_stm(self, s: IStm):
-        if isinstance(s, Move):
-            self.munch_move(s.source, s.destination)
-        elif isinstance(s, Jump):
-            self.munch_jump(s.label_to_jump)
-        elif isinstance(s, JumpC):
-            self.munch_jumpc(s.condition_left_expression,
-                             s.condition_right_expression,
-                             s.true_label,
-                             s.jump_type_enum)
-        elif isinstance(s, LabelStm):
-            self.munch_label_stm(s.label_name)
-        elif isinstance(s, Exp):
-            self.munch_exp(s.expression)
-        else:
+        try:
+            method = self.stm_cache[s.__class__]
+        except KeyError:
+            method = find_handler(type(self), self.stm_methods, s.__class__)
+            self.stm_cache[s.__class__] = method
+        if method is None:
             raise NotImplementedError()
+        method(self, s)
 
     def munch_exp(self, exp: IExp):
-        if isinstance(exp, Mem):
-            return self.munch_mem(exp)
-        elif isinstance(exp, Binop):
-            return self.munch_binop(exp)
-        elif isinstance(exp, Const):
-            return_reg = Temp("Const")
-            self.instructions_list.registers.append(return_reg)
-            self.emit(RegMove(
-                "MOV %0 " + str(exp.value),
-                exp,
-                return_reg)
-            )
-            return return_reg
-        elif isinstance(exp, Temp):
-            return exp
-        elif isinstance(exp, Call):
-            return self.munch_call(exp)
-        elif isinstance(exp, Name):
-            result = Temp("Name")
+        try:
+            method = self.exp_cache[exp.__class__]
+        except KeyError:
+            method = find_handler(type(self), self.exp_methods, exp.__class__)
+            self.exp_cache[exp.__class__] = method
+        if method is None:
+            raise NotImplementedError()
+        return method(self, exp)
+
+    def munch_move_statement(self, s: Move):
+        self.munch_move(s.source, s.destination)
+
+    def munch_jump_statement(self, s: Jump):
+        self.munch_jump(s.label_to_jump)
+
+    def munch_jumpc_statement(self, s: JumpC):
+        self.munch_jumpc(s.condition_left_expression,
+                         s.condition_right_expression,
+                         s.true_label,
+                         s.jump_type_enum)
+
+    def munch_label_statement(self, s: LabelStm):
+        self.munch_label_stm(s.label_name)
+
+    def munch_exp_statement(self, s: Exp):
+        self.munch_exp(s.expression)
+
+    def munch_const(self, exp: Const):
+        return_reg = self.context.new_temp("Const")
+        self.instructions_list.registers.append(return_reg)
+        self.emit(RegMove(
+            "MOV %0 " + str(exp.value),
+            exp,
+            return_reg)
+        )
+        return return_reg
+
+    def munch_temp(self, exp: Temp):
+        return exp
+
+    def munch_name(self, exp: Name):
+        result = self.context.new_temp("Name")
+        self.instructions_list.registers.append(result)
+        self.emit(RegMove(
+            "MOV %0" + exp.label_name.name,
+            Const(0),
+            result
+        ))
+        return result
+
+    def munch_unary_op(self, exp: UnaryOp):
+        if exp.operation == UnaryOpEnum.NOT:
+            result = self.context.new_temp("NOT")
             self.instructions_list.registers.append(result)
             self.emit(RegMove(
-                "MOV %0" + exp.label_name.name,
-                Const(0),
-                result
+                "MOV %0 %1",
+                self.munch_exp(exp.expression),
+                result,
+                True
+            ))
+            self.emit(CISCOperation(
+                "NOT %0",
+                [result],
+                [result]
             ))
             return result
-        elif isinstance(exp, UnaryOp):
-            if exp.operation == UnaryOpEnum.NOT:
-                result = Temp("NOT")
-                self.instructions_list.registers.append(result)
-                self.emit(RegMove(
-                    "MOV %0 %1",
-                    self.munch_exp(exp.expression),
-                    result,
-                    True
-                ))
-                self.emit(CISCOperation(
-                    "NOT %0",
-                    [result],
-                    [result]
-                ))
-                return result
-            else:
-                raise NotImplementedError()
         else:
             raise NotImplementedError()
 
@@ -184,28 +240,12 @@ class Muncher:
                 True
             ))
 
-    def munch_exp_list(self, exp_list: ExpList):
-        head = exp_list.head
-        tail = exp_list.tail
-        temps = []
-        if isinstance(head, ExpList):
-            sub_temps = self.munch_exp_list(head)
-            temps += sub_temps
-        else:
-            temps.append(self.munch_exp(head))
-        if isinstance(tail, ExpList):
-            sub_temps = self.munch_exp_list(tail)
-            temps += sub_temps
-        elif tail:
-            temps.append(self.munch_exp(tail))
-        return temps
-
     def munch_mem(self, mem: Mem):
         exp = mem.expression
         if isinstance(exp, Binop) and exp.operation == BinopEnum.PLUS:
             if isinstance(exp.right_expression, Const):
                 left = self.munch_exp(exp.left_expression)
-                returned_reg = Temp("MEM(BINOP(PLUS, e1, CONST(i)))")
+                returned_reg = self.context.new_temp("MEM(BINOP(PLUS, e1, CONST(i)))")
                 self.instructions_list.registers.append(returned_reg)
                 self.emit(RegMove(
                     "MOV %0 [%1 + " + str(exp.right_expression.value) + "]",
@@ -215,7 +255,7 @@ class Muncher:
                 return returned_reg
             elif isinstance(exp.left_expression, Const):
                 right = self.munch_exp(exp.right_expression)
-                returned_reg = Temp("MEM(BINOP(PLUS, CONST(i), e1))")
+                returned_reg = self.context.new_temp("MEM(BINOP(PLUS, CONST(i), e1))")
                 self.instructions_list.registers.append(returned_reg)
                 self.emit(RegMove(
                     "MOV %0 [%1 + " + str(exp.left_expression.value) + "]",
@@ -224,7 +264,7 @@ class Muncher:
                 ))
                 return returned_reg
             else:
-                returned_reg = Temp("MEM(e1)")
+                returned_reg = self.context.new_temp("MEM(e1)")
                 self.instructions_list.registers.append(returned_reg)
                 self.emit(RegMove(
                     "MOV %0 [%1]",
@@ -233,7 +273,7 @@ class Muncher:
                 ))
                 return returned_reg
         elif isinstance(exp, Const):
-            returned_reg = Temp("MEM(Const(i))")
+            returned_reg = self.context.new_temp("MEM(Const(i))")
             self.instructions_list.registers.append(returned_reg)
             self.emit(RegMove(
                 "MOV %0 [" + str(exp.value) + "]",
@@ -243,7 +283,7 @@ class Muncher:
             return returned_reg
         else:
             e1 = self.munch_exp(mem.expression)
-            returned_reg = Temp("MEM(e1)")
+            returned_reg = self.context.new_temp("MEM(e1)")
             self.instructions_list.registers.append(returned_reg)
             self.emit(RegMove(
                 "MOV %0 [%1]",
@@ -253,9 +293,9 @@ class Muncher:
             return returned_reg
 
     def munch_call(self, call: Call):
-        eax = Temp("EAX", unique_id=Regs.EAX.value)
+        eax = self.context.new_temp("EAX", unique_id=Regs.EAX.value)
         self.instructions_list.registers.append(eax)
-        list_args = self.munch_exp_list(call.args)
+        list_args = [self.munch_exp(argument) for argument in call.args.expressions]
         fe = call.func_expr
         if isinstance(fe, Mem):
             func_address = fe.expression
@@ -274,7 +314,14 @@ class Muncher:
             ))
             return eax
         else:
-            raise NotImplementedError()
+            # адрес метода уже вычислен канонизатором во временную переменную #
+            list_args.append(self.munch_exp(fe))
+            self.emit(CISCOperation(
+                "CALL %" + str(len(list_args)-1),
+                list_args,
+                TempList()
+            ))
+            return eax
 
     def munch_binop(self, binop: Binop):
         if binop.operation == BinopEnum.PLUS:
@@ -293,7 +340,7 @@ class Muncher:
             raise NotImplementedError()
 
     def munch_binop_regular(self, binop: Binop, prefix: str):
-        returned_reg = Temp("BINOP(Regular)")
+        returned_reg = self.context.new_temp("BINOP(Regular)")
         self.instructions_list.registers.append(returned_reg)
         if isinstance(binop.left_expression, Const):
             self.emit(RegMove(
@@ -333,7 +380,15 @@ class Muncher:
             return returned_reg
 
     def munch_binop_mul(self, binop: Binop):
-        returned_reg = Temp("BINOP(Regular)")
+        if self.cost_model is not None:
+            for factor, other in ((binop.left_expression, binop.right_expression),
+                                  (binop.right_expression, binop.left_expression)):
+                if isinstance(factor, Const):
+                    plan = multiply_plan(factor.value, self.cost_model)
+                    if plan is not None:
+                        return self.munch_multiply_plan(other, plan)
+                    break
+        returned_reg = self.context.new_temp("BINOP(Regular)")
         self.instructions_list.registers.append(returned_reg)
         if isinstance(binop.left_expression, Const):
             self.emit(CISCOperation(
@@ -362,10 +417,67 @@ class Muncher:
             ))
             return returned_reg
 
+    def munch_multiply_plan(self, exp: IExp, plan: List[Step]):
+        """
+        Умножение на константу по плану multiply_plan
+        :param exp: второй множитель
+        :param plan: шаги
+        :return: регистр с результатом
+        """
+        source = self.munch_exp(exp)
+        returned_reg = self.context.new_temp("BINOP(Regular)")
+        self.instructions_list.registers.append(returned_reg)
+        if plan and plan[0][0] == 'LEA':
+            self.emit(CISCOperation(
+                "LEA %0 [%1+%1*" + str(plan[0][1]) + "]",
+                [source],
+                [returned_reg]
+            ))
+            plan = plan[1:]
+        else:
+            self.emit(RegMove(
+                "MOV %0 %1",
+                source,
+                returned_reg
+            ))
+        for opcode, operand in plan:
+            if opcode == 'SHL':
+                self.emit(CISCOperation("SHL %0 " + str(operand), [returned_reg], [returned_reg]))
+            elif opcode == 'NEG':
+                self.emit(CISCOperation("NEG %0", [returned_reg], [returned_reg]))
+            else:
+                self.emit(CISCOperation(opcode + " %0 %1", [source], [returned_reg]))
+        return returned_reg
+
+    def munch_modulo_mask(self, exp: IExp, shift: int):
+        """
+        Остаток от деления на 2 ** shift со знаком делимого без IDIV (MODULO_OPCODES)
+        :param exp: делимое
+        :param shift: степень двойки делителя
+        :return: регистр с результатом
+        """
+        dividend = self.munch_exp(exp)
+        correction = self.context.new_temp("BINOP(Regular)")
+        self.instructions_list.registers.append(correction)
+        self.emit(RegMove("MOV %0 %1", dividend, correction))
+        self.emit(CISCOperation("SAR %0 " + str(WORD_BITS - 1), [correction], [correction]))
+        self.emit(CISCOperation("SHR %0 " + str(WORD_BITS - shift), [correction], [correction]))
+        returned_reg = self.context.new_temp("BINOP(Regular)")
+        self.instructions_list.registers.append(returned_reg)
+        self.emit(RegMove("MOV %0 %1", dividend, returned_reg))
+        self.emit(CISCOperation("ADD %0 %1", [correction], [returned_reg]))
+        self.emit(CISCOperation("AND %0 " + str((1 << shift) - 1), [returned_reg], [returned_reg]))
+        self.emit(CISCOperation("SUB %0 %1", [correction], [returned_reg]))
+        return returned_reg
+
     def munch_binop_div(self, binop: Binop):
-        eax = Temp("EAX", unique_id=Regs.EAX.value)
+        if self.cost_model is not None and isinstance(binop.right_expression, Const):
+            shift = modulo_shift(binop.right_expression.value, self.cost_model)
+            if shift is not None:
+                return self.munch_modulo_mask(binop.left_expression, shift)
+        eax = self.context.new_temp("EAX", unique_id=Regs.EAX.value)
         self.instructions_list.registers.append(eax)
-        edx = Temp("EDX", unique_id=Regs.EDX.value)
+        edx = self.context.new_temp("EDX", unique_id=Regs.EDX.value)
         self.instructions_list.registers.append(eax)
         self.emit(RegMove(
             "MOV %0 %1",
@@ -377,7 +489,7 @@ class Muncher:
             [self.munch_exp(binop.right_expression), eax],
             [edx]
         ))
-        return_reg = Temp("BINOP(Regular)")
+        return_reg = self.context.new_temp("BINOP(Regular)")
         self.instructions_list.registers.append(return_reg)
         self.emit(RegMove(
             "MOV %0 %1",
@@ -398,7 +510,8 @@ class Muncher:
             self, condition_left_expression: IExp,
             condition_right_expression: IExp,
             true_label: Label, jump_type: JumpC):
-        if isinstance(condition_left_expression, Const):
+        # CMP сравнивает с константой только справа, менять операнды местами можно лишь для EQ и NEQ #
+        if isinstance(condition_left_expression, Const) and jump_type in (JumpTypeEnum.EQ, JumpTypeEnum.NEQ):
             e = self.munch_exp(condition_right_expression)
             self.emit(CISCOperation(
                 "CMP %0 " + str(condition_left_expression.value),
@@ -441,6 +554,13 @@ class Muncher:
                 TempList(),
                 [true_label]
             ))
+        elif jump_type == JumpTypeEnum.GE:
+            self.emit(CISCOperation(
+                "JGE %l",
+                TempList(),
+                TempList(),
+                [true_label]
+            ))
         else:
             raise NotImplementedError()
 
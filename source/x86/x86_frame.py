@@ -3,6 +3,7 @@ from activation_records.i_frame import IFrame
 from activation_records.in_frame_access import InFrameAccess
 from activation_records.in_reg_access import InRegAccess
 from activation_records.temp_address import TempAddress
+from ir_tree.expressions.temp import TempAllocator
 from symbol_table.type_info import TypeInfo, TypeEnum
 from symbol_table.variable_info import VariableInfo
 from x86.x86_type_spec import X86MiniJavaTypeSpec
@@ -18,8 +19,9 @@ class X86MiniJavaFrame(IFrame):
     Реализация фрейма под конкретную архитектуру x86
     """
 
-    def __init__(self):
+    def __init__(self, temps: TempAllocator = None):
         IFrame.__init__(self)
+        self.temps = temps
         self.formal_list = []
         self.formal_access = dict()
         self.local_access = dict()
@@ -32,7 +34,8 @@ class X86MiniJavaFrame(IFrame):
         self.return_address: IAccess = InRegAccess(RecordsType.RT_AddressReturnValue,
                                                    self.type_spec.word_size(),
                                                    None,
-                                                   RETURN_ADDRESS)
+                                                   RETURN_ADDRESS,
+                                                   temps=self.temps)
 
     def type_size(self, type_enum: TypeEnum):
         return self.type_spec.type_size(type_enum)
@@ -91,7 +94,7 @@ class X86MiniJavaFrame(IFrame):
 
     def _create_formal(self, records_type: RecordsType, size: int):
         if len(self.formal_list) < MAX_IN_REG:
-            return InRegAccess(records_type, size, None, len(self.formal_list))
+            return InRegAccess(records_type, size, None, len(self.formal_list), self.temps)
         else:
             access: IAccess = InFrameAccess(records_type, size, self.formal_top_pointer)
             self.formal_top_pointer += size
@@ -1,8 +1,14 @@
+import copy
+import hashlib
+import os
+
 import ply.lex as ply_lex
 import ply.yacc as ply_yacc
 
 import syntax_tree as ast
+from framework.ast_cache import DEFAULT_MAX_BYTES, AstCache
 from lex import *
+from rd_parser import RecursiveDescentParser
 
 """
 # Подробное описание работы с YACC можно найти в документации Ply
@@ -25,18 +31,22 @@ precedence = (
 # Задаем стартовый символ - с него начинается разбор #
 start = 'start'
 
-text = None
-
 
 # Функция определения координат токена #
+# Таблица строк берется из лексера текущего разбора, поэтому разборы не мешают друг другу #
 def get_pos(p):
-    x = find_column(p.lexpos(0))
+    x = find_column(p.lexer.lines, p.lexpos(0))
     y = p.lineno(0)
     return x, y
 
 
-def find_column(lex_pos):
-    last_cr = text.rfind('\n', 0, lex_pos)
+# Расположения узлов берутся из общей таблицы текущего разбора #
+def get_position(p):
+    return p.lexer.positions.get(*get_pos(p))
+
+
+def find_column(lines: LineIndex, lex_pos):
+    last_cr = lines.last_newline(lex_pos)
     if last_cr < 0:
         last_cr = 0
     column = (lex_pos - last_cr)
@@ -50,9 +60,9 @@ def p_goal(p):
           | main_class
     """
     if len(p) == 2:
-        p[0] = ast.Program(p[1], None, ast.Position(*get_pos(p)))
+        p[0] = ast.Program(p[1], None, get_position(p))
     else:
-        p[0] = ast.Program(p[1], p[2], ast.Position(*get_pos(p)))
+        p[0] = ast.Program(p[1], p[2], get_position(p))
     return p[0]
 
 
@@ -60,7 +70,7 @@ def p_main_class(p):
     """
     main_class : CLASS id L_BRACKET PUBLIC STATIC_VOID_MAIN L_ROUND STRING L_SQUARE R_SQUARE id R_ROUND L_BRACKET statement_s R_BRACKET R_BRACKET
     """
-    p[0] = ast.MainClass(p[2], p[10], p[13], ast.Position(*get_pos(p)))
+    p[0] = ast.MainClass(p[2], p[10], p[13], get_position(p))
 
 
 def p_class_s(p):
@@ -87,22 +97,22 @@ def p_class(p):
     """
     if p[3] != 'extends':
         if isinstance(p[4], str):
-            p[0] = ast.ClassDecl(p[2], None, None, None, ast.Position(*get_pos(p)))
+            p[0] = ast.ClassDecl(p[2], None, None, None, get_position(p))
         elif len(p) == 7:
-            p[0] = ast.ClassDecl(p[2], None, p[4], p[5], ast.Position(*get_pos(p)))
+            p[0] = ast.ClassDecl(p[2], None, p[4], p[5], get_position(p))
         elif isinstance(p[4], ast.VarDeclList):
-            p[0] = ast.ClassDecl(p[2], None, p[4], None, ast.Position(*get_pos(p)))
+            p[0] = ast.ClassDecl(p[2], None, p[4], None, get_position(p))
         elif isinstance(p[4], ast.MethodDeclList):
-            p[0] = ast.ClassDecl(p[2], None, None, p[4], ast.Position(*get_pos(p)))
+            p[0] = ast.ClassDecl(p[2], None, None, p[4], get_position(p))
     else:
         if isinstance(p[6], str):
-            p[0] = ast.ClassDecl(p[2], p[4], None, None, ast.Position(*get_pos(p)))
+            p[0] = ast.ClassDecl(p[2], p[4], None, None, get_position(p))
         elif len(p) == 9:
-            p[0] = ast.ClassDecl(p[2], p[4], p[6], p[7], ast.Position(*get_pos(p)))
+            p[0] = ast.ClassDecl(p[2], p[4], p[6], p[7], get_position(p))
         elif isinstance(p[6], ast.VarDeclList):
-            p[0] = ast.ClassDecl(p[2], p[4], p[6], None, ast.Position(*get_pos(p)))
+            p[0] = ast.ClassDecl(p[2], p[4], p[6], None, get_position(p))
         elif isinstance(p[6], ast.MethodDeclList):
-            p[0] = ast.ClassDecl(p[2], p[4], None, p[6], ast.Position(*get_pos(p)))
+            p[0] = ast.ClassDecl(p[2], p[4], None, p[6], get_position(p))
 
 
 def p_var_s(p):
@@ -120,7 +130,7 @@ def p_var(p):
     """
     var : type id SEMICOLON
     """
-    p[0] = ast.VarDecl(p[1], p[2], ast.Position(*get_pos(p)))
+    p[0] = ast.VarDecl(p[1], p[2], get_position(p))
 
 
 def p_method_s(p):
@@ -142,20 +152,20 @@ def p_method(p):
            | modifier type id L_ROUND arg_s R_ROUND L_BRACKET stm_ret R_BRACKET
     """
     if isinstance(p[8], ast.ReturnStatement):
-        p[0] = ast.MethodDecl(p[1], p[2], p[3], p[5], None, None, p[8], ast.Position(*get_pos(p)))
+        p[0] = ast.MethodDecl(p[1], p[2], p[3], p[5], None, None, p[8], get_position(p))
     elif len(p) == 12:
-        p[0] = ast.MethodDecl(p[1], p[2], p[3], p[5], p[8], p[9], p[10], ast.Position(*get_pos(p)))
+        p[0] = ast.MethodDecl(p[1], p[2], p[3], p[5], p[8], p[9], p[10], get_position(p))
     elif isinstance(p[8], ast.VarDeclList):
-        p[0] = ast.MethodDecl(p[1], p[2], p[3], p[5], p[8], None, p[9], ast.Position(*get_pos(p)))
+        p[0] = ast.MethodDecl(p[1], p[2], p[3], p[5], p[8], None, p[9], get_position(p))
     else:
-        p[0] = ast.MethodDecl(p[1], p[2], p[3], p[5], None, p[8], p[9], ast.Position(*get_pos(p)))
+        p[0] = ast.MethodDecl(p[1], p[2], p[3], p[5], None, p[8], p[9], get_position(p))
 
 
 def p_stm_ret(p):
     """
     stm_ret : RETURN exp SEMICOLON
     """
-    p[0] = ast.ReturnStatement(p[2], ast.Position(*get_pos(p)))
+    p[0] = ast.ReturnStatement(p[2], get_position(p))
 
 def p_arg_s(p):
     """
@@ -175,7 +185,7 @@ def p_arg(p):
     """
     arg : type id
     """
-    p[0] = ast.ArgDecl(p[1], p[2], ast.Position(*get_pos(p)))
+    p[0] = ast.ArgDecl(p[1], p[2], get_position(p))
 
 
 def p_modifier(p):
@@ -224,17 +234,17 @@ def p_statement(p):
               | id L_SQUARE exp R_SQUARE EQUALS exp SEMICOLON
     """
     if p[1] == 'if':
-        p[0] = ast.IfStatement(p[3], p[5], p[7], ast.Position(*get_pos(p)))
+        p[0] = ast.IfStatement(p[3], p[5], p[7], get_position(p))
     elif p[1] == 'while':
-        p[0] = ast.WhileStatement(p[3], p[5], ast.Position(*get_pos(p)))
+        p[0] = ast.WhileStatement(p[3], p[5], get_position(p))
     elif p[1] == 'System.out.println':
-        p[0] = ast.PrintLineStatement(p[3], ast.Position(*get_pos(p)))
+        p[0] = ast.PrintLineStatement(p[3], get_position(p))
     elif len(p) == 4:
         p[0] = ast.Statements(p[2])
     elif len(p) == 5:
-        p[0] = ast.AssignStatement(p[1], p[3], ast.Position(*get_pos(p)))
+        p[0] = ast.AssignStatement(p[1], p[3], get_position(p))
     else:
-        p[0] = ast.RandomAccessAssignStatement(p[1], p[3], p[6], ast.Position(*get_pos(p)))
+        p[0] = ast.RandomAccessAssignStatement(p[1], p[3], p[6], get_position(p))
 
 
 def p_exp_s(p):
@@ -256,13 +266,13 @@ def p_exp(p):
         | exp DOT id L_ROUND exp_s R_ROUND
     """
     if len(p) == 5:
-        p[0] = ast.RandomAccessExpr(p[1], p[3], ast.Position(*get_pos(p)))
+        p[0] = ast.RandomAccessExpr(p[1], p[3], get_position(p))
     elif len(p) == 4:
-        p[0] = ast.LengthExpr(p[1], ast.Position(*get_pos(p)))
+        p[0] = ast.LengthExpr(p[1], get_position(p))
     elif len(p) == 6:
-        p[0] = ast.CallMethodExpr(p[1], p[3], None, ast.Position(*get_pos(p)))
+        p[0] = ast.CallMethodExpr(p[1], p[3], None, get_position(p))
     else:
-        p[0] = ast.CallMethodExpr(p[1], p[3], p[5], ast.Position(*get_pos(p)))
+        p[0] = ast.CallMethodExpr(p[1], p[3], p[5], get_position(p))
 
 
 def p_exp_vars(p):
@@ -278,19 +288,19 @@ def p_exp_vars(p):
         | L_ROUND exp R_ROUND
     """
     if p[1] == 'true' or p[1] == 'false':
-        p[0] = ast.ValueExpr(ast.ValueEnum.BOOLEAN, p[1], ast.Position(*get_pos(p)))
+        p[0] = ast.ValueExpr(ast.ValueEnum.BOOLEAN, p[1], get_position(p))
     elif p[1] == 'this':
-        p[0] = ast.ThisExpr(ast.Position(*get_pos(p)))
+        p[0] = ast.ThisExpr(get_position(p))
     elif len(p) == 6:
-        p[0] = ast.NewIntArrExpr(p[4], ast.Position(*get_pos(p)))
+        p[0] = ast.NewIntArrExpr(p[4], get_position(p))
     elif len(p) == 5:
-        p[0] = ast.NewObjectExpr(p[2], ast.Position(*get_pos(p)))
+        p[0] = ast.NewObjectExpr(p[2], get_position(p))
     elif len(p) == 3:
-        p[0] = ast.NotExpr(p[2], ast.Position(*get_pos(p)))
+        p[0] = ast.NotExpr(p[2], get_position(p))
     elif len(p) == 4:
         p[0] = p[2]
     elif isinstance(p[1], int):
-        p[0] = ast.ValueExpr(ast.ValueEnum.INTEGER, p[1], ast.Position(*get_pos(p)))
+        p[0] = ast.ValueExpr(ast.ValueEnum.INTEGER, p[1], get_position(p))
     else:
         p[0] = p[1]
 
@@ -305,14 +315,14 @@ def p_exp_binary_operation(p):
         | exp PERCENT exp
         | exp OR exp
     """
-    p[0] = ast.BinaryExpr(p[1], p[2], p[3], ast.Position(*get_pos(p)))
+    p[0] = ast.BinaryExpr(p[1], p[2], p[3], get_position(p))
 
 
 def p_id(p):
     """
     id : ID
     """
-    p[0] = ast.Id(p[1], ast.Position(*get_pos(p)))
+    p[0] = ast.Id(p[1], get_position(p))
 
 
 def p_empty(_):
@@ -324,17 +334,152 @@ def p_error(p):
     raise SyntaxError(f"Syntax error in input! Text: {p}")
 
 
-parser = ply_yacc.yacc()
+# Каталог для кэша таблиц разбора (и других кэшей компилятора) #
+CACHE_DIR = os.environ.get('MINIJAVA_CACHE_DIR') or os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                                                  '__pycache__')
 
 
-# Функция для разбора программы - именно ее использует конечный пользователь #
-def parse_program(file_path) -> ast.Program:
-    global parser
-    global text
-    with open(file_path) as file:
-        text = file.read()
+def grammar_hash() -> str:
+    """
+    Считает хеш грамматики: правила (docstring-и функций p_*), приоритеты,
+    токены и версию формата таблиц PLY - при любом их изменении кэш таблиц устаревает
+    :return:
+    """
+    digest = hashlib.sha256()
+    digest.update(ply_yacc.__tabversion__.encode())
+    digest.update(repr((start, precedence, tokens)).encode())
+    for name, function in sorted(globals().items()):
+        if name.startswith('p_') and callable(function):
+            digest.update(f'{name}:{function.__doc__}'.encode())
+    return digest.hexdigest()
+
+
+GRAMMAR_HASH = grammar_hash()
 
-    lexer = ply_lex.lex()
-    result = parser.parse(text, tracking=True, lexer=lexer)
 
+def load_parser():
+    """
+    Загружает таблицы разбора из кэша, при его отсутствии строит их и сохраняет
+    :return: LR-парсер PLY
+    """
+    path = os.path.join(CACHE_DIR, f'parsetab_{GRAMMAR_HASH[:16]}.pickle')
+    if os.path.exists(path):
+        return ply_yacc.yacc(debug=False, picklefile=path)
+
+    # Таблицы пишутся во временный файл и переименовываются - параллельно запущенные #
+    # процессы никогда не прочитают недописанный кэш #
+    temp_path = f'{path}.{os.getpid()}'
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    result = ply_yacc.yacc(debug=False, picklefile=temp_path)
+    try:
+        os.replace(temp_path, path)
+    except OSError:
+        pass
     return result
+
+
+# Таблицы разбора и лексер строятся один раз и дальше только читаются (лексер копируется) #
+parser = load_parser()
+lexer = ply_lex.lex()
+
+
+class Parser:
+    """
+    Отвечает за разбор программ - хранит свой текст, лексер и состояние LR-автомата,
+    поэтому разные экземпляры можно использовать одновременно из разных потоков
+    Сам экземпляр не потокобезопасен: один Parser - один поток
+    """
+
+    def __init__(self):
+        self.text: str = None
+        self.lexer = lexer.clone()
+        # Стеки автомата хранятся в его полях - копируем, таблицы остаются общими #
+        self.parser = copy.copy(parser)
+
+    def parse_source(self, text: str) -> ast.Program:
+        """
+        Разбирает программу, заданную текстом
+        :param text: исходный код программы
+        :return: корень AST
+        """
+        self.text = text
+        self.lexer.lineno = 1
+        self.lexer.lines = LineIndex(text)
+        self.lexer.positions = ast.PositionTable()
+        try:
+            return self.parser.parse(text, tracking=True, lexer=self.lexer)
+        finally:
+            self.lexer.positions = None
+
+    def parse_file(self, file_path) -> ast.Program:
+        """
+        Разбирает программу из файла
+        :param file_path: путь до файла
+        :return: корень AST
+        """
+        with open(file_path) as file:
+            return self.parse_source(file.read())
+
+
+# Доступные реализации парсера: таблицы PLY и рукописный рекурсивный спуск #
+PARSER_BACKENDS = {
+    'ply': Parser,
+    'rd': RecursiveDescentParser,
+}
+
+
+def create_parser(backend: str = 'ply'):
+    """
+    Создает парсер выбранной реализации - обе строят одинаковые деревья
+    :param backend: 'ply' или 'rd'
+    :return:
+    """
+    if backend not in PARSER_BACKENDS:
+        raise ValueError(f'Unknown parser backend {backend}! Use one of {", ".join(PARSER_BACKENDS)}')
+    return PARSER_BACKENDS[backend]()
+
+
+# Кэш AST выключен, пока его не включат явно (или через MINIJAVA_AST_CACHE) #
+ast_cache: AstCache = None
+
+
+def enable_ast_cache(directory: str, max_bytes: int = DEFAULT_MAX_BYTES) -> AstCache:
+    """
+    Включает дисковый кэш AST для parse_source, parse_file и parse_program
+    :param directory: каталог кэша
+    :param max_bytes: максимальный размер кэша
+    :return: кэш
+    """
+    global ast_cache
+    ast_cache = AstCache(directory, GRAMMAR_HASH, max_bytes)
+    return ast_cache
+
+
+def disable_ast_cache():
+    global ast_cache
+    ast_cache = None
+
+
+if os.environ.get('MINIJAVA_AST_CACHE'):
+    enable_ast_cache(os.environ['MINIJAVA_AST_CACHE'])
+
+
+# Функции для разбора программы - именно их использует конечный пользователь #
+def parse_source(text: str, backend: str = 'ply', cache: AstCache = None) -> ast.Program:
+    cache = cache if cache is not None else ast_cache
+    if cache is None:
+        return create_parser(backend).parse_source(text)
+
+    program = cache.get(text)
+    if program is None:
+        program = create_parser(backend).parse_source(text)
+        cache.put(text, program)
+    return program
+
+
+def parse_file(file_path, backend: str = 'ply', cache: AstCache = None) -> ast.Program:
+    with open(file_path) as file:
+        return parse_source(file.read(), backend, cache)
+
+
+parse_program = parse_file